@@ -20,10 +20,33 @@ class Config:
     MAX_RETRIES = 3
     SYNC_CYCLE_FAST = 1
     SYNC_CYCLE_SLOW = 10
+    HEARTBEAT_CYCLE = 5           # Solo en runtime ASYNC (tarea propia)
+    RUNTIME_MODE = 'ASYNC'        # 'ASYNC' (tareas independientes) o 'SYNC' (bucle serial legado)
+    KLINES_WORKERS = 4            # Requests paralelos al rellenar huecos de velas
+    API_WEIGHT_PER_MINUTE = 1200  # Presupuesto propio (el límite de Binance Futures es 2400)
+    HTTP_POOL_SIZE = 10           # Conexiones keep-alive por host
+    HTTP_RETRY_BACKOFF = 0.3      # Backoff (y jitter) de reintentos HTTP idempotentes
+    HEALTH_PROBE_BINANCE = 5      # Seg. entre pings de salud (en segundo plano)
+    HEALTH_PROBE_TELEGRAM = 30
+    HEALTH_BACKOFF_MAX = 120      # Tope del backoff de sondas tras fallos consecutivos
+
+    # DATOS DE MERCADO: 'REST' (polling) o 'STREAM' (WebSocket kline_1m + markPrice + bookTicker)
+    MARKET_DATA_MODE = 'REST'
+    WS_URL = 'wss://fstream.binance.com'
+    WS_URL_TESTNET = 'wss://stream.binancefuture.com'
+    STREAM_MAX_AGE = 5            # Seg. sin mensajes antes de volver a REST
 
     # GENERAL
-    MODE = 'TESTNET'      
+    MODE = 'TESTNET'      # 'TESTNET', 'REAL', 'SIMULATION' (stubs) u 'OFFLINE' (exchange simulado)
     SYMBOL = 'AAVEUSDT'   
+    # Símbolos operados por el mismo proceso (el primero es el principal: Dashboard/Telegram).
+    # Con más de uno cada símbolo tiene su almacén, motor, registro FVG y estado en
+    # bitacoras/<SYMBOL>/ (ver para_simbolo); requiere RUNTIME_MODE = 'ASYNC'.
+    SYMBOLS = [SYMBOL]
+    # Ruta de decisión en vivo (auditoría TP/SL local + Brain -> Shooter -> órdenes).
+    # Hasta V2.3 el bucle nunca la alcanzaba (esperaba un DataFrame en mtf_data['1m']);
+    # queda apagada por defecto y se activa explícitamente.
+    ENABLE_LIVE_DECISIONS = False
     LEVERAGE = 5          
     LOG_LEVEL = 'INFO'
 
@@ -38,7 +61,9 @@ class Config:
     MAX_DAILY_LOSS_PCT = 0.05
     DAILY_TARGET_PCT = 0.08
 
+    # Topes GLOBALES: la billetera es una sola para todas las mesas (multi-símbolo)
     MAX_OPEN_POSITIONS = 3
+    MAX_TOTAL_EXPOSURE_PCT = 0.50  # Margen comprometido máximo (suma de wallet_pct abiertos)
 
     # CONFIGURACIÓN CEREBRO
     class BrainConfig:
@@ -100,8 +125,45 @@ class Config:
     LOG_PATH = os.path.join(BASE_DIR, 'logs', 'bitacoras')
     
     FILE_STATE = os.path.join(LOG_PATH, 'bot_state.json')
-    FILE_METRICS = os.path.join(LOG_PATH, 'metrics_history.csv')
+    FILE_METRICS = os.path.join(LOG_PATH, 'metrics_history.csv')  # Legado (solo migración)
+    FILE_CANDLES = os.path.join(LOG_PATH, 'candles_1m.bin')
     FILE_WALLET = os.path.join(LOG_PATH, 'virtual_wallet.json')
     FILE_ORDERS = os.path.join(LOG_PATH, 'orders_positions.csv')
     FILE_ERRORS = os.path.join(LOG_PATH, 'system_errors.csv')
-    FILE_ACTIVITY = os.path.join(LOG_PATH, 'bot_activity.log')
\ No newline at end of file
+    FILE_ACTIVITY = os.path.join(LOG_PATH, 'bot_activity.log')
+
+    # MODO OFFLINE (exchange simulado sobre velas 1m grabadas: .bin del almacén o CSV)
+    OFFLINE_DATASET = os.path.join(BASE_DIR, 'logs', 'data_lab', f'{SYMBOL}_1m.csv')
+    OFFLINE_WARMUP_CANDLES = 60000  # Velas previas visibles al arrancar (historia para indicadores)
+    # Escalera de Take Profit SOLO del simulador (distancia desde la entrada, fracción por
+    # escalón): el Shooter la necesita para un ciclo completo. No aplica al vivo.
+    OFFLINE_TP_DISTANCES = [0.015, 0.03, 0.05]
+    OFFLINE_TP_SPLIT = [0.33, 0.33, 0.34]
+
+    @classmethod
+    def preparar_offline(cls):
+        """
+        MODE 'OFFLINE': si ShooterConfig no define escalera de TP (el vivo la fija
+        el dueño del riesgo), usa la del simulador. Una definida no se toca.
+        """
+        if not hasattr(cls.ShooterConfig, 'TP_DISTANCES'):
+            cls.ShooterConfig.TP_DISTANCES = list(cls.OFFLINE_TP_DISTANCES)
+            cls.ShooterConfig.TP_SPLIT = list(cls.OFFLINE_TP_SPLIT)
+
+    @classmethod
+    def para_simbolo(cls, symbol):
+        """
+        Config de un símbolo: subclase con SYMBOL propio y sus rutas de estado
+        (velas, historia HTF, registro FVG, posiciones). El símbolo principal
+        conserva las rutas de siempre; el resto vive en bitacoras/<SYMBOL>/.
+        """
+        if symbol == cls.SYMBOL: return cls
+        carpeta = os.path.join(cls.LOG_PATH, symbol)
+        os.makedirs(carpeta, exist_ok=True)
+        return type(f"{cls.__name__}_{symbol}", (cls,), {
+            'SYMBOL': symbol,
+            'LOG_PATH': carpeta,
+            'FILE_STATE': os.path.join(carpeta, 'bot_state.json'),
+            'FILE_METRICS': os.path.join(carpeta, 'metrics_history.csv'),
+            'FILE_CANDLES': os.path.join(carpeta, 'candles_1m.bin'),
+        })
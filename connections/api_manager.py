@@ -1,25 +1,45 @@
 import requests
 import time
+import threading
 from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceRequestException
 from requests.exceptions import RequestException
+from .market_stream import StreamMercado
+from .http_transport import TransporteHTTP
+from .health_monitor import MonitorSalud
+from .exchange_simulator import ExchangeSimulado
+from core import clock
 
 class APIManager:
     def __init__(self, config, logger):
         self.cfg = config
         self.log = logger
         self.client = None
-        self.session = requests.Session()
+        # Transporte compartido (pool keep-alive, reintentos, peso y latencias):
+        # lo usan el Client de Binance, el heartbeat y TelegramBot
+        self.transporte = TransporteHTTP(config, logger)
+        self.session = self.transporte.sesion
         self.status = {'binance': False, 'telegram': False}
+        self.stream = None   # StreamMercado del símbolo principal (solo en MARKET_DATA_MODE = 'STREAM')
+        self.streams = {}    # symbol -> StreamMercado
+        self._info_simbolos = None  # exchangeInfo por símbolo (una descarga para todos)
+        self._lock_info = threading.Lock()
         self._conectar_binance()
+        self._iniciar_monitor_salud()
 
     def _conectar_binance(self):
+        if self.cfg.MODE == 'OFFLINE':
+            return self._conectar_simulador()
         try:
             self.client = Client(
                 self.cfg.API_KEY, 
                 self.cfg.API_SECRET, 
                 testnet=(self.cfg.MODE == 'TESTNET')
             )
+            # El Client trae su propia Session: se reemplaza por la compartida. Sus
+            # cabeceras (API key) quedan acotadas a los hosts de Binance.
+            self.session.cabeceras_binance = dict(self.client.session.headers)
+            self.client.session = self.session
             self.client.ping()
             self.status['binance'] = True
             self.log.log_operational("API", f"Conectado a Binance ({self.cfg.MODE})")
@@ -27,49 +47,132 @@ class APIManager:
             self.log.log_error("API_INIT", f"Fallo crítico conectando Binance: {e}")
             self.status['binance'] = False
 
-    def check_heartbeat(self):
+    def _conectar_simulador(self):
+        """MODE 'OFFLINE': exchange en proceso sobre velas grabadas (sin red)."""
+        if self.client is not None: return  # Ya reproduciendo: no reiniciar el replay
         try:
-            self.client.ping() 
+            self.client = ExchangeSimulado.desde_config(self.cfg, reloj=clock.time)
             self.status['binance'] = True
-        except Exception:
+            self.log.log_operational("API", f"Exchange simulado ({self.cfg.OFFLINE_DATASET})")
+        except Exception as e:
+            self.log.log_error("API_INIT", f"Fallo iniciando exchange simulado: {e}")
             self.status['binance'] = False
-            if not self.status['binance']: 
-                self._conectar_binance()
-            
-        try:
-            url = f"https://api.telegram.org/bot{self.cfg.TELEGRAM_TOKEN}/getMe"
-            r = self.session.get(url, timeout=2)
-            self.status['telegram'] = r.status_code == 200
-        except: 
-            self.status['telegram'] = False
-            
-        return self.status
 
-    def get_historical_candles(self, symbol, interval, limit=100, start_time=None):
+    def _iniciar_monitor_salud(self):
+        """Sondas en segundo plano: el bucle principal nunca espera por un ping."""
+        self.salud = MonitorSalud(self.log, backoff_max=getattr(self.cfg, 'HEALTH_BACKOFF_MAX', 120))
+        self.salud.agregar('binance', self._sonda_binance, getattr(self.cfg, 'HEALTH_PROBE_BINANCE', 5),
+                           al_fallar=self._conectar_binance)
+        if self.cfg.TELEGRAM_TOKEN:
+            self.salud.agregar('telegram', self._sonda_telegram, getattr(self.cfg, 'HEALTH_PROBE_TELEGRAM', 30))
+        # Primera sonda de cada dependencia antes de volver (acotada): el estado
+        # cacheado no arranca en "caído" para quien consulta justo al iniciar
+        self.salud.iniciar(espera=self.cfg.REQUEST_TIMEOUT * 3)
+
+    def _sonda_binance(self):
+        if self.client is None: return False
+        self.client.ping()
+        return True
+
+    def _sonda_telegram(self):
+        url = f"https://api.telegram.org/bot{self.cfg.TELEGRAM_TOKEN}/getMe"
+        return self.session.get(url, timeout=self.cfg.REQUEST_TIMEOUT).status_code == 200
+
+    def check_heartbeat(self):
+        """Lectura no bloqueante del estado cacheado por el monitor de salud."""
+        detalle = self.salud.estado()
+        self.status['binance'] = self.salud.esta_ok('binance')
+        self.status['telegram'] = self.salud.esta_ok('telegram')
+        return dict(self.status, detalle=detalle)
+
+    def get_historical_candles(self, symbol, interval, limit=100, start_time=None, end_time=None, strict=False):
+        """Klines crudas; ante error devuelve [] (o relanza con strict=True)."""
         try:
-            if start_time:
-                return self.client.futures_klines(
-                    symbol=symbol, interval=interval, startTime=int(start_time), limit=1000
-                )
-            return self.client.futures_klines(symbol=symbol, interval=interval, limit=limit)
+            # Se respeta el limit pedido (máx. 1500 en futuros) también con start_time
+            params = {'symbol': symbol, 'interval': interval, 'limit': min(int(limit), 1500)}
+            if start_time: params['startTime'] = int(start_time)
+            if end_time: params['endTime'] = int(end_time)
+            return self.client.futures_klines(**params)
         except (BinanceAPIException, BinanceRequestException) as e:
             self.log.log_error("API_DATA", f"Error Binance: {e}")
+            if strict: raise
             return []
         except RequestException as e:
             self.log.log_error("API_NET", f"Error Red: {e}")
+            if strict: raise
             return []
         except Exception as e:
             self.log.log_error("API_UNKNOWN", f"Error Desconocido: {e}")
+            if strict: raise
             return []
 
-    def get_real_price(self):
+    # ==========================================
+    # STREAM DE MERCADO (WEBSOCKET)
+    # ==========================================
+    def iniciar_stream(self, store=None, al_reconectar=None, symbol=None):
+        """Abre la suscripción kline_1m/markPrice/bookTicker de 'symbol' en segundo plano."""
+        symbol = symbol or self.cfg.SYMBOL
+        url = self.cfg.WS_URL_TESTNET if self.cfg.MODE == 'TESTNET' else self.cfg.WS_URL
+        stream = StreamMercado(url, symbol, store, al_reconectar, self.log)
+        self.streams[symbol] = stream
+        if symbol == self.cfg.SYMBOL: self.stream = stream
+        stream.iniciar()
+        self.log.log_operational("API", f"Stream de mercado {symbol} iniciado ({url})")
+
+    def stream_activo(self, symbol=None):
+        """True si el stream del símbolo está conectado y su último dato es reciente."""
+        stream = self.streams.get(symbol or self.cfg.SYMBOL)
+        return (stream is not None and stream.conectado
+                and stream.edad_precio() < self.cfg.STREAM_MAX_AGE)
+
+    def get_real_price(self, symbol=None):
+        symbol = symbol or self.cfg.SYMBOL
+        # Con stream vivo el precio sale de memoria (sin REST por tick)
+        if self.stream_activo(symbol) and self.streams[symbol].precio is not None:
+            return self.streams[symbol].precio
         try:
-            ticker = self.client.futures_symbol_ticker(symbol=self.cfg.SYMBOL)
+            ticker = self.client.futures_symbol_ticker(symbol=symbol)
             return float(ticker['price'])
         except Exception as e:
             self.log.log_error("API_PRICE", f"Fallo obteniendo precio: {e}")
             return None
 
+    def get_real_prices(self, symbols):
+        """
+        {symbol: precio} de varios símbolos: los que tienen stream vivo salen de
+        memoria y el resto de UNA sola request de ticker (peso 2 para todos,
+        en vez de una request por símbolo). Los que fallen no aparecen.
+        """
+        precios = {}
+        faltan = []
+        for symbol in symbols:
+            if self.stream_activo(symbol) and self.streams[symbol].precio is not None:
+                precios[symbol] = self.streams[symbol].precio
+            else:
+                faltan.append(symbol)
+        if not faltan: return precios
+        if len(faltan) == 1:
+            precio = self.get_real_price(faltan[0])
+            if precio is not None: precios[faltan[0]] = precio
+            return precios
+        try:
+            tickers = self.client.futures_symbol_ticker()
+            if isinstance(tickers, dict): tickers = [tickers]
+            buscados = set(faltan)
+            for t in tickers:
+                if t['symbol'] in buscados: precios[t['symbol']] = float(t['price'])
+        except Exception as e:
+            self.log.log_error("API_PRICE", f"Fallo obteniendo precios: {e}")
+        return precios
+
+    def info_simbolo(self, symbol):
+        """Entrada de exchangeInfo del símbolo (filtros LOT_SIZE/PRICE_FILTER), o None."""
+        with self._lock_info:
+            if self._info_simbolos is None:
+                info = self.client.futures_exchange_info()
+                self._info_simbolos = {s['symbol']: s for s in info['symbols']}
+        return self._info_simbolos.get(symbol)
+
     def get_account_balance(self):
         if self.cfg.MODE == 'SIMULATION': 
             return self.cfg.FIXED_CAPITAL_AMOUNT
@@ -87,7 +190,7 @@ class APIManager:
     # ==========================================
     # MÉTODOS DE EJECUCIÓN (CORREGIDOS HEDGE MODE)
     # ==========================================
-    def place_market_order(self, side, position_side, qty, reduce_only=False):
+    def place_market_order(self, side, position_side, qty, reduce_only=False, symbol=None):
         """
         side: 'BUY' o 'SELL'
         position_side: 'LONG' o 'SHORT'
@@ -99,7 +202,7 @@ class APIManager:
 
         try:
             params = {
-                'symbol': self.cfg.SYMBOL,
+                'symbol': symbol or self.cfg.SYMBOL,
                 'side': side,
                 'positionSide': position_side,
                 'type': 'MARKET',
@@ -113,7 +216,7 @@ class APIManager:
         except Exception as e:
             return False, f"Net Error: {str(e)}"
 
-    def place_stop_loss(self, side, position_side, stop_price):
+    def place_stop_loss(self, side, position_side, stop_price, symbol=None):
         """
         Coloca orden STOP_MARKET para cierre de posición.
         """
@@ -121,7 +224,7 @@ class APIManager:
         
         try:
             order = self.client.futures_create_order(
-                symbol=self.cfg.SYMBOL,
+                symbol=symbol or self.cfg.SYMBOL,
                 side=side,
                 positionSide=position_side,
                 type='STOP_MARKET',
@@ -132,8 +235,8 @@ class APIManager:
         except Exception as e:
             return False, str(e)
 
-    def cancel_all_orders(self):
+    def cancel_all_orders(self, symbol=None):
         if self.cfg.MODE == 'SIMULATION': return
         try:
-            self.client.futures_cancel_all_open_orders(symbol=self.cfg.SYMBOL)
+            self.client.futures_cancel_all_open_orders(symbol=symbol or self.cfg.SYMBOL)
         except: pass
\ No newline at end of file
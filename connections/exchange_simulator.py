@@ -0,0 +1,412 @@
+import os
+import time
+import threading
+import numpy as np
+from data.candle_store import AlmacenVelas, DTYPE_VELA
+
+INTERVALOS_MS = {
+    '1m': 60000, '3m': 180000, '5m': 300000, '15m': 900000, '30m': 1800000,
+    '1h': 3600000, '2h': 7200000, '4h': 14400000, '1d': 86400000,
+}
+
+
+class ErrorSimulador(Exception):
+    """Mismo formato de texto que BinanceAPIException ('APIError(code=-2011): ...')."""
+    def __init__(self, code, message):
+        super().__init__(f"APIError(code={code}): {message}")
+        self.code = code
+        self.message = message
+        self.status_code = 400
+
+
+def cargar_velas(ruta):
+    """Velas 1m grabadas: almacén binario (.bin) o CSV con 'ts' (ms) o 'timestamp'."""
+    if ruta.endswith('.bin'):
+        return np.array(AlmacenVelas(ruta).cola())
+    import pandas as pd
+    df = pd.read_csv(ruta)
+    if 'ts' in df.columns:
+        ts = df['ts'].astype('int64').values
+    else:
+        # Vía datetime64[ms]: pandas 2 puede inferir resolución de segundos al parsear
+        ts = pd.to_datetime(df['timestamp']).values.astype('datetime64[ms]').astype('int64')
+    velas = np.zeros(len(df), dtype=DTYPE_VELA)
+    velas['ts'] = ts
+    for col in ('open', 'high', 'low', 'close', 'volume'):
+        velas[col] = df[col].astype(float).values
+    return velas
+
+
+class ExchangeSimulado:
+    """
+    EXCHANGE SIMULADO (BINANCE FUTURES EN PROCESO)
+    Sustituye a binance.client.Client con los métodos que usa el bot. Reproduce
+    velas 1m grabadas contra un reloj inyectable (tiempo real o acelerado) y casa
+    órdenes MARKET / LIMIT / STOP_MARKET sobre la trayectoria de cada vela:
+    alcista O→L→H→C, bajista O→H→L→C (lineal por tramos). La vela en formación
+    se revela según avanza el reloj, así ticker, klines y ejecuciones coinciden.
+    Posiciones en Hedge Mode (LONG/SHORT independientes), comisiones maker/taker,
+    PnL realizado al saldo, y errores con los códigos de Binance.
+
+    'desfase_ms' traslada las velas grabadas al dominio del reloj del bot: con el
+    reloj real, la historia se sirve como si ocurriera ahora.
+    """
+    FEE_MAKER = 0.0002
+    FEE_TAKER = 0.0004
+
+    def __init__(self, velas, symbol='AAVEUSDT', saldo=1000.0, apalancamiento=5,
+                 calentamiento=60000, reloj=time.time, desfase_ms=None,
+                 tick_size=0.01, step_size=0.1):
+        if len(velas) <= calentamiento:
+            raise ValueError(f"Dataset con {len(velas)} velas: insuficiente para {calentamiento} de calentamiento")
+        self.velas = velas
+        self.symbol = symbol
+        self.saldo = float(saldo)
+        self.apalancamiento = apalancamiento
+        self.reloj = reloj
+        self.tick_size = tick_size
+        self.step_size = step_size
+        self.hedge = False
+        self.lock = threading.RLock()
+
+        # La reproducción arranca tras el calentamiento (historia visible para indicadores)
+        inicio = int(velas['ts'][calentamiento])
+        if desfase_ms is None:
+            ahora = int(reloj() * 1000)
+            desfase_ms = ahora - ahora % 60000 - inicio
+        self.desfase_ms = desfase_ms
+        self.fin_ms = int(velas['ts'][-1]) + 60000
+
+        self._series = {}                          # periodo -> (velas agregadas, índice 1m de cada una)
+        self.ordenes = {}
+        self.abiertas = []                         # orderIds en el libro
+        self.posiciones = {'LONG': [0.0, 0.0], 'SHORT': [0.0, 0.0]}  # [qty, precio medio]
+        self.trades = []
+        self._siguiente_id = 1
+        self._cursor = (self._indice(self._ahora_ms()), 0.0)  # (vela, fracción) ya casada
+
+    @classmethod
+    def desde_config(cls, cfg, reloj=time.time):
+        if not os.path.exists(cfg.OFFLINE_DATASET):
+            raise FileNotFoundError(
+                f"Dataset offline inexistente: {cfg.OFFLINE_DATASET}. Apunta OFFLINE_DATASET a un CSV/.bin "
+                f"de velas 1m (p. ej. history_{{SYMBOL}}_1m.csv de tools/data_miner.py).")
+        velas = cargar_velas(cfg.OFFLINE_DATASET)
+        # Dataset más corto que el calentamiento: la mitad se muestra como historia y el resto se reproduce
+        calentamiento = cfg.OFFLINE_WARMUP_CANDLES
+        if len(velas) <= calentamiento:
+            calentamiento = len(velas) // 2
+            print(f"⚠️ Dataset offline con {len(velas)} velas: calentamiento reducido a {calentamiento}.")
+        return cls(velas, symbol=cfg.SYMBOL,
+                   saldo=cfg.FIXED_CAPITAL_AMOUNT, apalancamiento=cfg.LEVERAGE,
+                   calentamiento=calentamiento, reloj=reloj)
+
+    # --- RELOJ Y TRAYECTORIA ---
+    def _ahora_ms(self):
+        return int(self.reloj() * 1000) - self.desfase_ms
+
+    def _indice(self, t_ms):
+        return max(0, int(np.searchsorted(self.velas['ts'], t_ms, side='right')) - 1)
+
+    def _posicion_actual(self):
+        """(vela, fracción transcurrida) en el instante actual del reloj."""
+        t = min(self._ahora_ms(), self.fin_ms - 1)
+        i = self._indice(t)
+        return i, min(1.0, max(0.0, (t - int(self.velas['ts'][i])) / 60000.0))
+
+    def _vertices(self, i):
+        v = self.velas[i]
+        o, h, l, c = float(v['open']), float(v['high']), float(v['low']), float(v['close'])
+        return (o, l, h, c) if c >= o else (o, h, l, c)
+
+    def _precio_en(self, i, f):
+        p = self._vertices(i)
+        x = min(f, 1.0) * 3
+        k = min(int(x), 2)
+        return p[k] + (p[k + 1] - p[k]) * (x - k)
+
+    def _tramos(self, i, f0, f1):
+        """Segmentos (a, b) de la trayectoria de la vela i entre las fracciones f0 y f1."""
+        cortes = [f0] + [q for q in (1 / 3, 2 / 3) if f0 < q < f1] + [f1]
+        return [(self._precio_en(i, a), self._precio_en(i, b)) for a, b in zip(cortes, cortes[1:]) if b > a]
+
+    def _avanzar(self):
+        """Casa las órdenes abiertas contra la trayectoria recorrida desde la última llamada."""
+        i1, f1 = self._posicion_actual()
+        i0, f0 = self._cursor
+        if (i1, f1) <= (i0, f0): return
+        i = i0
+        while i <= i1:
+            fin = f1 if i == i1 else 1.0
+            for a, b in self._tramos(i, f0, fin):
+                self._casar_tramo(a, b, salto=False)
+            if i < i1:
+                # Hueco entre el cierre de i y la apertura de i+1: se ejecuta al precio de apertura
+                self._casar_tramo(float(self.velas['close'][i]), float(self.velas['open'][i + 1]), salto=True)
+            i, f0 = i + 1, 0.0
+        self._cursor = (i1, f1)
+
+    def _disparo(self, orden):
+        """(precio, dirección): 'baja' si se ejecuta cuando el precio cae hasta él."""
+        if orden['type'] == 'LIMIT':
+            return float(orden['price']), 'baja' if orden['side'] == 'BUY' else 'sube'
+        return float(orden['stopPrice']), 'sube' if orden['side'] == 'BUY' else 'baja'
+
+    def _casar_tramo(self, a, b, salto):
+        if not self.abiertas or a == b: return
+        candidatas = []
+        for oid in self.abiertas:
+            p, direccion = self._disparo(self.ordenes[oid])
+            if (direccion == 'baja' and b <= p <= a) or (direccion == 'sube' and a <= p <= b):
+                candidatas.append((abs(p - a), oid, p))
+        for _, oid, p in sorted(candidatas):
+            if oid in self.abiertas:
+                self.abiertas.remove(oid)
+                self._llenar(self.ordenes[oid], b if salto else p)
+
+    # --- EJECUCIÓN ---
+    def _nuevo_id(self):
+        oid = self._siguiente_id
+        self._siguiente_id += 1
+        return oid
+
+    def _llenar(self, orden, precio):
+        lado = orden['positionSide']
+        qty_pos, entrada = self.posiciones[lado]
+        reduce = (lado == 'LONG') == (orden['side'] == 'SELL')
+        qty = qty_pos if orden.get('closePosition') else float(orden['origQty'])
+        if reduce: qty = min(qty, qty_pos)
+        if qty <= 0:
+            orden['status'] = 'EXPIRED'
+            orden['updateTime'] = self._ahora_ms() + self.desfase_ms
+            return
+
+        maker = orden['type'] == 'LIMIT' and not orden.get('_taker')
+        comision = precio * qty * (self.FEE_MAKER if maker else self.FEE_TAKER)
+        pnl = 0.0
+        if reduce:
+            pnl = (precio - entrada) * qty if lado == 'LONG' else (entrada - precio) * qty
+            self.posiciones[lado] = [qty_pos - qty, entrada if qty_pos - qty > 1e-12 else 0.0]
+        else:
+            nueva = qty_pos + qty
+            self.posiciones[lado] = [nueva, (entrada * qty_pos + precio * qty) / nueva]
+        self.saldo += pnl - comision
+
+        t = self._ahora_ms() + self.desfase_ms
+        orden.update({'status': 'FILLED', 'executedQty': f"{qty}", 'cumQty': f"{qty}",
+                      'avgPrice': f"{precio}", 'cumQuote': f"{precio * qty}", 'updateTime': t})
+        self.trades.append({'symbol': self.symbol, 'id': len(self.trades) + 1, 'orderId': orden['orderId'],
+                            'side': orden['side'], 'positionSide': lado, 'price': f"{precio}",
+                            'qty': f"{qty}", 'realizedPnl': f"{pnl}", 'commission': f"{comision}",
+                            'commissionAsset': 'USDT', 'maker': maker, 'time': t})
+
+    def _margen_libre(self, precio):
+        usado = sum(q * e for q, e in self.posiciones.values()) / self.apalancamiento
+        return self.saldo - usado
+
+    def _validar(self, symbol):
+        if symbol != self.symbol: raise ErrorSimulador(-1121, "Invalid symbol.")
+
+    # ==========================================
+    # API (subconjunto de binance.client.Client)
+    # ==========================================
+    def ping(self):
+        return {}
+
+    def futures_time(self):
+        return {'serverTime': self._ahora_ms() + self.desfase_ms}
+
+    def futures_exchange_info(self):
+        return {'symbols': [{'symbol': self.symbol, 'status': 'TRADING', 'filters': [
+            {'filterType': 'PRICE_FILTER', 'tickSize': f"{self.tick_size}"},
+            {'filterType': 'LOT_SIZE', 'stepSize': f"{self.step_size}"},
+        ]}]}
+
+    def futures_change_position_mode(self, dualSidePosition=True, **kwargs):
+        dual = str(dualSidePosition).lower() == 'true'
+        if dual == self.hedge: raise ErrorSimulador(-4059, "No need to change position side.")
+        self.hedge = dual
+        return {'code': 200, 'msg': 'success'}
+
+    def futures_change_leverage(self, symbol, leverage, **kwargs):
+        self.apalancamiento = int(leverage)
+        return {'symbol': symbol, 'leverage': self.apalancamiento}
+
+    def _serie(self, periodo):
+        """
+        Todo el dataset agregado a 'periodo' (una sola vez por intervalo) y el índice
+        de la primera vela 1m de cada barra. Las consultas solo cortan por timestamp.
+        """
+        serie = self._series.get(periodo)
+        if serie is None:
+            v = self.velas
+            if periodo == 60000:
+                serie = (v, np.arange(len(v)))
+            else:
+                grupos = v['ts'] - v['ts'] % periodo
+                cortes = np.flatnonzero(np.r_[True, grupos[1:] != grupos[:-1]])
+                agregadas = np.zeros(len(cortes), dtype=DTYPE_VELA)
+                agregadas['ts'] = grupos[cortes]
+                agregadas['open'] = v['open'][cortes]
+                agregadas['high'] = np.maximum.reduceat(v['high'], cortes)
+                agregadas['low'] = np.minimum.reduceat(v['low'], cortes)
+                agregadas['close'] = v['close'][np.r_[cortes[1:] - 1, len(v) - 1]]
+                agregadas['volume'] = np.add.reduceat(v['volume'], cortes)
+                serie = (agregadas, cortes)
+            self._series[periodo] = serie
+        return serie
+
+    def futures_klines(self, symbol, interval, limit=500, startTime=None, endTime=None, **kwargs):
+        with self.lock:
+            self._validar(symbol)
+            periodo = INTERVALOS_MS.get(interval)
+            if periodo is None: raise ErrorSimulador(-1120, "Invalid interval.")
+            i_act, f_act = self._posicion_actual()
+            agregadas, cortes = self._serie(periodo)
+            # Barra que contiene la vela en curso: lo posterior aún no existe
+            k = int(np.searchsorted(cortes, i_act, side='right'))
+            ts_visibles = agregadas['ts'][:k]
+
+            a = 0 if startTime is None else int(np.searchsorted(ts_visibles, int(startTime) - self.desfase_ms, side='left'))
+            b = k if endTime is None else int(np.searchsorted(ts_visibles, int(endTime) - self.desfase_ms, side='right'))
+            limit = min(int(limit), 1500)
+            a, b = (a, min(b, a + limit)) if startTime is not None else (max(a, b - limit), b)
+            v = agregadas[a:b].copy()
+
+            if b == k and b > a:
+                # La barra en curso solo muestra la trayectoria recorrida hasta ahora
+                trayecto = [self._precio_en(i_act, q) for q in (0, 1 / 3, 2 / 3) if q <= f_act] + [self._precio_en(i_act, f_act)]
+                previas = self.velas[cortes[k - 1]:i_act]
+                v['high'][-1] = max(trayecto + previas['high'].tolist())
+                v['low'][-1] = min(trayecto + previas['low'].tolist())
+                v['close'][-1] = trayecto[-1]
+                v['volume'][-1] = float(previas['volume'].sum()) + float(self.velas['volume'][i_act]) * f_act
+
+            ts = v['ts'] + self.desfase_ms
+            return [[int(t), f"{r['open']}", f"{r['high']}", f"{r['low']}", f"{r['close']}", f"{r['volume']}",
+                     int(t) + periodo - 1, "0", 0, "0", "0", "0"] for t, r in zip(ts, v)]
+
+    def futures_symbol_ticker(self, symbol=None, **kwargs):
+        with self.lock:
+            self._avanzar()
+            i, f = self._posicion_actual()
+            return {'symbol': self.symbol, 'price': f"{self._precio_en(i, f)}",
+                    'time': self._ahora_ms() + self.desfase_ms}
+
+    def futures_mark_price(self, symbol=None, **kwargs):
+        ticker = self.futures_symbol_ticker(symbol)
+        return {'symbol': self.symbol, 'markPrice': ticker['price'], 'time': ticker['time']}
+
+    def futures_account_balance(self, **kwargs):
+        with self.lock:
+            self._avanzar()
+            i, f = self._posicion_actual()
+            precio = self._precio_en(i, f)
+            no_realizado = sum((precio - e) * q if lado == 'LONG' else (e - precio) * q
+                               for lado, (q, e) in self.posiciones.items())
+            return [{'asset': 'USDT', 'balance': f"{self.saldo}", 'crossUnPnl': f"{no_realizado}",
+                     'availableBalance': f"{self._margen_libre(precio) + min(0.0, no_realizado)}"}]
+
+    def futures_position_information(self, symbol=None, **kwargs):
+        with self.lock:
+            self._avanzar()
+            i, f = self._posicion_actual()
+            precio = self._precio_en(i, f)
+            salida = []
+            for lado, (q, e) in self.posiciones.items():
+                amt = q if lado == 'LONG' else -q
+                pnl = (precio - e) * q if lado == 'LONG' else (e - precio) * q
+                salida.append({'symbol': self.symbol, 'positionSide': lado, 'positionAmt': f"{amt}",
+                               'entryPrice': f"{e}", 'markPrice': f"{precio}",
+                               'unRealizedProfit': f"{pnl}", 'leverage': f"{self.apalancamiento}"})
+            return salida
+
+    def futures_create_order(self, **params):
+        with self.lock:
+            self._avanzar()
+            self._validar(params.get('symbol'))
+            tipo, lado = params.get('type'), params.get('side')
+            pos_side = params.get('positionSide', 'BOTH')
+            if tipo not in ('MARKET', 'LIMIT', 'STOP_MARKET'):
+                raise ErrorSimulador(-1116, "Invalid orderType.")
+            if self.hedge and pos_side not in ('LONG', 'SHORT'):
+                raise ErrorSimulador(-4061, "Order's position side does not match user's setting.")
+            if not self.hedge:
+                raise ErrorSimulador(-4061, "Simulador solo soporta Hedge Mode (dualSidePosition=true).")
+            cierre = str(params.get('closePosition', False)).lower() == 'true'
+            qty = float(params.get('quantity') or 0)
+            if not cierre and qty <= 0:
+                raise ErrorSimulador(-4003, "Quantity less than or equal to zero.")
+
+            i, f = self._posicion_actual()
+            precio = self._precio_en(i, f)
+            reduce = (pos_side == 'LONG') == (lado == 'SELL')
+            if reduce and not cierre and self.posiciones[pos_side][0] <= 0:
+                raise ErrorSimulador(-2022, "ReduceOnly Order is rejected.")
+            if not reduce and tipo == 'MARKET' and qty * precio / self.apalancamiento > self._margen_libre(precio):
+                raise ErrorSimulador(-2019, "Margin is insufficient.")
+
+            t = self._ahora_ms() + self.desfase_ms
+            orden = {'orderId': self._nuevo_id(), 'symbol': self.symbol, 'status': 'NEW', 'type': tipo,
+                     'side': lado, 'positionSide': pos_side, 'origQty': f"{qty}", 'executedQty': '0',
+                     'cumQty': '0', 'avgPrice': '0', 'price': f"{float(params.get('price') or 0)}",
+                     'stopPrice': f"{float(params.get('stopPrice') or 0)}", 'closePosition': cierre,
+                     'timeInForce': params.get('timeInForce', 'GTC'), 'time': t, 'updateTime': t}
+            self.ordenes[orden['orderId']] = orden
+
+            if tipo == 'MARKET':
+                self._llenar(orden, precio)
+            elif tipo == 'LIMIT':
+                limite = float(orden['price'])
+                if (lado == 'BUY' and precio <= limite) or (lado == 'SELL' and precio >= limite):
+                    orden['_taker'] = True          # Cruza el libro: se ejecuta ya, como taker
+                    self._llenar(orden, precio)
+                else:
+                    self.abiertas.append(orden['orderId'])
+            else:
+                stop = float(orden['stopPrice'])
+                if (lado == 'BUY' and precio >= stop) or (lado == 'SELL' and precio <= stop):
+                    del self.ordenes[orden['orderId']]
+                    raise ErrorSimulador(-2021, "Order would immediately trigger.")
+                self.abiertas.append(orden['orderId'])
+            return self._publica(orden)
+
+    def _publica(self, orden):
+        return {k: v for k, v in orden.items() if not k.startswith('_')}
+
+    def futures_get_order(self, symbol=None, orderId=None, **kwargs):
+        with self.lock:
+            self._avanzar()
+            orden = self.ordenes.get(int(orderId)) if orderId is not None else None
+            if orden is None: raise ErrorSimulador(-2013, "Order does not exist.")
+            return self._publica(orden)
+
+    def futures_get_open_orders(self, symbol=None, **kwargs):
+        with self.lock:
+            self._avanzar()
+            return [self._publica(self.ordenes[oid]) for oid in self.abiertas]
+
+    def futures_cancel_order(self, symbol=None, orderId=None, **kwargs):
+        with self.lock:
+            self._avanzar()
+            oid = int(orderId) if orderId is not None else None
+            if oid not in self.abiertas: raise ErrorSimulador(-2011, "Unknown order sent.")
+            self.abiertas.remove(oid)
+            self.ordenes[oid]['status'] = 'CANCELED'
+            return self._publica(self.ordenes[oid])
+
+    def futures_cancel_all_open_orders(self, symbol=None, **kwargs):
+        with self.lock:
+            self._avanzar()
+            for oid in self.abiertas: self.ordenes[oid]['status'] = 'CANCELED'
+            self.abiertas = []
+            return {'code': 200, 'msg': 'The operation of cancel all open order is done.'}
+
+    def futures_account_trades(self, symbol=None, **kwargs):
+        with self.lock:
+            self._avanzar()
+            return list(self.trades)
+
+    def terminado(self):
+        """True cuando el reloj ya pasó la última vela grabada."""
+        return self._ahora_ms() >= self.fin_ms
@@ -0,0 +1,129 @@
+import time
+import random
+import threading
+from collections import deque
+
+
+class EstadoSonda:
+    """Estado cacheado de una dependencia (lo escribe su hilo, lo lee cualquiera)."""
+    def __init__(self, nombre, periodo):
+        self.nombre = nombre
+        self.periodo = periodo
+        self.ok = False
+        self.ultimo_exito = 0.0
+        self.ultimo_intento = 0.0
+        self.fallos = 0                      # Consecutivos
+        self.ultimo_error = None
+        self.latencias = deque(maxlen=20)    # Segundos de las últimas sondas exitosas
+
+    def vigente(self, ahora):
+        """OK solo si el último éxito es reciente (una sonda colgada no deja un OK viejo)."""
+        return self.ok and ahora - self.ultimo_exito <= 3 * self.periodo
+
+    def resumen(self, ahora):
+        lat = sorted(self.latencias)
+        return {
+            'ok': self.vigente(ahora),
+            'edad_exito': ahora - self.ultimo_exito if self.ultimo_exito else None,
+            'latencia_ms': lat[len(lat) // 2] * 1000 if lat else None,
+            'latencia_max_ms': lat[-1] * 1000 if lat else None,
+            'fallos': self.fallos,
+            'error': self.ultimo_error,
+        }
+
+
+class MonitorSalud:
+    """
+    MONITOR DE SALUD EN SEGUNDO PLANO
+    Cada dependencia (Binance, Telegram...) se sondea en su propio hilo con su
+    propio periodo. Tras un fallo, el siguiente intento se aleja con backoff
+    exponencial + jitter (hasta 'backoff_max'); al primer éxito vuelve al periodo.
+    Leer el estado nunca bloquea ni hace red.
+    """
+    def __init__(self, logger=None, backoff_max=120, reloj=time.time):
+        self.log = logger
+        self.backoff_max = backoff_max
+        self.reloj = reloj
+        self.sondas = {}
+        self._funciones = {}
+        self._al_fallar = {}
+        self._hilos = []
+        self._parar = threading.Event()
+        self._primera = {}  # nombre -> Event: la primera sonda ya terminó
+
+    def agregar(self, nombre, funcion, periodo, al_fallar=None):
+        """funcion() sin argumentos: lanza excepción o devuelve False si la dependencia está caída."""
+        self.sondas[nombre] = EstadoSonda(nombre, periodo)
+        self._funciones[nombre] = funcion
+        self._al_fallar[nombre] = al_fallar
+        self._primera[nombre] = threading.Event()
+
+    def iniciar(self, espera=10):
+        """
+        Arranca un hilo por dependencia y espera (hasta 'espera' segundos en total)
+        a que cada una complete su primera sonda: el primer check_heartbeat ya
+        refleja el estado real en vez del False inicial.
+        """
+        for nombre in self.sondas:
+            hilo = threading.Thread(target=self._bucle, args=(nombre,), name=f"Salud-{nombre}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+        limite = time.monotonic() + espera
+        for evento in self._primera.values():
+            evento.wait(max(0.0, limite - time.monotonic()))
+
+    def detener(self, timeout=2):
+        self._parar.set()
+        for hilo in self._hilos: hilo.join(timeout)
+
+    # --- NÚCLEO ---
+    def sondear(self, nombre):
+        """Una sonda (síncrona). Devuelve la espera hasta la siguiente."""
+        estado = self.sondas[nombre]
+        inicio = time.monotonic()
+        estado.ultimo_intento = self.reloj()
+        try:
+            ok = self._funciones[nombre]() is not False
+            error = None if ok else "respuesta no válida"
+        except Exception as e:
+            ok, error = False, str(e)
+
+        if ok:
+            if estado.fallos: self._registrar(f"{nombre} recuperado tras {estado.fallos} fallos.")
+            estado.ok, estado.fallos, estado.ultimo_error = True, 0, None
+            estado.ultimo_exito = self.reloj()
+            estado.latencias.append(time.monotonic() - inicio)
+            return estado.periodo
+
+        estado.ok = False
+        estado.fallos += 1
+        estado.ultimo_error = error
+        if estado.fallos == 1: self._registrar(f"{nombre} caído: {error}", error=True)
+        if self._al_fallar[nombre]:
+            try:
+                self._al_fallar[nombre]()
+            except Exception:
+                pass
+        espera = min(estado.periodo * 2 ** estado.fallos, self.backoff_max)
+        return espera * (0.5 + random.random() / 2)
+
+    def _bucle(self, nombre):
+        while not self._parar.is_set():
+            espera = self.sondear(nombre)
+            self._primera[nombre].set()
+            self._parar.wait(espera)
+
+    def _registrar(self, msg, error=False):
+        if self.log is None: return
+        if error: self.log.log_error("SALUD", msg)
+        else: self.log.log_operational("SALUD", msg)
+
+    # --- API ---
+    def esta_ok(self, nombre):
+        estado = self.sondas.get(nombre)
+        return bool(estado and estado.vigente(self.reloj()))
+
+    def estado(self):
+        """{nombre: {ok, edad_exito, latencia_ms, latencia_max_ms, fallos, error}} desde caché."""
+        ahora = self.reloj()
+        return {nombre: s.resumen(ahora) for nombre, s in self.sondas.items()}
@@ -0,0 +1,204 @@
+import re
+import time
+import threading
+import requests
+from urllib.parse import urlsplit, parse_qsl
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .rate_limiter import LimitadorPeso
+
+# Peso IP de los endpoints de Binance Futures que usa el bot (resto: 1)
+PESOS_BINANCE = {
+    '/fapi/v2/positionRisk': 5,
+    '/fapi/v2/balance': 5,
+    '/fapi/v2/account': 5,
+    '/fapi/v1/exchangeInfo': 1,
+    '/fapi/v1/allOpenOrders': 1,
+}
+
+
+def peso_binance(metodo, ruta, params):
+    """Peso estimado de una request a Binance Futures antes de enviarla."""
+    params = params or {}
+    if ruta == '/fapi/v1/klines':
+        limit = int(params.get('limit', 500))
+        if limit < 100: return 1
+        if limit < 500: return 2
+        if limit <= 1000: return 5
+        return 10
+    if ruta == '/fapi/v1/openOrders':
+        return 1 if 'symbol' in params else 40
+    if ruta == '/fapi/v1/ticker/price':
+        return 1 if 'symbol' in params else 2
+    return PESOS_BINANCE.get(ruta, 1)
+
+
+class HistogramaLatencia:
+    """
+    HISTOGRAMA DE LATENCIA POR ENDPOINT
+    Cubetas fijas en ms; los percentiles se aproximan por el límite superior de su cubeta.
+    """
+    LIMITES_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self.conteos = [0] * (len(self.LIMITES_MS) + 1)
+        self.n = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+        self.errores = 0
+
+    def registrar(self, segundos, error=False):
+        ms = segundos * 1000
+        i = 0
+        while i < len(self.LIMITES_MS) and ms > self.LIMITES_MS[i]: i += 1
+        self.conteos[i] += 1
+        self.n += 1
+        self.suma += ms
+        self.maximo = max(self.maximo, ms)
+        if error: self.errores += 1
+
+    def percentil(self, q):
+        if self.n == 0: return 0.0
+        objetivo, acumulado = q * self.n, 0
+        for i, c in enumerate(self.conteos):
+            acumulado += c
+            if acumulado >= objetivo:
+                return min(float(self.LIMITES_MS[i]), self.maximo) if i < len(self.LIMITES_MS) else self.maximo
+        return self.maximo
+
+    def resumen(self):
+        return {'n': self.n, 'media': self.suma / self.n if self.n else 0.0,
+                'p50': self.percentil(0.50), 'p95': self.percentil(0.95),
+                'max': self.maximo, 'errores': self.errores}
+
+
+class SesionInstrumentada(requests.Session):
+    """
+    Session que pasa todas sus requests por el transporte (peso + latencia).
+    python-binance y TelegramBot la usan sin enterarse.
+    Las cabeceras de Binance (X-MBX-APIKEY) viven en 'cabeceras_binance' y solo se
+    añaden a requests hacia hosts de Binance: la API key nunca sale hacia Telegram.
+    """
+    def __init__(self, transporte):
+        super().__init__()
+        self.transporte = transporte
+        self.cabeceras_binance = {}
+
+    def request(self, method, url, *args, **kwargs):
+        if self.cabeceras_binance and self.transporte._es_binance(urlsplit(url).hostname or ''):
+            cabeceras = dict(self.cabeceras_binance)
+            cabeceras.update(kwargs.get('headers') or {})
+            kwargs['headers'] = cabeceras
+        return self.transporte._enviar(super().request, method, url, *args, **kwargs)
+
+
+class TransporteHTTP:
+    """
+    TRANSPORTE HTTP COMPARTIDO
+    - Una sola sesión keep-alive con pool de conexiones por host (Binance y Telegram).
+    - Reintentos HTTP con backoff exponencial + jitter solo en métodos idempotentes
+      (nunca se reintenta un POST de orden: podría duplicarla).
+    - Contabilidad de peso: reserva el peso estimado antes de cada request a Binance
+      y se recalibra con X-MBX-USED-WEIGHT-1M; ante 429/418 pausa según Retry-After.
+    - Histograma de latencia por endpoint (el token de Telegram se enmascara).
+    """
+    HOSTS_BINANCE = ('binance.com', 'binancefuture.com')
+    ESTADOS_REINTENTO = (500, 502, 503, 504)
+
+    def __init__(self, config, logger=None, reloj=time.monotonic, dormir=time.sleep):
+        self.cfg = config
+        self.log = logger
+        self.reloj = reloj
+        self.dormir = dormir
+        self.limitador = LimitadorPeso(getattr(config, 'API_WEIGHT_PER_MINUTE', 1200), reloj=reloj, dormir=dormir)
+        self.peso_usado = 0          # Último X-MBX-USED-WEIGHT-1M recibido
+        self.pausa_hasta = 0.0       # Veto por 429/418 (reloj monotónico)
+        self.histogramas = {}
+        self.lock = threading.Lock()
+        self.sesion = self._crear_sesion()
+
+    def _crear_sesion(self):
+        tam = getattr(self.cfg, 'HTTP_POOL_SIZE', 10)
+        reintentos = dict(total=getattr(self.cfg, 'MAX_RETRIES', 3), connect=getattr(self.cfg, 'MAX_RETRIES', 3),
+                          backoff_factor=getattr(self.cfg, 'HTTP_RETRY_BACKOFF', 0.3),
+                          status_forcelist=self.ESTADOS_REINTENTO,
+                          allowed_methods=frozenset(['GET', 'DELETE', 'HEAD', 'OPTIONS']),
+                          # 429/418 no se reintentan aquí: los gestiona la pausa del transporte
+                          respect_retry_after_header=False, raise_on_status=False)
+        try:
+            retry = Retry(backoff_jitter=getattr(self.cfg, 'HTTP_RETRY_BACKOFF', 0.3), **reintentos)
+        except TypeError:
+            retry = Retry(**reintentos)  # urllib3 < 2: sin jitter
+        sesion = SesionInstrumentada(self)
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=tam, max_retries=retry)
+        sesion.mount('https://', adaptador)
+        sesion.mount('http://', adaptador)
+        return sesion
+
+    # --- NÚCLEO ---
+    def _es_binance(self, host):
+        return any(host.endswith(h) for h in self.HOSTS_BINANCE)
+
+    @staticmethod
+    def _clave(metodo, host, ruta):
+        ruta = re.sub(r'/bot[^/]+/', '/bot***/', ruta)
+        return f"{metodo} {host}{ruta}"
+
+    def _enviar(self, enviar, method, url, *args, **kwargs):
+        partes = urlsplit(url)
+        host, ruta = partes.hostname or '', partes.path
+        metodo = method.upper()
+        binance = self._es_binance(host)
+
+        if binance:
+            espera = self.pausa_hasta - self.reloj()
+            if espera > 0: self.dormir(espera)
+            # python-binance puede mandar los params ya serializados como query string
+            params = kwargs.get('params')
+            if isinstance(params, (str, bytes)): params = dict(parse_qsl(params))
+            self.limitador.reservar(peso_binance(metodo, ruta, params or dict(parse_qsl(partes.query))))
+
+        inicio = self.reloj()
+        try:
+            resp = enviar(method, url, *args, **kwargs)
+        except Exception:
+            self._registrar(metodo, host, ruta, self.reloj() - inicio, error=True)
+            raise
+        self._registrar(metodo, host, ruta, self.reloj() - inicio, error=resp.status_code >= 400)
+        if binance: self._leer_peso(resp)
+        return resp
+
+    def _registrar(self, metodo, host, ruta, segundos, error=False):
+        clave = self._clave(metodo, host, ruta)
+        with self.lock:
+            if clave not in self.histogramas:
+                self.histogramas[clave] = HistogramaLatencia()
+            self.histogramas[clave].registrar(segundos, error)
+
+    def _leer_peso(self, resp):
+        cabeceras = resp.headers
+        usado = cabeceras.get('X-MBX-USED-WEIGHT-1M', cabeceras.get('X-MBX-USED-WEIGHT'))
+        if usado is not None:
+            try:
+                self.peso_usado = int(usado)
+                self.limitador.ajustar_usado(self.peso_usado)
+            except ValueError:
+                pass
+        if resp.status_code in (418, 429):
+            try:
+                segundos = float(cabeceras.get('Retry-After', 60))
+            except ValueError:
+                segundos = 60.0
+            self.pausa_hasta = max(self.pausa_hasta, self.reloj() + segundos)
+            if self.log:
+                self.log.log_error("HTTP", f"Binance {resp.status_code}: pausa de {segundos:.0f}s (peso usado {self.peso_usado})")
+
+    # --- API ---
+    def latencias(self):
+        """{endpoint: {n, media, p50, p95, max, errores}} en ms."""
+        with self.lock:
+            return {k: h.resumen() for k, h in self.histogramas.items()}
+
+    def mas_lentos(self, n=3):
+        """Endpoints ordenados por p95 descendente."""
+        return sorted(self.latencias().items(), key=lambda kv: kv[1]['p95'], reverse=True)[:n]
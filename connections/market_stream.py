@@ -0,0 +1,143 @@
+import json
+import time
+import random
+import asyncio
+import threading
+import numpy as np
+from data.candle_store import DTYPE_VELA
+
+# websockets es opcional: solo se necesita en MARKET_DATA_MODE = 'STREAM'
+try:
+    import websockets
+    WEBSOCKETS_DISPONIBLE = True
+except ImportError:
+    WEBSOCKETS_DISPONIBLE = False
+
+
+class StreamMercado:
+    """
+    STREAM DE MERCADO (WEBSOCKET)
+    Mantiene una suscripción combinada a kline_1m, markPrice y bookTicker en un
+    hilo propio (event loop asyncio). Cada actualización de vela se escribe en el
+    almacén (la vela en formación se reemplaza) y el último precio queda en memoria,
+    sin REST por tick. Reconecta con backoff exponencial y, al reconectar, llama a
+    'al_reconectar' para rellenar por REST las velas perdidas durante el corte.
+    """
+    BACKOFF_INICIAL = 1.0
+    BACKOFF_MAX = 60.0
+
+    def __init__(self, url_base, symbol, store=None, al_reconectar=None, logger=None):
+        self.symbol = symbol.lower()
+        streams = [f"{self.symbol}@kline_1m", f"{self.symbol}@markPrice@1s", f"{self.symbol}@bookTicker"]
+        self.url = f"{url_base.rstrip('/')}/stream?streams={'/'.join(streams)}"
+        self.store = store
+        self.al_reconectar = al_reconectar
+        self.log = logger
+
+        self.precio = None       # Último negociado (cierre de la vela en curso)
+        self.precio_marca = None
+        self.bid = None
+        self.ask = None
+        self.ultima_actualizacion = 0.0  # time.time() del último mensaje
+        self.conectado = False
+        self.reconexiones = 0
+        self.velas_recibidas = 0
+
+        self._activo = False
+        self._hilo = None
+        self._loop = None
+        self._ws = None
+
+    # --- CICLO DE VIDA ---
+    def iniciar(self):
+        if not WEBSOCKETS_DISPONIBLE:
+            raise RuntimeError("Modo STREAM requiere el paquete 'websockets'")
+        if self._hilo and self._hilo.is_alive(): return
+        self._activo = True
+        self._hilo = threading.Thread(target=self._ejecutar, name="StreamMercado", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout=5):
+        self._activo = False
+        if self._loop and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+        if self._hilo: self._hilo.join(timeout)
+
+    def edad_precio(self):
+        """Segundos desde el último mensaje (inf si nunca llegó ninguno)."""
+        return time.time() - self.ultima_actualizacion if self.ultima_actualizacion else float('inf')
+
+    def _ejecutar(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._bucle())
+        finally:
+            self._loop.close()
+
+    async def _bucle(self):
+        backoff = self.BACKOFF_INICIAL
+        primera = True
+        while self._activo:
+            try:
+                async with websockets.connect(self.url, ping_interval=20, ping_timeout=20,
+                                              close_timeout=2) as ws:
+                    self._ws = ws
+                    self.conectado = True
+                    backoff = self.BACKOFF_INICIAL
+                    if not primera:
+                        self.reconexiones += 1
+                        self._registrar(f"Stream reconectado ({self.reconexiones}).")
+                    # Relleno REST de lo perdido (en un hilo: no bloquea la recepción)
+                    if self.al_reconectar:
+                        await self._loop.run_in_executor(None, self._rellenar)
+                    primera = False
+                    async for mensaje in ws:
+                        self._procesar(mensaje)
+            except Exception as e:
+                if self._activo: self._registrar(f"Stream caído: {e}", error=True)
+            finally:
+                self._ws = None
+                self.conectado = False
+            if not self._activo: break
+            # Backoff exponencial con jitter
+            await asyncio.sleep(backoff * (0.5 + random.random() / 2))
+            backoff = min(backoff * 2, self.BACKOFF_MAX)
+
+    def _rellenar(self):
+        try:
+            self.al_reconectar()
+        except Exception as e:
+            self._registrar(f"Fallo rellenando huecos tras reconexión: {e}", error=True)
+
+    # --- MENSAJES ---
+    def _procesar(self, mensaje):
+        try:
+            datos = json.loads(mensaje)
+        except ValueError:
+            return
+        evento = datos.get('data', datos)  # Stream combinado: {'stream': ..., 'data': {...}}
+        tipo = evento.get('e')
+        self.ultima_actualizacion = time.time()
+
+        if tipo == 'kline':
+            k = evento['k']
+            self.precio = float(k['c'])
+            if self.store is not None:
+                registro = np.array([(int(k['t']), float(k['o']), float(k['h']), float(k['l']),
+                                      float(k['c']), float(k['v']))], dtype=DTYPE_VELA)
+                self.store.empujar(registro)  # O(1): reemplaza la vela en curso o agrega la siguiente
+                self.velas_recibidas += 1
+        elif tipo == 'markPriceUpdate':
+            self.precio_marca = float(evento['p'])
+        elif tipo == 'bookTicker' or ('b' in evento and 'a' in evento and tipo is None):
+            # Futuros incluye 'e': 'bookTicker'; spot no trae 'e'
+            self.bid = float(evento['b'])
+            self.ask = float(evento['a'])
+
+    def _registrar(self, msg, error=False):
+        if self.log is None:
+            print(msg)
+        elif error:
+            self.log.log_error("STREAM", msg)
+        else:
+            self.log.log_operational("STREAM", msg)
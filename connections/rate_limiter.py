@@ -0,0 +1,44 @@
+import time
+import threading
+
+
+class LimitadorPeso:
+    """
+    PRESUPUESTO DE PESO (TOKEN BUCKET)
+    Binance limita por 'peso' de request por minuto. Cada hilo reserva el peso
+    de su request antes de enviarla; si el presupuesto se agotó, espera a que se
+    recargue (recarga continua: peso_por_minuto / 60 por segundo).
+    """
+    def __init__(self, peso_por_minuto=1200, reloj=time.monotonic, dormir=time.sleep):
+        self.capacidad = float(peso_por_minuto)
+        self.disponible = float(peso_por_minuto)
+        self.recarga_seg = peso_por_minuto / 60.0
+        self.reloj = reloj
+        self.dormir = dormir
+        self.ultimo = reloj()
+        self.lock = threading.Lock()
+
+    def _recargar(self):
+        ahora = self.reloj()
+        self.disponible = min(self.capacidad, self.disponible + (ahora - self.ultimo) * self.recarga_seg)
+        self.ultimo = ahora
+
+    def reservar(self, peso=1):
+        """Bloquea hasta poder consumir 'peso'. Devuelve los segundos esperados."""
+        peso = min(float(peso), self.capacidad)
+        esperado = 0.0
+        while True:
+            with self.lock:
+                self._recargar()
+                if self.disponible >= peso:
+                    self.disponible -= peso
+                    return esperado
+                espera = (peso - self.disponible) / self.recarga_seg
+            self.dormir(espera)
+            esperado += espera
+
+    def ajustar_usado(self, usado):
+        """Sincroniza con el peso que el exchange informa como usado en el minuto."""
+        with self.lock:
+            self._recargar()
+            self.disponible = min(self.disponible, max(0.0, self.capacidad - float(usado)))
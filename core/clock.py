@@ -0,0 +1,67 @@
+"""
+RELOJ INYECTABLE
+Todo el camino en vivo (main, runtime, Brain, Shooter, OrderManager, Comptroller,
+Financials, sincronización de velas, exchange simulado) lee la hora y duerme a
+través de este módulo. Por defecto es el reloj real; un replay instala un
+RelojAcelerado y el mismo core.main.main() corre a 10x-1000x.
+Las latencias de CPU y los timeouts de red siguen midiéndose en tiempo real.
+"""
+import time as _time
+import asyncio
+from datetime import datetime
+
+
+class RelojReal:
+    velocidad = 1.0
+
+    def time(self):
+        return _time.time()
+
+    def sleep(self, segundos):
+        if segundos > 0: _time.sleep(segundos)
+
+
+class RelojAcelerado:
+    """Arranca en 'inicio' (epoch, seg) y avanza 'velocidad' segundos simulados por segundo real."""
+    def __init__(self, inicio, velocidad=100.0):
+        self.inicio = float(inicio)
+        self.velocidad = float(velocidad)
+        self._t0 = _time.monotonic()
+
+    def time(self):
+        return self.inicio + (_time.monotonic() - self._t0) * self.velocidad
+
+    def sleep(self, segundos):
+        if segundos > 0: _time.sleep(segundos / self.velocidad)
+
+
+_reloj = RelojReal()
+
+
+def instalar(reloj):
+    """Reemplaza el reloj global (antes de construir los módulos del bot)."""
+    global _reloj
+    _reloj = reloj
+    return reloj
+
+
+def actual():
+    return _reloj
+
+
+def time():
+    return _reloj.time()
+
+
+def sleep(segundos):
+    _reloj.sleep(segundos)
+
+
+async def sleep_async(segundos):
+    """asyncio.sleep en segundos simulados."""
+    await asyncio.sleep(max(0.0, segundos) / _reloj.velocidad)
+
+
+def now():
+    """datetime local en la hora del reloj (para fechas de bitácora y cambios de día)."""
+    return datetime.fromtimestamp(_reloj.time())
@@ -1,6 +1,7 @@
 import json
 import os
-from datetime import datetime
+import threading
+from core import clock
 
 class Financials:
     """
@@ -14,7 +15,14 @@ class Financials:
         # Variables de estado
         self.daily_pnl = 0.0
         self.virtual_wallet = self.cfg.FIXED_CAPITAL_AMOUNT
-        self.last_reset_date = datetime.now().strftime("%Y-%m-%d")
+        self.last_reset_date = clock.now().strftime("%Y-%m-%d")
+        # Una sola billetera para todas las mesas (multi-símbolo): lecturas,
+        # actualizaciones y guardado del PnL pasan por este candado
+        self.lock = threading.RLock()
+        # Cupo global de posiciones/margen: contralores de todas las mesas y
+        # entradas en curso (reservadas hasta que el contralor las registra)
+        self.contralores = []
+        self._reservas = {}
         
         # Cargar billetera persistente
         self._cargar_billetera()
@@ -32,7 +40,7 @@ class Financials:
                     
                     # Lógica de cambio de día:
                     # Solo reseteamos el PnL Diario visual, NUNCA el capital acumulado.
-                    hoy = datetime.now().strftime("%Y-%m-%d")
+                    hoy = clock.now().strftime("%Y-%m-%d")
                     if hoy != self.last_reset_date:
                         self.daily_pnl = 0.0
                         self.last_reset_date = hoy
@@ -54,16 +62,17 @@ class Financials:
 
     def _guardar_billetera(self):
         """Guarda el estado actual de la billetera."""
-        data = {
-            'capital': self.virtual_wallet,
-            'daily_pnl': self.daily_pnl,
-            'date': self.last_reset_date
-        }
-        try:
-            with open(self.cfg.FILE_WALLET, 'w') as f:
-                json.dump(data, f, indent=4)
-        except Exception as e:
-            print(f"!!! Error guardando billetera: {e}")
+        with self.lock:
+            data = {
+                'capital': self.virtual_wallet,
+                'daily_pnl': self.daily_pnl,
+                'date': self.last_reset_date
+            }
+            try:
+                with open(self.cfg.FILE_WALLET, 'w') as f:
+                    json.dump(data, f, indent=4)
+            except Exception as e:
+                print(f"!!! Error guardando billetera: {e}")
 
     def obtener_capital_total(self):
         """
@@ -84,30 +93,71 @@ class Financials:
         """
         Registra el resultado de una operación cerrada.
         """
-        # 1. Actualizar PnL Diario (Solo informativo/dashboard)
-        self.daily_pnl += pnl_realizado
-        
-        # 2. Actualizar Billetera Virtual (Interés Compuesto)
-        if self.cfg.ENABLE_COMPOUND_INTEREST:
-            self.virtual_wallet += pnl_realizado
-            # Protección: Evitar capital negativo o cero
-            if self.virtual_wallet < 10.0: 
-                self.virtual_wallet = 10.0 
-        
-        # 3. Persistencia Inmediata
-        self._guardar_billetera()
+        with self.lock:
+            # 1. Actualizar PnL Diario (Solo informativo/dashboard)
+            self.daily_pnl += pnl_realizado
+            
+            # 2. Actualizar Billetera Virtual (Interés Compuesto)
+            if self.cfg.ENABLE_COMPOUND_INTEREST:
+                self.virtual_wallet += pnl_realizado
+                # Protección: Evitar capital negativo o cero
+                if self.virtual_wallet < 10.0: 
+                    self.virtual_wallet = 10.0 
+            
+            # 3. Persistencia Inmediata
+            self._guardar_billetera()
 
     def puedo_operar(self):
         """Verifica salud financiera básica."""
-        capital = self.obtener_capital_total()
-        
-        if capital <= 10:
-            return False, "Capital insuficiente (<10 USDT)"
-            
-        # Circuit Breaker: Pérdida Diaria Máxima
-        # Si hemos perdido más del X% del capital HOY, paramos.
-        loss_pct = abs(self.daily_pnl) / capital
-        if self.daily_pnl < 0 and loss_pct >= self.cfg.MAX_DAILY_LOSS_PCT:
-            return False, f"⛔ Stop Loss Diario Alcanzado (-{loss_pct*100:.1f}%)"
+        with self.lock:
+            capital = self.obtener_capital_total()
             
-        return True, "OK"
\ No newline at end of file
+            if capital <= 10:
+                return False, "Capital insuficiente (<10 USDT)"
+                
+            # Circuit Breaker: Pérdida Diaria Máxima
+            # Si hemos perdido más del X% del capital HOY, paramos.
+            loss_pct = abs(self.daily_pnl) / capital
+            if self.daily_pnl < 0 and loss_pct >= self.cfg.MAX_DAILY_LOSS_PCT:
+                return False, f"⛔ Stop Loss Diario Alcanzado (-{loss_pct*100:.1f}%)"
+                
+            return True, "OK"
+
+    # --- CUPO GLOBAL (TODAS LAS MESAS) ---
+    def registrar_contralor(self, comptroller):
+        """Cada Comptroller que comparte esta billetera cuenta para el cupo global."""
+        with self.lock:
+            if comptroller not in self.contralores:
+                self.contralores.append(comptroller)
+
+    def exposicion(self):
+        """(posiciones, margen comprometido) de todas las mesas, incluidas las entradas en curso."""
+        with self.lock:
+            n, margen = len(self._reservas), sum(self._reservas.values())
+            for comp in self.contralores:
+                for pos in list(comp.positions.values()):
+                    d = pos.get('data', {})
+                    n += 1
+                    margen += (float(d.get('qty', 0) or 0) * float(d.get('entry_price', 0) or 0)
+                               / float(d.get('leverage') or self.cfg.LEVERAGE))
+            return n, margen
+
+    def reservar_cupo(self, clave, margen):
+        """
+        Reserva una posición y su margen contra los topes globales
+        (MAX_OPEN_POSITIONS, MAX_TOTAL_EXPOSURE_PCT del capital). La reserva
+        se libera con liberar_cupo() una vez registrada (o fallida) la entrada.
+        """
+        with self.lock:
+            n, usado = self.exposicion()
+            if n >= self.cfg.MAX_OPEN_POSITIONS:
+                return False, "⛔ Max Posiciones."
+            tope = self.obtener_capital_total() * self.cfg.MAX_TOTAL_EXPOSURE_PCT
+            if usado + margen > tope + 1e-9:
+                return False, f"⛔ Exposición total ({usado:.2f} + {margen:.2f} > {tope:.2f} USDT)."
+            self._reservas[clave] = margen
+            return True, "OK"
+
+    def liberar_cupo(self, clave):
+        with self.lock:
+            self._reservas.pop(clave, None)
@@ -1,7 +1,6 @@
-import time
 import sys
+import asyncio
 import os
-import pandas as pd  # Necesario para validación de tipos
 
 # Ajuste de path para importaciones absolutas
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -18,6 +17,9 @@ from logic.brain import Brain
 from interfaces.dashboard import Dashboard
 from interfaces.telegram_bot import TelegramBot
 from tools.data_miner import DataMiner
+from core.runtime import RuntimeAsincrono
+from core.multi_runtime import MesaSimbolo, RuntimeMultiSimbolo
+from core import clock
 
 class BotSupervisor:
     """
@@ -25,8 +27,9 @@ class BotSupervisor:
     Monitorea la estabilidad del sistema. Si detecta fallos críticos consecutivos,
     ejecuta apagado de emergencia.
     """
-    def __init__(self, order_manager, logger):
+    def __init__(self, order_manager, logger, otros=()):
         self.om = order_manager
+        self.otros = list(otros)  # OrderManagers de los demás símbolos (multi-símbolo)
         self.log = logger
         self.error_count = 0
         self.MAX_ERRORS = 5
@@ -45,9 +48,10 @@ class BotSupervisor:
     def _protocolo_emergencia(self):
         self.log.log_error("SUPERVISOR", "🚨 LÍMITE DE ERRORES ALCANZADO. APAGADO DE EMERGENCIA.")
         print("\n!!! PROTOCOLO DE EMERGENCIA ACTIVADO !!!")
-        try:
-            self.om.cancelar_todo()
-        except: pass
+        for om in [self.om] + self.otros:
+            try:
+                om.cancelar_todo()
+            except: pass
         sys.exit(1)
 
 def _verificar_y_generar_historia(cfg, log):
@@ -75,7 +79,7 @@ def _verificar_y_generar_historia(cfg, log):
         log.log_operational("SYSTEM", "Iniciando DataMiner por falta de historia.")
         
         try:
-            miner = DataMiner()
+            miner = DataMiner(cfg.SYMBOL)
             raw_data = miner.descargar_historia_masiva(dias=90)
             miner.generar_dataset_maestro(raw_data)
             print("✅ Datos Históricos Generados Exitosamente.\n")
@@ -90,14 +94,49 @@ def main():
     print("Iniciando SENTINEL AI PRO (V2.3 Robustez Total)...")
     
     cfg = Config()
+    if cfg.MODE == 'OFFLINE': Config.preparar_offline()
     log = SystemLogger()
     
-    # Auto-verificación de datos
-    _verificar_y_generar_historia(cfg, log)
+    # Auto-verificación de datos (en OFFLINE no hay red: los datos los sirve el exchange simulado)
+    if cfg.MODE != 'OFFLINE':
+        _verificar_y_generar_historia(cfg, log)
 
     dash = Dashboard()
     conn = APIManager(cfg, log)
-    
+
+    # ==================================================================
+    # MULTI-SÍMBOLO (una mesa por símbolo, conexión y finanzas compartidas)
+    # ==================================================================
+    simbolos = list(getattr(cfg, 'SYMBOLS', [cfg.SYMBOL]))
+    if len(simbolos) > 1:
+        if getattr(cfg, 'RUNTIME_MODE', 'SYNC') != 'ASYNC':
+            print("❌ Multi-símbolo requiere RUNTIME_MODE = 'ASYNC'.")
+            sys.exit(1)
+        financials = Financials(cfg, conn)
+        mesas = []
+        for symbol in simbolos:
+            cfg_simbolo = Config.para_simbolo(symbol)()
+            if cfg.MODE != 'OFFLINE' and symbol != cfg.SYMBOL:
+                _verificar_y_generar_historia(cfg_simbolo, log)
+            mesas.append(MesaSimbolo(cfg_simbolo, conn, financials, log))
+        principal = mesas[0]
+        supervisor = BotSupervisor(principal.om, log, otros=[m.om for m in mesas[1:]])
+
+        # Dashboard sobre el símbolo principal; /status y /panic de Telegram cubren todas las mesas
+        tele = TelegramBot(cfg, principal.shooter, principal.comptroller, principal.om, log, session=conn.session,
+                           mesas=mesas)
+        tele.iniciar()
+        dash.add_log(f"Sistema Online. Multi-símbolo: {', '.join(simbolos)}")
+        log.log_operational("MAIN", f"Sistema Iniciado en multi-símbolo ({', '.join(simbolos)}).")
+
+        runtime = RuntimeMultiSimbolo(cfg, conn, mesas, financials, dash, supervisor, log)
+        try:
+            asyncio.run(runtime.ejecutar())
+        except KeyboardInterrupt:
+            print("\nApagando sistema ordenadamente...")
+            log.log_operational("MAIN", "Apagado por usuario.")
+        return
+
     metrics_mgr = MetricsManager(cfg, conn)
     financials = Financials(cfg, conn)
     order_mgr = OrderManager(cfg, conn, log)
@@ -106,7 +145,7 @@ def main():
     brain = Brain(cfg, shooter, log)
     supervisor = BotSupervisor(order_mgr, log)
 
-    tele = TelegramBot(cfg, shooter, comptroller, order_mgr, log)
+    tele = TelegramBot(cfg, shooter, comptroller, order_mgr, log, session=conn.session)
     tele.iniciar()
 
     last_slow_cycle = 0
@@ -117,18 +156,30 @@ def main():
     dash.add_log("Sistema Online. Arquitectura Blindada V2.3.")
     log.log_operational("MAIN", "Sistema Iniciado correctamente.")
 
+    # ==================================================================
+    # RUNTIME ASÍNCRONO (tareas independientes con cadencia y timeout propios)
+    # ==================================================================
+    if getattr(cfg, 'RUNTIME_MODE', 'SYNC') == 'ASYNC':
+        runtime = RuntimeAsincrono(cfg, conn, metrics_mgr, comptroller, brain, financials, dash, supervisor, log)
+        try:
+            asyncio.run(runtime.ejecutar())
+        except KeyboardInterrupt:
+            print("\nApagando sistema ordenadamente...")
+            log.log_operational("MAIN", "Apagado por usuario.")
+        return
+
     # ==================================================================
     # MAIN LOOP
     # ==================================================================
     while True:
         try:
-            start_time = time.time()
+            start_time = clock.time()
             
             # A. DATOS CRÍTICOS
             price = conn.get_real_price()
             if price is None:
                 supervisor.reportar_error("Fallo obteniendo precio real.")
-                time.sleep(cfg.REQUEST_TIMEOUT)
+                clock.sleep(cfg.REQUEST_TIMEOUT)
                 continue
 
             con_status = conn.check_heartbeat()
@@ -141,18 +192,19 @@ def main():
                 last_slow_cycle = start_time
 
             # C. CICLO RÁPIDO
-            metrics_1m = mtf_data.get('1m')
+            metrics_1m = mtf_data.get('df_1m')  # Vista de indicadores 1m (None hasta tener datos)
+            datos_ok = metrics_1m is not None and not metrics_1m.empty
+            decisiones = getattr(cfg, 'ENABLE_LIVE_DECISIONS', False)
             
             # 1. Auditoría Local (TP/SL)
-            # Validación de Tipo: Solo pasamos si es DataFrame válido
-            if isinstance(metrics_1m, pd.DataFrame) and not metrics_1m.empty:
+            if datos_ok and decisiones:
                 comptroller.auditar_memoria(price, metrics_1m)
             
             # 2. Cerebro
             brain_msg = ""
-            # --- CORRECCIÓN DEL ERROR CRÍTICO ---
-            # Validamos explícitamente que sea un DataFrame antes de preguntar .empty
-            if isinstance(metrics_1m, pd.DataFrame) and not metrics_1m.empty:
+            if datos_ok and not decisiones:
+                brain_msg = "Decisiones desactivadas (ENABLE_LIVE_DECISIONS)"
+            elif datos_ok:
                 resultado_brain = brain.procesar_mercado(mtf_data, price)
                 
                 if isinstance(resultado_brain, str):
@@ -169,9 +221,9 @@ def main():
             dash.render(price, mtf_data, daily_stats, comptroller.positions, financials, con_status, brain_msg, session_stats)
 
             # E. SLEEP DINÁMICO
-            elapsed = time.time() - start_time
+            elapsed = clock.time() - start_time
             sleep_time = max(0, cfg.SYNC_CYCLE_FAST - elapsed)
-            time.sleep(sleep_time)
+            clock.sleep(sleep_time)
 
         except KeyboardInterrupt:
             print("\nApagando sistema ordenadamente...")
@@ -180,7 +232,7 @@ def main():
             
         except Exception as e:
             supervisor.reportar_error(e)
-            time.sleep(5)
+            clock.sleep(5)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,174 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core import clock
+from core.runtime import RuntimeAsincrono
+from data.metrics_manager import MetricsManager
+from execution.order_manager import OrderManager
+from execution.comptroller import Comptroller
+from logic.shooter import Shooter
+from logic.brain import Brain
+
+
+class MesaSimbolo:
+    """
+    MESA POR SÍMBOLO
+    Todo lo que es propio de un símbolo: almacén de velas + motor de indicadores
+    (MetricsManager), precisión calibrada (OrderManager), posiciones (Comptroller),
+    registro FVG (Brain) y la foto más reciente de precio/métricas.
+    Conexión, finanzas, logger y dashboard se comparten entre mesas.
+    """
+    def __init__(self, cfg, conn, financials, log):
+        self.cfg = cfg
+        self.symbol = cfg.SYMBOL
+        self.metrics = MetricsManager(cfg, conn)
+        self.om = OrderManager(cfg, conn, log)
+        self.comptroller = Comptroller(cfg, self.om, financials, log)
+        self.shooter = Shooter(cfg, financials, self.om, self.comptroller, log)
+        self.brain = Brain(cfg, self.shooter, log)
+
+        # Candado propio: los símbolos calculan y deciden en paralelo
+        self.lock = threading.Lock()
+        self.precio = None
+        self.precio_nuevo = False
+        self.mtf_data = {}
+        self.daily_stats = {}
+        self.brain_msg = "Esperando Datos (Cargando)..."
+
+
+class RuntimeMultiSimbolo(RuntimeAsincrono):
+    """
+    RUNTIME MULTI-SÍMBOLO (UN PROCESO, N PERPETUOS)
+    Igual que RuntimeAsincrono pero con una mesa por símbolo:
+      - precios    (SYNC_CYCLE_FAST)  -> UNA request de ticker para todos (o stream)
+      - decisión   por cada símbolo con precio nuevo, en paralelo en el pool
+      - métricas   y contralor por símbolo, escalonados dentro de SYNC_CYCLE_SLOW
+                   para repartir la red y la CPU a lo largo del ciclo
+    Todas las llamadas REST salen de la misma conexión, cuyo transporte reserva
+    el peso de cada request en un único presupuesto por minuto.
+    El Dashboard muestra el símbolo principal (el primero de la lista).
+    """
+    def __init__(self, cfg, conn, mesas, financials, dash, supervisor, log):
+        principal = mesas[0]
+        super().__init__(cfg, conn, principal.metrics, principal.comptroller, principal.brain,
+                         financials, dash, supervisor, log)
+        self.mesas = list(mesas)
+        self.principal = principal
+        # Cálculo/decisión por símbolo + red: el pool crece con el número de mesas
+        self.executor.shutdown(wait=False)
+        self.executor = ThreadPoolExecutor(max_workers=max(8, 2 * len(self.mesas) + 4),
+                                           thread_name_prefix="runtime")
+
+    # --- TAREAS ---
+    async def _tarea_precio(self):
+        t0 = time.monotonic()
+        simbolos = [m.symbol for m in self.mesas]
+        ok, precios = await self._en_hilo('precio', self.conn.get_real_prices, simbolos,
+                                          timeout=self.cfg.REQUEST_TIMEOUT)
+        if not ok or not precios:
+            self.supervisor.reportar_error("Fallo obteniendo precios.")
+            return
+        for mesa in self.mesas:
+            if mesa.symbol in precios:
+                mesa.precio, mesa.precio_nuevo = precios[mesa.symbol], True
+        self.precio, self.t_precio = self.principal.precio, t0
+        self._evento_precio.set()
+
+    async def _tarea_metricas_mesa(self, mesa):
+        await self._en_hilo(f'velas:{mesa.symbol}', mesa.metrics.sincronizar_velas,
+                            timeout=self.cfg.SYNC_CYCLE_SLOW * 3)
+        ok, resultado = await self._en_hilo(f'calculo:{mesa.symbol}', self._calcular_mesa, mesa,
+                                            timeout=self.cfg.SYNC_CYCLE_SLOW)
+        if ok and resultado:
+            mesa.mtf_data, mesa.daily_stats = resultado
+            if mesa is self.principal: self.mtf_data, self.daily_stats = resultado
+
+    def _calcular_mesa(self, mesa):
+        with mesa.lock:
+            return mesa.metrics.calcular()
+
+    async def _tarea_contralor_mesa(self, mesa):
+        ok, externo = await self._en_hilo(f'contralor:{mesa.symbol}', mesa.comptroller.obtener_estado_externo,
+                                          timeout=self.cfg.SYNC_CYCLE_SLOW)
+        if ok and externo is not None:
+            await self._en_hilo(f'reconciliacion:{mesa.symbol}', self._reconciliar_mesa, mesa, externo,
+                                timeout=self.cfg.SYNC_CYCLE_SLOW)
+
+    def _reconciliar_mesa(self, mesa, externo):
+        with mesa.lock:
+            mesa.comptroller.aplicar_estado_externo(*externo)
+
+    async def _tarea_decision(self):
+        """Espera precios nuevos y decide cada símbolo que cambió, en paralelo."""
+        while True:
+            await self._evento_precio.wait()
+            self._evento_precio.clear()
+            t_precio = self.t_precio
+            pendientes = [m for m in self.mesas if m.precio_nuevo]
+            for mesa in pendientes: mesa.precio_nuevo = False
+            try:
+                resultados = await asyncio.gather(*(
+                    self._en_hilo(f'decision:{m.symbol}', self._decidir_mesa, m, m.precio) for m in pendientes))
+                if any(ok for ok, _ in resultados):
+                    self.latencia_decision.registrar(time.monotonic() - t_precio)
+                    self.supervisor.reportar_exito()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.supervisor.reportar_error(e)
+
+    def _decidir_mesa(self, mesa, precio):
+        with mesa.lock:
+            metrics_1m = mesa.mtf_data.get('df_1m')
+            if metrics_1m is None or metrics_1m.empty:
+                mesa.brain_msg = "Esperando Datos (Cargando)..."
+            elif not getattr(mesa.cfg, 'ENABLE_LIVE_DECISIONS', False):
+                mesa.brain_msg = "Decisiones desactivadas (ENABLE_LIVE_DECISIONS)"
+            else:
+                # 1. Auditoría Local (TP/SL)
+                mesa.comptroller.auditar_memoria(precio, metrics_1m)
+
+                # 2. Cerebro
+                resultado_brain = mesa.brain.procesar_mercado(mesa.mtf_data, precio)
+                mesa.brain_msg = resultado_brain
+                if not isinstance(resultado_brain, str):
+                    self.dash.add_log(f"{mesa.symbol}: {resultado_brain}")
+                    self.session_stats['total_ops'] += 1
+            if mesa is self.principal: self.brain_msg = mesa.brain_msg
+
+    def _render(self):
+        with self.principal.lock:
+            self.dash.render(self.principal.precio, self.principal.mtf_data, self.principal.daily_stats,
+                             self.principal.comptroller.positions, self.fin, self.con_status,
+                             self.brain_msg, self.session_stats)
+
+    async def _escalonada(self, desfase, periodo, corutina, mesa):
+        """Primera ejecución desplazada 'desfase' segundos; luego cadencia fija."""
+        await clock.sleep_async(desfase)
+        await self._periodica(periodo, lambda: corutina(mesa))
+
+    # --- API ---
+    async def ejecutar(self, duracion=None):
+        self._evento_precio = asyncio.Event()
+        lento = self.cfg.SYNC_CYCLE_SLOW
+        paso = lento / len(self.mesas)
+        tareas = [
+            asyncio.create_task(self._periodica(self.cfg.SYNC_CYCLE_FAST, self._tarea_precio)),
+            asyncio.create_task(self._periodica(getattr(self.cfg, 'HEARTBEAT_CYCLE', 5), self._tarea_heartbeat)),
+            asyncio.create_task(self._periodica(self.cfg.SYNC_CYCLE_FAST, self._tarea_render, real=True)),
+            asyncio.create_task(self._periodica(60, self._tarea_reporte)),
+            asyncio.create_task(self._tarea_decision()),
+        ]
+        for i, mesa in enumerate(self.mesas):
+            tareas.append(asyncio.create_task(self._escalonada(i * paso, lento, self._tarea_metricas_mesa, mesa)))
+            tareas.append(asyncio.create_task(self._escalonada(i * paso, lento, self._tarea_contralor_mesa, mesa)))
+        try:
+            if duracion is None:
+                await asyncio.gather(*tareas)
+            else:
+                await asyncio.sleep(duracion)
+        finally:
+            for t in tareas: t.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+            self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,224 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from core import clock
+
+
+class MedidorLatencia:
+    """
+    LATENCIAS RODANTES
+    Guarda las últimas N muestras (segundos) y resume p50/p95/máx en ms.
+    """
+    def __init__(self, muestras=600):
+        self.muestras = deque(maxlen=muestras)
+        self.total = 0
+
+    def registrar(self, segundos):
+        self.muestras.append(segundos)
+        self.total += 1
+
+    def resumen(self):
+        if not self.muestras: return {'n': 0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+        orden = sorted(self.muestras)
+        pct = lambda q: orden[min(len(orden) - 1, int(q * len(orden)))] * 1000
+        return {'n': self.total, 'p50': pct(0.50), 'p95': pct(0.95), 'max': orden[-1] * 1000}
+
+
+class RuntimeAsincrono:
+    """
+    NÚCLEO ASÍNCRONO DEL BUCLE PRINCIPAL
+    Cada dependencia corre como tarea independiente con su cadencia y su timeout:
+      - precio       (SYNC_CYCLE_FAST)  -> dispara una decisión
+      - heartbeat    (HEARTBEAT_CYCLE)
+      - métricas     (SYNC_CYCLE_SLOW)  -> red fuera del candado, cálculo dentro
+      - contralor    (SYNC_CYCLE_SLOW)  -> red fuera del candado, reconciliación dentro
+      - render       (SYNC_CYCLE_FAST)
+    La decisión (auditoría TP/SL + Brain) reacciona al precio nuevo con la última
+    foto de métricas: su latencia depende del precio, no de la suma de llamadas.
+    Las llamadas bloqueantes van a un pool de hilos; si una sigue colgada, su tarea
+    no lanza otra encima (se salta la cadencia y se cuenta como timeout).
+    """
+    def __init__(self, cfg, conn, metrics_mgr, comptroller, brain, financials, dash, supervisor, log):
+        self.cfg = cfg
+        self.conn = conn
+        self.metrics = metrics_mgr
+        self.comptroller = comptroller
+        self.brain = brain
+        self.fin = financials
+        self.dash = dash
+        self.supervisor = supervisor
+        self.log = log
+
+        # Estado compartido (la foto más reciente de cada entrada)
+        self.precio = None
+        self.t_precio = 0.0          # monotonic en que se PIDIÓ el precio vigente
+        self.con_status = {'binance': False, 'telegram': False}
+        self.mtf_data = {}
+        self.daily_stats = {}
+        self.brain_msg = "Esperando Datos (Cargando)..."
+        self.session_stats = {'wins': 0, 'losses': 0, 'total_ops': 0}
+
+        # Métricas, posiciones y vistas se tocan desde varios hilos
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="runtime")
+        self.latencia_decision = MedidorLatencia()
+        self.latencias = {}
+        self.timeouts = {}
+        self._pendientes = {}
+        self._evento_precio = None
+
+    # --- EJECUCIÓN EN HILOS ---
+    async def _en_hilo(self, nombre, funcion, *args, timeout=None):
+        """Corre funcion en el pool. Devuelve (ok, resultado); no apila llamadas colgadas."""
+        previa = self._pendientes.get(nombre)
+        if previa is not None and not previa.done():
+            self.timeouts[nombre] = self.timeouts.get(nombre, 0) + 1
+            return False, None
+
+        loop = asyncio.get_running_loop()
+        inicio = time.monotonic()
+        futuro = loop.run_in_executor(self.executor, funcion, *args)
+        self._pendientes[nombre] = futuro
+        hechos, _ = await asyncio.wait({futuro}, timeout=timeout)
+        if not hechos:
+            self.timeouts[nombre] = self.timeouts.get(nombre, 0) + 1
+            self.log.log_error("RUNTIME", f"Timeout en '{nombre}' (> {timeout}s)")
+            return False, None
+        self.latencias.setdefault(nombre, MedidorLatencia()).registrar(time.monotonic() - inicio)
+        return True, futuro.result()
+
+    async def _periodica(self, periodo, corutina, real=False):
+        """
+        Ejecuta la corrutina con cadencia fija (descontando su propia duración).
+        El periodo es en tiempo del reloj inyectable salvo 'real' (UI: no acelerar).
+        """
+        while True:
+            inicio = time.monotonic() if real else clock.time()
+            try:
+                await corutina()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.supervisor.reportar_error(e)
+            if real:
+                await asyncio.sleep(max(0.0, periodo - (time.monotonic() - inicio)))
+            else:
+                await clock.sleep_async(periodo - (clock.time() - inicio))
+
+    # --- TAREAS ---
+    async def _tarea_precio(self):
+        t0 = time.monotonic()
+        ok, precio = await self._en_hilo('precio', self.conn.get_real_price, timeout=self.cfg.REQUEST_TIMEOUT)
+        if not ok or precio is None:
+            self.supervisor.reportar_error("Fallo obteniendo precio real.")
+            return
+        self.precio, self.t_precio = precio, t0
+        self._evento_precio.set()
+
+    async def _tarea_heartbeat(self):
+        ok, estado = await self._en_hilo('heartbeat', self.conn.check_heartbeat,
+                                         timeout=self.cfg.REQUEST_TIMEOUT * 3)
+        if ok and estado: self.con_status = dict(estado)
+
+    async def _tarea_metricas(self):
+        self.dash.add_log("Sincronizando...", "DEBUG")
+        await self._en_hilo('velas', self.metrics.sincronizar_velas, timeout=self.cfg.SYNC_CYCLE_SLOW * 3)
+        ok, resultado = await self._en_hilo('calculo', self._calcular, timeout=self.cfg.SYNC_CYCLE_SLOW)
+        if ok and resultado:
+            self.mtf_data, self.daily_stats = resultado
+
+    def _calcular(self):
+        with self.lock:
+            return self.metrics.calcular()
+
+    async def _tarea_contralor(self):
+        ok, externo = await self._en_hilo('contralor', self.comptroller.obtener_estado_externo,
+                                          timeout=self.cfg.SYNC_CYCLE_SLOW)
+        if ok and externo is not None:
+            await self._en_hilo('reconciliacion', self._reconciliar, externo, timeout=self.cfg.SYNC_CYCLE_SLOW)
+
+    def _reconciliar(self, externo):
+        with self.lock:
+            self.comptroller.aplicar_estado_externo(*externo)
+
+    async def _tarea_decision(self):
+        """Espera precio nuevo; si llegan varios durante una decisión, usa el último."""
+        while True:
+            await self._evento_precio.wait()
+            self._evento_precio.clear()
+            precio, t_precio = self.precio, self.t_precio
+            try:
+                ok, _ = await self._en_hilo('decision', self._decidir, precio)
+                if ok:
+                    self.latencia_decision.registrar(time.monotonic() - t_precio)
+                    self.supervisor.reportar_exito()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.supervisor.reportar_error(e)
+
+    def _decidir(self, precio):
+        with self.lock:
+            mtf_data = self.mtf_data
+            metrics_1m = mtf_data.get('df_1m')
+            if metrics_1m is None or metrics_1m.empty:
+                self.brain_msg = "Esperando Datos (Cargando)..."
+                return
+            if not getattr(self.cfg, 'ENABLE_LIVE_DECISIONS', False):
+                self.brain_msg = "Decisiones desactivadas (ENABLE_LIVE_DECISIONS)"
+                return
+
+            # 1. Auditoría Local (TP/SL)
+            self.comptroller.auditar_memoria(precio, metrics_1m)
+
+            # 2. Cerebro
+            resultado_brain = self.brain.procesar_mercado(mtf_data, precio)
+            self.brain_msg = resultado_brain
+            if not isinstance(resultado_brain, str):
+                self.dash.add_log(resultado_brain)
+                self.session_stats['total_ops'] += 1
+
+    async def _tarea_render(self):
+        if self.precio is None: return
+        await self._en_hilo('render', self._render, timeout=self.cfg.SYNC_CYCLE_FAST * 5)
+
+    def _render(self):
+        with self.lock:
+            self.dash.render(self.precio, self.mtf_data, self.daily_stats, self.comptroller.positions,
+                             self.fin, self.con_status, self.brain_msg, self.session_stats)
+
+    async def _tarea_reporte(self):
+        r = self.latencia_decision.resumen()
+        if r['n'] == 0: return
+        txt = f"Tick→decisión p50 {r['p50']:.0f}ms p95 {r['p95']:.0f}ms máx {r['max']:.0f}ms"
+        if self.timeouts: txt += f" | timeouts {self.timeouts}"
+        transporte = getattr(self.conn, 'transporte', None)
+        if transporte is not None:
+            lentos = ", ".join(f"{k} p95 {v['p95']:.0f}ms" for k, v in transporte.mas_lentos(3))
+            if lentos: txt += f" | HTTP: {lentos} | peso {transporte.peso_usado}"
+        self.log.log_operational("RUNTIME", txt)
+
+    # --- API ---
+    async def ejecutar(self, duracion=None):
+        """Lanza todas las tareas. 'duracion' (seg reales) limita la corrida (herramientas/pruebas)."""
+        self._evento_precio = asyncio.Event()
+        tareas = [
+            asyncio.create_task(self._periodica(self.cfg.SYNC_CYCLE_FAST, self._tarea_precio)),
+            asyncio.create_task(self._periodica(getattr(self.cfg, 'HEARTBEAT_CYCLE', 5), self._tarea_heartbeat)),
+            asyncio.create_task(self._periodica(self.cfg.SYNC_CYCLE_SLOW, self._tarea_metricas)),
+            asyncio.create_task(self._periodica(self.cfg.SYNC_CYCLE_SLOW, self._tarea_contralor)),
+            asyncio.create_task(self._periodica(self.cfg.SYNC_CYCLE_FAST, self._tarea_render, real=True)),
+            asyncio.create_task(self._periodica(60, self._tarea_reporte)),
+            asyncio.create_task(self._tarea_decision()),
+        ]
+        try:
+            if duracion is None:
+                await asyncio.gather(*tareas)
+            else:
+                await asyncio.sleep(duracion)
+        finally:
+            for t in tareas: t.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+            self.executor.shutdown(wait=False, cancel_futures=True)
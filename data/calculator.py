@@ -1,60 +1,49 @@
 import pandas as pd
 import numpy as np
+from . import kernels
+from .incremental_engine import MotorIncremental, COLUMNAS
+from .resampler import AgregadorVelas
+from .htf_history import MAX_BARRAS
+from .indicator_view import VistaIndicadores
 
 class MetricCalculator:
+    def __init__(self):
+        # Estado incremental por temporalidad (EMAs, ventanas RSI/ADX/BB)
+        self.motor = MotorIncremental()
+        # Resampler streaming: 1m -> 3m/5m/15m/30m/1h/4h/1d (expone eventos de barra cerrada)
+        # 1h/4h/1d retienen historia completa (no solo lo que cubre la ventana de 1m)
+        self.agregador = AgregadorVelas(max_barras=MAX_BARRAS)
+
+    def calcular_lote(self, entradas):
+        """
+        API por lotes: recibe {tf: (ts, velas)} con las columnas OHLCV de todas las
+        temporalidades y avanza el motor de cada una, que escribe en su matriz de
+        indicadores preasignada (n x len(COLUMNAS)). Devuelve {tf: (resumen, vista)}:
+        el dict ligero para el Dashboard y la VistaIndicadores para PrecisionLab,
+        sin construir DataFrames intermedios. Con menos de 20 velas (o error): ({}, None).
+        """
+        salida = {}
+        for tf, (ts, velas) in entradas.items():
+            salida[tf] = ({}, None)
+            if len(ts) < 20: continue
+            try:
+                matriz = self.motor.calcular(tf, ts, velas['high'], velas['low'], velas['close'])
+                columnas = dict(velas)
+                for j, col in enumerate(COLUMNAS):
+                    columnas[col] = matriz[:, j]
+                vista = VistaIndicadores(ts, columnas)
+                salida[tf] = (vista.resumen(), vista)
+            except Exception as e:
+                print(f"Error calculando indicadores {tf}: {e}")
+        return salida
+
     def _calcular_indicadores_base(self, df):
         if df.empty or len(df) < 20: return {}, None
         df = df.copy()
         
-        # 1. RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        
-        # 2. StochRSI
-        min_rsi = df['RSI'].rolling(14).min()
-        max_rsi = df['RSI'].rolling(14).max()
-        denom = (max_rsi - min_rsi).replace(0, 1)
-        df['STOCH_RSI'] = (df['RSI'] - min_rsi) / denom * 100
-        
-        # 3. Bollinger
-        sma = df['close'].rolling(20).mean()
-        std = df['close'].rolling(20).std()
-        df['BB_UPPER'] = sma + (std * 2)
-        df['BB_LOWER'] = sma - (std * 2)
-        df['BB_MID'] = sma
-        df['BB_WIDTH'] = (df['BB_UPPER'] - df['BB_LOWER']) / df['BB_MID']
-        
-        # 4. EMAs
-        df['EMA_7'] = df['close'].ewm(span=7, adjust=False).mean()
-        df['EMA_25'] = df['close'].ewm(span=25, adjust=False).mean()
-        df['EMA_99'] = df['close'].ewm(span=99, adjust=False).mean()
-        df['EMA_200'] = df['close'].ewm(span=200, adjust=False).mean()
-
-        # 5. ADX
-        high_diff = df['high'].diff()
-        low_diff = -df['low'].diff()
-        plus_dm = np.where((high_diff > low_diff) & (high_diff > 0), high_diff, 0.0)
-        minus_dm = np.where((low_diff > high_diff) & (low_diff > 0), low_diff, 0.0)
-        tr = pd.concat([
-            df['high'] - df['low'], 
-            (df['high'] - df['close'].shift(1)).abs(), 
-            (df['low'] - df['close'].shift(1)).abs()
-        ], axis=1).max(axis=1)
-        atr = tr.rolling(14).mean()
-        plus_di = 100 * (pd.Series(plus_dm).rolling(14).mean() / atr)
-        minus_di = 100 * (pd.Series(minus_dm).rolling(14).mean() / atr)
-        dx = (abs(plus_di - minus_di) / (plus_di + minus_di).replace(0,1)) * 100
-        df['ADX'] = dx.rolling(14).mean()
-        
-        # 6. MACD
-        k_fast = df['close'].ewm(span=12, adjust=False).mean()
-        k_slow = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD_DIF'] = k_fast - k_slow
-        df['MACD_DEA'] = df['MACD_DIF'].ewm(span=9, adjust=False).mean()
-        df['MACD_HIST'] = df['MACD_DIF'] - df['MACD_DEA']
+        # Kernels sobre arrays float64 (mismas fórmulas que la versión pandas)
+        for col, serie in kernels.indicadores_completos(df['high'], df['low'], df['close']).items():
+            df[col] = serie
 
         # Extraer última fila para Dashboard (Resumen)
         last_row = df.iloc[-1].to_dict()
@@ -64,39 +53,49 @@ class MetricCalculator:
         return last_row, df 
 
     def generar_mtf_completo(self, df_1m):
-        if df_1m.empty: return {}, {}
-        df_1m = df_1m.copy()
-        
-        if 'ts' in df_1m.columns:
-            df_1m['datetime'] = pd.to_datetime(df_1m['ts'], unit='ms')
-            df_1m.set_index('datetime', inplace=True)
+        """
+        Acepta un DataFrame de velas 1m o, en el pipeline en vivo, los registros del
+        almacén binario (memmap de solo lectura) para no copiar la serie 1m.
+        """
+        cols = ['open', 'high', 'low', 'close', 'volume']
+        if isinstance(df_1m, np.ndarray):
+            if len(df_1m) == 0: return {}, {}
+            ts_ms = df_1m['ts']
+            velas_1m = {c: df_1m[c] for c in ['ts'] + cols}
+        else:
+            if df_1m.empty: return {}, {}
+            if 'ts' in df_1m.columns:
+                ts_ms = df_1m['ts'].to_numpy(dtype=np.float64)
+            else:
+                ts_ms = ((df_1m.index - pd.Timestamp(0)) // pd.Timedelta('1ms')).to_numpy(dtype=np.float64)
+            velas_1m = {'ts': ts_ms}
+            velas_1m.update({c: df_1m[c].to_numpy(dtype=np.float64) for c in cols})
+
+        # Solo las velas nuevas se pliegan en los buckets abiertos
+        self.agregador.alimentar(ts_ms, *(velas_1m[c] for c in cols))
         
+        tfs = ['1m', '3m', '5m', '15m', '30m', '1h', '4h', '1d']
+        entradas = {'1m': (ts_ms, velas_1m)}
+        for tf in tfs[1:]:
+            barras = self.agregador.barras(tf)
+            if len(barras):
+                entradas[tf] = (barras[:, 0], {c: barras[:, j] for j, c in enumerate(cols, start=1)})
+
         mtf_data = {}
-        agg = {'open':'first', 'high':'max', 'low':'min', 'close':'last', 'volume':'sum'}
-        tfs = {'1m': None, '3m': '3min', '5m': '5min', '15m': '15min', '30m': '30min', '1h': '1h', '4h': '4h', '1d': '1D'}
-        daily_stats = {'prev_high': 0.0, 'prev_low': 0.0, 'curr_high': 0.0, 'curr_low': 0.0}
+        resultados = self.calcular_lote(entradas)
+        for tf in tfs:
+            resumen, vista = resultados.get(tf, ({}, None))
+            mtf_data[tf] = resumen              # Para Dashboard (ligero)
+            if vista is not None:
+                mtf_data[f'df_{tf}'] = vista    # Para PrecisionLab (vistas de arrays)
 
-        for tf, rule in tfs.items():
-            try:
-                if tf == '1m':
-                    df_res = df_1m
-                else:
-                    df_res = df_1m.resample(rule).agg(agg).dropna()
-                
-                if not df_res.empty:
-                    resumen, df_calculado = self._calcular_indicadores_base(df_res.reset_index())
-                    
-                    # Guardamos AMBOS datos
-                    mtf_data[tf] = resumen          # Para Dashboard (ligero)
-                    mtf_data[f'df_{tf}'] = df_calculado # Para PrecisionLab (pesado)
-                    
-                    if tf == '1d':
-                        daily_stats['curr_high'] = float(df_res.iloc[-1]['high'])
-                        daily_stats['curr_low'] = float(df_res.iloc[-1]['low'])
-                        if len(df_res) > 1:
-                            daily_stats['prev_high'] = float(df_res.iloc[-2]['high'])
-                            daily_stats['prev_low'] = float(df_res.iloc[-2]['low'])
-            except:
-                mtf_data[tf] = {}
+        daily_stats = {'prev_high': 0.0, 'prev_low': 0.0, 'curr_high': 0.0, 'curr_low': 0.0}
+        if '1d' in entradas:
+            velas_1d = entradas['1d'][1]
+            daily_stats['curr_high'] = float(velas_1d['high'][-1])
+            daily_stats['curr_low'] = float(velas_1d['low'][-1])
+            if len(velas_1d['high']) > 1:
+                daily_stats['prev_high'] = float(velas_1d['high'][-2])
+                daily_stats['prev_low'] = float(velas_1d['low'][-2])
 
         return mtf_data, daily_stats
\ No newline at end of file
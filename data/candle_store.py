@@ -0,0 +1,221 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Registro de vela de ancho fijo (48 bytes)
+DTYPE_VELA = np.dtype([
+    ('ts', '<i8'), ('open', '<f8'), ('high', '<f8'),
+    ('low', '<f8'), ('close', '<f8'), ('volume', '<f8')
+])
+
+# Cabecera de 64 bytes: firma, versión, tamaño de registro e intervalo
+DTYPE_CABECERA = np.dtype([
+    ('magic', 'S8'), ('version', '<u4'), ('itemsize', '<u4'),
+    ('intervalo_ms', '<i8'), ('reservado', 'V40')
+])
+MAGIC = b'SNTLVELA'
+VERSION = 1
+TAM_CABECERA = DTYPE_CABECERA.itemsize
+
+
+class AlmacenVelas:
+    """
+    ALMACÉN BINARIO DE VELAS (APPEND-ONLY)
+    Archivo de registros numpy de ancho fijo con una cabecera pequeña.
+    - Último timestamp en O(1) (lectura de los últimos 8+ bytes).
+    - Ventanas de cola mapeadas en memoria (sin parsear texto).
+    - Append sin reescribir el archivo; si la data nueva se solapa con la cola
+      (vela en formación), se sobrescriben solo esos registros.
+    """
+    def __init__(self, path, intervalo_ms=60000):
+        self.path = path
+        self.intervalo_ms = intervalo_ms
+        self.itemsize = DTYPE_VELA.itemsize
+        self.lock = threading.RLock()  # Escrituras desde el hilo del stream y el ciclo lento
+        self._inicializar()
+
+    def _inicializar(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            cabecera = np.zeros(1, dtype=DTYPE_CABECERA)
+            cabecera['magic'] = MAGIC
+            cabecera['version'] = VERSION
+            cabecera['itemsize'] = self.itemsize
+            cabecera['intervalo_ms'] = self.intervalo_ms
+            with open(self.path, 'wb') as f:
+                f.write(cabecera.tobytes())
+            return
+
+        with open(self.path, 'rb') as f:
+            cabecera = np.frombuffer(f.read(TAM_CABECERA), dtype=DTYPE_CABECERA)
+        if len(cabecera) != 1 or cabecera['magic'][0] != MAGIC or cabecera['itemsize'][0] != self.itemsize:
+            raise ValueError(f"Archivo de velas inválido: {self.path}")
+
+        # Un corte de luz a mitad de escritura puede dejar un registro incompleto
+        sobrante = (os.path.getsize(self.path) - TAM_CABECERA) % self.itemsize
+        if sobrante:
+            with open(self.path, 'r+b') as f:
+                f.truncate(os.path.getsize(self.path) - sobrante)
+
+    def __len__(self):
+        return (os.path.getsize(self.path) - TAM_CABECERA) // self.itemsize
+
+    # --- LECTURA ---
+    def ultimo_ts(self):
+        n = len(self)
+        if n == 0: return None
+        with open(self.path, 'rb') as f:
+            f.seek(TAM_CABECERA + (n - 1) * self.itemsize)
+            return int(np.frombuffer(f.read(8), dtype='<i8')[0])
+
+    def cola(self, n=None):
+        """Vista de solo lectura (memmap) de los últimos n registros."""
+        total = len(self)
+        n = total if n is None else min(n, total)
+        if n == 0: return np.empty(0, dtype=DTYPE_VELA)
+        return np.memmap(self.path, dtype=DTYPE_VELA, mode='r',
+                         offset=TAM_CABECERA + (total - n) * self.itemsize, shape=(n,))
+
+    def bloque(self, a, b):
+        """
+        Copia de los registros [a, b) tomada bajo el candado (acotada al tamaño
+        actual): para leer mientras otro hilo escribe. Un memmap de cola() vería la
+        vela en curso a medio reescribir, o registros ya truncados.
+        """
+        with self.lock:
+            total = len(self)
+            a, b = min(max(a, 0), total), min(b, total)
+            if b <= a: return np.empty(0, dtype=DTYPE_VELA)
+            return np.array(np.memmap(self.path, dtype=DTYPE_VELA, mode='r',
+                                      offset=TAM_CABECERA + a * self.itemsize, shape=(b - a,)))
+
+    def ventana(self, n=None):
+        """
+        Últimos n registros para el ciclo de cálculo sin copiar la serie: memmap
+        copy-on-write cuyas velas cerradas se leen del archivo y cuya vela en
+        curso (la única que el stream reescribe en sitio) se fija bajo el
+        candado. Solo se copian la(s) página(s) de ese último registro.
+        """
+        with self.lock:
+            total = len(self)
+            n = total if n is None else min(n, total)
+            if n == 0: return np.empty(0, dtype=DTYPE_VELA)
+            vista = np.memmap(self.path, dtype=DTYPE_VELA, mode='c',
+                              offset=TAM_CABECERA + (total - n) * self.itemsize, shape=(n,))
+            vista[-1] = vista[-1].copy()  # Escritura privada: la página deja de seguir al archivo
+            return vista
+
+    def _posicion_ts(self, ts):
+        """Índice del primer registro con timestamp >= ts (búsqueda binaria sobre el memmap)."""
+        todos = self.cola()
+        if len(todos) == 0: return 0
+        return int(np.searchsorted(todos['ts'], ts, side='left'))
+
+    # --- ESCRITURA ---
+    def agregar(self, registros):
+        """Agrega registros ordenados por ts. Reemplaza la cola si hay solape."""
+        if len(registros) == 0: return 0
+        registros = np.asarray(registros, dtype=DTYPE_VELA)
+        with self.lock:
+            return self._agregar(registros)
+
+    def _agregar(self, registros):
+        total = len(self)
+        pos = total
+        ultimo = self.ultimo_ts()
+        if ultimo is not None and registros['ts'][0] <= ultimo:
+            pos = self._posicion_ts(int(registros['ts'][0]))
+
+        with open(self.path, 'r+b') as f:
+            f.seek(TAM_CABECERA + pos * self.itemsize)
+            f.write(registros.tobytes())
+            fin = pos + len(registros)
+            if fin < total:
+                # La data nueva termina antes que la vieja: descartamos el resto
+                f.truncate(TAM_CABECERA + fin * self.itemsize)
+        return len(registros)
+
+    def empujar(self, registro):
+        """
+        Camino O(1) del stream: una vela que reemplaza a la última (mismo ts, vela
+        en formación) o la sigue. Solo si llega una anterior se cae a fusionar().
+        """
+        registro = np.asarray(registro, dtype=DTYPE_VELA).reshape(1)
+        ts = int(registro['ts'][0])
+        with self.lock:
+            ultimo = self.ultimo_ts()
+            if ultimo is not None and ts < ultimo:
+                return self._fusionar(registro)
+            pos = len(self) - 1 if ts == ultimo else len(self)
+            with open(self.path, 'r+b') as f:
+                f.seek(TAM_CABECERA + pos * self.itemsize)
+                f.write(registro.tobytes())
+            return 1
+
+    def fusionar(self, registros):
+        """
+        Inserta registros en cualquier punto de la serie (relleno de huecos).
+        Solo se reescribe desde el primer timestamp afectado; ante timestamps
+        repetidos gana el registro nuevo (ej. la vela que estaba en formación).
+        """
+        if len(registros) == 0: return 0
+        registros = np.sort(np.asarray(registros, dtype=DTYPE_VELA), order='ts', kind='stable')
+        with self.lock:
+            return self._fusionar(registros)
+
+    def _fusionar(self, registros):
+        ultimo = self.ultimo_ts()
+        if ultimo is None or registros['ts'][0] > ultimo:
+            return self._agregar(registros)
+
+        pos = self._posicion_ts(int(registros['ts'][0]))
+        existentes = np.array(self.cola(len(self) - pos))  # Copia: se sobrescribe debajo
+        todos = np.concatenate([registros, existentes])
+        todos = todos[np.argsort(todos['ts'], kind='stable')]
+        unicos = np.ones(len(todos), dtype=bool)
+        unicos[1:] = todos['ts'][1:] != todos['ts'][:-1]
+        todos = todos[unicos]
+
+        with open(self.path, 'r+b') as f:
+            f.seek(TAM_CABECERA + pos * self.itemsize)
+            f.write(todos.tobytes())
+        return len(registros)
+
+    def truncar_desde(self, ts):
+        """Descarta los registros con timestamp >= ts. Devuelve cuántos quedaron."""
+        with self.lock:
+            pos = self._posicion_ts(int(ts))
+            with open(self.path, 'r+b') as f:
+                f.truncate(TAM_CABECERA + pos * self.itemsize)
+            return pos
+
+    def vaciar(self):
+        with self.lock, open(self.path, 'r+b') as f:
+            f.truncate(TAM_CABECERA)
+
+    # --- CONVERSIÓN ---
+    @staticmethod
+    def desde_klines(klines):
+        """Convierte la respuesta cruda de futures_klines en registros."""
+        registros = np.empty(len(klines), dtype=DTYPE_VELA)
+        if len(klines) == 0: return registros
+        crudo = np.array([k[:6] for k in klines], dtype=np.float64)
+        registros['ts'] = crudo[:, 0].astype(np.int64)
+        for j, col in enumerate(['open', 'high', 'low', 'close', 'volume'], start=1):
+            registros[col] = crudo[:, j]
+        return registros
+
+    def migrar_csv(self, csv_path):
+        """Migración única desde metrics_history.csv (solo si el almacén está vacío)."""
+        if len(self) > 0 or not os.path.exists(csv_path): return 0
+        df = pd.read_csv(csv_path, encoding='utf-8')
+        if df.empty: return 0
+        df = df[['ts', 'open', 'high', 'low', 'close', 'volume']].astype(float).dropna()
+        df = df.sort_values('ts').drop_duplicates('ts', keep='last')
+
+        registros = np.empty(len(df), dtype=DTYPE_VELA)
+        registros['ts'] = df['ts'].to_numpy().astype(np.int64)
+        for col in ['open', 'high', 'low', 'close', 'volume']:
+            registros[col] = df[col].to_numpy()
+        return self.agregar(registros)
@@ -0,0 +1,194 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import inspect
+import numpy as np
+import pandas as pd
+
+from . import kernels, mtf_align
+
+VERSION_CUBO = 1
+
+
+# --- BLOQUE COLUMNAR ---
+# Un frame MTF en un solo buffer: [índice/columnas de fecha como int64 ns] seguido
+# de las columnas numéricas como una matriz float64 (una fila contigua por columna).
+# Sirve tanto para el archivo del cubo (memmap) como para memoria compartida.
+def describir(df):
+    """Descriptor JSON-serializable del layout de 'df' en un bloque columnar."""
+    fechas = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+    numericas = [c for c in df.columns if c not in fechas]
+    indice_fecha = isinstance(df.index, pd.DatetimeIndex)
+    return {
+        'n': len(df),
+        'orden': [str(c) for c in df.columns],
+        'fechas': [str(c) for c in fechas],
+        'unidades': {str(c): np.datetime_data(df[c].dtype)[0] for c in fechas},
+        'numericas': [str(c) for c in numericas],
+        'dtypes': {str(c): str(df[c].dtype) for c in numericas if df[c].dtype != np.float64},
+        'indice_fecha': indice_fecha,
+        'indice': df.index.name if indice_fecha else None,
+        'unidad_indice': np.datetime_data(df.index.dtype)[0] if indice_fecha else None,
+    }
+
+
+def tamano(d):
+    return max(8, 8 * d['n'] * (len(d['fechas']) + int(d['indice_fecha']) + len(d['numericas'])))
+
+
+def _vistas(buf, d):
+    n_ent = len(d['fechas']) + int(d['indice_fecha'])
+    enteros = np.ndarray((n_ent, d['n']), dtype=np.int64, buffer=buf)
+    floats = np.ndarray((len(d['numericas']), d['n']), dtype=np.float64, buffer=buf, offset=8 * n_ent * d['n'])
+    return enteros, floats
+
+
+def _a_ns(valores):
+    return np.asarray(valores).astype('datetime64[ns]').astype(np.int64)
+
+
+def volcar(df, buf, d):
+    """Copia 'df' al buffer según el descriptor."""
+    enteros, floats = _vistas(buf, d)
+    fila = 0
+    if d['indice_fecha']:
+        enteros[0] = _a_ns(df.index.values)
+        fila = 1
+    for k, c in enumerate(d['fechas']):
+        enteros[fila + k] = _a_ns(df[c].to_numpy())
+    for k, c in enumerate(d['numericas']):
+        floats[k] = df[c].to_numpy(dtype=np.float64)
+
+
+def armar(buf, d):
+    """
+    DataFrame sobre el buffer: las columnas float64 son vistas de solo lectura (sin copia);
+    fechas y columnas enteras (p.ej. 'ts') se reconstruyen con su dtype original.
+    """
+    enteros, floats = _vistas(buf, d)
+    floats.flags.writeable = False
+    df = pd.DataFrame(floats.T, columns=d['numericas'], copy=False)
+    for c, dtype in d['dtypes'].items():
+        df[c] = df[c].to_numpy().astype(dtype)
+    fila = int(d['indice_fecha'])
+    for k, c in enumerate(d['fechas']):
+        unidad = d['unidades'][c]
+        df.insert(d['orden'].index(c), c, enteros[fila + k].view('datetime64[ns]').astype(f'datetime64[{unidad}]'))
+    if d['indice_fecha']:
+        df.index = pd.DatetimeIndex(enteros[0].view('datetime64[ns]').astype(f"datetime64[{d['unidad_indice']}]"),
+                                    name=d['indice'])
+    return df
+
+
+# --- CACHÉ EN DISCO ---
+class CuboMTF:
+    """
+    CUBO MTF EN CACHÉ (MEMMAP)
+    Materializa una vez el frame MTF alineado a 1m de un backtester (columnas con
+    prefijo: '5m_EMA_7', '1h_STOCH_RSI', '4h_EMA_200'...) y lo guarda como bloque
+    columnar + manifiesto JSON. La clave es símbolo + rango de fechas + hash del
+    conjunto de indicadores (spec declarada, código del módulo del constructor
+    -incluye sus helpers, ej. _calc_adx/_calc_rsi-, de los kernels y de la alineación MTF).
+    Si cambia un archivo fuente (tamaño o mtime) el cubo se reconstruye.
+    """
+    def __init__(self, carpeta, symbol, nombre, spec, fuentes, construir):
+        self.carpeta = carpeta
+        self.symbol = symbol
+        self.nombre = nombre
+        self.fuentes = list(fuentes)
+        self.construir = construir
+        firma = (json.dumps(spec, sort_keys=True) + self._codigo(construir)
+                 + inspect.getsource(kernels) + inspect.getsource(mtf_align))
+        self.hash = hashlib.sha1(f"{VERSION_CUBO}|{firma}".encode()).hexdigest()[:12]
+        self.prefijo = f"{symbol}_{nombre}_{self.hash}"
+
+    @staticmethod
+    def _codigo(construir):
+        """Fuente del módulo completo del constructor (o solo la función si no hay archivo)."""
+        try:
+            return inspect.getsource(inspect.getmodule(construir))
+        except (OSError, TypeError):
+            return inspect.getsource(construir)
+
+    def _huellas(self):
+        huellas = {}
+        for ruta in self.fuentes:
+            if not os.path.exists(ruta): return None
+            st = os.stat(ruta)
+            huellas[os.path.abspath(ruta)] = [st.st_size, st.st_mtime_ns]
+        return huellas
+
+    def _manifiestos(self):
+        return glob.glob(os.path.join(self.carpeta, f"{self.prefijo}_*.json"))
+
+    def _vigente(self, huellas):
+        for ruta in self._manifiestos():
+            try:
+                with open(ruta, encoding='utf-8') as f:
+                    manifiesto = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if manifiesto.get('fuentes') == huellas and os.path.exists(ruta[:-5] + '.bin'):
+                return ruta[:-5], manifiesto
+        return None
+
+    def cargar(self):
+        """Frame MTF del caché (memmap) o construido y guardado si falta/está desactualizado."""
+        huellas = self._huellas()
+        if huellas is None: return self.construir()  # Faltan fuentes: el constructor informa
+
+        t0 = time.perf_counter()
+        vigente = self._vigente(huellas)
+        if vigente:
+            base, manifiesto = vigente
+            d = manifiesto['layout']
+            buf = np.memmap(base + '.bin', dtype=np.uint8, mode='r', shape=(tamano(d),))
+            df = armar(buf, d)
+            print(f"⚡ Cubo MTF {os.path.basename(base)}: {len(df)} velas en {(time.perf_counter() - t0) * 1000:.0f} ms")
+            return df
+
+        df = self.construir()
+        if df is None or df.empty: return df
+        try:
+            self._guardar(df, huellas)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el cubo MTF: {e}")
+        return df
+
+    def _rango(self, df):
+        tiempos = df.index if isinstance(df.index, pd.DatetimeIndex) else df.get('datetime')
+        if tiempos is None or len(tiempos) == 0: return "sin_rango"
+        return f"{pd.Timestamp(tiempos[0]):%Y%m%d%H%M}-{pd.Timestamp(tiempos[len(tiempos) - 1]):%Y%m%d%H%M}"
+
+    def _guardar(self, df, huellas):
+        os.makedirs(self.carpeta, exist_ok=True)
+        d = describir(df)
+        base = os.path.join(self.carpeta, f"{self.prefijo}_{self._rango(df)}")
+
+        # Bloque primero (vía .tmp + replace); el manifiesto al final confirma el cubo
+        mm = np.memmap(base + '.bin.tmp', dtype=np.uint8, mode='w+', shape=(tamano(d),))
+        volcar(df, mm, d)
+        mm.flush()
+        del mm
+        os.replace(base + '.bin.tmp', base + '.bin')
+        manifiesto = {'version': VERSION_CUBO, 'symbol': self.symbol, 'nombre': self.nombre,
+                      'hash': self.hash, 'fuentes': huellas, 'layout': d}
+        with open(base + '.json.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f)
+        os.replace(base + '.json.tmp', base + '.json')
+
+        # Cubos viejos del mismo conjunto de indicadores (otras fuentes/rango)
+        for ruta in self._manifiestos():
+            if ruta[:-5] != base:
+                for viejo in (ruta, ruta[:-5] + '.bin'):
+                    try: os.remove(viejo)
+                    except OSError: pass
+        print(f"💾 Cubo MTF guardado: {os.path.basename(base)} ({len(df)} velas)")
+
+    def invalidar(self):
+        for ruta in self._manifiestos():
+            for archivo in (ruta, ruta[:-5] + '.bin'):
+                try: os.remove(archivo)
+                except OSError: pass
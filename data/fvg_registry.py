@@ -0,0 +1,98 @@
+import os
+import threading
+from collections import namedtuple
+import pandas as pd
+
+# Foto inmutable del registro: se reemplaza entera, nunca se modifica en sitio
+Instantanea = namedtuple('Instantanea', ['version', 'registros', 'indice'])
+
+
+def guardar_registro(df, path):
+    """
+    Escritura atómica del registro FVG (CSV a .tmp + os.replace): un lector ve
+    el archivo anterior o el nuevo completo, nunca uno a medio escribir.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+class RegistroFVG:
+    """
+    REGISTRO FVG VIGILADO
+    Mantiene en memoria la última versión de fvg_registry.csv como una
+    Instantanea (version, registros, indice). Un hilo vigía compara la huella
+    del archivo (inode, tamaño, mtime) cada 'intervalo' segundos y solo si
+    cambió lo parsea e indexa fuera del bucle caliente; luego publica la foto
+    nueva con una sola asignación. El lector (Brain) toma 'actual' sin candados.
+    'indexar' (opcional) construye el índice de la foto a partir de los registros.
+    """
+    def __init__(self, path, indexar=None, intervalo=1.0, vigilar=True, log=None):
+        self.path = path
+        self.indexar = indexar
+        self.intervalo = intervalo
+        self.log = log
+        self._huella = None
+        self._version = 0
+        self.actual = self._instantanea([])
+        self._parar = threading.Event()
+        self._hilo = None
+
+        self.refrescar()
+        if vigilar:
+            self._hilo = threading.Thread(target=self._vigilar, name=f"fvg:{os.path.basename(os.path.dirname(path))}",
+                                          daemon=True)
+            self._hilo.start()
+
+    def _instantanea(self, registros):
+        indice = self.indexar(registros) if self.indexar else None
+        return Instantanea(self._version, registros, indice)
+
+    def _huella_actual(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def refrescar(self):
+        """Recarga si el archivo cambió. Devuelve True si se publicó una versión nueva."""
+        huella = self._huella_actual()
+        if huella == self._huella: return False
+
+        if huella is None:
+            registros = []  # Sin registro: sin zonas (como antes)
+        else:
+            try:
+                registros = pd.read_csv(self.path).to_dict('records')
+            except Exception as e:
+                self._error(f"Registro FVG ilegible, se conserva la versión {self._version}: {e}")
+                return False
+            # Si cambió mientras se leía (escritor no atómico), se reintenta en la próxima vuelta
+            if self._huella_actual() != huella: return False
+
+        self._version += 1
+        try:
+            self.actual = self._instantanea(registros)
+        except Exception as e:
+            self._version -= 1
+            self._error(f"Error indexando registro FVG: {e}")
+            return False
+        self._huella = huella
+        return True
+
+    def _vigilar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.refrescar()
+            except Exception as e:
+                self._error(f"Vigía del registro FVG: {e}")
+
+    def _error(self, msg):
+        if self.log is not None: self.log.log_error("FVG", msg)
+        else: print(msg)
+
+    def cerrar(self):
+        self._parar.set()
+        if self._hilo is not None: self._hilo.join(timeout=self.intervalo * 2)
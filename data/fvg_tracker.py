@@ -0,0 +1,142 @@
+import os
+import heapq
+from collections import deque
+import pandas as pd
+from .resampler import TS, HIGH, LOW, CLOSE, PERIODOS_MS
+from .fvg_registry import Instantanea
+
+# Temporalidades institucionales (las mismas que barre tools/fvg_scanner.py)
+TFS_FVG = ('1h', '4h', '1d')
+
+
+class _ZonasTF:
+    """
+    Estado FVG de una temporalidad: las 3 últimas barras cerradas y las zonas
+    vivas en dos montículos ordenados por su borde de mitigación
+    (LONG: top más alto primero; SHORT: bottom más bajo primero).
+    """
+    def __init__(self):
+        self.ultimas = deque(maxlen=3)
+        self.longs = []   # (-top, seq)
+        self.shorts = []  # (bottom, seq)
+
+
+class RastreadorFVG:
+    """
+    RASTREADOR FVG EN LÍNEA
+    Misma regla que FVGScanner.detectar_fvg, pero alimentado por cada barra
+    cerrada de 1h/4h/1d del AgregadorVelas en vivo:
+      - detección O(1): el trío (Vela 1, Vela 2, Vela 3) termina en la barra que cierra
+      - mitigación incremental: cada barra solo mira la cima de cada montículo
+        (O(1) si no toca ninguna zona, O(log n) por zona mitigada)
+    Se siembra con las barras cerradas del agregador (historia persistida) y,
+    antes de ellas, con los CSV del Data Miner que barre el scanner
+    ('historia': carpeta con history_{SYMBOL}_{tf}.csv), y después sigue los
+    eventos del agregador. Publica en 'actual' una Instantanea (version,
+    registros) con el formato del fvg_registry.csv, reemplazada entera solo
+    cuando el conjunto vivo cambia. 'cubre' es False si su historia empieza
+    después que la del scanner (CSV separado por un hueco): el consumidor debe
+    usar el registro en disco hasta que la cubra.
+    """
+    def __init__(self, symbol, agregador, tfs=TFS_FVG, historia=None):
+        self.symbol = symbol
+        self.agregador = agregador
+        self.tfs = [tf for tf in tfs if tf in agregador.tfs]
+        self.historia = historia
+        self._version = 0
+        self.actual = Instantanea(0, [], None)
+        self.cubre = False
+        self.sembrar()
+        agregador.suscribir(self._on_barra)
+
+    def sembrar(self):
+        """(Re)construye el conjunto vivo desde el CSV previo + las barras cerradas del agregador."""
+        self.estado = {tf: _ZonasTF() for tf in self.tfs}
+        self.vivas = {}  # seq -> registro
+        self._seq = 0
+        cubre = True
+        for tf in self.tfs:
+            barras = self.agregador.series[tf].ventana()
+            previa = self._historia_csv(tf)
+            if previa is not None and len(barras):
+                # Solo lo anterior a la primera barra propia, y sin hueco entre ambas
+                previa = previa[previa['ts'] < barras[0][TS]]
+                if len(previa) and previa['ts'].iloc[-1] < barras[0][TS] - PERIODOS_MS[tf]:
+                    cubre, previa = False, None
+            if previa is not None:
+                for ts, high, low, close in previa.itertuples(index=False):
+                    self._avanzar(tf, ts, high, low, close)
+            for fila in barras:
+                self._avanzar(tf, fila[TS], fila[HIGH], fila[LOW], fila[CLOSE])
+        self.cubre = cubre
+        self._publicar()
+
+    def _historia_csv(self, tf):
+        """Barras cerradas de history_{SYMBOL}_{tf}.csv (DataFrame ts/high/low/close) o None."""
+        if not self.historia: return None
+        path = os.path.join(self.historia, f"history_{self.symbol}_{tf}.csv")
+        if not os.path.exists(path): return None
+        try:
+            df = pd.read_csv(path, usecols=['ts', 'high', 'low', 'close'])
+        except Exception as e:
+            print(f"Historia FVG ilegible ({path}): {e}")
+            return None
+        # La última fila es la barra que estaba en formación al minar: no se usa
+        return df.dropna().sort_values('ts').iloc[:-1]
+
+    def _on_barra(self, tf, barra):
+        if tf not in self.estado: return
+        if self._avanzar(tf, barra['ts'], barra['high'], barra['low'], barra['close']):
+            self._publicar()
+
+    def _avanzar(self, tf, ts, high, low, close):
+        """Pliega una barra cerrada. Devuelve True si el conjunto vivo cambió."""
+        est = self.estado[tf]
+        # Barras ya plegadas (p. ej. desde el CSV) no se repiten
+        if est.ultimas and ts <= est.ultimas[-1][0]: return False
+        cambio = False
+
+        # --- 1. MITIGACIÓN (zonas de tríos anteriores) ---
+        # LONG: el precio bajó a tocar el techo | SHORT: subió a tocar el piso
+        while est.longs and low <= -est.longs[0][0]:
+            self.vivas.pop(heapq.heappop(est.longs)[1], None)
+            cambio = True
+        while est.shorts and high >= est.shorts[0][0]:
+            self.vivas.pop(heapq.heappop(est.shorts)[1], None)
+            cambio = True
+
+        # --- 2. DETECCIÓN (trío que termina en esta barra) ---
+        est.ultimas.append((ts, high, low, close))
+        if len(est.ultimas) < 3: return cambio
+        (_, h1, l1, _), (ts2, _, _, c2), (_, h3, l3, _) = est.ultimas
+
+        if l3 > h1:
+            # FVG ALCISTA (Soporte): Techo = Low(3), Piso = High(1)
+            if (l3 - h1) > (c2 * 0.001):
+                self._abrir(tf, 'LONG', l3, h1, ts2, c2, est.longs, -l3)
+                cambio = True
+        elif h3 < l1:
+            # FVG BAJISTA (Resistencia): Techo = Low(1), Piso = High(3)
+            if (l1 - h3) > (c2 * 0.001):
+                self._abrir(tf, 'SHORT', l1, h3, ts2, c2, est.shorts, h3)
+                cambio = True
+        return cambio
+
+    def _abrir(self, tf, tipo, top, bottom, ts2, c2, monticulo, clave):
+        self._seq += 1
+        self.vivas[self._seq] = {
+            'Symbol': self.symbol,
+            'Timeframe': tf,
+            'Type': tipo,
+            'Top': float(f"{top:.2f}"),
+            'Bottom': float(f"{bottom:.2f}"),
+            'Created_At': str(pd.Timestamp(int(ts2), unit='ms')),
+            'Gap_Size_Pct': float(f"{(abs(top-bottom)/c2)*100:.2f}")
+        }
+        heapq.heappush(monticulo, (clave, self._seq))
+
+    def _publicar(self):
+        # Los más recientes primero (como el registro en disco)
+        registros = [self.vivas[s] for s in sorted(self.vivas, reverse=True)]
+        self._version += 1
+        self.actual = Instantanea(self._version, registros, None)
@@ -0,0 +1,222 @@
+import os
+import numpy as np
+import pandas as pd
+from .candle_store import AlmacenVelas, DTYPE_VELA
+from .resampler import PERIODOS_MS
+from .incremental_engine import IndicadoresTF, COLUMNAS
+
+# Temporalidades con historia completa (sin el tope de la ventana de 1m)
+TFS_HISTORIA = ('1h', '4h', '1d')
+# Barras retenidas en memoria por TF (~2 años de 1h, ~5 de 4h, ~13 de 1d)
+MAX_BARRAS = {'1h': 20000, '4h': 11000, '1d': 5000}
+# La EMA200 necesita al menos 200 barras; la siembra nativa trae una página de klines
+# (1500: ~2 meses de 1h, ~8 de 4h, ~4 años de 1d) mientras la historia sea más corta
+BARRAS_MINIMAS = 200
+BARRAS_SEMILLA = 1500
+
+
+class HistorialSuperior:
+    """
+    HISTORIA PERSISTENTE DE TEMPORALIDADES SUPERIORES
+    Las barras cerradas de 1h/4h/1d se guardan una sola vez en su propio almacén
+    binario y los acarreos de sus indicadores (EMAs, ventanas) se guardan tras
+    cada cierre como arrays planos versionados (.npz, sin pickle). Al arrancar se
+    recargan ambos y solo se avanza con lo nuevo, de modo que la EMA200 de 4h/1d
+    es correcta sin cargar meses de velas de 1m en RAM. Un estado de otra versión
+    se descarta y los acarreos se re-siembran desde las barras.
+    """
+    def __init__(self, carpeta, agregador, motor, tfs=TFS_HISTORIA):
+        self.agregador = agregador
+        self.motor = motor
+        self.tfs = [tf for tf in tfs if tf in agregador.tfs]
+        self.path_estado = os.path.join(carpeta, 'indicadores_htf.npz')
+        self.stores = {
+            tf: AlmacenVelas(os.path.join(carpeta, f'candles_{tf}.bin'), PERIODOS_MS[tf])
+            for tf in self.tfs
+        }
+        self.pendiente = False  # Hay barras cerradas sin estado guardado
+        self.al_dia = False
+
+        for tf, store in self.stores.items():
+            self.agregador.precargar(tf, self._a_matriz(store.cola()))
+        self._cargar_estado()
+        self.agregador.suscribir(self._on_barra)
+
+    @staticmethod
+    def _a_matriz(registros):
+        """Registros del almacén -> matriz (n, 6) como las barras del agregador."""
+        matriz = np.empty((len(registros), 6))
+        for j, col in enumerate(DTYPE_VELA.names):
+            matriz[:, j] = registros[col]
+        return matriz
+
+    # --- PERSISTENCIA ---
+    def _on_barra(self, tf, barra):
+        store = self.stores.get(tf)
+        if store is None: return
+        registro = np.array([tuple(barra[col] for col in DTYPE_VELA.names)], dtype=DTYPE_VELA)
+        store.agregar(registro)
+        self.pendiente = True
+
+    def _cargar_estado(self):
+        if not os.path.exists(self.path_estado): return
+        try:
+            with np.load(self.path_estado, allow_pickle=False) as z:
+                datos = {k: z[k] for k in z.files}
+        except Exception as e:
+            print(f"Estado de indicadores HTF ilegible, se recalcula: {e}")
+            return
+        if (int(datos.get('version', -1)) != IndicadoresTF.VERSION_ESTADO
+                or str(datos.get('columnas', '')) != ','.join(COLUMNAS)):
+            print("Estado de indicadores HTF de otra versión: se descarta y se recalcula desde las barras.")
+            return
+        for tf in self.tfs:
+            campos = {k[len(tf) + 2:]: v for k, v in datos.items() if k.startswith(f"{tf}__")}
+            if not campos: continue
+            try:
+                ind = IndicadoresTF.importar(campos)
+            except (KeyError, ValueError) as e:
+                print(f"Estado de indicadores {tf} incompleto, se recalcula: {e}")
+                continue
+            # Solo se usa si coincide con la última barra persistida (si no, el motor re-siembra)
+            if ind.ultimo_ts == self.stores[tf].ultimo_ts():
+                self.motor.tfs[tf] = ind
+
+    def guardar_estado(self):
+        """Guarda los acarreos de las TFs superiores (arrays versionados, escritura atómica)."""
+        if not self.pendiente: return
+        estado = {'version': np.array(IndicadoresTF.VERSION_ESTADO), 'columnas': np.array(','.join(COLUMNAS))}
+        for tf in self.tfs:
+            if tf not in self.motor.tfs: continue
+            for campo, valor in self.motor.tfs[tf].exportar().items():
+                estado[f"{tf}__{campo}"] = valor
+        tmp = self.path_estado + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                np.savez(f, **estado)
+            os.replace(tmp, self.path_estado)
+            self.pendiente = False
+        except Exception as e:
+            print(f"Error guardando estado de indicadores HTF: {e}")
+
+    def rebobinar(self, desde_ts):
+        """
+        Velas de 1m insertadas en el pasado (relleno de un hueco) desde 'desde_ts':
+        descarta las barras persistidas cuyo bucket contiene o sigue a ese instante
+        y el estado de indicadores guardado, reinicia el agregador y precarga lo
+        que sigue siendo válido. La siguiente ponerse_al_dia() vuelve a plegar
+        desde ahí (los acarreos se re-siembran desde las barras).
+        """
+        self.agregador.reiniciar()
+        for tf, store in self.stores.items():
+            periodo = PERIODOS_MS[tf]
+            store.truncar_desde(desde_ts - desde_ts % periodo)
+            self.agregador.precargar(tf, self._a_matriz(store.cola()))
+        self.motor.reiniciar()
+        try:
+            if os.path.exists(self.path_estado): os.remove(self.path_estado)
+        except OSError as e:
+            print(f"No se pudo borrar el estado de indicadores HTF: {e}")
+        self.pendiente = True
+        self.al_dia = False
+
+    # --- ARRANQUE ---
+    def sembrar(self, store_1m, conn=None, symbol=None, carpeta_csv=None):
+        """
+        Antes del primer plegado: las TFs con menos de BARRAS_SEMILLA barras se
+        completan hacia atrás con barras nativas (klines 1h/4h/1d del exchange y, por
+        detrás o sin conexión, los history_{SYMBOL}_{tf}.csv del Data Miner). 60,000 velas de 1m
+        solo dan ~41 barras de 1d. Se siembra hasta la primera barra persistida
+        inclusive (la primera plegada puede venir de un bucket de 1m incompleto) o,
+        sin barras, hasta el primer bucket que el 1m cubre entero: nativas y
+        plegadas no se solapan. Devuelve las barras sembradas por TF.
+        """
+        primera = store_1m.bloque(0, 1)
+        ultimo_1m = store_1m.ultimo_ts()
+        if len(primera) == 0: return {}
+        primero_1m = int(primera['ts'][0])
+
+        sembradas = {}
+        for tf, store in self.stores.items():
+            if len(store) >= BARRAS_SEMILLA: continue
+            periodo = PERIODOS_MS[tf]
+            primera_tf = int(store.bloque(0, 1)['ts'][0]) if len(store) else None
+            if primera_tf is not None:
+                corte = primera_tf + periodo
+            else:
+                corte = min(-(-primero_1m // periodo) * periodo, ultimo_1m - ultimo_1m % periodo)
+            registros = self._barras_nativas(tf, corte, conn, symbol, carpeta_csv)
+            # Sin nada anterior a lo persistido (símbolo reciente) no hay que reconstruir
+            if len(registros) == 0 or (primera_tf is not None and registros['ts'][0] >= primera_tf): continue
+            store.fusionar(registros)
+            sembradas[tf] = len(registros)
+
+        if sembradas:
+            # Historia más larga por detrás: se precarga de nuevo y los acarreos se re-siembran
+            self.agregador.reiniciar()
+            for tf, store in self.stores.items():
+                self.agregador.precargar(tf, self._a_matriz(store.cola()))
+            for tf in sembradas:
+                self.motor.reiniciar(tf)
+            self.pendiente = True
+        for tf, store in self.stores.items():
+            if len(store) < BARRAS_MINIMAS:
+                print(f"Historia {tf} con {len(store)} barras (< {BARRAS_MINIMAS}): su EMA200 aún no es fiable.")
+        return sembradas
+
+    def _barras_nativas(self, tf, corte, conn, symbol, carpeta_csv):
+        """
+        Barras cerradas de 'tf' anteriores a 'corte': klines del exchange y, por
+        detrás de ellas (o sin conexión), el CSV del Data Miner.
+        """
+        registros = np.empty(0, dtype=DTYPE_VELA)
+        if conn is not None:
+            klines = conn.get_historical_candles(symbol, tf, limit=BARRAS_SEMILLA, end_time=corte - 1)
+            registros = self._filtrar(AlmacenVelas.desde_klines(klines), tf, corte)
+        if len(registros) < BARRAS_SEMILLA and carpeta_csv:
+            limite = int(registros['ts'][0]) if len(registros) else corte
+            previas = self._filtrar(self._leer_csv(os.path.join(carpeta_csv, f"history_{symbol}_{tf}.csv")), tf, limite)
+            registros = np.concatenate([previas, registros])
+        return registros[-BARRAS_SEMILLA:]
+
+    @staticmethod
+    def _filtrar(registros, tf, corte):
+        """Solo buckets alineados y cerrados antes del corte (el exchange puede incluir la barra en curso)."""
+        ts = registros['ts']
+        return registros[(ts < corte) & (ts % PERIODOS_MS[tf] == 0)]
+
+    @staticmethod
+    def _leer_csv(path):
+        if not os.path.exists(path): return np.empty(0, dtype=DTYPE_VELA)
+        try:
+            df = pd.read_csv(path, usecols=list(DTYPE_VELA.names)).dropna()
+        except Exception as e:
+            print(f"Historia {os.path.basename(path)} ilegible: {e}")
+            return np.empty(0, dtype=DTYPE_VELA)
+        df = df.sort_values('ts').drop_duplicates('ts', keep='last')
+        registros = np.empty(len(df), dtype=DTYPE_VELA)
+        for col in DTYPE_VELA.names:
+            registros[col] = df[col].to_numpy()
+        return registros
+
+    def ponerse_al_dia(self, store_1m, bloque=50000, desde=None):
+        """
+        Pasada única al arrancar: pliega las velas de 1m del almacén posteriores a la
+        última barra persistida (o toda la historia si aún no hay barras), por bloques
+        copiados bajo el candado del almacén (el stream puede estar escribiendo).
+        Luego el ciclo normal solo procesa velas nuevas.
+        'desde' (ts) adelanta el inicio para que las temporalidades menores
+        también se plieguen desde ahí (las barras ya persistidas no se duplican).
+        """
+        self.al_dia = True
+        with store_1m.lock:
+            ts = np.array(store_1m.cola()['ts'])
+        if len(ts) == 0: return
+        inicio_htf = min(self.agregador.desde[tf] for tf in self.tfs) if self.tfs else ts[-1]
+        desde = inicio_htf if desde is None else min(inicio_htf, desde)
+        inicio = int(np.searchsorted(ts, desde))
+        for a in range(inicio, len(ts), bloque):
+            # +1: la última vela de cada bloque entra provisional y se confirma con el siguiente
+            trozo = store_1m.bloque(a, a + bloque + 1)
+            self.agregador.alimentar(trozo['ts'], trozo['open'], trozo['high'],
+                                     trozo['low'], trozo['close'], trozo['volume'])
@@ -0,0 +1,310 @@
+import math
+from collections import deque
+from itertools import islice
+import numpy as np
+from . import kernels
+from .ring_buffer import BufferCircular
+
+# Columnas que produce el motor (mismo orden y nombres que MetricCalculator)
+COLUMNAS = ['RSI', 'STOCH_RSI', 'BB_UPPER', 'BB_LOWER', 'BB_MID', 'BB_WIDTH',
+            'EMA_7', 'EMA_25', 'EMA_99', 'EMA_200', 'ADX',
+            'MACD_DIF', 'MACD_DEA', 'MACD_HIST']
+
+NAN = float('nan')
+
+
+def _div(a, b):
+    """División con semántica IEEE (igual que pandas): x/0 -> inf, 0/0 -> nan."""
+    if b == 0:
+        if a == 0 or a != a: return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def _previos(ventana, periodo):
+    """Los periodo-1 valores más recientes de la ventana, sin copiarla."""
+    return islice(ventana, len(ventana) - (periodo - 1), None)
+
+
+def _media(ventana, x, periodo):
+    """Media móvil de 'periodo' valores incluyendo el nuevo valor x (nan si falta data)."""
+    if len(ventana) < periodo - 1: return NAN
+    # Mismo orden de suma que sum([...previos, x])
+    return (sum(_previos(ventana, periodo)) + x) / periodo
+
+
+def _extremos(ventana, x, periodo):
+    """Min/Max de la ventana con x. Si hay nan dentro, pandas devuelve nan."""
+    if len(ventana) < periodo - 1: return NAN, NAN
+    if x != x: return NAN, NAN
+    minimo = maximo = x
+    for v in _previos(ventana, periodo):
+        if v != v: return NAN, NAN
+        if v < minimo: minimo = v
+        elif v > maximo: maximo = v
+    return minimo, maximo
+
+
+class IndicadoresTF:
+    """
+    ESTADO INCREMENTAL DE UNA TEMPORALIDAD
+    Mantiene los acarreos de cada indicador (EMAs, ventanas de RSI/ADX/Bollinger)
+    para avanzar vela a vela en O(1) en lugar de recalcular toda la historia.
+    Replica exactamente las fórmulas de MetricCalculator._calcular_indicadores_base.
+    Desde estado vacío, un rango largo se confirma en una sola pasada vectorizada
+    (kernels) y los acarreos se toman de su cola; luego se avanza vela a vela.
+    """
+    PERIODO_RSI = 14
+    PERIODO_STOCH = 14
+    PERIODO_BB = 20
+    PERIODO_ADX = 14
+    SPANS_EMA = (7, 25, 99, 200)
+    CAPACIDAD_INICIAL = 4096
+    MIN_SIEMBRA = 256  # Filas desde estado vacío a partir de las cuales se siembra en bloque
+    # Versión del estado exportado: subirla si cambian los acarreos o las fórmulas
+    VERSION_ESTADO = 1
+    VENTANAS = ('ganancias', 'perdidas', 'rsis', 'cierres', 'plus_dm', 'minus_dm', 'trs', 'dxs')
+
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.prev = None  # (high, low, close) de la última vela confirmada
+        self.emas = {}    # span -> valor (incluye 12/26 del MACD)
+        self.dea = None
+        self.ganancias = deque(maxlen=self.PERIODO_RSI)
+        self.perdidas = deque(maxlen=self.PERIODO_RSI)
+        self.rsis = deque(maxlen=self.PERIODO_STOCH)
+        self.cierres = deque(maxlen=self.PERIODO_BB)
+        self.plus_dm = deque(maxlen=self.PERIODO_ADX)
+        self.minus_dm = deque(maxlen=self.PERIODO_ADX)
+        self.trs = deque(maxlen=self.PERIODO_ADX)
+        self.dxs = deque(maxlen=self.PERIODO_ADX)
+
+        # Historia de salidas confirmadas (ring buffers preasignados, alineados por timestamp)
+        self.hist = BufferCircular(self.CAPACIDAD_INICIAL, len(COLUMNAS))
+        self.hist_ts = BufferCircular(self.CAPACIDAD_INICIAL)
+
+    @property
+    def n_hist(self):
+        return len(self.hist)
+
+    @property
+    def ultimo_ts(self):
+        return self.hist_ts.ultimo() if self.hist_ts.total else None
+
+    def _asegurar_capacidad(self, n):
+        """La ventana (cerradas + provisional) debe caber en el ring buffer."""
+        if n + 1 > self.hist.capacidad:
+            capacidad = n + 1 + n // 8
+            self.hist.redimensionar(capacidad)
+            self.hist_ts.redimensionar(capacidad)
+
+    # --- NÚCLEO ---
+    def _paso(self, high, low, close):
+        """Calcula la fila de indicadores para una vela nueva SIN mutar el estado."""
+        prev = self.prev
+        p = self.PERIODO_RSI
+
+        # 1. RSI (medias simples de 14, como el rolling de pandas)
+        delta = close - prev[2] if prev else NAN
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        avg_gain = _media(self.ganancias, gain, p)
+        avg_loss = _media(self.perdidas, loss, p)
+        rsi = 100 - _div(100, 1 + _div(avg_gain, avg_loss))
+
+        # 2. StochRSI
+        min_rsi, max_rsi = _extremos(self.rsis, rsi, self.PERIODO_STOCH)
+        denom = max_rsi - min_rsi
+        if denom == 0: denom = 1
+        stoch = _div(rsi - min_rsi, denom) * 100
+
+        # 3. Bollinger (std muestral, ddof=1)
+        sma = _media(self.cierres, close, self.PERIODO_BB)
+        if sma == sma:
+            cuadrados = sum((v - sma) ** 2 for v in _previos(self.cierres, self.PERIODO_BB)) + (close - sma) ** 2
+            std = math.sqrt(cuadrados / (self.PERIODO_BB - 1))
+        else:
+            std = NAN
+        bb_up = sma + std * 2
+        bb_lo = sma - std * 2
+        bb_w = _div(bb_up - bb_lo, sma)
+
+        # 4. EMAs (adjust=False: y = (1-a)*y_prev + a*x, semilla = primer cierre)
+        emas = {}
+        for span in self.SPANS_EMA + (12, 26):
+            alpha = 2.0 / (span + 1)
+            anterior = self.emas.get(span)
+            emas[span] = close if anterior is None else (1 - alpha) * anterior + alpha * close
+
+        # 5. ADX
+        if prev:
+            high_diff = high - prev[0]
+            low_diff = -(low - prev[1])
+            tr = max(high - low, abs(high - prev[2]), abs(low - prev[2]))
+        else:
+            high_diff = low_diff = NAN
+            tr = high - low
+        pdm = high_diff if (high_diff > low_diff and high_diff > 0) else 0.0
+        mdm = low_diff if (low_diff > high_diff and low_diff > 0) else 0.0
+        atr = _media(self.trs, tr, self.PERIODO_ADX)
+        plus_di = 100 * _div(_media(self.plus_dm, pdm, self.PERIODO_ADX), atr)
+        minus_di = 100 * _div(_media(self.minus_dm, mdm, self.PERIODO_ADX), atr)
+        suma_di = plus_di + minus_di
+        if suma_di == 0: suma_di = 1
+        dx = _div(abs(plus_di - minus_di), suma_di) * 100
+        adx = _media(self.dxs, dx, self.PERIODO_ADX)
+
+        # 6. MACD
+        dif = emas[12] - emas[26]
+        alpha_dea = 2.0 / (9 + 1)
+        dea = dif if self.dea is None else (1 - alpha_dea) * self.dea + alpha_dea * dif
+
+        fila = (rsi, stoch, bb_up, bb_lo, sma, bb_w,
+                emas[7], emas[25], emas[99], emas[200], adx,
+                dif, dea, dif - dea)
+        nuevo_estado = (gain, loss, rsi, close, pdm, mdm, tr, dx, emas, dea, (high, low, close))
+        return fila, nuevo_estado
+
+    def _confirmar(self, ts, high, low, close):
+        fila, (gain, loss, rsi, c, pdm, mdm, tr, dx, emas, dea, prev) = self._paso(high, low, close)
+        self.ganancias.append(gain); self.perdidas.append(loss)
+        self.rsis.append(rsi); self.cierres.append(c)
+        self.plus_dm.append(pdm); self.minus_dm.append(mdm)
+        self.trs.append(tr); self.dxs.append(dx)
+        self.emas = emas; self.dea = dea; self.prev = prev
+        self._guardar_fila(ts, fila)
+        return fila
+
+    def _guardar_fila(self, ts, fila):
+        self.hist.agregar(fila)
+        self.hist_ts.agregar(ts)
+
+    def _sembrar(self, ts, high, low, close, fin):
+        """
+        Confirma las filas [0, fin) desde estado vacío con una pasada de kernels
+        (mismas fórmulas y semillas que el paso a paso) y deja los acarreos
+        como si se hubieran avanzado vela a vela.
+        """
+        h, l, c = (np.asarray(x[:fin], dtype=np.float64) for x in (high, low, close))
+        columnas = kernels.indicadores_completos(h, l, c)
+        self.hist.extender(np.column_stack([columnas[col] for col in COLUMNAS]))
+        self.hist_ts.extender(np.asarray(ts[:fin], dtype=np.float64))
+
+        delta = np.empty(fin)
+        delta[0] = NAN
+        delta[1:] = c[1:] - c[:-1]
+        plus_dm, minus_dm, trs, dxs = kernels.componentes_adx(h, l, c, self.PERIODO_ADX)
+        colas = {'ganancias': np.where(delta > 0, delta, 0.0), 'perdidas': np.where(delta < 0, -delta, 0.0),
+                 'rsis': columnas['RSI'], 'cierres': c,
+                 'plus_dm': plus_dm, 'minus_dm': minus_dm, 'trs': trs, 'dxs': dxs}
+        for nombre, serie in colas.items():
+            ventana = getattr(self, nombre)
+            ventana.extend(serie[-ventana.maxlen:].tolist())
+
+        self.emas = {span: float(columnas[f'EMA_{span}'][-1]) for span in self.SPANS_EMA}
+        for span in (12, 26):
+            self.emas[span] = float(kernels.ema(c, span)[-1])
+        self.dea = float(columnas['MACD_DEA'][-1])
+        self.prev = (float(h[-1]), float(l[-1]), float(c[-1]))
+
+    def _confirmar_rango(self, ts, high, low, close, inicio, fin):
+        if inicio == 0 and self.n_hist == 0 and fin >= self.MIN_SIEMBRA:
+            return self._sembrar(ts, high, low, close, fin)
+        # tolist(): floats nativos (los escalares numpy de un memmap son mucho más lentos)
+        filas = zip(ts[inicio:fin].tolist(), high[inicio:fin].tolist(),
+                    low[inicio:fin].tolist(), close[inicio:fin].tolist())
+        for t, h, l, c in filas:
+            self._confirmar(t, h, l, c)
+
+    # --- API ---
+    def sincronizar(self, ts, high, low, close):
+        """
+        Recibe la serie completa de la temporalidad (arrays) y devuelve la matriz de
+        indicadores alineada fila a fila. Solo procesa las velas nuevas: las cerradas
+        se confirman en el estado y la última (en formación) se calcula provisionalmente.
+
+        La matriz devuelta es una vista del ring buffer (sin copia): es válida hasta
+        la siguiente llamada a sincronizar().
+        """
+        n = len(ts)
+        cerradas = n - 1
+        inicio = 0
+        self._asegurar_capacidad(n)
+        if self.n_hist:
+            pos = int(np.searchsorted(ts, self.ultimo_ts))
+            continua = pos < n and ts[pos] == self.ultimo_ts and pos + 1 <= cerradas
+            if continua:
+                inicio = pos + 1
+            else:
+                self.reiniciar()
+                self._asegurar_capacidad(n)
+
+        self._confirmar_rango(ts, high, low, close, inicio, cerradas)
+
+        # La historia confirmada debe cubrir todas las filas cerradas de la entrada
+        if cerradas and (self.n_hist < cerradas or self.hist_ts.ultimas(cerradas)[0] != ts[0]):
+            self.reiniciar()
+            self._asegurar_capacidad(n)
+            self._confirmar_rango(ts, high, low, close, 0, cerradas)
+
+        provisional, _ = self._paso(float(high[-1]), float(low[-1]), float(close[-1]))
+        self.hist.escribir_provisional(provisional)
+        return self.hist.ultimas(n, con_provisional=True)
+
+
+    # --- PERSISTENCIA (arrays planos: se cargan sin pickle) ---
+    def exportar(self):
+        """Acarreos + historia confirmada como dict de arrays numpy."""
+        n = self.n_hist
+        spans = sorted(self.emas)
+        estado = {
+            'prev': np.array(self.prev if self.prev else [], dtype=np.float64),
+            'ema_spans': np.array(spans, dtype=np.int64),
+            'ema_valores': np.array([self.emas[s] for s in spans], dtype=np.float64),
+            'dea': np.array([] if self.dea is None else [self.dea], dtype=np.float64),
+            'hist': np.array(self.hist.ultimas(n)),
+            'hist_ts': np.array(self.hist_ts.ultimas(n)),
+        }
+        for nombre in self.VENTANAS:
+            estado[nombre] = np.array(getattr(self, nombre), dtype=np.float64)
+        return estado
+
+    @classmethod
+    def importar(cls, estado):
+        """Inverso de exportar(). KeyError/ValueError si el dict está incompleto."""
+        ind = cls()
+        prev = estado['prev']
+        ind.prev = tuple(prev.tolist()) if len(prev) else None
+        ind.emas = dict(zip(estado['ema_spans'].tolist(), estado['ema_valores'].tolist()))
+        ind.dea = float(estado['dea'][0]) if len(estado['dea']) else None
+        for nombre in cls.VENTANAS:
+            getattr(ind, nombre).extend(estado[nombre].tolist())
+        hist, hist_ts = estado['hist'], estado['hist_ts']
+        if hist.shape != (len(hist_ts), len(COLUMNAS)):
+            raise ValueError(f"historia con forma {hist.shape}")
+        ind._asegurar_capacidad(len(hist))
+        for ts, fila in zip(hist_ts.tolist(), hist):
+            ind._guardar_fila(ts, fila)
+        return ind
+
+
+class MotorIncremental:
+    """
+    MOTOR DE INDICADORES INCREMENTAL (MULTI-TEMPORAL)
+    Un IndicadoresTF por temporalidad. El ciclo lento pasa de O(historia) a O(velas nuevas).
+    """
+    def __init__(self):
+        self.tfs = {}
+
+    def calcular(self, tf, ts, high, low, close):
+        if tf not in self.tfs:
+            self.tfs[tf] = IndicadoresTF()
+        return self.tfs[tf].sincronizar(ts, high, low, close)
+
+    def reiniciar(self, tf=None):
+        if tf is None:
+            self.tfs = {}
+        else:
+            self.tfs.pop(tf, None)
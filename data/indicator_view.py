@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+
+class VistaIndicadores:
+    """
+    VISTA DE INDICADORES (SIN DATAFRAME)
+    Agrupa columnas que ya viven en buffers preasignados (velas del almacén o del
+    agregador + matriz del motor) bajo nombres de columna, sin copiarlas.
+    Expone lo mínimo que usan PrecisionLab/Brain: vista['RSI'], 'RSI' in vista.columns,
+    len(vista) y vista.empty. Válida hasta el siguiente ciclo de cálculo.
+    """
+    def __init__(self, ts, columnas):
+        self.ts = ts
+        self._columnas = columnas
+        self.columns = list(columnas)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def __getitem__(self, col):
+        return self._columnas[col]
+
+    def __contains__(self, col):
+        return col in self._columnas
+
+    @property
+    def empty(self):
+        return len(self.ts) == 0
+
+    def get(self, col, default=None):
+        return self._columnas.get(col, default)
+
+    def resumen(self):
+        """Última fila como dict de floats (lo que consume el Dashboard)."""
+        if self.empty: return {}
+        fila = {col: float(serie[-1]) for col, serie in self._columnas.items()}
+        fila['datetime'] = pd.Timestamp(int(self.ts[-1]), unit='ms')
+        fila['CLOSE'] = fila.get('close', 0.0)
+        return fila
+
+    def a_dataframe(self):
+        """DataFrame bajo demanda (herramientas/depuración); copia las columnas."""
+        datos = {'datetime': pd.to_datetime(np.asarray(self.ts, dtype=np.int64), unit='ms')}
+        datos.update({col: np.array(serie) for col, serie in self._columnas.items()})
+        return pd.DataFrame(datos)
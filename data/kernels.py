@@ -0,0 +1,250 @@
+"""
+KERNELS DE INDICADORES (ARRAYS float64)
+Matemática compartida por MetricCalculator, DataMiner y los backtesters.
+Replica la semántica de pandas de las versiones anteriores:
+- rolling(n): nan hasta tener n valores y si hay nan dentro de la ventana.
+- ewm(span, adjust=False/True) sobre series sin huecos.
+- x/0 -> inf, 0/0 -> nan (IEEE), como la división de pandas.
+"""
+import numpy as np
+
+# Numba es opcional: si está instalado, la recursión de las EMAs se compila (JIT).
+# Sin numba se usa una forma cerrada por bloques en NumPy (tolerancia 1e-9).
+# Las ventanas móviles (rolling) son NumPy vectorizado en ambos casos.
+try:
+    from numba import njit
+    NUMBA_DISPONIBLE = True
+except ImportError:
+    NUMBA_DISPONIBLE = False
+
+
+def _f64(x):
+    return np.ascontiguousarray(x, dtype=np.float64)
+
+
+def _con_relleno(valores, n, periodo):
+    """Antepone los periodo-1 nan que pandas deja al inicio de un rolling."""
+    out = np.full(n, np.nan)
+    if n >= periodo: out[periodo - 1:] = valores
+    return out
+
+
+# --- RECURSIÓN EMA (compilable con numba) ---
+def _ema_lazo(x, alpha, ajustada):
+    n = x.shape[0]
+    out = np.empty(n)
+    if n == 0: return out
+    if ajustada:
+        # adjust=True: promedio ponderado con pesos (1-a)^i normalizados
+        num = x[0]
+        den = 1.0
+        out[0] = x[0]
+        for i in range(1, n):
+            num = x[i] + (1.0 - alpha) * num
+            den = 1.0 + (1.0 - alpha) * den
+            out[i] = num / den
+    else:
+        y = x[0]
+        out[0] = y
+        for i in range(1, n):
+            y = (1.0 - alpha) * y + alpha * x[i]
+            out[i] = y
+    return out
+
+
+if NUMBA_DISPONIBLE:
+    _ema_lazo = njit(cache=True)(_ema_lazo)
+
+
+# --- NUMPY ---
+def _ventana_np(x, periodo, modo):
+    """
+    Ventanas móviles vectorizadas sobre desplazamientos: 'periodo' operaciones
+    sobre vectores contiguos en lugar de un lazo por vela.
+    modo 0: media, 1: desviación muestral, 2: mínimo, 3: máximo.
+    """
+    n = len(x)
+    if n < periodo: return np.full(n, np.nan)
+    m = n - periodo + 1
+    acc = x[0:m].copy()
+    if modo >= 2:
+        reducir = np.minimum if modo == 2 else np.maximum  # propagan nan
+        for k in range(1, periodo):
+            reducir(acc, x[k:k + m], out=acc)
+        return _con_relleno(acc, n, periodo)
+
+    for k in range(1, periodo):
+        acc += x[k:k + m]
+    media = acc / periodo
+    if modo == 0: return _con_relleno(media, n, periodo)
+    acum = np.zeros(m)
+    for k in range(periodo):
+        acum += (x[k:k + m] - media) ** 2
+    return _con_relleno(np.sqrt(acum / (periodo - 1)), n, periodo)
+
+
+def _recursion_lineal(x, decaimiento, peso, inicial):
+    """
+    y[t] = decaimiento * y[t-1] + peso * x[t] (y[-1] = inicial), por bloques:
+    dentro de cada bloque la forma cerrada es un cumsum escalado y solo el
+    arrastre entre bloques es secuencial (n/bloque pasos en Python).
+    """
+    n = len(x)
+    if n == 0: return np.empty(0)
+    if decaimiento == 0: return peso * x
+    # Bloque acotado para que decaimiento^-bloque no desborde
+    bloque = int(max(1, min(64, 100 / -np.log10(decaimiento)))) if decaimiento < 1 else 64
+    relleno = (-n) % bloque
+    matriz = np.concatenate([x, np.zeros(relleno)]).reshape(-1, bloque)
+
+    j = np.arange(bloque)
+    potencias = decaimiento ** j
+    local = peso * potencias * np.cumsum(matriz / potencias, axis=1)
+
+    # Arrastre entre bloques: y_fin[k] = local[k, -1] + decaimiento^bloque * y_fin[k-1]
+    factor_bloque = decaimiento ** bloque
+    arrastres = np.empty(len(matriz))
+    y = inicial
+    for k, fin in enumerate(local[:, -1].tolist()):
+        arrastres[k] = y
+        y = fin + factor_bloque * y
+    salida = local + (potencias * decaimiento)[None, :] * arrastres[:, None]
+    return salida.reshape(-1)[:n]
+
+
+def _ema_np(x, alpha, ajustada):
+    if len(x) == 0: return np.empty(0)
+    decaimiento = 1.0 - alpha
+    if ajustada:
+        # num[t] = x[t] + (1-a)·num[t-1];  den[t] = 1 + (1-a)·den[t-1] (forma cerrada)
+        num = _recursion_lineal(x, decaimiento, 1.0, 0.0)
+        den = np.full(len(x), 1.0 / alpha)
+        # (1-a)^t se vuelve despreciable enseguida: solo el tramo inicial necesita la potencia
+        k = min(len(x), int(40 / -np.log10(decaimiento)) + 1) if 0 < decaimiento < 1 else len(x)
+        den[:k] = (1 - decaimiento ** np.arange(1, k + 1)) / alpha
+        return num / den
+    # adjust=False arranca en x[0]: equivale a y[-1] = x[0]
+    return _recursion_lineal(x, decaimiento, alpha, x[0])
+
+
+# --- PRIMITIVAS ---
+def media_movil(x, periodo):
+    x = _f64(x)
+    return _ventana_np(x, periodo, 0)
+
+
+def desviacion_movil(x, periodo):
+    """Desviación estándar muestral (ddof=1), como rolling().std()."""
+    x = _f64(x)
+    return _ventana_np(x, periodo, 1)
+
+
+def minimo_movil(x, periodo):
+    x = _f64(x)
+    return _ventana_np(x, periodo, 2)
+
+
+def maximo_movil(x, periodo):
+    x = _f64(x)
+    return _ventana_np(x, periodo, 3)
+
+
+def ema(x, span, ajustada=False):
+    """ewm(span=span, adjust=ajustada).mean() para series sin nan."""
+    x = _f64(x)
+    alpha = 2.0 / (span + 1)
+    if NUMBA_DISPONIBLE: return _ema_lazo(x, alpha, ajustada)
+    return _ema_np(x, alpha, ajustada)
+
+
+def _diferencia(x):
+    """diff(): nan en la primera posición."""
+    out = np.empty(len(x))
+    if len(x): out[0] = np.nan
+    out[1:] = x[1:] - x[:-1]
+    return out
+
+
+# --- INDICADORES ---
+def rsi(close, periodo=14):
+    close = _f64(close)
+    delta = _diferencia(close)
+    # where(delta > 0, 0): el nan inicial pasa a 0 (igual que en pandas)
+    gain = media_movil(np.where(delta > 0, delta, 0.0), periodo)
+    loss = media_movil(np.where(delta < 0, -delta, 0.0), periodo)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+
+
+def stoch_rsi(rsi_arr, periodo=14):
+    rsi_arr = _f64(rsi_arr)
+    min_rsi = minimo_movil(rsi_arr, periodo)
+    max_rsi = maximo_movil(rsi_arr, periodo)
+    denom = max_rsi - min_rsi
+    denom[denom == 0] = 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (rsi_arr - min_rsi) / denom * 100
+
+
+def bollinger(close, periodo=20, desviaciones=2):
+    """Devuelve (upper, lower, mid, width)."""
+    close = _f64(close)
+    sma = media_movil(close, periodo)
+    std = desviacion_movil(close, periodo)
+    upper = sma + std * desviaciones
+    lower = sma - std * desviaciones
+    with np.errstate(divide='ignore', invalid='ignore'):
+        width = (upper - lower) / sma
+    return upper, lower, sma, width
+
+
+def componentes_adx(high, low, close, periodo=14):
+    """Series intermedias del ADX: (plus_dm, minus_dm, tr, dx)."""
+    high, low, close = _f64(high), _f64(low), _f64(close)
+    high_diff = _diferencia(high)
+    low_diff = -_diferencia(low)
+    plus_dm = np.where((high_diff > low_diff) & (high_diff > 0), high_diff, 0.0)
+    minus_dm = np.where((low_diff > high_diff) & (low_diff > 0), low_diff, 0.0)
+
+    # True Range (max con skipna: la primera vela usa solo high-low)
+    cierre_prev = np.empty(len(close))
+    if len(close): cierre_prev[0] = np.nan
+    cierre_prev[1:] = close[:-1]
+    tr = np.fmax(high - low, np.fmax(np.abs(high - cierre_prev), np.abs(low - cierre_prev)))
+
+    atr = media_movil(tr, periodo)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * (media_movil(plus_dm, periodo) / atr)
+        minus_di = 100 * (media_movil(minus_dm, periodo) / atr)
+        suma_di = plus_di + minus_di
+        suma_di[suma_di == 0] = 1
+        dx = np.abs(plus_di - minus_di) / suma_di * 100
+    return plus_dm, minus_dm, tr, dx
+
+
+def adx(high, low, close, periodo=14):
+    return media_movil(componentes_adx(high, low, close, periodo)[3], periodo)
+
+
+def macd(close, rapida=12, lenta=26, senal=9):
+    """Devuelve (dif, dea, hist)."""
+    close = _f64(close)
+    dif = ema(close, rapida) - ema(close, lenta)
+    dea = ema(dif, senal)
+    return dif, dea, dif - dea
+
+
+def indicadores_completos(high, low, close):
+    """Todas las columnas de MetricCalculator en un dict de arrays."""
+    r = rsi(close)
+    upper, lower, mid, width = bollinger(close)
+    dif, dea, hist = macd(close)
+    return {
+        'RSI': r, 'STOCH_RSI': stoch_rsi(r),
+        'BB_UPPER': upper, 'BB_LOWER': lower, 'BB_MID': mid, 'BB_WIDTH': width,
+        'EMA_7': ema(close, 7), 'EMA_25': ema(close, 25),
+        'EMA_99': ema(close, 99), 'EMA_200': ema(close, 200),
+        'ADX': adx(high, low, close),
+        'MACD_DIF': dif, 'MACD_DEA': dea, 'MACD_HIST': hist,
+    }
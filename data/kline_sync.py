@@ -0,0 +1,122 @@
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from .candle_store import AlmacenVelas
+
+
+class SincronizadorVelas:
+    """
+    SINCRONIZACIÓN DELTA DE VELAS
+    - Pide solo lo que falta: desde la última vela guardada (que se vuelve a pedir
+      porque pudo quedar en formación y se reemplaza, no se duplica) hasta ahora.
+    - Detecta huecos internos del almacén y los rellena.
+    - Un corte largo se recupera en una sola ronda de requests paginados en
+      paralelo; el presupuesto de peso por minuto lo reserva el transporte HTTP
+      compartido de la conexión en cada request.
+    - Si falla una página no se escribe nada (no se fusiona alrededor del hueco).
+    - Las velas rellenadas ANTES de la última guardada quedan anotadas en
+      'rebobinar_desde': lo ya plegado a temporalidades superiores desde ahí es
+      incorrecto y el consumidor debe reconstruirlo.
+    """
+    LIMITE_PAGINA = 1000        # Peso 5: más velas por unidad de peso que 1500 (peso 10)
+    MAX_VELAS_RELLENO = 259200  # Tope de recuperación tras un corte (~180 días de 1m)
+    REVISION_HUECOS_SEG = 3600  # Frecuencia del escaneo de huecos internos
+
+    def __init__(self, conn, store, symbol, intervalo='1m', intervalo_ms=60000,
+                 historia_inicial=60000, workers=4, reloj=time.time):
+        self.conn = conn
+        self.store = store
+        self.symbol = symbol
+        self.intervalo = intervalo
+        self.intervalo_ms = intervalo_ms
+        self.historia_inicial = historia_inicial
+        self.workers = workers
+        self.reloj = reloj
+        self.ultima_revision = 0
+        self.rebobinar_desde = None  # ts del primer relleno interno aún no reconstruido
+
+    # --- PLANIFICACIÓN ---
+    def detectar_huecos(self):
+        """Rangos [inicio, fin] (timestamps de apertura) que faltan entre velas guardadas."""
+        with self.store.lock:  # El stream puede estar escribiendo la cola
+            ts = np.array(self.store.cola()['ts'])
+        if len(ts) < 2: return []
+        saltos = np.nonzero(np.diff(ts) > self.intervalo_ms)[0]
+        return [(int(ts[i]) + self.intervalo_ms, int(ts[i + 1]) - self.intervalo_ms) for i in saltos]
+
+    def _rango_final(self, ahora_ms):
+        """Desde la última vela guardada (inclusive) hasta la vela en curso."""
+        vela_actual = ahora_ms - ahora_ms % self.intervalo_ms
+        minimo = vela_actual - (self.MAX_VELAS_RELLENO - 1) * self.intervalo_ms
+        ultimo = self.store.ultimo_ts()
+        if ultimo is None:
+            inicio = vela_actual - (self.historia_inicial - 1) * self.intervalo_ms
+        else:
+            inicio = ultimo
+        return max(inicio, minimo), vela_actual
+
+    def paginar(self, inicio, fin):
+        """Divide [inicio, fin] en páginas (inicio, fin) de hasta LIMITE_PAGINA velas."""
+        paginas = []
+        paso = self.LIMITE_PAGINA * self.intervalo_ms
+        a = inicio
+        while a <= fin:
+            b = min(a + paso - self.intervalo_ms, fin)
+            paginas.append((a, b))
+            a = b + self.intervalo_ms
+        return paginas
+
+    # --- DESCARGA ---
+    def _descargar_pagina(self, pagina):
+        inicio, fin = pagina
+        limit = int((fin - inicio) // self.intervalo_ms) + 1
+        # strict: un error lanza (no se confunde con una página legítimamente vacía)
+        return self.conn.get_historical_candles(self.symbol, self.intervalo, limit=limit,
+                                                start_time=inicio, end_time=fin, strict=True) or []
+
+    def descargar(self, paginas):
+        """Descarga las páginas en paralelo (orden preservado). Devuelve registros; lanza si falla alguna."""
+        if not paginas: return AlmacenVelas.desde_klines([])
+        if len(paginas) == 1:
+            respuestas = [self._descargar_pagina(paginas[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(paginas))) as ex:
+                respuestas = list(ex.map(self._descargar_pagina, paginas))
+        return np.concatenate([AlmacenVelas.desde_klines(r) for r in respuestas])
+
+    # --- API ---
+    def _huecos_pendientes(self, ahora):
+        """Huecos internos si toca revisarlos (cada REVISION_HUECOS_SEG), si no []."""
+        if ahora - self.ultima_revision <= self.REVISION_HUECOS_SEG: return []
+        self.ultima_revision = ahora
+        return self.detectar_huecos()
+
+    def _escribir(self, rangos):
+        """Descarga los rangos y los fusiona; anota en 'rebobinar_desde' lo escrito en el pasado."""
+        paginas = [p for inicio, fin in rangos for p in self.paginar(inicio, fin)]
+        registros = self.descargar(paginas)
+        if len(registros) == 0: return 0
+        previo = self.store.ultimo_ts()
+        escritas = self.store.fusionar(registros)
+        if previo is not None:
+            internas = registros['ts'][registros['ts'] < previo]
+            if len(internas):
+                desde = int(internas.min())
+                self.rebobinar_desde = desde if self.rebobinar_desde is None else min(self.rebobinar_desde, desde)
+        return escritas
+
+    def sincronizar(self):
+        """Trae el delta (y los huecos, si toca revisarlos) y lo escribe. Devuelve velas recibidas."""
+        ahora = self.reloj()
+        rangos = self._huecos_pendientes(ahora)
+        rangos.append(self._rango_final(int(ahora * 1000)))
+        return self._escribir(rangos)
+
+    def revisar_huecos(self):
+        """
+        Solo el escaneo periódico de huecos internos (sin el delta final): con el
+        stream vivo el delta llega por WebSocket, pero un mensaje perdido deja un
+        hueco que solo este escaneo detecta. Devuelve velas recibidas.
+        """
+        rangos = self._huecos_pendientes(self.reloj())
+        return self._escribir(rangos) if rangos else 0
@@ -1,9 +1,14 @@
-import pandas as pd
 import os
-import time
 from .calculator import MetricCalculator
+from .candle_store import AlmacenVelas
+from .htf_history import HistorialSuperior
+from .fvg_tracker import RastreadorFVG
+from .kline_sync import SincronizadorVelas
+from core import clock
 
 class MetricsManager:
+    VENTANA_1M = 60000
+
     def __init__(self, config, api_conn):
         self.cfg = config
         self.conn = api_conn
@@ -12,46 +17,78 @@ class MetricsManager:
 
     def _ensure_file(self):
         if not os.path.exists(self.cfg.LOG_PATH): os.makedirs(self.cfg.LOG_PATH)
-        if not os.path.exists(self.cfg.FILE_METRICS):
-            # Encoding utf-8 para compatibilidad universal
-            pd.DataFrame(columns=['ts','open','high','low','close','volume']).to_csv(self.cfg.FILE_METRICS, index=False, encoding='utf-8')
+        self.store = AlmacenVelas(self.cfg.FILE_CANDLES)
+        # Migración única: el CSV legado se vuelca al almacén binario la primera vez
+        try:
+            migradas = self.store.migrar_csv(self.cfg.FILE_METRICS)
+            if migradas: print(f"Migradas {migradas} velas de {self.cfg.FILE_METRICS} al almacén binario.")
+        except Exception as e:
+            print(f"Error migrando métricas CSV: {e}")
+        self.sync = SincronizadorVelas(
+            self.conn, self.store, self.cfg.SYMBOL, historia_inicial=self.VENTANA_1M,
+            workers=self.cfg.KLINES_WORKERS, reloj=clock.time
+        )
+        # Barras 1h/4h/1d + acarreos de sus indicadores, persistidos aparte
+        self.historial = HistorialSuperior(self.cfg.LOG_PATH, self.calc.agregador, self.calc.motor)
+        # Zonas FVG vivas: sembradas con esa historia (y la del Data Miner que barre
+        # el scanner) y seguidas barra a barra
+        self.fvg = RastreadorFVG(self.cfg.SYMBOL, self.calc.agregador,
+                                 historia=os.path.join(self.cfg.BASE_DIR, 'logs', 'data_lab'))
+
+        # Modo stream: las velas llegan por WebSocket; al (re)conectar se rellena por REST
+        if getattr(self.cfg, 'MARKET_DATA_MODE', 'REST') == 'STREAM':
+            try:
+                self.conn.iniciar_stream(self.store, al_reconectar=self.sync.sincronizar, symbol=self.cfg.SYMBOL)
+            except Exception as e:
+                print(f"Stream no disponible, se usa REST: {e}")
 
     def sincronizar_y_calcular(self):
-        last_ts = 0
+        self.sincronizar_velas()
+        return self.calcular()
+
+    def sincronizar_velas(self):
+        # Delta desde la última vela guardada + huecos, con backfill paralelo.
+        # Con el stream vivo las velas ya están en el almacén: solo se revisan
+        # (en su temporizador) los huecos que deja un mensaje perdido.
         try:
-            # Leemos solo la última línea para saber donde quedamos (rápido)
-            with open(self.cfg.FILE_METRICS, 'r', encoding='utf-8') as f:
-                last_line = f.readlines()[-1]
-                if "ts" not in last_line:
-                    last_ts = float(last_line.split(',')[0])
-        except: pass
-
-        # Lógica de descarga
-        now = time.time() * 1000
-        # Si falta mucha data (>24h), pedimos bloque grande (1500), si no, solo actualización (100)
-        limit_req = 1500 if (last_ts == 0 or (now - last_ts) > 86400000) else 100
-        start_time = (int(last_ts) + 60000) if last_ts > 0 else None
-        
-        data = self.conn.get_historical_candles(self.cfg.SYMBOL, '1m', limit=limit_req, start_time=start_time)
-        
-        if data:
-            df_new = pd.DataFrame(data, columns=['ts','open','high','low','close','volume','x','y','z','w','v','u'])
-            df_new = df_new[['ts','open','high','low','close','volume']].astype(float)
-            mode = 'w' if limit_req == 1500 else 'a' # Si es carga masiva inicial, sobrescribimos
-            header = (mode == 'w')
-            df_new.to_csv(self.cfg.FILE_METRICS, mode=mode, header=header, index=False, encoding='utf-8')
-        
+            if self.conn.stream_activo(self.cfg.SYMBOL):
+                self.sync.revisar_huecos()
+            else:
+                self.sync.sincronizar()
+        except Exception as e:
+            print(f"Error sincronizando velas: {e}")
+
+    def calcular(self):
+        # Solo CPU sobre el almacén local. Reescribe en sitio los buffers que
+        # respaldan las vistas del ciclo anterior.
         try:
-            # --- CORRECCIÓN CRÍTICA AQUÍ ---
-            # Antes: tail(3000) -> 50 horas (Insuficiente para 4H/1D)
-            # Ahora: tail(50000) -> ~35 días. 
-            # Suficiente para indicadores de 4H. Para 1D completo se requeriría más RAM,
-            # pero 50,000 es un buen balance rendimiento/visibilidad.
-            # NOTA: Para ver EMA200 de 1D necesitas 288,000 velas. Si tienes mucha RAM, aumenta este número.
-            
-            df_full = pd.read_csv(self.cfg.FILE_METRICS, encoding='utf-8').astype(float).tail(60000) 
-            
-            return self.calc.generar_mtf_completo(df_full)
+            # La ventana de 1m solo alimenta 1m..30m. 1h/4h/1d salen de su historia
+            # persistida (EMA200 de 1D correcta sin cargar 288,000 velas de 1m).
+            if self.sync.rebobinar_desde is not None:
+                # Relleno de un hueco en el pasado: lo plegado desde ahí se reconstruye
+                desde, self.sync.rebobinar_desde = self.sync.rebobinar_desde, None
+                print(f"Relleno interno de velas desde {desde}: reconstruyendo temporalidades superiores.")
+                self.historial.rebobinar(desde)
+            if not self.historial.al_dia:
+                # Primera vez (o tras rebobinar): las TFs superiores con poca historia se siembran
+                # con barras nativas (EMA200 de 4h/1d) y se pliega la historia de 1m aún no volcada
+                # a las barras superiores; las temporalidades menores desde el inicio de la ventana
+                self.historial.sembrar(self.store, self.conn, self.cfg.SYMBOL,
+                                       os.path.join(self.cfg.BASE_DIR, 'logs', 'data_lab'))
+                inicio_ventana = self.store.cola(self.VENTANA_1M)['ts'][:1]
+                self.historial.ponerse_al_dia(self.store, desde=int(inicio_ventana[0]) if len(inicio_ventana) else None)
+                # Zonas FVG re-sembradas sobre la historia completa (CSV previo + barras ya al día)
+                self.fvg.sembrar()
+
+            # Ventana memmap (sin copiar la serie 1m): las velas cerradas no cambian y
+            # la vela en curso, que el hilo del stream reescribe, queda fijada bajo su candado
+            cola = self.store.ventana(self.VENTANA_1M)
+
+            resultado = self.calc.generar_mtf_completo(cola)
+            # Sin cubrir la historia del scanner, el Brain sigue usando el registro en disco
+            if resultado[0] and self.fvg.cubre: resultado[0]['fvg_vivos'] = self.fvg.actual
+            self.historial.guardar_estado()
+            return resultado
         except Exception as e:
             print(f"Error calculando métricas: {e}")
             return {}, {}
\ No newline at end of file
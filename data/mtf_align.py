@@ -0,0 +1,132 @@
+"""
+ALINEACIÓN MULTI-TEMPORAL SIN LOOK-AHEAD
+Las barras de 5m/1h/4h se etiquetan por su apertura: unirlas con merge_asof
+'backward' sobre esa etiqueta deja ver a una vela de 1m el cierre (y los
+indicadores) de una barra que todavía no terminó.
+
+Aquí cada barra superior se une en su CIERRE (apertura + periodo): una vela
+base la ve solo si la barra cerró a más tardar cuando cierra la vela base,
+que es cuando el backtest decide. Opcionalmente se expone la barra en
+formación tal como la ve el bot en vivo (open/high/low/close/volume
+acumulados hasta esa vela y los indicadores del motor incremental con la
+barra provisional al final).
+Todo es vectorizado (searchsorted/take) salvo los indicadores de la barra en
+formación, que reutilizan el paso provisional O(1) del motor en vivo.
+"""
+import numpy as np
+import pandas as pd
+
+from .resampler import PERIODOS_MS
+from .incremental_engine import IndicadoresTF, COLUMNAS
+
+PERIODO_BASE_MS = 60000
+PERIODOS = {'1m': PERIODO_BASE_MS, **PERIODOS_MS}
+
+
+def tiempos_ms(df):
+    """Aperturas (int64 ms) desde el índice de fechas, 'datetime' o 'ts'."""
+    if isinstance(df.index, pd.DatetimeIndex):
+        valores = df.index.values
+    elif 'datetime' in df.columns:
+        valores = df['datetime'].to_numpy()
+    else:
+        return df['ts'].to_numpy(dtype=np.int64)
+    return valores.astype('datetime64[ms]').astype(np.int64)
+
+
+def indices_cerradas(ts_base, ts_tf, periodo_ms, periodo_base_ms=PERIODO_BASE_MS):
+    """
+    Por vela base, índice de la última barra de 'ts_tf' cerrada al cierre de esa
+    vela (apertura_tf + periodo <= apertura_base + periodo_base); -1 si ninguna.
+    Ambos arrays en ms y ordenados.
+    """
+    cierres = np.asarray(ts_tf, dtype=np.int64) + int(periodo_ms)
+    visibles = np.asarray(ts_base, dtype=np.int64) + int(periodo_base_ms)
+    return np.searchsorted(cierres, visibles, side='right') - 1
+
+
+def _tomar(df, idx, indice):
+    """Filas idx de df (NaN donde idx < 0) sobre el índice de la base."""
+    tomadas = df.iloc[np.maximum(idx, 0)].reset_index(drop=True)
+    tomadas.index = indice
+    faltan = idx < 0
+    if faltan.any(): tomadas = tomadas.where(np.broadcast_to(~faltan[:, None], tomadas.shape))
+    return tomadas
+
+
+def unir_cerradas(base, df_tf, tf, prefijo=None, periodo_base_ms=PERIODO_BASE_MS):
+    """
+    Reemplazo de merge_asof(base, df_tf, direction='backward') sin look-ahead:
+    añade a 'base' las columnas de la última barra de 'df_tf' ya cerrada.
+    'tf' es '5m', '1h'... (o el periodo en ms). Conserva el índice de 'base'.
+    """
+    periodo = PERIODOS[tf] if isinstance(tf, str) else int(tf)
+    idx = indices_cerradas(tiempos_ms(base), tiempos_ms(df_tf), periodo, periodo_base_ms)
+    tomadas = _tomar(df_tf, idx, base.index)
+    if prefijo: tomadas = tomadas.add_prefix(prefijo)
+    return pd.concat([base, tomadas], axis=1)
+
+
+# --- BARRA EN FORMACIÓN ---
+def barra_en_formacion(ts, open_, high, low, close, volume, periodo_ms):
+    """
+    OHLCV de la barra de 'periodo_ms' en formación vista al cierre de cada vela
+    de 1m (buckets alineados a epoch, como AgregadorVelas). Devuelve un dict de
+    arrays alineados con la entrada más 'fin': True en la última vela de cada bucket.
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    inicio = ts - ts % int(periodo_ms)
+    nuevo = np.ones(len(ts), dtype=bool)
+    nuevo[1:] = inicio[1:] != inicio[:-1]
+    grupo = np.cumsum(nuevo) - 1
+    primera = np.flatnonzero(nuevo)
+    fin = np.zeros(len(ts), dtype=bool)
+    fin[:-1] = nuevo[1:]
+    if len(ts): fin[-1] = True
+
+    por_grupo = pd.DataFrame({'high': np.asarray(high, dtype=np.float64), 'low': np.asarray(low, dtype=np.float64),
+                              'volume': np.asarray(volume, dtype=np.float64)}).groupby(grupo)
+    return {
+        'ts': inicio,
+        'open': np.asarray(open_, dtype=np.float64)[primera][grupo],
+        'high': por_grupo['high'].cummax().to_numpy(dtype=np.float64),
+        'low': por_grupo['low'].cummin().to_numpy(dtype=np.float64),
+        'close': np.asarray(close, dtype=np.float64),
+        'volume': por_grupo['volume'].cumsum().to_numpy(dtype=np.float64),
+        'fin': fin,
+    }
+
+
+def indicadores_en_formacion(barra, columnas):
+    """
+    Indicadores del motor en vivo con la barra en formación como última fila:
+    las barras cerradas se confirman en IndicadoresTF y cada vela de 1m se
+    evalúa con el paso provisional (mismo código y floats que el bot).
+    """
+    motor = IndicadoresTF()
+    posiciones = [COLUMNAS.index(c) for c in columnas]
+    filas = []
+    datos = zip(barra['ts'].tolist(), barra['high'].tolist(), barra['low'].tolist(),
+                barra['close'].tolist(), barra['fin'].tolist())
+    for ts, h, l, c, fin in datos:
+        fila, _ = motor._paso(h, l, c)
+        filas.append(fila)
+        if fin: motor._confirmar(ts, h, l, c)
+    matriz = np.array(filas, dtype=np.float64).reshape(len(filas), len(COLUMNAS))
+    return {c: matriz[:, k] for c, k in zip(columnas, posiciones)}
+
+
+def unir_en_formacion(base, tf, prefijo=None, indicadores=None):
+    """
+    Añade a un frame de 1m (open/high/low/close[/volume]) la barra de 'tf' en
+    formación y, si se piden, columnas de indicadores del motor en vivo
+    (subconjunto de incremental_engine.COLUMNAS) calculados sobre ella.
+    """
+    volumen = base['volume'] if 'volume' in base.columns else np.zeros(len(base))
+    barra = barra_en_formacion(tiempos_ms(base), base['open'], base['high'], base['low'],
+                               base['close'], volumen, PERIODOS[tf])
+    columnas = {c: barra[c] for c in ('ts', 'open', 'high', 'low', 'close', 'volume')}
+    if indicadores: columnas.update(indicadores_en_formacion(barra, list(indicadores)))
+    parcial = pd.DataFrame(columnas, index=base.index)
+    if prefijo: parcial = parcial.add_prefix(prefijo)
+    return pd.concat([base, parcial], axis=1)
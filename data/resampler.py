@@ -0,0 +1,160 @@
+import numpy as np
+from .ring_buffer import BufferCircular
+
+# Temporalidades superiores y su duración en milisegundos.
+# Los buckets se alinean a múltiplos del periodo desde epoch (igual que resample de pandas
+# para periodos que dividen el día: 3m, 5m, 15m, 30m, 1h, 4h, 1d).
+PERIODOS_MS = {
+    '3m': 3 * 60000,
+    '5m': 5 * 60000,
+    '15m': 15 * 60000,
+    '30m': 30 * 60000,
+    '1h': 60 * 60000,
+    '4h': 240 * 60000,
+    '1d': 1440 * 60000,
+}
+
+# Columnas de cada barra: ts (apertura del bucket), open, high, low, close, volume
+TS, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+
+class SerieBarras:
+    """Barras cerradas de una temporalidad + slot de la barra en curso (ring buffer)."""
+    def __init__(self, max_barras):
+        self.max_barras = max_barras
+        self.buffer = BufferCircular(max_barras + 2, 6)
+
+    def agregar(self, barra):
+        self.buffer.agregar(barra)
+
+    def ventana(self, actual=None):
+        """Vista contigua de las barras cerradas, terminando en 'actual' si existe."""
+        if actual is None:
+            return self.buffer.ultimas(self.max_barras)
+        self.buffer.escribir_provisional(actual)
+        return self.buffer.ultimas(self.max_barras + 1, con_provisional=True)
+
+
+class AgregadorVelas:
+    """
+    RESAMPLER INCREMENTAL (STREAMING)
+    Pliega cada vela de 1m nueva en los buckets abiertos de cada temporalidad
+    (first/max/min/last/sum) y emite las barras cerradas. El costo es proporcional
+    a las velas nuevas, no al tamaño de la historia.
+
+    La última vela de 1m recibida se considera en formación: se pliega de forma
+    provisional y solo se confirma cuando llega una vela posterior.
+    Los suscriptores reciben (tf, barra) cada vez que se cierra una barra.
+    """
+    def __init__(self, ventana_1m=60000, tfs=None, max_barras=None):
+        self.ventana_1m = ventana_1m
+        self.tfs = list(tfs) if tfs else list(PERIODOS_MS.keys())
+        # Por defecto cada tf guarda las barras que cubre la ventana de 1m;
+        # max_barras permite retener más historia (ej. 4h/1d para EMA200)
+        self.max_barras = dict(max_barras or {})
+        self.suscriptores = []
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.ultimo_ts = None  # Última vela de 1m confirmada
+        self.abiertas = {tf: None for tf in self.tfs}  # Bucket abierto (lista de 6 valores)
+        self.series = {
+            tf: SerieBarras(self.max_barras.get(tf, self.ventana_1m * 60000 // PERIODOS_MS[tf] + 1))
+            for tf in self.tfs
+        }
+        self.provisionales = {tf: None for tf in self.tfs}
+        self.desde = {tf: 0 for tf in self.tfs}  # Velas 1m anteriores a este ts ya están en barras precargadas
+
+    def precargar(self, tf, barras):
+        """
+        Carga barras cerradas persistidas (matriz n x 6). Las velas de 1m anteriores
+        al cierre de la última barra se ignoran para esta tf (no se duplican).
+        """
+        if len(barras) == 0: return
+        for fila in barras:
+            self.series[tf].agregar(fila)
+        self.desde[tf] = barras[-1][TS] + PERIODOS_MS[tf]
+
+    def suscribir(self, callback):
+        """Registra callback(tf, barra) para eventos de 'barra cerrada'."""
+        self.suscriptores.append(callback)
+
+    def _emitir(self, tf, barra):
+        self.series[tf].agregar(barra)
+        evento = {'ts': barra[TS], 'open': barra[OPEN], 'high': barra[HIGH],
+                  'low': barra[LOW], 'close': barra[CLOSE], 'volume': barra[VOLUME]}
+        for cb in self.suscriptores:
+            try:
+                cb(tf, evento)
+            except Exception as e:
+                print(f"Error en suscriptor de barras ({tf}): {e}")
+
+    @staticmethod
+    def _fusionar(bucket, o, h, l, c, v):
+        if h > bucket[HIGH]: bucket[HIGH] = h
+        if l < bucket[LOW]: bucket[LOW] = l
+        bucket[CLOSE] = c
+        bucket[VOLUME] += v
+
+    def _plegar(self, ts, o, h, l, c, v):
+        """Confirma una vela de 1m en todos los buckets."""
+        for tf in self.tfs:
+            if ts < self.desde[tf]: continue
+            inicio = ts - ts % PERIODOS_MS[tf]
+            bucket = self.abiertas[tf]
+            if bucket is not None and bucket[TS] == inicio:
+                self._fusionar(bucket, o, h, l, c, v)
+            else:
+                if bucket is not None: self._emitir(tf, bucket)
+                self.abiertas[tf] = [inicio, o, h, l, c, v]
+        self.ultimo_ts = ts
+
+    def alimentar(self, ts, o, h, l, c, v):
+        """
+        Recibe arrays de velas de 1m ordenadas (puede incluir velas ya procesadas)
+        y avanza el estado solo con las nuevas.
+        """
+        n = len(ts)
+        if n == 0: return
+        if self.ultimo_ts is not None and ts[-1] < self.ultimo_ts:
+            # La serie retrocedió (archivo regenerado): empezamos de nuevo
+            self.reiniciar()
+
+        inicio = 0
+        if self.ultimo_ts is not None:
+            inicio = int(np.searchsorted(ts, self.ultimo_ts, side='right'))
+
+        # tolist(): floats/ints nativos (los escalares numpy de un memmap son mucho más lentos)
+        columnas = [arr[inicio:n].tolist() for arr in (ts, o, h, l, c, v)]
+        velas = list(zip(*columnas))
+        if not velas: return
+        for vela in velas[:-1]:
+            self._plegar(*vela)
+
+        # Última vela (en formación): plegado provisional sin mutar los buckets
+        t_ult, o_u, h_u, l_u, c_u, v_u = velas[-1]
+        if self.ultimo_ts is not None and t_ult <= self.ultimo_ts:
+            return
+        for tf in self.tfs:
+            if t_ult < self.desde[tf]: continue
+            inicio_b = t_ult - t_ult % PERIODOS_MS[tf]
+            bucket = self.abiertas[tf]
+            if bucket is not None and bucket[TS] == inicio_b:
+                prov = list(bucket)
+                self._fusionar(prov, o_u, h_u, l_u, c_u, v_u)
+            else:
+                # La vela en formación abre un bucket nuevo: el anterior ya es definitivo
+                if bucket is not None: self._emitir(tf, bucket)
+                self.abiertas[tf] = None
+                prov = [inicio_b, o_u, h_u, l_u, c_u, v_u]
+            self.provisionales[tf] = prov
+
+    def barras(self, tf):
+        """
+        Matriz (n, 6) con las barras cerradas + la barra actual (abierta/provisional).
+        Es una vista del ring buffer: válida hasta la próxima llamada a alimentar().
+        """
+        actual = self.provisionales.get(tf)
+        if actual is None:
+            actual = self.abiertas.get(tf)
+        return self.series[tf].ventana(actual)
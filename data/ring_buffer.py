@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class BufferCircular:
+    """
+    RING BUFFER PREASIGNADO (ESPEJO)
+    Cada fila se escribe dos veces (posición i y i+capacidad), de modo que
+    cualquier ventana de las últimas m filas es una vista contigua del mismo
+    bloque de memoria: sin copias ni realocaciones en el ciclo 24/7.
+
+    Además de las filas confirmadas admite una fila 'provisional' (la vela en
+    formación) que ocupa el siguiente slot sin avanzar el contador.
+    Las vistas devueltas son válidas hasta la siguiente escritura.
+    """
+    def __init__(self, capacidad, columnas=None, dtype=np.float64):
+        self.capacidad = int(capacidad)
+        self.columnas = columnas
+        forma = (2 * self.capacidad,) if columnas is None else (2 * self.capacidad, columnas)
+        self.datos = np.empty(forma, dtype=dtype)
+        self.total = 0  # Filas confirmadas desde el inicio (índice lógico)
+
+    def __len__(self):
+        return min(self.total, self.capacidad)
+
+    def _escribir(self, indice, fila):
+        pos = indice % self.capacidad
+        self.datos[pos] = fila
+        self.datos[pos + self.capacidad] = fila
+
+    def agregar(self, fila):
+        self._escribir(self.total, fila)
+        self.total += 1
+
+    def extender(self, filas):
+        """Agrega un bloque de filas de una vez (siembra vectorizada)."""
+        filas = np.asarray(filas)
+        if len(filas) > self.capacidad:
+            # Solo las más recientes caben: las demás cuentan como ya desplazadas
+            self.total += len(filas) - self.capacidad
+            filas = filas[-self.capacidad:]
+        posiciones = (self.total + np.arange(len(filas))) % self.capacidad
+        self.datos[posiciones] = filas
+        self.datos[posiciones + self.capacidad] = filas
+        self.total += len(filas)
+
+    def escribir_provisional(self, fila):
+        """Ocupa el slot siguiente sin confirmarlo (pisa la fila más vieja si está lleno)."""
+        self._escribir(self.total, fila)
+
+    def ultimo(self):
+        return self.datos[(self.total - 1) % self.capacidad] if self.total else None
+
+    def ultimas(self, m, con_provisional=False):
+        """Vista contigua de las últimas m filas (opcionalmente terminando en la provisional)."""
+        fin = self.total + (1 if con_provisional else 0)
+        limite = self.capacidad - 1 if con_provisional else self.capacidad
+        m = min(m, fin, limite)
+        pos = (fin - m) % self.capacidad
+        return self.datos[pos:pos + m]
+
+    def redimensionar(self, capacidad):
+        """Cambia la capacidad conservando las filas más recientes (solo en arranque)."""
+        n = min(len(self), capacidad)
+        recientes = self.ultimas(n).copy()
+        nuevo = BufferCircular(capacidad, self.columnas, self.datos.dtype)
+        posiciones = np.arange(self.total - n, self.total) % capacidad
+        nuevo.datos[posiciones] = recientes
+        nuevo.datos[posiciones + capacidad] = recientes
+        nuevo.total = self.total
+        self.capacidad, self.datos, self.total = nuevo.capacidad, nuevo.datos, nuevo.total
@@ -1,6 +1,6 @@
 import json
-import time
 import os
+from core import clock
 
 class Comptroller:
     def __init__(self, config, order_manager, financials, logger):
@@ -10,6 +10,8 @@ class Comptroller:
         self.log = logger
         self.positions = {} 
         self._cargar_estado()
+        # Sus posiciones cuentan para el cupo global de la billetera compartida
+        self.fin.registrar_contralor(self)
 
     def _cargar_estado(self):
         if os.path.exists(self.cfg.FILE_STATE):
@@ -39,12 +41,21 @@ class Comptroller:
         self.log.log_operational("CONTRALOR", f"Posición {pid} registrada.")
 
     def sincronizar_estado_externo(self):
-        if self.cfg.MODE == 'SIMULATION': return
+        externo = self.obtener_estado_externo()
+        if externo is not None:
+            self.aplicar_estado_externo(*externo)
+
+    def obtener_estado_externo(self):
+        """Solo red: (posiciones, órdenes abiertas) del exchange, o None si no aplica/falla."""
+        if self.cfg.MODE == 'SIMULATION': return None
         try:
             raw_positions = self.om.conn.client.futures_position_information(symbol=self.cfg.SYMBOL)
             raw_orders = self.om.conn.client.futures_get_open_orders(symbol=self.cfg.SYMBOL)
-        except: return
+        except: return None
+        return raw_positions, raw_orders
 
+    def aplicar_estado_externo(self, raw_positions, raw_orders):
+        """Reconcilia la memoria local con lo obtenido del exchange."""
         real_positions = {}
         for p in raw_positions:
             amt = float(p['positionAmt'])
@@ -84,7 +95,7 @@ class Comptroller:
         side = d['side']
         sl_side = 'SELL' if side == 'LONG' else 'BUY'
         
-        ok, resp = self.om.conn.place_stop_loss(sl_side, side, sl_price)
+        ok, resp = self.om.conn.place_stop_loss(sl_side, side, sl_price, symbol=self.cfg.SYMBOL)
         if ok:
             new_id = resp.get('orderId')
             record['sl_order_id'] = new_id
@@ -94,7 +105,7 @@ class Comptroller:
             self.log.log_error("CONTRALOR", f"Fallo restaurando protección: {resp}")
 
     def _adoptar_posicion_huerfana(self, qty, entry_price, side):
-        pid = f"REC_{int(time.time())}"
+        pid = f"REC_{int(clock.time())}"
         sl_pct = 0.02
         sl_price = entry_price * (1 - sl_pct) if side == 'LONG' else entry_price * (1 + sl_pct)
         plan = {
@@ -158,7 +169,7 @@ class Comptroller:
         old_sl_id = record.get('sl_order_id')
 
         # 2. Intentar colocar NUEVO SL primero (Seguridad)
-        ok, resp = self.om.conn.place_stop_loss(sl_side, side, be_price)
+        ok, resp = self.om.conn.place_stop_loss(sl_side, side, be_price, symbol=self.cfg.SYMBOL)
         
         if ok:
             # Si éxito, cancelamos el viejo y actualizamos estado
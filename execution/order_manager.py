@@ -1,8 +1,7 @@
 import csv
-import time
 import threading
 import math
-from datetime import datetime
+from core import clock
 
 class OrderManager:
     def __init__(self, config, api_conn, logger):
@@ -37,17 +36,17 @@ class OrderManager:
     def _calibrar_precision_simbolo(self):
         if self.cfg.MODE == 'SIMULATION': return
         try:
-            info = self.conn.client.futures_exchange_info()
-            for s in info['symbols']:
-                if s['symbol'] == self.cfg.SYMBOL:
-                    for f in s['filters']:
-                        if f['filterType'] == 'LOT_SIZE':
-                            step_size = float(f['stepSize'])
-                            self.qty_precision = int(round(-math.log(step_size, 10), 0))
-                        if f['filterType'] == 'PRICE_FILTER':
-                            tick_size = float(f['tickSize'])
-                            self.price_precision = int(round(-math.log(tick_size, 10), 0))
-                    self.log.log_operational("GESTOR", f"Calibrado: Qty={self.qty_precision}, Price={self.price_precision}")
+            # exchangeInfo se descarga una vez en la conexión y se comparte entre símbolos
+            s = self.conn.info_simbolo(self.cfg.SYMBOL)
+            if s:
+                for f in s['filters']:
+                    if f['filterType'] == 'LOT_SIZE':
+                        step_size = float(f['stepSize'])
+                        self.qty_precision = int(round(-math.log(step_size, 10), 0))
+                    if f['filterType'] == 'PRICE_FILTER':
+                        tick_size = float(f['tickSize'])
+                        self.price_precision = int(round(-math.log(tick_size, 10), 0))
+                self.log.log_operational("GESTOR", f"Calibrado {self.cfg.SYMBOL}: Qty={self.qty_precision}, Price={self.price_precision}")
         except: pass
 
     # --- FORMATO ---
@@ -129,19 +128,19 @@ class OrderManager:
 
             # 1. ENTRY (MARKET)
             action_side = 'BUY' if pos_side == 'LONG' else 'SELL'
-            ok_entry, resp_entry = self.conn.place_market_order(action_side, pos_side, qty)
+            ok_entry, resp_entry = self.conn.place_market_order(action_side, pos_side, qty, symbol=self.cfg.SYMBOL)
             if not ok_entry: return False, f"Error Entrada: {resp_entry}"
 
             real_entry_price, real_qty = self._esperar_confirmacion_fill(resp_entry)
             if real_entry_price == 0:
-                self.conn.cancel_all_orders()
+                self.conn.cancel_all_orders(symbol=self.cfg.SYMBOL)
                 return False, "Timeout Entry"
 
             self._registrar_en_csv(order_id, pos_side, "ENTRY", real_entry_price, real_qty, "FILLED")
 
             # 2. STOP LOSS (MARKET PROTECCION)
             sl_action_side = 'SELL' if pos_side == 'LONG' else 'BUY'
-            ok_sl, resp_sl = self.conn.place_stop_loss(sl_action_side, pos_side, sl_price)
+            ok_sl, resp_sl = self.conn.place_stop_loss(sl_action_side, pos_side, sl_price, symbol=self.cfg.SYMBOL)
 
             if not ok_sl:
                 self._rollback_emergencia(sl_action_side, pos_side, real_qty)
@@ -183,18 +182,18 @@ class OrderManager:
                 if ord_status['status'] == 'FILLED':
                     return float(ord_status['avgPrice']), float(ord_status['executedQty'])
             except: pass
-            time.sleep(1)
+            clock.sleep(1)
         return 0.0, 0.0
 
     def _rollback_emergencia(self, close_side, pos_side, qty):
-        self.conn.place_market_order(close_side, pos_side, qty, reduce_only=True)
-        self.conn.cancel_all_orders()
+        self.conn.place_market_order(close_side, pos_side, qty, reduce_only=True, symbol=self.cfg.SYMBOL)
+        self.conn.cancel_all_orders(symbol=self.cfg.SYMBOL)
 
     def _registrar_en_csv(self, oid, side, type_, price, qty, status):
         try:
             with open(self.cfg.FILE_ORDERS, 'a', newline='') as f:
                 writer = csv.writer(f)
-                writer.writerow([oid, datetime.now().isoformat(), self.cfg.SYMBOL, side, type_, f"{price:.4f}", qty, status, ""])
+                writer.writerow([oid, clock.now().isoformat(), self.cfg.SYMBOL, side, type_, f"{price:.4f}", qty, status, ""])
         except: pass
 
     def ejecutar_cierre_parcial(self, pos_data, pct_cierre):
@@ -207,7 +206,7 @@ class OrderManager:
             pos_side = pos_data['side']
             close_side = 'SELL' if pos_side == 'LONG' else 'BUY'
             
-            ok, _ = self.conn.place_market_order(close_side, pos_side, qty, reduce_only=True)
+            ok, _ = self.conn.place_market_order(close_side, pos_side, qty, reduce_only=True, symbol=self.cfg.SYMBOL)
             if ok:
                 self._registrar_en_csv(pos_data['id'], close_side, "TP_PARTIAL", 0, qty, "FILLED")
                 return True
@@ -217,4 +216,4 @@ class OrderManager:
             
     def cancelar_todo(self):
         with self.lock:
-            self.conn.cancel_all_orders()
\ No newline at end of file
+            self.conn.cancel_all_orders(symbol=self.cfg.SYMBOL)
\ No newline at end of file
@@ -1,6 +1,6 @@
 import os
 from colorama import Fore, Style, Back, init
-from datetime import datetime
+from core import clock
 
 init(autoreset=True)
 
@@ -9,7 +9,7 @@ class Dashboard:
         self.logs = []
 
     def add_log(self, msg, level="INFO"):
-        ts = datetime.now().strftime("%H:%M:%S")
+        ts = clock.now().strftime("%H:%M:%S")
         self.logs.append(f"[{ts}] {msg}")
         if len(self.logs) > 4: self.logs.pop(0)
 
@@ -46,15 +46,22 @@ class Dashboard:
             else: return f"{Back.GREEN}{Fore.WHITE}{Style.BRIGHT}{txt:^7}{Style.RESET_ALL}"
         return f"{Fore.LIGHTBLACK_EX}{txt:^7}{Style.RESET_ALL}"
     
-    def _status(self, connected):
-        return f"{Fore.GREEN}● ONLINE{Style.RESET_ALL}" if connected else f"{Fore.RED}● OFFLINE{Style.RESET_ALL}"
+    def _status(self, connected, detalle=None):
+        txt = f"{Fore.GREEN}● ONLINE{Style.RESET_ALL}" if connected else f"{Fore.RED}● OFFLINE{Style.RESET_ALL}"
+        # Latencia de la sonda de salud (cacheada) o antigüedad del último éxito si está caído
+        if detalle and connected and detalle.get('latencia_ms') is not None:
+            txt += f" {Fore.LIGHTBLACK_EX}{detalle['latencia_ms']:.0f}ms{Style.RESET_ALL}"
+        elif detalle and not connected and detalle.get('edad_exito') is not None:
+            txt += f" {Fore.LIGHTBLACK_EX}hace {detalle['edad_exito']:.0f}s{Style.RESET_ALL}"
+        return txt
 
     def render(self, price, mtf_data, daily_stats, positions, financials, connections, brain_msg, session_stats):
         os.system('cls' if os.name == 'nt' else 'clear')
         
         # HEADER
+        detalle = connections.get('detalle', {})
         print(f"{Back.BLUE}{Fore.WHITE} 🛡️ SENTINEL AI PRO {Style.RESET_ALL}")
-        print(f" 💵 PRECIO: {Fore.YELLOW}{Style.BRIGHT}{price:.2f}{Style.RESET_ALL} │ BINANCE: {self._status(connections['binance'])} │ TELEGRAM: {self._status(connections['telegram'])}")
+        print(f" 💵 PRECIO: {Fore.YELLOW}{Style.BRIGHT}{price:.2f}{Style.RESET_ALL} │ BINANCE: {self._status(connections['binance'], detalle.get('binance'))} │ TELEGRAM: {self._status(connections['telegram'], detalle.get('telegram'))}")
         
         # ESTADÍSTICAS DIARIAS
         print("-" * 92)
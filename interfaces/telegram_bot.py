@@ -9,16 +9,19 @@ class TelegramBot:
     Interfaz de Control vía Telegram.
     Maneja comandos /start, /status, /panic, /balance en segundo plano.
     """
-    def __init__(self, config, shooter, comptroller, order_manager, logger):
+    def __init__(self, config, shooter, comptroller, order_manager, logger, session=None, mesas=None):
         self.cfg = config
         self.shooter = shooter
         self.comp = comptroller
         self.om = order_manager
         self.log = logger
+        # Multi-símbolo: /status y /panic recorren todas las mesas (no solo la principal)
+        self.mesas = list(mesas) if mesas else []
         
         self.token = self.cfg.TELEGRAM_TOKEN
         self.chat_id = self.cfg.TELEGRAM_CHAT_ID
         self.base_url = f"https://api.telegram.org/bot{self.token}/"
+        self.http = session or requests.Session()  # Keep-alive (compartida con APIManager)
         
         self.running = False
         self.thread = None
@@ -46,7 +49,7 @@ class TelegramBot:
         try:
             url = self.base_url + "sendMessage"
             data = {"chat_id": chat_id, "text": text}
-            requests.post(url, data=data, timeout=5)
+            self.http.post(url, data=data, timeout=5)
         except Exception as e:
             self.log.log_error("TELEGRAM", f"Fallo envío: {e}")
 
@@ -54,7 +57,7 @@ class TelegramBot:
         try:
             url = self.base_url + "getUpdates"
             params = {"offset": self.last_update_id + 1, "timeout": 10}
-            resp = requests.get(url, params=params, timeout=15)
+            resp = self.http.get(url, params=params, timeout=15)
             if resp.status_code == 200:
                 result = resp.json().get("result", [])
                 return result
@@ -97,7 +100,13 @@ class TelegramBot:
             self._send_msg(chat_id, f"💰 Capital Total: ${cap:.2f}")
 
     def _reportar_status(self, chat_id):
-        pos = self.comp.positions
+        if self.mesas:
+            pos = {}
+            for mesa in self.mesas:
+                for pid, record in list(mesa.comptroller.positions.items()):
+                    pos[(mesa.symbol, pid)] = record
+        else:
+            pos = self.comp.positions
         if not pos:
             self._send_msg(chat_id, "💤 Sin posiciones activas. Escaneando mercado...")
             return
@@ -106,20 +115,34 @@ class TelegramBot:
         for pid, record in pos.items():
             data = record['data']
             pnl = record.get('pnl_actual', 0.0)
-            msg += f"🔹 {data['side']} {data['mode']} | PnL: ${pnl:.2f}\n"
+            simbolo = f"{pid[0]} " if self.mesas else ""
+            msg += f"🔹 {simbolo}{data['side']} {data['mode']} | PnL: ${pnl:.2f}\n"
         self._send_msg(chat_id, msg)
 
     def _ejecutar_panico(self, chat_id):
-        """Cierra todas las posiciones registradas y cancela órdenes."""
+        """Cierra todas las posiciones registradas y cancela órdenes (en todas las mesas)."""
         self._send_msg(chat_id, "🚨 EJECUTANDO PÁNICO... DETENIENDO OPERACIONES.")
         
+        count = 0
+        if self.mesas:
+            for mesa in self.mesas:
+                # El candado de la mesa frena su decisión/auditoría mientras se liquida
+                with mesa.lock:
+                    count += self._liquidar(mesa.comptroller, mesa.om)
+        else:
+            count = self._liquidar(self.comp, self.om)
+        
+        self._send_msg(chat_id, f"✅ Pánico completado. {count} posiciones liquidadas y órdenes canceladas.")
+
+    def _liquidar(self, comp, om):
+        """Cierre a mercado de las posiciones de un símbolo + cancelación de sus órdenes."""
         count = 0
         # Copia estática de claves para evitar error de iteración
-        ids_activos = list(self.comp.positions.keys())
+        ids_activos = list(comp.positions.keys())
         
         for pid in ids_activos:
-            if pid in self.comp.positions:
-                record = self.comp.positions[pid]
+            if pid in comp.positions:
+                record = comp.positions[pid]
                 plan = record['data']
                 
                 # Cierre a mercado forzoso
@@ -127,15 +150,15 @@ class TelegramBot:
                 
                 try:
                     # Usamos conexión directa del Order Manager
-                    self.om.conn.place_market_order(close_side, plan['side'], plan['qty'], reduce_only=True)
+                    om.conn.place_market_order(close_side, plan['side'], plan['qty'], reduce_only=True,
+                                               symbol=om.cfg.SYMBOL)
                 except Exception as e:
-                    self.log.log_error("TELEGRAM", f"Fallo cierre {pid}: {e}")
+                    self.log.log_error("TELEGRAM", f"Fallo cierre {om.cfg.SYMBOL} {pid}: {e}")
                 
                 # Borrar de memoria inmediatamente
-                del self.comp.positions[pid]
+                del comp.positions[pid]
                 count += 1
             
-        self.comp._guardar_estado() # Guardar estado vacío
-        self.om.cancelar_todo() # Borrar SLs y TPs pendientes en Binance
-        
-        self._send_msg(chat_id, f"✅ Pánico completado. {count} posiciones liquidadas y órdenes canceladas.")
\ No newline at end of file
+        comp._guardar_estado() # Guardar estado vacío
+        om.cancelar_todo() # Borrar SLs y TPs pendientes en Binance
+        return count
@@ -1,8 +1,10 @@
 import pandas as pd
 import os
-import time
 from datetime import datetime
-from tools.precision_lab import PrecisionLab as Lab
+from tools.precision_lab import PrecisionLab as Lab, DetectorDivergencia
+from data import kernels
+from data.fvg_registry import RegistroFVG
+from logic.fvg_index import indexar_fvgs
 
 class Brain:
     """
@@ -13,28 +15,32 @@ class Brain:
         self.shooter = shooter
         self.log = logger
         
-        self.fvg_db = []
-        self.last_fvg_reload = 0
-        self._cargar_fvgs()
+        # Registro FVG vigilado: se recarga (e indexa) en segundo plano solo si cambia
+        self.registro_fvg = RegistroFVG(os.path.join(self.cfg.LOG_PATH, 'fvg_registry.csv'),
+                                        indexar=indexar_fvgs, log=logger)
+        # Zonas vivas del rastreador en línea (mtf_data['fvg_vivos']), indexadas por versión
+        self._version_vivas = None
+        self._zonas_vivas = None
+        # Gatillo Sniper: divergencia 1m con extremos móviles (O(1) por consulta)
+        self.divergencia = DetectorDivergencia(ventana=15)
 
-    def _cargar_fvgs(self):
-        try:
-            path = os.path.join(self.cfg.LOG_PATH, 'fvg_registry.csv')
-            if os.path.exists(path):
-                self.fvg_db = pd.read_csv(path).to_dict('records')
-            else:
-                self.fvg_db = []
-        except: pass
+    def _zonas_fvg(self, vivas):
+        if vivas is None: return self.registro_fvg.actual.indice
+        # El índice se rehace solo cuando el rastreador publica una versión nueva
+        if vivas.version != self._version_vivas:
+            self._zonas_vivas = indexar_fvgs(vivas.registros)
+            self._version_vivas = vivas.version
+        return self._zonas_vivas
 
     def procesar_mercado(self, mtf_data, current_price):
         if not mtf_data: return "Esperando Datos..."
         
-        # 1. RECUPERAR DATAFRAMES (Usando las Keys correctas '1m', '5m'...)
-        df_1m = mtf_data.get('1m')
-        df_5m = mtf_data.get('5m')
-        df_15m = mtf_data.get('15m')
-        df_1h = mtf_data.get('1h')
-        df_4h = mtf_data.get('4h')
+        # 1. RECUPERAR SERIES ('df_1m', 'df_5m'...: vistas de indicadores; '1m' es el resumen)
+        df_1m = mtf_data.get('df_1m')
+        df_5m = mtf_data.get('df_5m')
+        df_15m = mtf_data.get('df_15m')
+        df_1h = mtf_data.get('df_1h')
+        df_4h = mtf_data.get('df_4h')
         
         # 2. VALIDACIÓN DE SEGURIDAD (Critical Check)
         # Si falta CUALQUIER dato, salimos antes de que explote el código.
@@ -45,15 +51,13 @@ class Brain:
             if df_4h is None: missing.append('4h')
             return f"Cargando Buffer {missing}..."
 
-        # Refresco de FVGs cada minuto
-        if time.time() - self.last_fvg_reload > 60:
-            self._cargar_fvgs()
-            self.last_fvg_reload = time.time()
+        # Zonas FVG: las vivas del pipeline si existen; si no, la foto del registro en disco
+        zonas_fvg = self._zonas_fvg(mtf_data.get('fvg_vivos'))
 
-        # 3. ANÁLISIS MACRO (Ahora es seguro usar iloc)
+        # 3. ANÁLISIS MACRO
         try:
-            # Usamos get con default 0 para evitar error si falta la columna
-            ema_macro = df_4h.iloc[-1].get('EMA_200', 0)
+            # Default 0 para evitar error si falta la columna
+            ema_macro = Lab.ultimo(df_4h, 'EMA_200', 0)
             tendencia_4h = 'ALCISTA' if current_price > ema_macro else 'BAJISTA'
             stoch_1h = Lab.analizar_stoch(df_1h)
         except Exception as e:
@@ -65,29 +69,23 @@ class Brain:
         # ==========================================================
         # ESTRATEGIA 1: SNIPER FVG (PRIORIDAD ALTA)
         # ==========================================================
-        for fvg in self.fvg_db:
+        # Solo un lado puede validar (LONG exige 4H alcista, SHORT bajista): se
+        # consulta el índice de ese lado y la divergencia se calcula una vez.
+        for tipo in ('LONG', 'SHORT'):
             try:
-                tipo = fvg['Type']
-                top, bottom = float(fvg['Top']), float(fvg['Bottom'])
-                
-                en_zona = (tipo=='LONG' and bottom <= current_price <= top) or \
-                          (tipo=='SHORT' and top >= current_price >= bottom)
-                
-                if en_zona:
-                    validado = True
-                    # Filtro de Tendencia Macro y Saturación
-                    if tipo == 'LONG' and (tendencia_4h == 'BAJISTA' or stoch_1h['zona'] == 'TECHO'): validado = False
-                    if tipo == 'SHORT' and (tendencia_4h == 'ALCISTA' or stoch_1h['zona'] == 'SUELO'): validado = False
-                    
-                    if validado:
-                        # Gatillo: Divergencia en 1m
-                        div = Lab.detectar_divergencia(df_1m, ventana=15)
-                        if (tipo == 'LONG' and div == 'BULLISH_DIV') or (tipo == 'SHORT' and div == 'BEARISH_DIV'):
-                            senal = {
-                                'side': tipo, 'mode': 'SNIPER_FVG', 
-                                'price': current_price, 'sl_ref': 0.0 
-                            }
-                            return self.shooter.ejecutar_senal(senal)
+                # Filtro de Tendencia Macro y Saturación
+                if tipo == 'LONG' and (tendencia_4h == 'BAJISTA' or stoch_1h['zona'] == 'TECHO'): continue
+                if tipo == 'SHORT' and (tendencia_4h == 'ALCISTA' or stoch_1h['zona'] == 'SUELO'): continue
+
+                if zonas_fvg[tipo].alguna(current_price):
+                    # Gatillo: Divergencia en 1m
+                    div = self.divergencia.detectar(df_1m)
+                    if (tipo == 'LONG' and div == 'BULLISH_DIV') or (tipo == 'SHORT' and div == 'BEARISH_DIV'):
+                        senal = {
+                            'side': tipo, 'mode': 'SNIPER_FVG', 
+                            'price': current_price, 'sl_ref': 0.0 
+                        }
+                        return self.shooter.ejecutar_senal(senal)
             except: continue
 
         # ==========================================================
@@ -101,13 +99,14 @@ class Brain:
                 # Verificamos la clave 'cruce' (fix del error anterior)
                 if emas_5m.get('cruce'): 
                     # 2. CONFIRMACIÓN (15 min)
-                    ema_trend_15m = df_15m['close'].ewm(span=50).mean().iloc[-1]
+                    ema_trend_15m = kernels.ema(Lab.serie(df_15m, 'close'), 50, ajustada=True)[-1]
                     adx_15m = Lab.analizar_adx(df_15m)
+                    close_15m = Lab.ultimo(df_15m, 'close')
                     
                     confirmado = False
-                    if emas_5m['estado'] == 'ALCISTA' and df_15m.iloc[-1]['close'] > ema_trend_15m:
+                    if emas_5m['estado'] == 'ALCISTA' and close_15m > ema_trend_15m:
                         confirmado = True
-                    elif emas_5m['estado'] == 'BAJISTA' and df_15m.iloc[-1]['close'] < ema_trend_15m:
+                    elif emas_5m['estado'] == 'BAJISTA' and close_15m < ema_trend_15m:
                         confirmado = True
                     
                     if confirmado and adx_15m['valor'] > 20:
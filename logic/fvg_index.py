@@ -0,0 +1,83 @@
+import math
+from bisect import bisect_right
+
+
+class IndiceZonas:
+    """
+    ÍNDICE DE INTERVALOS (ÁRBOL CENTRADO ESTÁTICO)
+    Responde "qué zonas [bottom, top] contienen el precio P" en O(log n + k).
+    Cada nodo guarda las zonas que cruzan su centro ordenadas por bottom
+    (ascendente) y por top (descendente): a un lado del centro basta un bisect
+    para cortar las que contienen P. Se construye una vez por recarga del registro.
+    """
+    def __init__(self, zonas):
+        # zonas: lista de (bottom, top, registro) con bottom <= top
+        self.n = len(zonas)
+        self.raiz = self._construir(sorted(zonas, key=lambda z: z[0]))
+
+    def _construir(self, zonas):
+        if not zonas: return None
+        extremos = sorted([z[0] for z in zonas] + [z[1] for z in zonas])
+        centro = extremos[len(extremos) // 2]
+        izquierda, derecha, cruzan = [], [], []
+        for z in zonas:
+            if z[1] < centro: izquierda.append(z)
+            elif z[0] > centro: derecha.append(z)
+            else: cruzan.append(z)
+        por_top = sorted(cruzan, key=lambda z: -z[1])
+        return {
+            'centro': centro,
+            'bottoms': [z[0] for z in cruzan],           # 'zonas' ya viene ordenada por bottom
+            'por_bottom': [z[2] for z in cruzan],
+            'tops_neg': [-z[1] for z in por_top],
+            'por_top': [z[2] for z in por_top],
+            'izq': self._construir(izquierda),
+            'der': self._construir(derecha),
+        }
+
+    def contienen(self, precio):
+        """Registros cuyas zonas contienen 'precio' (extremos incluidos)."""
+        resultado = []
+        nodo = self.raiz
+        while nodo is not None:
+            if precio < nodo['centro']:
+                resultado.extend(nodo['por_bottom'][:bisect_right(nodo['bottoms'], precio)])
+                nodo = nodo['izq']
+            elif precio > nodo['centro']:
+                resultado.extend(nodo['por_top'][:bisect_right(nodo['tops_neg'], -precio)])
+                nodo = nodo['der']
+            else:
+                return resultado + nodo['por_bottom']
+        return resultado
+
+    def alguna(self, precio):
+        """True si alguna zona contiene 'precio' (sin armar la lista)."""
+        nodo = self.raiz
+        while nodo is not None:
+            if precio < nodo['centro']:
+                if nodo['bottoms'] and nodo['bottoms'][0] <= precio: return True
+                nodo = nodo['izq']
+            elif precio > nodo['centro']:
+                if nodo['tops_neg'] and nodo['tops_neg'][0] <= -precio: return True
+                nodo = nodo['der']
+            else:
+                return bool(nodo['bottoms'])
+        return False
+
+
+def indexar_fvgs(registros):
+    """
+    Registros del fvg_registry (dicts con Type/Top/Bottom) -> {'LONG': IndiceZonas,
+    'SHORT': IndiceZonas}. Convierte los precios una sola vez; descarta filas
+    ilegibles o invertidas (nunca podían contener un precio).
+    """
+    lados = {'LONG': [], 'SHORT': []}
+    for fvg in registros:
+        try:
+            tipo = fvg['Type']
+            top, bottom = float(fvg['Top']), float(fvg['Bottom'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if tipo not in lados or math.isnan(top) or math.isnan(bottom) or bottom > top: continue
+        lados[tipo].append((bottom, top, fvg))
+    return {tipo: IndiceZonas(zonas) for tipo, zonas in lados.items()}
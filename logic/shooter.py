@@ -1,5 +1,5 @@
 import uuid
-import time
+from core import clock
 # Opcional: from tools.precision_lab import PrecisionLab as Lab
 
 class Shooter:
@@ -15,9 +15,7 @@ class Shooter:
         side = senal['side']
         price = senal['price']
         
-        # 1. Validaciones
-        if len(self.comp.positions) >= self.cfg.MAX_OPEN_POSITIONS:
-            return "⛔ Max Posiciones."
+        # 1. Validaciones (el tope de posiciones es global: ver 5.)
         active = [p['data']['mode'] for p in self.comp.positions.values()]
         if mode in active and mode != 'MANUAL': return f"⛔ Modo {mode} ocupado."
         
@@ -61,11 +59,18 @@ class Shooter:
             'id': str(uuid.uuid4())[:8].upper(),
             'side': side, 'mode': mode, 'qty': qty,
             'sl_price': sl_price, 'tps': tps,
-            'leverage': self.cfg.LEVERAGE, 'timestamp': time.time()
+            'leverage': self.cfg.LEVERAGE, 'timestamp': clock.time()
         }
         
-        ok, res = self.om.ejecutar_estrategia(plan)
-        if ok:
-            self.comp.registrar_posicion(res)
-            return f"✅ ORDEN {res['id']} EJECUTADA"
-        return f"❌ {res}"
\ No newline at end of file
+        # Cupo global (todas las mesas comparten billetera): se reserva bajo el
+        # candado de Financials y se libera cuando el contralor ya cuenta la posición
+        ok, msg = self.fin.reservar_cupo(plan['id'], margin)
+        if not ok: return msg
+        try:
+            ok, res = self.om.ejecutar_estrategia(plan)
+            if ok:
+                self.comp.registrar_posicion(res)
+                return f"✅ ORDEN {res['id']} EJECUTADA"
+            return f"❌ {res}"
+        finally:
+            self.fin.liberar_cupo(plan['id'])
\ No newline at end of file
@@ -1,5 +1,6 @@
 import sys
 import os
+import numpy as np
 import pandas as pd
 import time
 from datetime import datetime
@@ -8,13 +9,17 @@ from datetime import datetime
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from config.config import Config
+from data import kernels, mtf_align
+from data.indicator_view import VistaIndicadores
 from logic.brain import Brain
 from logic.shooter import Shooter
 
 # --- CLASES MOCK (SIMULADORES) ---
 class MockFinancials:
-    def __init__(self, initial_balance=1000.0):
+    def __init__(self, initial_balance=1000.0, max_posiciones=3):
         self.balance = initial_balance
+        self.max_posiciones = max_posiciones
+        self.comp = None  # MockComptroller (una sola mesa)
     
     def obtener_capital_total(self):
         return self.balance
@@ -25,6 +30,15 @@ class MockFinancials:
     def registrar_pnl(self, pnl):
         self.balance += pnl
 
+    def reservar_cupo(self, clave, margen):
+        # Una sola mesa: mismo tope de posiciones abiertas que el bot
+        if self.comp is not None and len(self.comp.positions) >= self.max_posiciones:
+            return False, "⛔ Max Posiciones."
+        return True, "OK"
+
+    def liberar_cupo(self, clave):
+        pass
+
 class MockOrderManager:
     def __init__(self, financials):
         self.fin = financials
@@ -113,14 +127,18 @@ class MockLogger:
 # --- MOTOR PRINCIPAL ---
 
 class BacktesterV2:
+    # Barras por temporalidad que ve el Brain en cada vela (vistas, sin copia)
+    VENTANA_BARRAS = 300
+
     def __init__(self):
         print("🚀 INICIANDO BACKTESTER V2 (CORREGIDO)...")
         self.cfg = Config()
         self.log = MockLogger()
         
-        self.fin = MockFinancials(initial_balance=1000.0)
+        self.fin = MockFinancials(initial_balance=1000.0, max_posiciones=self.cfg.MAX_OPEN_POSITIONS)
         self.om = MockOrderManager(self.fin)
         self.comp = MockComptroller(self.om)
+        self.fin.comp = self.comp
         
         self.shooter = Shooter(self.cfg, self.fin, self.om, self.comp, self.log)
         self.brain = Brain(self.cfg, self.shooter, self.log)
@@ -128,6 +146,8 @@ class BacktesterV2:
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.data_path = os.path.join(base_dir, 'logs', 'data_lab')
         self.datasets = {}
+        self.series = {}   # tf -> (ts, {columna: array}) con indicadores
+        self.cerradas = {} # tf -> índice de la última barra cerrada por vela de 1m
 
     def cargar_datos(self):
         print("📂 Cargando datasets Multi-Timeframe...")
@@ -154,20 +174,34 @@ class BacktesterV2:
 
             except Exception as e:
                 print(f"   x Error cargando {tf}: {e}")
+        self._preparar_series()
 
-    def _construir_mtf_data(self, current_ts_ms):
-        mtf_data = {}
-        ts_sec = current_ts_ms / 1000
-        
+    def _preparar_series(self):
+        """Indicadores por temporalidad y alineación (vectorizada) de cada tf al cierre de sus barras."""
+        if '1m' not in self.datasets: return
+        ts_1m = self.datasets['1m']['ts'].to_numpy(dtype=np.int64)
         for tf, df in self.datasets.items():
-            # Buscar índice sin mirar al futuro
-            idx = df['ts_sec'].searchsorted(ts_sec, side='right') - 1
-            
-            if idx >= 0:
-                last_row = df.iloc[idx]
-                mtf_data[tf] = last_row.to_dict()
-                if 'close' in mtf_data[tf]: mtf_data[tf]['CLOSE'] = mtf_data[tf]['close']
-                
+            columnas = {c: df[c].to_numpy(dtype=np.float64) for c in ('open', 'high', 'low', 'close', 'volume')
+                        if c in df.columns}
+            for col, arr in kernels.indicadores_completos(columnas['high'], columnas['low'], columnas['close']).items():
+                columnas[col] = df[col].to_numpy(dtype=np.float64) if col in df.columns else arr
+            ts = df['ts'].to_numpy(dtype=np.int64)
+            self.series[tf] = (ts, columnas)
+            # 1m incluida: la vela actual es visible al cerrar (cuando se decide)
+            self.cerradas[tf] = mtf_align.indices_cerradas(ts_1m, ts, mtf_align.PERIODOS[tf])
+
+    def _construir_mtf_data(self, fila):
+        """
+        Lo que recibe el Brain en la vela 'fila' de 1m: por temporalidad ('df_1h'...)
+        una vista de las últimas VENTANA_BARRAS barras CERRADAS, como en el runtime.
+        """
+        mtf_data = {}
+        for tf, (ts, columnas) in self.series.items():
+            fin = int(self.cerradas[tf][fila]) + 1
+            if fin <= 0: continue
+            inicio = max(0, fin - self.VENTANA_BARRAS)
+            vista = VistaIndicadores(ts[inicio:fin], {c: arr[inicio:fin] for c, arr in columnas.items()})
+            mtf_data[f'df_{tf}'] = vista
         return mtf_data
 
     def run(self):
@@ -190,8 +224,8 @@ class BacktesterV2:
             # Esto corrige el KeyError 'entry_price'
             self.om.actualizar_posiciones(current_price, current_ts/1000)
             
-            # 2. Preparar Datos MTF
-            mtf_data = self._construir_mtf_data(current_ts)
+            # 2. Preparar Datos MTF (solo barras ya cerradas)
+            mtf_data = self._construir_mtf_data(idx)
             
             # 3. Brain
             self.brain.procesar_mercado(mtf_data, current_price)
@@ -3,6 +3,7 @@ import numpy as np
 import os
 import sys
 import time
+import heapq
 from datetime import datetime
 
 # -------------------------------------------------------------------------
@@ -13,9 +14,14 @@ project_root = os.path.abspath(os.path.join(current_dir, '..'))
 sys.path.append(project_root)
 
 from config.config import Config
+from data import kernels, mtf_align
+from data.feature_cube import CuboMTF
+from tools import vector_backtest as vb
 
 class FVGTracker:
     """Clase para gestionar el ciclo de vida de un FVG individual."""
+    UMBRAL_VALIDACION = 0.002 # 0.2% rebote
+
     def __init__(self, data):
         self.data = data
         self.top = float(data['Top'])
@@ -33,10 +39,9 @@ class FVGTracker:
                 self.last_interaction_time = time
                 
         elif self.state == 'TOUCHED':
-            umbral_validacion = 0.002 # 0.2% rebote
-            if self.type == 'LONG' and price > self.top * (1 + umbral_validacion):
+            if self.type == 'LONG' and price > self.top * (1 + self.UMBRAL_VALIDACION):
                 self.state = 'VALIDATED'
-            elif self.type == 'SHORT' and price < self.bottom * (1 - umbral_validacion):
+            elif self.type == 'SHORT' and price < self.bottom * (1 - self.UMBRAL_VALIDACION):
                 self.state = 'VALIDATED'
                 
         elif self.state == 'VALIDATED':
@@ -46,10 +51,27 @@ class FVGTracker:
         
         return False
 
+    def proxima_transicion(self, precios, desde):
+        """Primera vela >= desde en la que update() cambiaría el estado actual, o None."""
+        n = len(precios)
+        if self.state in ('WAITING', 'VALIDATED'):
+            return vb.primer_indice(lambda a, b: vb.en_zona(precios[a:b], self.bottom, self.top), desde, n)
+        if self.state == 'TOUCHED':
+            if self.type == 'LONG':
+                limite = self.top * (1 + self.UMBRAL_VALIDACION)
+                return vb.primer_indice(lambda a, b: precios[a:b] > limite, desde, n)
+            if self.type == 'SHORT':
+                limite = self.bottom * (1 - self.UMBRAL_VALIDACION)
+                return vb.primer_indice(lambda a, b: precios[a:b] < limite, desde, n)
+        return None
+
 class BacktesterV3:
     """
     SENTINEL BACKTESTER V3 PRO (FVG + Estructura + Filtros)
     """
+    # Columnas del cubo MTF por temporalidad (cambiarlas invalida el caché)
+    INDICADORES_MTF = {'1h': ['CSV', 'STOCH_RSI'], '4h': ['CSV', 'EMA_200']}
+
     def __init__(self):
         print("🚀 INICIANDO BACKTESTER V3 (Estrategia FVG Retest + Filtros)...")
         self.cfg = Config()
@@ -76,10 +98,18 @@ class BacktesterV3:
         self.BE_TRIGGER = 0.008 
         self.BE_NEAR_THRESHOLD = 0.005 
         self.SL_PCT = 0.02 
+        self.TP_PCT = 0.03
         
         self.active_fvgs = []
 
     def load_data(self):
+        """Frame MTF desde el cubo en caché (memmap); se reconstruye si cambian las fuentes."""
+        fuentes = [os.path.join(self.data_path, f"history_{self.cfg.SYMBOL}_{tf}.csv") for tf in ['1m', '1h', '4h']]
+        cubo = CuboMTF(os.path.join(self.cfg.BASE_DIR, 'logs', 'cache', 'mtf'), self.cfg.SYMBOL, 'v3_pro',
+                       self.INDICADORES_MTF, fuentes, self._construir_datos)
+        return cubo.cargar()
+
+    def _construir_datos(self):
         print(f"📂 Cargando datos...")
         # Cargar 1m base
         path = os.path.join(self.data_path, f"history_{self.cfg.SYMBOL}_1m.csv")
@@ -102,27 +132,22 @@ class BacktesterV3:
         
         # Calculamos indicadores macro si faltan
         if not df_4h.empty:
-            df_4h['EMA_200'] = df_4h['close'].ewm(span=200, adjust=False).mean()
+            df_4h['EMA_200'] = kernels.ema(df_4h['close'].to_numpy(), 200)
             if 'ts' in df_4h.columns: df_4h['datetime'] = pd.to_datetime(df_4h['ts'], unit='ms')
             df_4h = df_4h.set_index('datetime').add_prefix('4h_')
             
         if not df_1h.empty:
             # StochRSI
-            delta = df_1h['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            min_rsi = rsi.rolling(14).min()
-            max_rsi = rsi.rolling(14).max()
-            df_1h['STOCH_RSI'] = (rsi - min_rsi) / (max_rsi - min_rsi).replace(0,1) * 100
+            df_1h['STOCH_RSI'] = kernels.stoch_rsi(kernels.rsi(df_1h['close'].to_numpy()))
             
             if 'ts' in df_1h.columns: df_1h['datetime'] = pd.to_datetime(df_1h['ts'], unit='ms')
             df_1h = df_1h.set_index('datetime').add_prefix('1h_')
 
         # Merge final
-        df_final = pd.merge_asof(df_1m, df_1h, on='datetime', direction='backward')
-        df_final = pd.merge_asof(df_final, df_4h, on='datetime', direction='backward')
+        # Cada barra superior entra al cerrar (sin look-ahead)
+        df_final = df_1m
+        if not df_1h.empty: df_final = mtf_align.unir_cerradas(df_final, df_1h, '1h')
+        if not df_4h.empty: df_final = mtf_align.unir_cerradas(df_final, df_4h, '4h')
         
         return df_final
 
@@ -134,83 +159,74 @@ class BacktesterV3:
         else:
             print("⚠️ Sin archivo FVG. (No habrá entradas)")
 
-    def ejecutar_simulacion(self):
-        df = self.load_data()
+    def ejecutar_simulacion(self, df=None):
+        """'df': frame MTF ya cargado (barridos de parámetros); si falta se lee de disco."""
+        if df is None: df = self.load_data()
         self.cargar_fvgs()
         
         if df is None or not self.active_fvgs: return
 
         print(f"⚡ Ejecutando Motor sobre {len(df)} velas...")
-        
-        in_position = False
-        position = {}
-        records = df.to_dict('records')
-        
-        for i, row in enumerate(records):
-            if i < 50: continue
-            
-            # 1. GESTIÓN POSICIÓN
-            if in_position:
-                self._gestionar_salida(row, position)
-                if position['status'] == 'CLOSED':
-                    self.current_capital += position['pnl_realized']
-                    self.stats['trades'].append(position.copy())
-                    in_position = False
+
+        close = df['close'].to_numpy(dtype=np.float64)
+        tiempos = df['datetime']
+        ema_4h = vb.columna(df, '4h_EMA_200', np.nan)
+        stoch_1h = vb.columna(df, '1h_STOCH_RSI', np.nan)
+        techo, suelo = self.cfg.BrainConfig.STOCH_1H_OVERBOUGHT, self.cfg.BrainConfig.STOCH_1H_OVERSOLD
+
+        # 1. COLA DE EVENTOS: (vela de la próxima transición, orden en la lista).
+        # En una misma vela las zonas se actualizan en orden de lista, como el bucle por filas.
+        cola = []
+        for k, fvg in enumerate(self.active_fvgs):
+            fila = fvg.proxima_transicion(close, 50)
+            if fila is not None: cola.append((fila, k))
+        heapq.heapify(cola)
+
+        libre = 50  # primera vela sin posición abierta
+        while cola:
+            i, k = heapq.heappop(cola)
+            fvg = self.active_fvgs[k]
+            if i < libre:
+                # La vela quedó dentro de una posición: la zona no se actualizó ahí
+                fila = fvg.proxima_transicion(close, libre)
+                if fila is not None: heapq.heappush(cola, (fila, k))
                 continue
 
-            # 2. SCANNER DE ZONAS + MAQUINA DE ESTADOS
-            price = row['close']
-            signal_side = None
-            fvg_trigger = None
-            
-            for fvg in self.active_fvgs:
-                is_retest = fvg.update(price, row['datetime'])
-                
-                if is_retest:
-                    # 3. FILTROS DE CONTEXTO (Brain Logic)
-                    # Filtro 4H Trend
-                    ema_4h = row.get('4h_EMA_200')
-                    if pd.notna(ema_4h):
-                        is_bullish = price > ema_4h
-                        if fvg.type == 'LONG' and not is_bullish:
-                            self.stats['rejected']['4H_Trend'] += 1
-                            continue
-                        if fvg.type == 'SHORT' and is_bullish:
-                            self.stats['rejected']['4H_Trend'] += 1
-                            continue
-                    
-                    # Filtro 1H Momento
-                    stoch_1h = row.get('1h_STOCH_RSI')
-                    if pd.notna(stoch_1h):
-                        if fvg.type == 'LONG' and stoch_1h > 80:
-                            self.stats['rejected']['1H_Stoch'] += 1
-                            continue
-                        if fvg.type == 'SHORT' and stoch_1h < 20:
-                            self.stats['rejected']['1H_Stoch'] += 1
-                            continue
+            # 2. MAQUINA DE ESTADOS (solo en las velas donde la zona cambia de estado)
+            price = float(close[i])
+            if not fvg.update(price, tiempos[i]):
+                fila = fvg.proxima_transicion(close, i + 1)
+                if fila is not None: heapq.heappush(cola, (fila, k))
+                continue
 
-                    # Si pasa filtros, buscamos confirmación de vela (simple)
-                    # En simulación asumimos que el retesteo es la confirmación
-                    signal_side = fvg.type
-                    fvg_trigger = fvg
-                    break
-            
-            if not signal_side: continue
-            
-            # ¡AUTORIZADO!
+            # 3. FILTROS DE CONTEXTO (Brain Logic)
+            # Filtro 4H Trend
+            if pd.notna(ema_4h[i]):
+                is_bullish = price > ema_4h[i]
+                if (fvg.type == 'LONG' and not is_bullish) or (fvg.type == 'SHORT' and is_bullish):
+                    self.stats['rejected']['4H_Trend'] += 1
+                    continue
+
+            # Filtro 1H Momento
+            if pd.notna(stoch_1h[i]):
+                if (fvg.type == 'LONG' and stoch_1h[i] > techo) or (fvg.type == 'SHORT' and stoch_1h[i] < suelo):
+                    self.stats['rejected']['1H_Stoch'] += 1
+                    continue
+
+            # ¡AUTORIZADO! (en simulación el retesteo es la confirmación)
+            signal_side = fvg.type
             self.stats['authorized'] += 1
-            fvg_trigger.state = 'USED'
+            fvg.state = 'USED'
             
             margin = self.current_capital * self.WALLET_PCT
             qty = (margin * self.LEVERAGE) / price
             
             # TP Estructural (Simplificado a 3% para prueba FVG)
-            tp_price = price * (1.03 if signal_side == 'LONG' else 0.97)
-            sl_price = price * (0.98 if signal_side == 'LONG' else 1.02)
+            tp_price = price * (1 + self.TP_PCT if signal_side == 'LONG' else 1 - self.TP_PCT)
+            sl_price = price * (1 - self.SL_PCT if signal_side == 'LONG' else 1 + self.SL_PCT)
             
-            in_position = True
             position = {
-                'entry_time': row['datetime'],
+                'entry_time': tiempos[i],
                 'side': signal_side,
                 'entry_price': price,
                 'qty': qty,
@@ -222,24 +238,45 @@ class BacktesterV3:
                 'pnl_realized': 0.0
             }
 
-    def _gestionar_salida(self, row, pos):
-        curr = row['close']
-        entry = pos['entry_price']
-        side = pos['side']
-        qty = pos['qty']
-        
-        pnl_pct = (curr - entry)/entry if side=='LONG' else (entry - curr)/entry
-        if pnl_pct > pos['max_pnl']: pos['max_pnl'] = pnl_pct
-        
-        if not pos['be_active'] and pnl_pct >= self.BE_TRIGGER:
+            # 4. GESTIÓN POSICIÓN (primer toque de SL/BE/TP)
+            j = self._resolver_salida(close, i, position)
+            if j is None: break  # sigue abierta al final de los datos
+            self.current_capital += position['pnl_realized']
+            self.stats['trades'].append(position.copy())
+            libre = j + 1
+
+    def _resolver_salida(self, close, i, pos):
+        """
+        Salida por cierre de vela resuelta por primer toque: SL/TP, o activación del
+        Breakeven (pnl >= BE_TRIGGER) y desde ahí SL en la entrada/TP.
+        Cierra 'pos' y devuelve la vela de salida, o None si sigue abierta.
+        """
+        n = len(close)
+        entry, side, qty = pos['entry_price'], pos['side'], pos['qty']
+        if side == 'LONG':
+            pnl = lambda a, b: (close[a:b] - entry) / entry
+            toca_sl = lambda a, b, nivel: close[a:b] <= nivel
+            toca_tp = lambda a, b: close[a:b] >= pos['tp_price']
+        else:
+            pnl = lambda a, b: (entry - close[a:b]) / entry
+            toca_sl = lambda a, b, nivel: close[a:b] >= nivel
+            toca_tp = lambda a, b: close[a:b] <= pos['tp_price']
+
+        # Fase 1: SL original, TP o activación del BE
+        j = vb.primer_indice(lambda a, b: toca_sl(a, b, pos['sl_price']) | toca_tp(a, b) |
+                             (pnl(a, b) >= self.BE_TRIGGER), i + 1, n)
+        if j is not None and pnl(j, j + 1)[0] >= self.BE_TRIGGER:
             pos['be_active'] = True
             self.stats['be_activated'] += 1
-            
+            # Fase 2: SL en la entrada (en la vela de activación solo puede tocar el TP)
+            if not toca_tp(j, j + 1)[0]:
+                j = vb.primer_indice(lambda a, b: toca_sl(a, b, entry) | toca_tp(a, b), j + 1, n)
+        if j is None: return None
+
+        pos['max_pnl'] = max(pos['max_pnl'], float(pnl(i + 1, j + 1).max()))
+        pos['status'] = 'CLOSED'
         sl_limit = entry if pos['be_active'] else pos['sl_price']
-        hit_sl = (side=='LONG' and curr<=sl_limit) or (side=='SHORT' and curr>=sl_limit)
-        
-        if hit_sl:
-            pos['status'] = 'CLOSED'
+        if toca_sl(j, j + 1, sl_limit)[0]:
             if pos['be_active']:
                 pos['pnl_realized'] = 0
             else:
@@ -247,13 +284,10 @@ class BacktesterV3:
                 pos['pnl_realized'] = loss
                 if pos['max_pnl'] > self.BE_NEAR_THRESHOLD:
                     self.stats['be_near_miss'] += 1
-            return
-
-        hit_tp = (side=='LONG' and curr>=pos['tp_price']) or (side=='SHORT' and curr<=pos['tp_price'])
-        if hit_tp:
-            pos['status'] = 'CLOSED'
+        else:
             gain = qty * abs(entry - pos['tp_price'])
             pos['pnl_realized'] = gain
+        return j
 
     def reporte(self):
         print("\n" + "="*50)
@@ -12,7 +12,14 @@ project_root = os.path.abspath(os.path.join(current_dir, '..'))
 sys.path.append(project_root)
 
 from config.config import Config
+from data import kernels, mtf_align
+from data.feature_cube import CuboMTF
 from tools.precision_lab import PrecisionLab as Lab
+from tools import vector_backtest as vb
+
+VIDA_FVG_SEG = 14400  # 4h
+MOTIVO_SNIPER_OK = "FVG + Filtros OK + Gatillo OK"
+MOTIVO_TREND_OK = "Tendencia + Fuerza + Filtros OK"
 
 class DynamicFVG:
     def __init__(self, top, bottom, tipo, candle_time):
@@ -27,6 +34,14 @@ class BacktesterV4:
     SENTINEL AUDITOR V4 (Unified Logic + Detailed Reporting)
     Simula la lógica exacta del Brain V3.0 y genera un reporte detallado de cada decisión.
     """
+    # Columnas del cubo MTF por temporalidad (cambiarlas invalida el caché)
+    INDICADORES_MTF = {'5m': ['EMA_7', 'EMA_25', 'RSI'], '1h': ['CSV', 'STOCH_RSI'], '4h': ['CSV', 'EMA_200']}
+
+    # Constantes de la simulación (ajustables por tools/param_sweep.py)
+    SL_PCT = 0.01
+    TP_PCT = 0.02
+    ADX_MIN_1H = 25
+
     def __init__(self):
         print("🚀 INICIANDO AUDITORÍA V4 (Lógica Unificada)...")
         self.cfg = Config()
@@ -39,6 +54,13 @@ class BacktesterV4:
         self.trades = []
 
     def cargar_datos(self):
+        """Frame MTF desde el cubo en caché (memmap); se reconstruye si cambian las fuentes."""
+        fuentes = [os.path.join(self.data_path, f"history_{self.cfg.SYMBOL}_{tf}.csv") for tf in ['1m', '1h', '4h']]
+        cubo = CuboMTF(os.path.join(self.cfg.BASE_DIR, 'logs', 'cache', 'mtf'), self.cfg.SYMBOL, 'v4_dynamic',
+                       self.INDICADORES_MTF, fuentes, self._construir_datos)
+        return cubo.cargar()
+
+    def _construir_datos(self):
         print("📂 Cargando Datos MTF (1m, 5m, 1h, 4h)...")
         try:
             dfs = {}
@@ -65,15 +87,12 @@ class BacktesterV4:
             df_5m = df_main.resample('5min').agg({'open':'first', 'high':'max', 'low':'min', 'close':'last', 'volume':'sum'}).dropna()
             
             # Calcular EMAs 5m
-            df_5m['EMA_7'] = df_5m['close'].ewm(span=7).mean()
-            df_5m['EMA_25'] = df_5m['close'].ewm(span=25).mean()
+            close_5m = df_5m['close'].to_numpy()
+            df_5m['EMA_7'] = kernels.ema(close_5m, 7, ajustada=True)
+            df_5m['EMA_25'] = kernels.ema(close_5m, 25, ajustada=True)
             
             # --- CORRECCIÓN: Cálculo directo de RSI 5m (Eliminada llamada prematura a Lab) ---
-            delta = df_5m['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-            rs = gain / loss
-            df_5m['RSI'] = 100 - (100 / (1 + rs))
+            df_5m['RSI'] = kernels.rsi(close_5m)
             
             # Cargar 1h y 4h para Filtros
             path_1h = os.path.join(self.data_path, f"history_{self.cfg.SYMBOL}_1h.csv")
@@ -96,18 +115,11 @@ class BacktesterV4:
             
             # Asegurar indicadores Filtro
             if 'EMA_200' not in df_4h.columns:
-                df_4h['EMA_200'] = df_4h['close'].ewm(span=200).mean()
+                df_4h['EMA_200'] = kernels.ema(df_4h['close'].to_numpy(), 200, ajustada=True)
             
             # Stoch 1H
             if 'STOCH_RSI' not in df_1h.columns:
-                delta = df_1h['close'].diff()
-                gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-                loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-                rs = gain / loss
-                rsi = 100 - (100 / (1 + rs))
-                min_rsi = rsi.rolling(14).min()
-                max_rsi = rsi.rolling(14).max()
-                df_1h['STOCH_RSI'] = (rsi - min_rsi) / (max_rsi - min_rsi).replace(0, 1) * 100
+                df_1h['STOCH_RSI'] = kernels.stoch_rsi(kernels.rsi(df_1h['close'].to_numpy()))
             
             # Merge Final
             df_1h = df_1h.add_prefix('1h_')
@@ -115,9 +127,10 @@ class BacktesterV4:
             df_5m = df_5m.add_prefix('5m_')
             
             print("   Sincronizando Reloj Maestro...")
-            df_final = pd.merge_asof(df_main.sort_index(), df_5m.sort_index(), left_index=True, right_index=True, direction='backward')
-            df_final = pd.merge_asof(df_final, df_1h.sort_index(), left_index=True, right_index=True, direction='backward')
-            df_final = pd.merge_asof(df_final, df_4h.sort_index(), left_index=True, right_index=True, direction='backward')
+            # Cada barra superior entra al cerrar (sin look-ahead)
+            df_final = mtf_align.unir_cerradas(df_main.sort_index(), df_5m.sort_index(), '5m')
+            df_final = mtf_align.unir_cerradas(df_final, df_1h.sort_index(), '1h')
+            df_final = mtf_align.unir_cerradas(df_final, df_4h.sort_index(), '4h')
             
             return df_final.dropna()
 
@@ -127,164 +140,143 @@ class BacktesterV4:
             traceback.print_exc()
             return None
 
-    def detectar_fvg_dinamico(self, row, prev_row, prev2_row):
-        # Lógica simplificada de FVG en 1m
-        if prev2_row['high'] < row['low']:
-            gap = row['low'] - prev2_row['high']
-            if gap > (row['close'] * 0.001):
-                return DynamicFVG(row['low'], prev2_row['high'], 'LONG', row['datetime'])
-        if prev2_row['low'] > row['high']:
-            gap = prev2_row['low'] - row['high']
-            if gap > (row['close'] * 0.001):
-                return DynamicFVG(prev2_row['low'], row['high'], 'SHORT', row['datetime'])
-        return None
+    # --- SEÑALES VECTORIZADAS ---
+    def detectar_fvgs(self, df):
+        """
+        FVGs dinámicos en 1m: hueco > 0.1% del cierre entre el high/low de la vela
+        i-2 y el low/high de la vela i. Devuelve (fvgs en orden de creación, fila de cada uno).
+        """
+        high, low, close = (df[c].to_numpy(dtype=np.float64) for c in ('high', 'low', 'close'))
+        i = np.arange(50, len(df))
+        h2, l2 = high[i - 2], low[i - 2]
+        larga = (h2 < low[i]) & ((low[i] - h2) > (close[i] * 0.001))
+        corta = ~larga & (l2 > high[i]) & ((l2 - high[i]) > (close[i] * 0.001))
+
+        fvgs, filas = [], i[larga | corta]
+        for fila, creado in zip(filas, df.index[filas].to_list()):
+            if larga[fila - 50]:
+                fvgs.append(DynamicFVG(float(low[fila]), float(high[fila - 2]), 'LONG', creado))
+            else:
+                fvgs.append(DynamicFVG(float(low[fila - 2]), float(high[fila]), 'SHORT', creado))
+        return fvgs, filas
+
+    def _motivos(self, df, close):
+        """Motivo de la decisión por fila para Sniper (LONG/SHORT) y Trend (la regla de cada escenario)."""
+        alcista = close > df['4h_EMA_200'].to_numpy(dtype=np.float64)
+        stoch_1h = vb.columna(df, '1h_STOCH_RSI', 50)
+        adx_1h = vb.columna(df, '1h_ADX', 0)
+        rsi_1m = vb.columna(df, 'RSI', 50)
 
-    def ejecutar(self):
-        df = self.cargar_datos()
+        techo, suelo = self.cfg.BrainConfig.STOCH_1H_OVERBOUGHT, self.cfg.BrainConfig.STOCH_1H_OVERSOLD
+
+        sniper = {}
+        for lado, contra, agotado, gatillo in (('LONG', ~alcista, stoch_1h > techo, rsi_1m < 40),
+                                               ('SHORT', alcista, stoch_1h < suelo, rsi_1m > 60)):
+            sniper[lado] = np.select([contra, agotado, gatillo],
+                                     ["Contra Tendencia 4H", "1H Agotado (Stoch)", MOTIVO_SNIPER_OK],
+                                     "Falta Gatillo RSI 1m")
+
+        diff_ema = df['5m_EMA_7'].to_numpy(dtype=np.float64) - df['5m_EMA_25'].to_numpy(dtype=np.float64)
+        larga = (diff_ema > 0) & (diff_ema < (close * 0.001))
+        corta = ~larga & (diff_ema < 0) & (np.abs(diff_ema) < (close * 0.001))
+        tendencia = np.where(larga, 'LONG', np.where(corta, 'SHORT', ''))
+        contra = np.where(larga, ~alcista, alcista)
+        agotado = np.where(larga, stoch_1h > techo, stoch_1h < suelo)
+        trend = np.select([tendencia == '', adx_1h < self.ADX_MIN_1H, contra, agotado],
+                          ["", "ADX 1H Débil", "Contra Tendencia 4H", "1H Agotado (Stoch)"],
+                          MOTIVO_TREND_OK)
+        contexto = {'alcista': alcista, 'stoch_1h': stoch_1h, 'adx_1h': adx_1h, 'diff_ema': diff_ema}
+        return sniper, tendencia, trend, contexto
+
+    def ejecutar(self, df=None):
+        """'df': frame MTF ya cargado (barridos de parámetros); si falta se lee de disco."""
+        if df is None: df = self.cargar_datos()
         if df is None: return
 
         print(f"⚡ Auditando {len(df)} velas...")
-        
-        in_pos = False
-        pos = {}
-        records = df.reset_index().to_dict('records')
-        
-        for i in range(50, len(records)):
-            row = records[i]
-            
-            # 1. MANTENIMIENTO FVG
-            self.fvgs = [f for f in self.fvgs if (row['datetime'] - f.created_at).total_seconds() < 14400]
-            new_fvg = self.detectar_fvg_dinamico(row, records[i-1], records[i-2])
-            if new_fvg: self.fvgs.append(new_fvg)
-            
-            # 2. GESTIÓN DE POSICIÓN
-            if in_pos:
-                self._gestionar_salida(row, pos)
-                if pos['status'] == 'CLOSED':
-                    self.trades.append(pos)
-                    self.capital += pos['pnl']
-                    in_pos = False
-                continue
+        n = len(df)
+        close = df['close'].to_numpy(dtype=np.float64)
+        ts = df.index.values.astype('datetime64[ns]').astype(np.int64)
+        sniper, tendencia, trend, ctx = self._motivos(df, close)
 
-            # 3. EVALUACIÓN DE ESTRATEGIAS
-            price = row['close']
-            
-            # Datos de Contexto
-            trend_4h = 'ALCISTA' if price > row['4h_EMA_200'] else 'BAJISTA'
-            stoch_1h = row.get('1h_STOCH_RSI', 50)
-            adx_1h = row.get('1h_ADX', 0)
-            
-            # --- ESCENARIO A: SNIPER FVG ---
-            fvg_signal = None
-            for fvg in self.fvgs:
-                if fvg.active:
-                    en_zona = (fvg.type == 'LONG' and fvg.bottom <= price <= fvg.top) or \
-                              (fvg.type == 'SHORT' and fvg.top >= price >= fvg.bottom)
-                    if en_zona:
-                        fvg_signal = fvg
-                        break
-            
-            # --- ESCENARIO B: TREND FOLLOWING ---
-            trend_signal = None
-            ema7_5m = row['5m_EMA_7']
-            ema25_5m = row['5m_EMA_25']
-            diff_ema = ema7_5m - ema25_5m
-            
-            if diff_ema > 0 and diff_ema < (price*0.001): trend_signal = 'LONG'
-            elif diff_ema < 0 and abs(diff_ema) < (price*0.001): trend_signal = 'SHORT'
+        # 1. FVGs: vida de 4h desde su vela de creación; impactos = filas con el cierre en zona
+        self.fvgs, filas_fvg = self.detectar_fvgs(df)
+        fin_vida = np.searchsorted(ts, ts[filas_fvg] + VIDA_FVG_SEG * 10**9, side='left')
+        impactos = {}
+        for k, (desde, hasta) in enumerate(zip(filas_fvg, fin_vida)):
+            fvg = self.fvgs[k]
+            for fila in desde + np.flatnonzero(vb.en_zona(close[desde:hasta], fvg.bottom, fvg.top)):
+                impactos.setdefault(int(fila), []).append(k)
 
-            # --- DECISIÓN Y REGISTRO ---
-            decision = "NONE"
-            reason = "No Signal"
-            mode = ""
-            side = ""
-            
-            if fvg_signal:
-                mode = "SNIPER_FVG"
-                side = fvg_signal.type
-                
-                if (side == 'LONG' and trend_4h == 'BAJISTA') or (side == 'SHORT' and trend_4h == 'ALCISTA'):
-                    decision = "REJECTED"
-                    reason = "Contra Tendencia 4H"
-                elif (side == 'LONG' and stoch_1h > 80) or (side == 'SHORT' and stoch_1h < 20):
-                    decision = "REJECTED"
-                    reason = "1H Agotado (Stoch)"
-                else:
-                    rsi_1m = row['RSI'] if 'RSI' in row else 50
-                    if (side == 'LONG' and rsi_1m < 40) or (side == 'SHORT' and rsi_1m > 60):
-                        decision = "AUTHORIZED"
-                        reason = "FVG + Filtros OK + Gatillo OK"
-                    else:
-                        decision = "REJECTED"
-                        reason = "Falta Gatillo RSI 1m"
-
-            elif trend_signal:
-                mode = "TREND_FOLLOWING"
-                side = trend_signal
-                
-                if adx_1h < 25:
-                    decision = "REJECTED"
-                    reason = "ADX 1H Débil"
-                elif (side == 'LONG' and trend_4h == 'BAJISTA') or (side == 'SHORT' and trend_4h == 'ALCISTA'):
-                    decision = "REJECTED"
-                    reason = "Contra Tendencia 4H"
-                elif (side == 'LONG' and stoch_1h > 80) or (side == 'SHORT' and stoch_1h < 20):
-                    decision = "REJECTED"
-                    reason = "1H Agotado (Stoch)"
-                else:
-                    decision = "AUTHORIZED"
-                    reason = "Tendencia + Fuerza + Filtros OK"
+        # 2. MÁQUINA DE ESTADOS SOBRE EVENTOS (filas con FVG en zona o Trend autorizado)
+        eventos = np.union1d(np.fromiter(impactos, dtype=np.int64, count=len(impactos)),
+                             np.flatnonzero(trend == MOTIVO_TREND_OK))
+        eventos = eventos[eventos >= 50]
+        elegidos = {}
+        ocupada = np.zeros(n, dtype=bool)
+        ocupada[:50] = True
+        libre = 50
+        while True:
+            i = vb.siguiente(eventos, libre)
+            if i is None: break
+            k = next((k for k in impactos.get(i, ()) if self.fvgs[k].active), None)
+            if k is not None:
+                elegidos[i] = k
+                side, mode = self.fvgs[k].type, "SNIPER_FVG"
+                autorizado = sniper[side][i] == MOTIVO_SNIPER_OK
+            else:
+                side, mode = tendencia[i], "TREND_FOLLOWING"
+                autorizado = trend[i] == MOTIVO_TREND_OK
+            if not autorizado:
+                libre = i + 1
+                continue
 
-            # REGISTRO DE AUDITORÍA
-            if mode != "":
-                self.audit_log.append({
-                    'Time': row['datetime'],
-                    'Price': price,
-                    'Signal_Mode': mode,
-                    'Side': side,
-                    '4H_Trend': trend_4h,
-                    '1H_Stoch': round(stoch_1h, 1),
-                    '1H_ADX': round(adx_1h, 1),
-                    '5m_EMA_Diff': round(diff_ema, 2) if trend_signal else 0,
-                    'Decision': decision,
-                    'Reason': reason
-                })
+            price = float(close[i])
+            pos = {
+                'time': df.index[i],
+                'type': side,
+                'mode': mode,
+                'entry': price,
+                'sl': price * (1 - self.SL_PCT if side=='LONG' else 1 + self.SL_PCT),
+                'tp': price * (1 + self.TP_PCT if side=='LONG' else 1 - self.TP_PCT),
+                'status': 'OPEN',
+                'pnl': 0
+            }
+            if k is not None: self.fvgs[k].active = False
 
-            # EJECUCIÓN
-            if decision == "AUTHORIZED":
-                in_pos = True
-                pos = {
-                    'time': row['datetime'],
-                    'type': side,
-                    'mode': mode,
-                    'entry': price,
-                    'sl': price * (0.99 if side=='LONG' else 1.01),
-                    'tp': price * (1.02 if side=='LONG' else 0.98),
-                    'status': 'OPEN',
-                    'pnl': 0
-                }
-                if fvg_signal: fvg_signal.active = False
+            # 3. SALIDA: primer cierre que cruza SL o TP
+            j, salida = vb.primera_salida(close, close, i + 1, pos['sl'], pos['tp'], side)
+            if j is None:
+                ocupada[i + 1:] = True
+                break
+            ocupada[i + 1:j + 1] = True
+            pos['status'] = 'CLOSED'
+            pos['pnl'], pos['result'] = (-10, 'LOSS') if salida == 'STOP_LOSS' else (20, 'WIN')
+            self.trades.append(pos)
+            self.capital += pos['pnl']
+            libre = j + 1
 
-    def _gestionar_salida(self, row, pos):
-        price = row['close']
-        if pos['type'] == 'LONG':
-            if price <= pos['sl']:
-                pos['status'] = 'CLOSED'
-                pos['pnl'] = -10
-                pos['result'] = 'LOSS'
-            elif price >= pos['tp']:
-                pos['status'] = 'CLOSED'
-                pos['pnl'] = 20
-                pos['result'] = 'WIN'
-        else:
-            if price >= pos['sl']:
-                pos['status'] = 'CLOSED'
-                pos['pnl'] = -10
-                pos['result'] = 'LOSS'
-            elif price <= pos['tp']:
-                pos['status'] = 'CLOSED'
-                pos['pnl'] = 20
-                pos['result'] = 'WIN'
+        # 4. AUDITORÍA: toda fila libre con señal (autorizada o rechazada)
+        filas = np.flatnonzero(~ocupada & (tendencia != ''))
+        filas = np.union1d(filas, np.fromiter(elegidos, dtype=np.int64, count=len(elegidos)))
+        for i, momento in zip(filas, df.index[filas].to_list()):
+            k = elegidos.get(i)
+            if k is not None:
+                side, mode, reason = self.fvgs[k].type, "SNIPER_FVG", sniper[self.fvgs[k].type][i]
+            else:
+                side, mode, reason = tendencia[i], "TREND_FOLLOWING", trend[i]
+            self.audit_log.append({
+                'Time': momento,
+                'Price': float(close[i]),
+                'Signal_Mode': mode,
+                'Side': str(side),
+                '4H_Trend': 'ALCISTA' if ctx['alcista'][i] else 'BAJISTA',
+                '1H_Stoch': round(float(ctx['stoch_1h'][i]), 1),
+                '1H_ADX': round(float(ctx['adx_1h'][i]), 1),
+                '5m_EMA_Diff': round(float(ctx['diff_ema'][i]), 2) if tendencia[i] else 0,
+                'Decision': "AUTHORIZED" if reason in (MOTIVO_SNIPER_OK, MOTIVO_TREND_OK) else "REJECTED",
+                'Reason': str(reason)
+            })
 
     def generar_reporte_auditoria(self):
         print("\n" + "="*50)
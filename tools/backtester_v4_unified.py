@@ -8,7 +8,10 @@ project_root = os.path.abspath(os.path.join(current_dir, '..'))
 if project_root not in sys.path: sys.path.append(project_root)
 
 from config.config import Config
+from data import kernels, mtf_align
+from data.feature_cube import CuboMTF
 from tools.precision_lab import PrecisionLab as Lab
+from tools import vector_backtest as vb
 
 class DynamicFVG:
     def __init__(self, top, bottom, tipo, time):
@@ -18,6 +21,19 @@ class BacktesterV4Unified:
     """
     SENTINEL BACKTESTER V4.5 (Support for Triangulation V3.5 + CSV Saving Fixed)
     """
+    # Columnas del cubo MTF por temporalidad (cambiarlas invalida el caché)
+    INDICADORES_MTF = {'1m': ['RSI'], '5m': ['EMA_7', 'EMA_25'], '15m': ['ADX'],
+                       '1h': ['ADX', 'RSI', 'STOCH_RSI'], '4h': ['EMA_200']}
+
+    # False: 5m/15m/1h/4h entran al cerrar cada barra. True: barra en formación con los
+    # indicadores del motor en vivo (lo que ve el bot a mitad de barra; más lento de construir)
+    BARRA_PARCIAL = False
+
+    # Constantes de la simulación (ajustables por tools/param_sweep.py)
+    SNIPER_SL_PCT = 0.025
+    TREND_SL_PCT = 0.015
+    TP_PCT = 0.03
+
     def __init__(self):
         print("🚀 INICIANDO BACKTESTER V4.5 (Triangulación Trend + Sniper)...")
         self.cfg = Config()
@@ -40,26 +56,21 @@ class BacktesterV4Unified:
         if len(df) < 20: 
             df['ADX'] = 0
             return df
-        high_diff = df['high'].diff()
-        low_diff = -df['low'].diff()
-        plus_dm = np.where((high_diff > low_diff) & (high_diff > 0), high_diff, 0.0)
-        minus_dm = np.where((low_diff > high_diff) & (low_diff > 0), low_diff, 0.0)
-        tr = pd.concat([df['high']-df['low'], (df['high']-df['close'].shift(1)).abs(), (df['low']-df['close'].shift(1)).abs()], axis=1).max(axis=1)
-        atr = tr.rolling(14).mean()
-        plus_di = 100 * (pd.Series(plus_dm, index=df.index).rolling(14).mean() / atr)
-        minus_di = 100 * (pd.Series(minus_dm, index=df.index).rolling(14).mean() / atr)
-        df['ADX'] = (abs(plus_di - minus_di) / (plus_di + minus_di).replace(0,1) * 100).rolling(14).mean()
+        df['ADX'] = kernels.adx(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy())
         return df
 
     def _calc_rsi(self, df):
-        delta = df['close'].diff()
-        gain = (delta.where(delta>0, 0)).rolling(14).mean()
-        loss = (-delta.where(delta<0, 0)).rolling(14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100/(1+rs))
+        df['RSI'] = kernels.rsi(df['close'].to_numpy())
         return df
 
     def cargar_datos(self):
+        """Frame MTF desde el cubo en caché (memmap); se reconstruye si cambian las fuentes."""
+        fuentes = [os.path.join(self.data_path, f"history_{self.cfg.SYMBOL}_{tf}.csv") for tf in ['1m']]
+        cubo = CuboMTF(os.path.join(self.cfg.BASE_DIR, 'logs', 'cache', 'mtf'), self.cfg.SYMBOL, 'v4_unified',
+                       dict(self.INDICADORES_MTF, parcial=self.BARRA_PARCIAL), fuentes, self._construir_datos)
+        return cubo.cargar()
+
+    def _construir_datos(self):
         print(f"📂 Preparando Dataframes MTF...")
         try:
             dfs = {}
@@ -86,8 +97,8 @@ class BacktesterV4Unified:
                 
                 # Indicadores Específicos para Brain V3.5
                 if name == '5m':
-                    sub_df['EMA_7'] = sub_df['close'].ewm(span=7).mean()
-                    sub_df['EMA_25'] = sub_df['close'].ewm(span=25).mean()
+                    sub_df['EMA_7'] = kernels.ema(sub_df['close'].to_numpy(), 7, ajustada=True)
+                    sub_df['EMA_25'] = kernels.ema(sub_df['close'].to_numpy(), 25, ajustada=True)
                 
                 if name == '15m':
                     sub_df = self._calc_adx(sub_df) # Necesario para Confirmación
@@ -96,126 +107,92 @@ class BacktesterV4Unified:
                     sub_df = self._calc_adx(sub_df) # Necesario para Contexto
                     sub_df = self._calc_rsi(sub_df)
                     # StochRSI
-                    min_rsi = sub_df['RSI'].rolling(14).min()
-                    max_rsi = sub_df['RSI'].rolling(14).max()
-                    sub_df['STOCH_RSI'] = (sub_df['RSI'] - min_rsi) / (max_rsi - min_rsi).replace(0,1) * 100
+                    sub_df['STOCH_RSI'] = kernels.stoch_rsi(sub_df['RSI'].to_numpy())
                 
                 if name == '4h':
-                    sub_df['EMA_200'] = sub_df['close'].ewm(span=200).mean()
+                    sub_df['EMA_200'] = kernels.ema(sub_df['close'].to_numpy(), 200, ajustada=True)
 
                 dfs[name] = sub_df
 
-            # Merge Maestro (Base 1m)
+            # Merge Maestro (Base 1m): cada barra superior entra al cerrar (sin look-ahead)
             base = dfs['1m'].sort_index()
             for tf in ['5m', '15m', '1h', '4h']:
-                other = dfs[tf].add_prefix(f"{tf}_").sort_index()
-                base = pd.merge_asof(base, other, left_index=True, right_index=True, direction='backward')
+                if self.BARRA_PARCIAL:
+                    base = mtf_align.unir_en_formacion(base, tf, f"{tf}_", self.INDICADORES_MTF[tf])
+                else:
+                    base = mtf_align.unir_cerradas(base, dfs[tf].sort_index(), tf, f"{tf}_")
             
             return base.dropna()
         except Exception as e:
             print(f"Error data: {e}")
             return None
 
-    def ejecutar(self):
-        df = self.cargar_datos()
+    def _senales(self, df):
+        """
+        Entradas del simulador Cerebro V3.5 como arrays: (autorizada, lado, modo).
+        Trend (cruce EMA 5m + ADX 15m + RSI 1m + 4H) tiene prioridad sobre Sniper.
+        """
+        close = df['close'].to_numpy(dtype=np.float64)
+        alcista_4h = close > vb.columna(df, '4h_EMA_200', 0)
+
+        # 1. TREND TRIANGULATION: cruce de estado EMA 7/25 (5m) respecto a la vela anterior
+        estado_5m = vb.columna(df, '5m_EMA_7', 0) > vb.columna(df, '5m_EMA_25', 0)
+        cruce_5m = np.zeros(len(df), dtype=bool)
+        cruce_5m[1:] = estado_5m[1:] != estado_5m[:-1]
+        rsi_1m = vb.columna(df, 'RSI', 50)
+        entrada_ok = np.where(estado_5m, rsi_1m < 80, rsi_1m > 20)
+        adx_min = self.cfg.BrainConfig.ADX_MIN_STRENGTH
+        trend = cruce_5m & (vb.columna(df, '15m_ADX', 0) > adx_min) & entrada_ok & (alcista_4h == estado_5m)
+
+        # 2. SNIPER: primera zona de la lista que contiene el precio, salvo contra tendencia 4H
+        zonas = [f for f in self.fvgs if f.type in ('LONG', 'SHORT')]
+        primera = vb.primera_zona(close, np.array([f.bottom for f in zonas], dtype=np.float64),
+                                  np.array([f.top for f in zonas], dtype=np.float64))
+        tipos = np.array([f.type for f in zonas] + [''])
+        lado_fvg = tipos[primera]
+        sniper = ((lado_fvg == 'LONG') & alcista_4h) | ((lado_fvg == 'SHORT') & ~alcista_4h)
+
+        lado = np.where(trend, np.where(estado_5m, 'LONG', 'SHORT'), lado_fvg)
+        modo = np.where(trend, 'TREND_FOLLOWING', 'SNIPER_FVG')
+        return trend | sniper, lado, modo
+
+    def ejecutar(self, df=None):
+        """'df': frame MTF ya cargado (barridos de parámetros); si falta se lee de disco."""
+        if df is None: df = self.cargar_datos()
         if df is None: return
         print(f"⚡ Auditando {len(df)} minutos...")
-        
-        pos = {}
-        in_pos = False
-        records = df.reset_index().to_dict('records') 
-        
-        SNIPER_SL_PCT = 0.025 
-        TREND_SL_PCT = 0.015 
-        
-        for i in range(50, len(records)):
-            row = records[i]
-            price = row['close']
-            
-            # --- GESTIÓN DE SALIDAS ---
-            if in_pos:
-                exit_type = None
-                pnl_usd = 0
-                if pos['side'] == 'LONG':
-                    if row['low'] <= pos['sl']: exit_type = 'STOP_LOSS'
-                    elif row['high'] >= pos['tp']: exit_type = 'TAKE_PROFIT'
-                else:
-                    if row['high'] >= pos['sl']: exit_type = 'STOP_LOSS'
-                    elif row['low'] <= pos['tp']: exit_type = 'TAKE_PROFIT'
-                
-                if exit_type:
-                    exit_price = pos['sl'] if exit_type == 'STOP_LOSS' else pos['tp']
-                    pct_diff = (exit_price - pos['entry']) / pos['entry'] if pos['side'] == 'LONG' else (pos['entry'] - exit_price) / pos['entry']
-                    pnl_usd = self.capital * self.cfg.ShooterConfig.MODES[pos['mode']]['wallet_pct'] * self.cfg.LEVERAGE * pct_diff
-                    self.trades.append({
-                        'Entry_Time': pos['time'], 'Exit_Time': row['datetime'], 'Mode': pos['mode'], 'Side': pos['side'],
-                        'Result': 'WIN' if pnl_usd > 0 else 'LOSS', 'PnL': round(pnl_usd, 2)
-                    })
-                    self.capital += pnl_usd
-                    in_pos = False
-                    pos = {}
-                continue
-
-            # --- CEREBRO V3.5 LOGIC SIMULATOR ---
-            decision = "NONE"
-            mode = ""
-            side = ""
-            
-            # Variables de estado
-            adx_1h = row.get('1h_ADX', 0)
-            stoch_1h = row.get('1h_STOCH_RSI', 50)
-            trend_4h = 'ALCISTA' if price > row.get('4h_EMA_200', 0) else 'BAJISTA'
-            
-            # 1. TREND TRIANGULATION
-            # Gatillo 5m
-            ema7_5m = row.get('5m_EMA_7', 0)
-            ema25_5m = row.get('5m_EMA_25', 0)
-            prev_ema7 = records[i-1].get('5m_EMA_7', 0)
-            prev_ema25 = records[i-1].get('5m_EMA_25', 0)
-            
-            cruce_5m = False
-            estado_5m = 'ALCISTA' if ema7_5m > ema25_5m else 'BAJISTA'
-            prev_estado = 'ALCISTA' if prev_ema7 > prev_ema25 else 'BAJISTA'
-            if estado_5m != prev_estado: cruce_5m = True
-            
-            if cruce_5m:
-                # Confirmación 15m
-                # No tenemos EMA 50 calculada en DF, usamos approx simple o pasamos
-                # En simulacion simplificada asumimos validación ADX
-                adx_15m = row.get('15m_ADX', 0)
-                if adx_15m > 20:
-                    # Refinamiento 1m
-                    rsi_1m = row.get('RSI', 50)
-                    entrada_ok = False
-                    if estado_5m == 'ALCISTA' and rsi_1m < 80: entrada_ok = True
-                    if estado_5m == 'BAJISTA' and rsi_1m > 20: entrada_ok = True
-                    
-                    if entrada_ok and trend_4h == estado_5m:
-                        mode = "TREND_FOLLOWING"
-                        side = "LONG" if estado_5m == 'ALCISTA' else "SHORT"
-                        decision = "AUTHORIZED"
-
-            # 2. SNIPER
-            if decision != "AUTHORIZED":
-                 for fvg in self.fvgs:
-                    hit = (fvg.type=='LONG' and fvg.bottom <= price <= fvg.top) or \
-                          (fvg.type=='SHORT' and fvg.top >= price >= fvg.bottom)
-                    if hit:
-                        mode = "SNIPER_FVG"
-                        side = fvg.type
-                        if not ((side == 'LONG' and trend_4h == 'BAJISTA') or (side == 'SHORT' and trend_4h == 'ALCISTA')):
-                             decision = "AUTHORIZED"
-                        break
-
-            if decision == "AUTHORIZED":
-                in_pos = True
-                sl_pct = SNIPER_SL_PCT if mode == 'SNIPER_FVG' else TREND_SL_PCT
-                sl_price = price * (1 - sl_pct) if side == 'LONG' else price * (1 + sl_pct)
-                tp_price = price * 1.03 if side == 'LONG' else price * 0.97
-                pos = {
-                    'time': row['datetime'], 'side': side, 'mode': mode,
-                    'entry': price, 'sl': sl_price, 'tp': tp_price
-                }
+
+        high, low, close = (df[c].to_numpy(dtype=np.float64) for c in ('high', 'low', 'close'))
+        autorizada, lados, modos = self._senales(df)
+        entradas = np.flatnonzero(autorizada)
+
+        # Solo las entradas pasan por Python; la salida es el primer toque de SL/TP en high/low
+        libre = 50
+        while True:
+            i = vb.siguiente(entradas, libre)
+            if i is None: break
+            price, side, mode = float(close[i]), str(lados[i]), str(modos[i])
+            sl_pct = self.SNIPER_SL_PCT if mode == 'SNIPER_FVG' else self.TREND_SL_PCT
+            sl_price = price * (1 - sl_pct) if side == 'LONG' else price * (1 + sl_pct)
+            tp_price = price * (1 + self.TP_PCT) if side == 'LONG' else price * (1 - self.TP_PCT)
+            pos = {
+                'time': df.index[i], 'side': side, 'mode': mode,
+                'entry': price, 'sl': sl_price, 'tp': tp_price
+            }
+
+            serie_sl, serie_tp = (low, high) if side == 'LONG' else (high, low)
+            j, exit_type = vb.primera_salida(serie_sl, serie_tp, i + 1, sl_price, tp_price, side)
+            if j is None: break
+
+            exit_price = pos['sl'] if exit_type == 'STOP_LOSS' else pos['tp']
+            pct_diff = (exit_price - pos['entry']) / pos['entry'] if pos['side'] == 'LONG' else (pos['entry'] - exit_price) / pos['entry']
+            pnl_usd = self.capital * self.cfg.ShooterConfig.MODES[pos['mode']]['wallet_pct'] * self.cfg.LEVERAGE * pct_diff
+            self.trades.append({
+                'Entry_Time': pos['time'], 'Exit_Time': df.index[j], 'Mode': pos['mode'], 'Side': pos['side'],
+                'Result': 'WIN' if pnl_usd > 0 else 'LOSS', 'PnL': round(pnl_usd, 2)
+            })
+            self.capital += pnl_usd
+            libre = j + 1
 
     def generar_reporte(self):
         print("\n" + "="*60)
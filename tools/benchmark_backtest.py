@@ -0,0 +1,524 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import contextlib
+import io
+import numpy as np
+import pandas as pd
+
+# Ajuste de path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from config.config import Config
+from data import kernels
+from tools.backtester_v4_dynamic import BacktesterV4, DynamicFVG
+from tools.backtester_v4_unified import BacktesterV4Unified
+from tools.backtester_v3_pro import BacktesterV3
+
+DIAS = 90
+
+
+# --- REFERENCIA POR FILAS (los bucles sobre to_dict('records') que reemplaza el motor vectorizado) ---
+class _ReferenciaV4(BacktesterV4):
+    def detectar_fvg_dinamico(self, row, prev_row, prev2_row):
+        # Lógica simplificada de FVG en 1m
+        if prev2_row['high'] < row['low']:
+            gap = row['low'] - prev2_row['high']
+            if gap > (row['close'] * 0.001):
+                return DynamicFVG(row['low'], prev2_row['high'], 'LONG', row['datetime'])
+        if prev2_row['low'] > row['high']:
+            gap = prev2_row['low'] - row['high']
+            if gap > (row['close'] * 0.001):
+                return DynamicFVG(prev2_row['low'], row['high'], 'SHORT', row['datetime'])
+        return None
+
+    def ejecutar(self):
+        df = self.cargar_datos()
+        if df is None: return
+
+        print(f"⚡ Auditando {len(df)} velas...")
+        
+        in_pos = False
+        pos = {}
+        records = df.reset_index().to_dict('records')
+        
+        for i in range(50, len(records)):
+            row = records[i]
+            
+            # 1. MANTENIMIENTO FVG
+            self.fvgs = [f for f in self.fvgs if (row['datetime'] - f.created_at).total_seconds() < 14400]
+            new_fvg = self.detectar_fvg_dinamico(row, records[i-1], records[i-2])
+            if new_fvg: self.fvgs.append(new_fvg)
+            
+            # 2. GESTIÓN DE POSICIÓN
+            if in_pos:
+                self._gestionar_salida(row, pos)
+                if pos['status'] == 'CLOSED':
+                    self.trades.append(pos)
+                    self.capital += pos['pnl']
+                    in_pos = False
+                continue
+
+            # 3. EVALUACIÓN DE ESTRATEGIAS
+            price = row['close']
+            
+            # Datos de Contexto
+            trend_4h = 'ALCISTA' if price > row['4h_EMA_200'] else 'BAJISTA'
+            stoch_1h = row.get('1h_STOCH_RSI', 50)
+            adx_1h = row.get('1h_ADX', 0)
+            
+            # --- ESCENARIO A: SNIPER FVG ---
+            fvg_signal = None
+            for fvg in self.fvgs:
+                if fvg.active:
+                    en_zona = (fvg.type == 'LONG' and fvg.bottom <= price <= fvg.top) or \
+                              (fvg.type == 'SHORT' and fvg.top >= price >= fvg.bottom)
+                    if en_zona:
+                        fvg_signal = fvg
+                        break
+            
+            # --- ESCENARIO B: TREND FOLLOWING ---
+            trend_signal = None
+            ema7_5m = row['5m_EMA_7']
+            ema25_5m = row['5m_EMA_25']
+            diff_ema = ema7_5m - ema25_5m
+            
+            if diff_ema > 0 and diff_ema < (price*0.001): trend_signal = 'LONG'
+            elif diff_ema < 0 and abs(diff_ema) < (price*0.001): trend_signal = 'SHORT'
+
+            # --- DECISIÓN Y REGISTRO ---
+            decision = "NONE"
+            reason = "No Signal"
+            mode = ""
+            side = ""
+            
+            if fvg_signal:
+                mode = "SNIPER_FVG"
+                side = fvg_signal.type
+                
+                if (side == 'LONG' and trend_4h == 'BAJISTA') or (side == 'SHORT' and trend_4h == 'ALCISTA'):
+                    decision = "REJECTED"
+                    reason = "Contra Tendencia 4H"
+                elif (side == 'LONG' and stoch_1h > 80) or (side == 'SHORT' and stoch_1h < 20):
+                    decision = "REJECTED"
+                    reason = "1H Agotado (Stoch)"
+                else:
+                    rsi_1m = row['RSI'] if 'RSI' in row else 50
+                    if (side == 'LONG' and rsi_1m < 40) or (side == 'SHORT' and rsi_1m > 60):
+                        decision = "AUTHORIZED"
+                        reason = "FVG + Filtros OK + Gatillo OK"
+                    else:
+                        decision = "REJECTED"
+                        reason = "Falta Gatillo RSI 1m"
+
+            elif trend_signal:
+                mode = "TREND_FOLLOWING"
+                side = trend_signal
+                
+                if adx_1h < 25:
+                    decision = "REJECTED"
+                    reason = "ADX 1H Débil"
+                elif (side == 'LONG' and trend_4h == 'BAJISTA') or (side == 'SHORT' and trend_4h == 'ALCISTA'):
+                    decision = "REJECTED"
+                    reason = "Contra Tendencia 4H"
+                elif (side == 'LONG' and stoch_1h > 80) or (side == 'SHORT' and stoch_1h < 20):
+                    decision = "REJECTED"
+                    reason = "1H Agotado (Stoch)"
+                else:
+                    decision = "AUTHORIZED"
+                    reason = "Tendencia + Fuerza + Filtros OK"
+
+            # REGISTRO DE AUDITORÍA
+            if mode != "":
+                self.audit_log.append({
+                    'Time': row['datetime'],
+                    'Price': price,
+                    'Signal_Mode': mode,
+                    'Side': side,
+                    '4H_Trend': trend_4h,
+                    '1H_Stoch': round(stoch_1h, 1),
+                    '1H_ADX': round(adx_1h, 1),
+                    '5m_EMA_Diff': round(diff_ema, 2) if trend_signal else 0,
+                    'Decision': decision,
+                    'Reason': reason
+                })
+
+            # EJECUCIÓN
+            if decision == "AUTHORIZED":
+                in_pos = True
+                pos = {
+                    'time': row['datetime'],
+                    'type': side,
+                    'mode': mode,
+                    'entry': price,
+                    'sl': price * (0.99 if side=='LONG' else 1.01),
+                    'tp': price * (1.02 if side=='LONG' else 0.98),
+                    'status': 'OPEN',
+                    'pnl': 0
+                }
+                if fvg_signal: fvg_signal.active = False
+
+    def _gestionar_salida(self, row, pos):
+        price = row['close']
+        if pos['type'] == 'LONG':
+            if price <= pos['sl']:
+                pos['status'] = 'CLOSED'
+                pos['pnl'] = -10
+                pos['result'] = 'LOSS'
+            elif price >= pos['tp']:
+                pos['status'] = 'CLOSED'
+                pos['pnl'] = 20
+                pos['result'] = 'WIN'
+        else:
+            if price >= pos['sl']:
+                pos['status'] = 'CLOSED'
+                pos['pnl'] = -10
+                pos['result'] = 'LOSS'
+            elif price <= pos['tp']:
+                pos['status'] = 'CLOSED'
+                pos['pnl'] = 20
+                pos['result'] = 'WIN'
+
+
+class _ReferenciaV4Unified(BacktesterV4Unified):
+    def ejecutar(self):
+        df = self.cargar_datos()
+        if df is None: return
+        print(f"⚡ Auditando {len(df)} minutos...")
+        
+        pos = {}
+        in_pos = False
+        records = df.reset_index().to_dict('records') 
+        
+        SNIPER_SL_PCT = 0.025 
+        TREND_SL_PCT = 0.015 
+        
+        for i in range(50, len(records)):
+            row = records[i]
+            price = row['close']
+            
+            # --- GESTIÓN DE SALIDAS ---
+            if in_pos:
+                exit_type = None
+                pnl_usd = 0
+                if pos['side'] == 'LONG':
+                    if row['low'] <= pos['sl']: exit_type = 'STOP_LOSS'
+                    elif row['high'] >= pos['tp']: exit_type = 'TAKE_PROFIT'
+                else:
+                    if row['high'] >= pos['sl']: exit_type = 'STOP_LOSS'
+                    elif row['low'] <= pos['tp']: exit_type = 'TAKE_PROFIT'
+                
+                if exit_type:
+                    exit_price = pos['sl'] if exit_type == 'STOP_LOSS' else pos['tp']
+                    pct_diff = (exit_price - pos['entry']) / pos['entry'] if pos['side'] == 'LONG' else (pos['entry'] - exit_price) / pos['entry']
+                    pnl_usd = self.capital * self.cfg.ShooterConfig.MODES[pos['mode']]['wallet_pct'] * self.cfg.LEVERAGE * pct_diff
+                    self.trades.append({
+                        'Entry_Time': pos['time'], 'Exit_Time': row['datetime'], 'Mode': pos['mode'], 'Side': pos['side'],
+                        'Result': 'WIN' if pnl_usd > 0 else 'LOSS', 'PnL': round(pnl_usd, 2)
+                    })
+                    self.capital += pnl_usd
+                    in_pos = False
+                    pos = {}
+                continue
+
+            # --- CEREBRO V3.5 LOGIC SIMULATOR ---
+            decision = "NONE"
+            mode = ""
+            side = ""
+            
+            # Variables de estado
+            adx_1h = row.get('1h_ADX', 0)
+            stoch_1h = row.get('1h_STOCH_RSI', 50)
+            trend_4h = 'ALCISTA' if price > row.get('4h_EMA_200', 0) else 'BAJISTA'
+            
+            # 1. TREND TRIANGULATION
+            # Gatillo 5m
+            ema7_5m = row.get('5m_EMA_7', 0)
+            ema25_5m = row.get('5m_EMA_25', 0)
+            prev_ema7 = records[i-1].get('5m_EMA_7', 0)
+            prev_ema25 = records[i-1].get('5m_EMA_25', 0)
+            
+            cruce_5m = False
+            estado_5m = 'ALCISTA' if ema7_5m > ema25_5m else 'BAJISTA'
+            prev_estado = 'ALCISTA' if prev_ema7 > prev_ema25 else 'BAJISTA'
+            if estado_5m != prev_estado: cruce_5m = True
+            
+            if cruce_5m:
+                # Confirmación 15m
+                # No tenemos EMA 50 calculada en DF, usamos approx simple o pasamos
+                # En simulacion simplificada asumimos validación ADX
+                adx_15m = row.get('15m_ADX', 0)
+                if adx_15m > 20:
+                    # Refinamiento 1m
+                    rsi_1m = row.get('RSI', 50)
+                    entrada_ok = False
+                    if estado_5m == 'ALCISTA' and rsi_1m < 80: entrada_ok = True
+                    if estado_5m == 'BAJISTA' and rsi_1m > 20: entrada_ok = True
+                    
+                    if entrada_ok and trend_4h == estado_5m:
+                        mode = "TREND_FOLLOWING"
+                        side = "LONG" if estado_5m == 'ALCISTA' else "SHORT"
+                        decision = "AUTHORIZED"
+
+            # 2. SNIPER
+            if decision != "AUTHORIZED":
+                 for fvg in self.fvgs:
+                    hit = (fvg.type=='LONG' and fvg.bottom <= price <= fvg.top) or \
+                          (fvg.type=='SHORT' and fvg.top >= price >= fvg.bottom)
+                    if hit:
+                        mode = "SNIPER_FVG"
+                        side = fvg.type
+                        if not ((side == 'LONG' and trend_4h == 'BAJISTA') or (side == 'SHORT' and trend_4h == 'ALCISTA')):
+                             decision = "AUTHORIZED"
+                        break
+
+            if decision == "AUTHORIZED":
+                in_pos = True
+                sl_pct = SNIPER_SL_PCT if mode == 'SNIPER_FVG' else TREND_SL_PCT
+                sl_price = price * (1 - sl_pct) if side == 'LONG' else price * (1 + sl_pct)
+                tp_price = price * 1.03 if side == 'LONG' else price * 0.97
+                pos = {
+                    'time': row['datetime'], 'side': side, 'mode': mode,
+                    'entry': price, 'sl': sl_price, 'tp': tp_price
+                }
+
+
+class _ReferenciaV3(BacktesterV3):
+    def ejecutar_simulacion(self):
+        df = self.load_data()
+        self.cargar_fvgs()
+        
+        if df is None or not self.active_fvgs: return
+
+        print(f"⚡ Ejecutando Motor sobre {len(df)} velas...")
+        
+        in_position = False
+        position = {}
+        records = df.to_dict('records')
+        
+        for i, row in enumerate(records):
+            if i < 50: continue
+            
+            # 1. GESTIÓN POSICIÓN
+            if in_position:
+                self._gestionar_salida(row, position)
+                if position['status'] == 'CLOSED':
+                    self.current_capital += position['pnl_realized']
+                    self.stats['trades'].append(position.copy())
+                    in_position = False
+                continue
+
+            # 2. SCANNER DE ZONAS + MAQUINA DE ESTADOS
+            price = row['close']
+            signal_side = None
+            fvg_trigger = None
+            
+            for fvg in self.active_fvgs:
+                is_retest = fvg.update(price, row['datetime'])
+                
+                if is_retest:
+                    # 3. FILTROS DE CONTEXTO (Brain Logic)
+                    # Filtro 4H Trend
+                    ema_4h = row.get('4h_EMA_200')
+                    if pd.notna(ema_4h):
+                        is_bullish = price > ema_4h
+                        if fvg.type == 'LONG' and not is_bullish:
+                            self.stats['rejected']['4H_Trend'] += 1
+                            continue
+                        if fvg.type == 'SHORT' and is_bullish:
+                            self.stats['rejected']['4H_Trend'] += 1
+                            continue
+                    
+                    # Filtro 1H Momento
+                    stoch_1h = row.get('1h_STOCH_RSI')
+                    if pd.notna(stoch_1h):
+                        if fvg.type == 'LONG' and stoch_1h > 80:
+                            self.stats['rejected']['1H_Stoch'] += 1
+                            continue
+                        if fvg.type == 'SHORT' and stoch_1h < 20:
+                            self.stats['rejected']['1H_Stoch'] += 1
+                            continue
+
+                    # Si pasa filtros, buscamos confirmación de vela (simple)
+                    # En simulación asumimos que el retesteo es la confirmación
+                    signal_side = fvg.type
+                    fvg_trigger = fvg
+                    break
+            
+            if not signal_side: continue
+            
+            # ¡AUTORIZADO!
+            self.stats['authorized'] += 1
+            fvg_trigger.state = 'USED'
+            
+            margin = self.current_capital * self.WALLET_PCT
+            qty = (margin * self.LEVERAGE) / price
+            
+            # TP Estructural (Simplificado a 3% para prueba FVG)
+            tp_price = price * (1.03 if signal_side == 'LONG' else 0.97)
+            sl_price = price * (0.98 if signal_side == 'LONG' else 1.02)
+            
+            in_position = True
+            position = {
+                'entry_time': row['datetime'],
+                'side': signal_side,
+                'entry_price': price,
+                'qty': qty,
+                'sl_price': sl_price,
+                'tp_price': tp_price,
+                'be_active': False,
+                'max_pnl': -0.01,
+                'status': 'OPEN',
+                'pnl_realized': 0.0
+            }
+
+    def _gestionar_salida(self, row, pos):
+        curr = row['close']
+        entry = pos['entry_price']
+        side = pos['side']
+        qty = pos['qty']
+        
+        pnl_pct = (curr - entry)/entry if side=='LONG' else (entry - curr)/entry
+        if pnl_pct > pos['max_pnl']: pos['max_pnl'] = pnl_pct
+        
+        if not pos['be_active'] and pnl_pct >= self.BE_TRIGGER:
+            pos['be_active'] = True
+            self.stats['be_activated'] += 1
+            
+        sl_limit = entry if pos['be_active'] else pos['sl_price']
+        hit_sl = (side=='LONG' and curr<=sl_limit) or (side=='SHORT' and curr>=sl_limit)
+        
+        if hit_sl:
+            pos['status'] = 'CLOSED'
+            if pos['be_active']:
+                pos['pnl_realized'] = 0
+            else:
+                loss = qty * abs(entry - sl_limit) * -1
+                pos['pnl_realized'] = loss
+                if pos['max_pnl'] > self.BE_NEAR_THRESHOLD:
+                    self.stats['be_near_miss'] += 1
+            return
+
+        hit_tp = (side=='LONG' and curr>=pos['tp_price']) or (side=='SHORT' and curr<=pos['tp_price'])
+        if hit_tp:
+            pos['status'] = 'CLOSED'
+            gain = qty * abs(entry - pos['tp_price'])
+            pos['pnl_realized'] = gain
+
+
+# --- DATOS SINTÉTICOS ---
+def _generar_velas(dias, seed=7):
+    """
+    1m con tramos de tendencia (cruces de EMAs, ADX alto) y saltos ocasionales
+    (FVGs de 1m), al estilo de AAVEUSDT.
+    """
+    rng = np.random.default_rng(seed)
+    n = dias * 1440
+    deriva = np.repeat(rng.normal(0, 0.0004, n // 720 + 1), 720)[:n]
+    pasos = rng.normal(0, 0.0012, n) + deriva
+    saltos = rng.random(n) < 0.004
+    pasos[saltos] += rng.normal(0, 0.006, saltos.sum())
+    close = 280 * np.exp(np.cumsum(pasos))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    mecha = np.abs(rng.normal(0, 0.0006, (2, n))) * close
+    high = np.maximum(open_, close) + mecha[0]
+    low = np.minimum(open_, close) - mecha[1]
+    ts = 1759000000000 // 60000 * 60000 + np.arange(n, dtype=np.int64) * 60000
+    return pd.DataFrame({'ts': ts, 'open': open_, 'high': high, 'low': low, 'close': close,
+                         'volume': rng.random(n) * 100})
+
+
+def _superior(df_1m, regla):
+    """Temporalidad superior con los indicadores que guarda data_miner."""
+    df = df_1m.set_index(pd.to_datetime(df_1m['ts'], unit='ms'))
+    sub = df.resample(regla).agg({'ts': 'first', 'open': 'first', 'high': 'max', 'low': 'min',
+                                  'close': 'last', 'volume': 'sum'}).dropna()
+    h, l, c = (sub[k].to_numpy() for k in ('high', 'low', 'close'))
+    sub['RSI'] = kernels.rsi(c)
+    sub['STOCH_RSI'] = kernels.stoch_rsi(sub['RSI'].to_numpy())
+    sub['EMA_200'] = kernels.ema(c, 200)
+    sub['ADX'] = kernels.adx(h, l, c)
+    sub['ts'] = sub['ts'].astype(np.int64)
+    return sub.reset_index(drop=True)
+
+
+def _generar_zonas(close, n_zonas=60, seed=3):
+    rng = np.random.default_rng(seed)
+    centros = rng.uniform(close.min(), close.max(), n_zonas)
+    ancho = centros * rng.uniform(0.002, 0.01, n_zonas)
+    return pd.DataFrame({'Top': centros + ancho / 2, 'Bottom': centros - ancho / 2,
+                         'Type': rng.choice(['LONG', 'SHORT'], n_zonas)})
+
+
+def preparar_datos(base, dias=DIAS):
+    """Escribe history_{SYMBOL}_{1m,1h,4h}.csv y fvg_registry.csv bajo base/logs."""
+    lab = os.path.join(base, 'logs', 'data_lab')
+    bit = os.path.join(base, 'logs', 'bitacoras')
+    os.makedirs(lab, exist_ok=True)
+    os.makedirs(bit, exist_ok=True)
+    df = _generar_velas(dias)
+    df.to_csv(os.path.join(lab, f"history_{Config.SYMBOL}_1m.csv"), index=False)
+    for tf in ('1h', '4h'):
+        _superior(df, tf).to_csv(os.path.join(lab, f"history_{Config.SYMBOL}_{tf}.csv"), index=False)
+    _generar_zonas(df['close'].to_numpy()).to_csv(os.path.join(bit, 'fvg_registry.csv'), index=False)
+    return len(df)
+
+
+# --- COMPARACIÓN ---
+def _correr(clase, metodo):
+    with contextlib.redirect_stdout(io.StringIO()):
+        bt = clase()
+        t0 = time.perf_counter()
+        getattr(bt, metodo)()
+    return bt, time.perf_counter() - t0
+
+
+def _resultado(bt):
+    if isinstance(bt, BacktesterV4):
+        return {'trades': bt.trades, 'audit': bt.audit_log, 'capital': bt.capital}
+    if isinstance(bt, BacktesterV4Unified):
+        return {'trades': bt.trades, 'capital': bt.capital}
+    return {'stats': bt.stats, 'capital': bt.current_capital,
+            'zonas': [(f.state, f.last_interaction_time) for f in bt.active_fvgs]}
+
+
+CASOS = [
+    ('v4_dynamic', BacktesterV4, _ReferenciaV4, 'ejecutar'),
+    ('v4_unified', BacktesterV4Unified, _ReferenciaV4Unified, 'ejecutar'),
+    ('v3_pro', BacktesterV3, _ReferenciaV3, 'ejecutar_simulacion'),
+]
+
+
+def ejecutar(dias=DIAS):
+    print(f"🧪 BACKTEST VECTORIZADO: equivalencia vs bucle por filas ({dias} días sintéticos)")
+    base = tempfile.mkdtemp(prefix='bt_vector_')
+    base_original = Config.BASE_DIR
+    fallos = 0
+    try:
+        n = preparar_datos(base, dias)
+        Config.BASE_DIR = base
+        print(f"   {n} velas de 1m\n")
+        print(f" {'BACKTESTER':<11} │ {'TRADES':>6} │ {'FILAS (s)':>9} │ {'VECTOR (s)':>10} │ {'x':>6}")
+        print(" " + "─" * 56)
+        for nombre, clase, referencia, metodo in CASOS:
+            ref, t_ref = _correr(referencia, metodo)
+            vec, t_vec = _correr(clase, metodo)
+            ok = _resultado(ref) == _resultado(vec)
+            if not ok: fallos += 1
+            trades = len(vec.trades) if hasattr(vec, 'trades') else len(vec.stats['trades'])
+            print(f" {nombre:<11} │ {trades:>6} │ {t_ref:>9.2f} │ {t_vec:>10.2f} │ {t_ref / max(t_vec, 1e-9):>5.0f}x {'✅' if ok else '❌'}")
+    finally:
+        Config.BASE_DIR = base_original
+        shutil.rmtree(base, ignore_errors=True)
+
+    print(f"\n{'✅ Listas de operaciones idénticas.' if fallos == 0 else f'❌ {fallos} backtesters difieren.'}")
+    return fallos == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if ejecutar() else 1)
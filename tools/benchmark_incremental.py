@@ -0,0 +1,178 @@
+import sys
+import os
+import math
+import time
+import numpy as np
+import pandas as pd
+
+# Ajuste de path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from data.calculator import MetricCalculator
+from data.candle_store import DTYPE_VELA
+
+VENTANA = 60000                 # Ventana de 1m del ciclo lento (MetricsManager.VENTANA_1M)
+VELAS_TOTALES = 150 * 1440      # 150 días de 1m: la ventana se desliza ~110 días
+BLOQUE = 720                    # Velas nuevas por ciclo "largo" (12 h)
+CHEQUEO_CADA = 20               # Ciclos entre comparaciones contra el camino legado
+TFS = ['1m', '3m', '5m', '15m', '30m', '1h', '4h', '1d']
+
+# Tolerancias
+RTOL = 1e-9                     # Relativa: misma fórmula, distinto orden de redondeo
+SALTO_VENTANAS = 60             # Filas de arranque del legado (RSI/Stoch/BB/ADX aún sin ventana llena)
+# Columnas con acarreo EMA -> span de la EMA más lenta de la que dependen
+SPANS_EMA = {'EMA_7': 7, 'EMA_25': 25, 'EMA_99': 99, 'EMA_200': 200,
+             'MACD_DIF': 26, 'MACD_DEA': 26, 'MACD_HIST': 26}
+COLUMNAS_VENTANA = ['RSI', 'STOCH_RSI', 'BB_UPPER', 'BB_LOWER', 'BB_MID', 'BB_WIDTH', 'ADX']
+
+
+def _generar_velas(n, seed=11):
+    """Serie 1m sintética (random walk) con la forma del almacén."""
+    rng = np.random.default_rng(seed)
+    close = 200 + np.cumsum(rng.normal(0, 0.3, n))
+    registros = np.empty(n, dtype=DTYPE_VELA)
+    registros['ts'] = 1764892800000 + np.arange(n, dtype=np.int64) * 60000
+    registros['open'] = close + rng.normal(0, 0.1, n)
+    registros['high'] = np.maximum(close, registros['open']) + rng.random(n)
+    registros['low'] = np.minimum(close, registros['open']) - rng.random(n)
+    registros['close'] = close
+    registros['volume'] = rng.random(n) * 100
+    return registros
+
+
+def filas_teoricas(span, brecha_rel):
+    """Filas para que una brecha relativa inicial 'brecha_rel' de una EMA(span) baje de RTOL."""
+    if brecha_rel <= RTOL: return 0
+    return math.ceil(math.log(RTOL / brecha_rel) / math.log(1 - 2.0 / (span + 1)))
+
+
+def _decae(span, n):
+    """(1 - a)^k para k = 0..n-1, con a = 2 / (span + 1)."""
+    return (1 - 2.0 / (span + 1)) ** np.arange(n)
+
+
+def brechas_macd(d0, d1, e0, n):
+    """
+    Brecha esperada de MACD_DIF/DEA/HIST por el arranque en caliente. Todo MACD
+    es lineal en las EMAs, así que la brecha del DIF es a*r12^k + b*r26^k
+    (a, b: brechas iniciales de EMA12 y EMA26, despejadas de las filas 0 y 1),
+    la del DEA es su EMA(9) partiendo de la brecha inicial e0, y HIST = DIF - DEA.
+    """
+    r12, r26 = 1 - 2.0 / 13, 1 - 2.0 / 27
+    b = (d1 - r12 * d0) / (r26 - r12)
+    dif = (d0 - b) * _decae(12, n) + b * _decae(26, n)
+    dea = np.empty(n)
+    dea[0] = e0
+    for k in range(1, n):
+        dea[k] = (1 - 0.2) * dea[k - 1] + 0.2 * dif[k]
+    return {'MACD_DIF': dif, 'MACD_DEA': dea, 'MACD_HIST': dif - dea}
+
+
+def comparar_tf(calc_legado, vista):
+    """
+    Recalcula la temporalidad entera con MetricCalculator._calcular_indicadores_base
+    sobre exactamente las mismas barras que vio el motor y compara columna a columna.
+
+    Columnas de ventana finita (RSI, Stoch, BB, ADX): idénticas pasadas las primeras
+    SALTO_VENTANAS filas (el legado aún no tiene la ventana llena).
+    Columnas EMA: el motor trae la EMA desde antes de la ventana y el legado la siembra
+    con el primer cierre. Ambas siguen y = (1-a)*y_prev + a*x con la misma x, así que
+    la diferencia debe ser exactamente dif_0 * (1-a)^k (MACD: ver brechas_macd),
+    salvo redondeo: |dif_k - esperada_k| <= RTOL * |close_k|.
+    Devuelve (errores, detalle_ema) con detalle_ema[col] = (filas hasta bajar de RTOL,
+    filas teóricas, dif relativa en la última fila).
+    """
+    df = pd.DataFrame({c: np.array(vista[c]) for c in ['open', 'high', 'low', 'close', 'volume']})
+    _, ref = calc_legado._calcular_indicadores_base(df)
+    errores = []
+    detalle = {}
+    n = len(df)
+    escala = np.abs(df['close'].to_numpy())
+
+    # 1. Indicadores de ventana finita
+    for col in COLUMNAS_VENTANA:
+        a, b = np.asarray(vista[col])[SALTO_VENTANAS:], ref[col].to_numpy()[SALTO_VENTANAS:]
+        malas = ~np.isclose(a, b, rtol=RTOL, atol=RTOL, equal_nan=True)
+        if malas.any(): errores.append(f"{col}: {int(malas.sum())} filas (primera {int(np.argmax(malas)) + SALTO_VENTANAS})")
+
+    # 2. Columnas con acarreo EMA: la diferencia solo puede ser el arranque en caliente
+    dif = {col: np.asarray(vista[col]) - ref[col].to_numpy() for col in SPANS_EMA}
+    esperada = brechas_macd(dif['MACD_DIF'][0], dif['MACD_DIF'][1], dif['MACD_DEA'][0], n) if n > 1 else {}
+    for col, span in SPANS_EMA.items():
+        prevista = esperada.get(col, dif[col][0] * _decae(span, n))
+        fuera = np.flatnonzero(np.abs(dif[col] - prevista) > RTOL * escala)
+        if len(fuera): errores.append(f"{col}: {len(fuera)} filas fuera del decaimiento esperado (primera {int(fuera[0])})")
+
+        dif_rel = np.abs(dif[col]) / escala
+        sobre = np.flatnonzero(dif_rel > RTOL)
+        detalle[col] = (int(sobre[-1]) + 1 if len(sobre) else 0,
+                        filas_teoricas(span, float(np.max(np.abs(prevista)) / escala[0])), float(dif_rel[-1]))
+    return errores, detalle
+
+
+def ejecutar():
+    print("🧪 MOTOR INCREMENTAL vs CÁLCULO COMPLETO (MetricCalculator._calcular_indicadores_base)")
+    print(f"   {VELAS_TOTALES} velas 1m, ventana {VENTANA}, ciclos de {BLOQUE} y de 1 vela, "
+          f"comparación cada {CHEQUEO_CADA} ciclos.\n")
+    registros = _generar_velas(VELAS_TOTALES)
+    calc = MetricCalculator()
+    calc_legado = MetricCalculator()
+
+    n = VENTANA
+    ciclo = 0
+    errores = []
+    peor_ema = {}      # (tf, col) -> (converge, teóricas, dif última fila) del peor chequeo
+    t_motor, t_legado, ciclos_1 = [], [], 0
+    while n < VELAS_TOTALES:
+        # Ciclos "largos" alternados con rachas de 1 vela (el régimen del bot en vivo)
+        paso = 1 if ciclo % 4 == 3 else BLOQUE
+        n = min(n + paso, VELAS_TOTALES)
+        ciclos_1 += paso == 1
+        t0 = time.perf_counter()
+        mtf, _ = calc.generar_mtf_completo(registros[max(0, n - VENTANA):n])
+        t_motor.append(time.perf_counter() - t0)
+        ciclo += 1
+
+        if ciclo % CHEQUEO_CADA and n < VELAS_TOTALES: continue
+        t0 = time.perf_counter()
+        for tf in TFS:
+            vista = mtf.get(f'df_{tf}')
+            if vista is None: continue
+            errs, detalle = comparar_tf(calc_legado, vista)
+            errores += [f"ciclo {ciclo} {tf} {e}" for e in errs]
+            for col, valores in detalle.items():
+                if valores[2] >= peor_ema.get((tf, col), (0, 0, -1.0))[2]:
+                    peor_ema[(tf, col)] = valores
+        t_legado.append(time.perf_counter() - t0)
+
+    print(f"   Ciclos: {ciclo} ({ciclos_1} de 1 vela) | Chequeos: {len(t_legado)}")
+    print(f"   Motor: {np.median(t_motor) * 1000:.1f} ms/ciclo (mediana) | "
+          f"Legado (8 TFs completas): {np.median(t_legado) * 1000:.1f} ms/chequeo\n")
+
+    print(f" {'TF':<4} │ {'COLUMNA':<10} │ {'< RTOL EN':>9} │ {'TEÓRICO':>8} │ {'DIF REL ÚLTIMA FILA':>20}")
+    print(" " + "─" * 64)
+    for tf in TFS:
+        for col in ('EMA_200', 'MACD_DEA'):
+            if (tf, col) not in peor_ema: continue
+            converge, teoricas, ultima = peor_ema[(tf, col)]
+            print(f" {tf:<4} │ {col:<10} │ {converge:>9} │ {teoricas:>8} │ {ultima:>20.2e}")
+
+    print("\n   Tolerancia esperada del arranque en caliente de las EMAs: la diferencia con la")
+    print("   siembra del legado es exactamente dif_0 * (1 - 2/(span+1))^k (± redondeo). EMA_200")
+    print(f"   necesita ~1750-2000 barras y MACD ~200-250 para bajar de {RTOL:g} relativo: en 1m-15m")
+    print("   la ventana lo absorbe, en 30m (~2000 barras por ventana) la última fila queda en")
+    print("   ~1e-8 relativo, y 1h/4h/1d (historia completa desde la misma primera barra)")
+    print("   coinciden sin brecha.")
+    if errores:
+        print(f"\n❌ {len(errores)} diferencias fuera de tolerancia:")
+        for e in errores[:20]: print(f"   {e}")
+        return False
+    print(f"\n✅ Columnas de ventana idénticas (rtol {RTOL:g}) y EMAs dentro del decaimiento teórico.")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if ejecutar() else 1)
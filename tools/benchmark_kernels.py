@@ -0,0 +1,179 @@
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# Ajuste de path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from data import kernels
+
+TOLERANCIA = 1e-9
+N_VELAS = 200000
+REPETICIONES = 5
+
+
+# --- REFERENCIA PANDAS (las fórmulas que existían en calculator/data_miner/backtesters) ---
+def _rsi_pd(df):
+    delta = df['close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def _stoch_pd(rsi):
+    min_rsi = rsi.rolling(14).min()
+    max_rsi = rsi.rolling(14).max()
+    return (rsi - min_rsi) / (max_rsi - min_rsi).replace(0, 1) * 100
+
+
+def _bollinger_pd(df):
+    sma = df['close'].rolling(20).mean()
+    std = df['close'].rolling(20).std()
+    upper, lower = sma + (std * 2), sma - (std * 2)
+    return upper, lower, sma, (upper - lower) / sma
+
+
+def _adx_pd(df):
+    high_diff = df['high'].diff()
+    low_diff = -df['low'].diff()
+    plus_dm = np.where((high_diff > low_diff) & (high_diff > 0), high_diff, 0.0)
+    minus_dm = np.where((low_diff > high_diff) & (low_diff > 0), low_diff, 0.0)
+    tr = pd.concat([df['high'] - df['low'], (df['high'] - df['close'].shift(1)).abs(),
+                    (df['low'] - df['close'].shift(1)).abs()], axis=1).max(axis=1)
+    atr = tr.rolling(14).mean()
+    plus_di = 100 * (pd.Series(plus_dm, index=df.index).rolling(14).mean() / atr)
+    minus_di = 100 * (pd.Series(minus_dm, index=df.index).rolling(14).mean() / atr)
+    return (abs(plus_di - minus_di) / (plus_di + minus_di).replace(0, 1) * 100).rolling(14).mean()
+
+
+def _macd_pd(df):
+    dif = df['close'].ewm(span=12, adjust=False).mean() - df['close'].ewm(span=26, adjust=False).mean()
+    dea = dif.ewm(span=9, adjust=False).mean()
+    return dif, dea, dif - dea
+
+
+CASOS = {
+    'RSI': (lambda df: _rsi_pd(df),
+            lambda a: kernels.rsi(a['close'])),
+    'STOCH_RSI': (lambda df: _stoch_pd(_rsi_pd(df)),
+                  lambda a: kernels.stoch_rsi(kernels.rsi(a['close']))),
+    'BOLLINGER': (lambda df: _bollinger_pd(df),
+                  lambda a: kernels.bollinger(a['close'])),
+    'ADX': (lambda df: _adx_pd(df),
+            lambda a: kernels.adx(a['high'], a['low'], a['close'])),
+    'EMA_200': (lambda df: df['close'].ewm(span=200, adjust=False).mean(),
+                lambda a: kernels.ema(a['close'], 200)),
+    'EMA_25_ADJ': (lambda df: df['close'].ewm(span=25).mean(),
+                   lambda a: kernels.ema(a['close'], 25, ajustada=True)),
+    'MACD': (lambda df: _macd_pd(df),
+             lambda a: kernels.macd(a['close'])),
+}
+
+
+def _generar(n, seed=11):
+    """Random walk geométrico con tramos planos (fuerzan divisiones 0/0 y denominadores 0)."""
+    rng = np.random.default_rng(seed)
+    pasos = rng.normal(0, 0.002, n)
+    pasos[rng.random(n) < 0.05] = 0.0
+    close = 150 * np.exp(np.cumsum(pasos))
+    a, b = n // 2, n // 2 + 40  # Tramo totalmente plano
+    close[a:b] = close[a - 1]
+    high = close + rng.random(n) * 0.5
+    low = close - rng.random(n) * 0.5
+    high[a:b] = low[a:b] = close[a - 1]
+    return pd.DataFrame({'high': high, 'low': low, 'close': close})
+
+
+def _como_tupla(x):
+    return x if isinstance(x, tuple) else (x,)
+
+
+def _iguales(ref, got, ignorar=None):
+    ref = np.asarray(ref, dtype=np.float64)
+    got = np.asarray(got, dtype=np.float64)
+    if ref.shape != got.shape: return False
+    if ignorar is not None:
+        ref, got = ref[~ignorar], got[~ignorar]
+    if not np.array_equal(np.isnan(ref), np.isnan(got)): return False
+    if not np.array_equal(np.isinf(ref), np.isinf(got)): return False
+    finitos = np.isfinite(ref)
+    return np.allclose(ref[finitos], got[finitos], rtol=TOLERANCIA, atol=TOLERANCIA)
+
+
+def _medir(fn, arg):
+    fn(arg)  # Calentamiento (compilación JIT si aplica)
+    tiempos = []
+    for _ in range(REPETICIONES):
+        t0 = time.perf_counter()
+        fn(arg)
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos) * 1000
+
+
+def _ventanas_planas(close, periodo=20):
+    """
+    rolling().std() de pandas es una varianza online (suma/resta) que acumula
+    redondeo: en ventanas planas devuelve ~1e-5 en lugar de 0. El kernel calcula
+    cada ventana en dos pasadas, así que ahí se exige BB_WIDTH ~0 en el kernel.
+    """
+    s = pd.Series(close)
+    return (s.rolling(periodo).max() - s.rolling(periodo).min() == 0).to_numpy()
+
+
+def verificar(df, arrays, modo):
+    fallos = 0
+    planas = _ventanas_planas(arrays['close'])
+    for nombre, (ref_fn, ker_fn) in CASOS.items():
+        refs = [s.to_numpy() for s in _como_tupla(ref_fn(df))]
+        gots = _como_tupla(ker_fn(arrays))
+        ignorar = None
+        if nombre == 'BOLLINGER':
+            ignorar = planas
+            if not np.all(np.abs(gots[3][planas]) < 1e-12): fallos += 1  # width ~0 en tramos planos
+        ok = len(refs) == len(gots) and all(_iguales(r, g, ignorar) for r, g in zip(refs, gots))
+        if not ok: fallos += 1
+        print(f"   {'✅' if ok else '❌'} {nombre:<11} ({modo})")
+    return fallos
+
+
+def ejecutar():
+    print("🧪 KERNELS DE INDICADORES: equivalencia vs pandas + microbenchmark")
+    print(f"   Numba: {'disponible' if kernels.NUMBA_DISPONIBLE else 'no instalado (fallback NumPy)'}\n")
+
+    df = _generar(N_VELAS)
+    arrays = {c: df[c].to_numpy() for c in df.columns}
+    corto = _generar(50)  # Series cortas: bordes de las ventanas
+    arrays_corto = {c: corto[c].to_numpy() for c in corto.columns}
+
+    modos = ['numba', 'numpy'] if kernels.NUMBA_DISPONIBLE else ['numpy']
+    con_numba = kernels.NUMBA_DISPONIBLE
+    fallos = 0
+    tiempos = {}
+    print("1. Equivalencia:")
+    for modo in modos:
+        kernels.NUMBA_DISPONIBLE = (modo == 'numba')
+        fallos += verificar(df, arrays, modo)
+        fallos += verificar(corto, arrays_corto, f"{modo}, n=50")
+        for nombre, (_, ker_fn) in CASOS.items():
+            tiempos[(nombre, modo)] = _medir(ker_fn, arrays)
+    kernels.NUMBA_DISPONIBLE = con_numba
+
+    print(f"\n2. Microbenchmark ({N_VELAS} velas, mejor de {REPETICIONES}, ms):")
+    print(f" {'INDICADOR':<11} │ {'PANDAS':>8} │ " + " │ ".join(f"{m.upper():>8}" for m in modos))
+    print(" " + "─" * (24 + 11 * len(modos)))
+    for nombre, (ref_fn, _) in CASOS.items():
+        t_pd = _medir(ref_fn, df)
+        print(f" {nombre:<11} │ {t_pd:>8.2f} │ " + " │ ".join(f"{tiempos[(nombre, m)]:>8.2f}" for m in modos))
+
+    print(f"\n{'✅ Todos los kernels coinciden con pandas.' if fallos == 0 else f'❌ {fallos} discrepancias.'}")
+    return fallos == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if ejecutar() else 1)
@@ -0,0 +1,155 @@
+import sys
+import os
+import gc
+import time
+import tempfile
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# Ajuste de path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from config.config import Config
+from data.calculator import MetricCalculator
+from data.candle_store import DTYPE_VELA
+from data.metrics_manager import MetricsManager
+
+VENTANA = MetricsManager.VENTANA_1M  # La ventana que usa calcular()
+VELAS_TOTALES = 80000
+CICLOS = 30
+
+
+def _generar_velas(n, seed=7):
+    """Serie 1m sintética (random walk) con la forma del almacén."""
+    rng = np.random.default_rng(seed)
+    close = 200 + np.cumsum(rng.normal(0, 0.3, n))
+    registros = np.empty(n, dtype=DTYPE_VELA)
+    registros['ts'] = 1764906660000 + np.arange(n, dtype=np.int64) * 60000
+    registros['open'] = close + rng.normal(0, 0.1, n)
+    registros['high'] = close + rng.random(n)
+    registros['low'] = close - rng.random(n)
+    registros['close'] = close
+    registros['volume'] = rng.random(n) * 100
+    return registros
+
+
+def _mtf_legado(calc, df_1m):
+    """Réplica del pipeline anterior: read_csv + copy + resample + pandas por temporalidad."""
+    df_1m = df_1m.copy()
+    df_1m['datetime'] = pd.to_datetime(df_1m['ts'], unit='ms')
+    df_1m.set_index('datetime', inplace=True)
+    agg = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+    tfs = {'1m': None, '3m': '3min', '5m': '5min', '15m': '15min', '30m': '30min', '1h': '1h', '4h': '4h', '1d': '1D'}
+    mtf = {}
+    for tf, rule in tfs.items():
+        df_res = df_1m if rule is None else df_1m.resample(rule).agg(agg).dropna()
+        mtf[tf], mtf[f'df_{tf}'] = calc._calcular_indicadores_base(df_res.reset_index())
+    return mtf
+
+
+def _metrics_aislado(carpeta):
+    """MetricsManager real (el del bot en vivo) con sus archivos en 'carpeta', sin red ni stream."""
+    cfg = type('ConfigBenchmark', (Config,), {
+        'BASE_DIR': carpeta, 'LOG_PATH': carpeta, 'MARKET_DATA_MODE': 'REST',
+        'FILE_CANDLES': os.path.join(carpeta, 'candles_1m.bin'),
+        'FILE_METRICS': os.path.join(carpeta, 'metrics_history.csv'),
+    })()
+    return MetricsManager(cfg, None)
+
+
+def ejecutar_modo(modo, carpeta):
+    """
+    Corre ciclos lentos agregando 1 vela por ciclo. Primero mide tiempos (sin trazar)
+    y luego memoria con tracemalloc: retenida y asignación transitoria por ciclo.
+    """
+    registros = _generar_velas(VELAS_TOTALES)
+    base = VELAS_TOTALES - 2 * CICLOS - 1
+    calc = MetricCalculator()
+
+    if modo == 'legado':
+        csv_path = os.path.join(carpeta, 'metrics_history.csv')
+        pd.DataFrame(registros[:base]).to_csv(csv_path, index=False)
+    else:
+        # Mismo camino que el ciclo lento del bot: MetricsManager.calcular() sobre su almacén
+        metrics = _metrics_aislado(carpeta)
+        metrics.store.agregar(registros[:base])
+
+    def ciclo(i):
+        nueva = registros[base + i:base + i + 1]
+        if modo == 'legado':
+            pd.DataFrame(nueva).to_csv(csv_path, mode='a', header=False, index=False)
+            df_full = pd.read_csv(csv_path).astype(float).tail(VENTANA)
+            return _mtf_legado(calc, df_full)
+        metrics.store.agregar(nueva)
+        return metrics.calcular()
+
+    # 1. Arranque (en memmap incluye plegar la historia HTF y sembrar el estado incremental)
+    t0 = time.perf_counter()
+    resultado = ciclo(0)
+    t_arranque = time.perf_counter() - t0
+
+    # 2. Régimen estable: tiempos y colecciones del GC
+    gc.collect()
+    gc_antes = sum(s['collections'] for s in gc.get_stats())
+    tiempos = []
+    for i in range(1, CICLOS + 1):
+        t0 = time.perf_counter()
+        resultado = ciclo(i)
+        tiempos.append(time.perf_counter() - t0)
+    gc_ciclos = sum(s['collections'] for s in gc.get_stats()) - gc_antes
+
+    # 3. Memoria: lo que queda vivo y lo que se asigna/libera en cada ciclo
+    tracemalloc.start()
+    transitorios = []
+    for i in range(CICLOS + 1, 2 * CICLOS + 1):
+        resultado = None
+        antes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        resultado = ciclo(i)
+        _, pico = tracemalloc.get_traced_memory()
+        transitorios.append(pico - antes)
+    retenida, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rss = 0
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB -> MB (Linux)
+    except ImportError:
+        pass
+
+    print(f"{modo},{retenida / 1e6:.1f},{np.mean(transitorios) / 1e6:.1f},{rss:.1f},{gc_ciclos},"
+          f"{t_arranque * 1000:.1f},{np.median(tiempos) * 1000:.1f}")
+
+
+def comparar():
+    print("🧪 BENCHMARK DE MEMORIA: pipeline legado (CSV + copias) vs MetricsManager.calcular() (memmap + ring buffers)")
+    print(f"   Ventana {VENTANA} velas 1m, {CICLOS} ciclos lentos por medición.\n")
+    filas = []
+    for modo in ['legado', 'memmap']:
+        with tempfile.TemporaryDirectory() as carpeta:
+            # Cada modo en su propio proceso para medir el pico de RSS por separado
+            out = subprocess.run([sys.executable, __file__, '--modo', modo, carpeta],
+                                 capture_output=True, text=True)
+            if out.returncode != 0:
+                print(f"❌ Error en modo {modo}:\n{out.stderr}")
+                return
+            filas.append(out.stdout.strip().splitlines()[-1].split(','))
+
+    print(f" {'MODO':<8} │ {'RETENIDA':>9} │ {'ASIG/CICLO':>10} │ {'RSS MAX':>8} │ {'GC':>4} │ {'ARRANQUE':>9} │ {'CICLO':>7}")
+    print(f" {'':<8} │ {'(MB)':>9} │ {'(MB)':>10} │ {'(MB)':>8} │ {'':>4} │ {'(ms)':>9} │ {'(ms)':>7}")
+    print(" " + "─" * 74)
+    for modo, retenida, asig, rss, gc_n, t0, t_med in filas:
+        print(f" {modo:<8} │ {retenida:>9} │ {asig:>10} │ {rss:>8} │ {gc_n:>4} │ {t0:>9} │ {t_med:>7}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == '--modo':
+        ejecutar_modo(sys.argv[2], sys.argv[3])
+    else:
+        comparar()
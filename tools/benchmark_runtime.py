@@ -0,0 +1,90 @@
+import sys
+import os
+import time
+import asyncio
+
+# Ajuste de path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from core.runtime import RuntimeAsincrono
+
+# Demoras simuladas de cada dependencia (segundos)
+DEMORAS = {
+    'precio': 0.05,      # GET ticker
+    'heartbeat': 1.5,    # ping + getMe con Telegram lento
+    'velas': 0.6,        # delta de klines
+    'calculo': 0.01,     # indicadores MTF
+    'contralor': 0.4,    # posiciones + órdenes abiertas
+    'brain': 0.002,
+}
+
+
+class _Cfg:
+    REQUEST_TIMEOUT = 2
+    SYNC_CYCLE_FAST = 0.2
+    SYNC_CYCLE_SLOW = 2
+    HEARTBEAT_CYCLE = 1
+    ENABLE_LIVE_DECISIONS = True
+
+
+class _Vista:
+    empty = False
+
+
+class _Conn:
+    def __init__(self): self.precio = 100.0
+    def get_real_price(self):
+        time.sleep(DEMORAS['precio']); self.precio += 0.01; return self.precio
+    def check_heartbeat(self):
+        time.sleep(DEMORAS['heartbeat']); return {'binance': True, 'telegram': True}
+
+
+class _Metricas:
+    def sincronizar_velas(self): time.sleep(DEMORAS['velas'])
+    def calcular(self):
+        time.sleep(DEMORAS['calculo']); return {'df_1m': _Vista()}, {}
+
+
+class _Contralor:
+    positions = {}
+    def obtener_estado_externo(self): time.sleep(DEMORAS['contralor']); return [], []
+    def aplicar_estado_externo(self, pos, ords): pass
+    def auditar_memoria(self, precio, m1): pass
+
+
+class _Brain:
+    def procesar_mercado(self, mtf, precio): time.sleep(DEMORAS['brain']); return "OK"
+
+
+class _Nulo:
+    def __getattr__(self, nombre): return lambda *a, **k: None
+
+
+def benchmark(segundos=6):
+    print("⏱️  RUNTIME ASÍNCRONO vs BUCLE SERIAL (dependencias simuladas)")
+    rt = RuntimeAsincrono(_Cfg(), _Conn(), _Metricas(), _Contralor(), _Brain(), None,
+                          _Nulo(), _Nulo(), _Nulo())
+    asyncio.run(rt.ejecutar(duracion=segundos))
+
+    r = rt.latencia_decision.resumen()
+    serial_rapido = DEMORAS['precio'] + DEMORAS['heartbeat'] + DEMORAS['brain']
+    serial_lento = serial_rapido + DEMORAS['velas'] + DEMORAS['calculo'] + DEMORAS['contralor']
+    print(f"   Decisiones: {r['n']} en {segundos}s")
+    print(f"   Tick→decisión async : p50 {r['p50']:.0f}ms | p95 {r['p95']:.0f}ms | máx {r['max']:.0f}ms")
+    print(f"   Ciclo serial legado : {serial_rapido * 1000:.0f}ms (rápido) | {serial_lento * 1000:.0f}ms (con sync)")
+    for nombre, medidor in sorted(rt.latencias.items()):
+        m = medidor.resumen()
+        print(f"   - {nombre:<15} n={m['n']:<4} p50 {m['p50']:.0f}ms")
+    if rt.timeouts: print(f"   Saltos por llamada colgada: {rt.timeouts}")
+
+    # La decisión solo depende del precio: acotada por él, no por la suma
+    ok = r['n'] > 0 and r['p95'] / 1000 < DEMORAS['precio'] + DEMORAS['velas']
+    print("✅ Latencia acotada por la entrada más lenta requerida." if ok else "❌ Latencia fuera de cota.")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if benchmark() else 1)
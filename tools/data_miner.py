@@ -11,13 +11,14 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from config.config import Config
+from data import kernels
 from connections.api_manager import APIManager
 from logs.system_logger import SystemLogger
 
 class DataMiner:
-    def __init__(self):
+    def __init__(self, symbol=None):
         print("⛏️  INICIANDO DATA MINER (Modo Integrado)...")
-        self.cfg = Config()
+        self.cfg = Config.para_simbolo(symbol or Config.SYMBOL)()
         self.log = SystemLogger()
         self.conn = APIManager(self.cfg, self.log)
         
@@ -86,45 +87,13 @@ class DataMiner:
         if df.empty: return df
         df = df.copy()
 
-        # Indicadores Base para Brain
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-
-        min_rsi = df['RSI'].rolling(14).min()
-        max_rsi = df['RSI'].rolling(14).max()
-        denom = (max_rsi - min_rsi).replace(0, 1)
-        df['STOCH_RSI'] = (df['RSI'] - min_rsi) / denom * 100
-        
-        sma = df['close'].rolling(20).mean()
-        std = df['close'].rolling(20).std()
-        df['BB_UPPER'] = sma + (std * 2)
-        df['BB_LOWER'] = sma - (std * 2)
-        df['BB_MID'] = sma
-        
-        df['EMA_200'] = df['close'].ewm(span=200, adjust=False).mean()
-        
-        high_diff = df['high'].diff()
-        low_diff = -df['low'].diff()
-        plus_dm = np.where((high_diff > low_diff) & (high_diff > 0), high_diff, 0.0)
-        minus_dm = np.where((low_diff > high_diff) & (low_diff > 0), low_diff, 0.0)
-        
-        tr = pd.concat([
-            df['high'] - df['low'], 
-            (df['high'] - df['close'].shift(1)).abs(), 
-            (df['low'] - df['close'].shift(1)).abs()
-        ], axis=1).max(axis=1)
-        
-        atr = tr.rolling(14).mean()
-        
-        plus_di = 100 * (pd.Series(plus_dm, index=df.index).rolling(14).mean() / atr)
-        minus_di = 100 * (pd.Series(minus_dm, index=df.index).rolling(14).mean() / atr)
-        
-        sum_di = (plus_di + minus_di).replace(0, 1)
-        dx = (abs(plus_di - minus_di) / sum_di) * 100
-        df['ADX'] = dx.rolling(14).mean()
+        # Indicadores Base para Brain (kernels compartidos sobre arrays)
+        high, low, close = df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy()
+        df['RSI'] = kernels.rsi(close)
+        df['STOCH_RSI'] = kernels.stoch_rsi(df['RSI'].to_numpy())
+        df['BB_UPPER'], df['BB_LOWER'], df['BB_MID'], _ = kernels.bollinger(close)
+        df['EMA_200'] = kernels.ema(close, 200)
+        df['ADX'] = kernels.adx(high, low, close)
         
         return df.dropna()
 
@@ -161,6 +130,7 @@ class DataMiner:
         df[final_cols].to_csv(path, index=False)
 
 if __name__ == "__main__":
-    miner = DataMiner()
-    data = miner.descargar_historia_masiva(dias=90)
-    miner.generar_dataset_maestro(data)
\ No newline at end of file
+    for symbol in Config.SYMBOLS:
+        miner = DataMiner(symbol)
+        data = miner.descargar_historia_masiva(dias=90)
+        miner.generar_dataset_maestro(data)
\ No newline at end of file
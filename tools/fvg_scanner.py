@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import os
 import sys
@@ -6,13 +7,15 @@ from datetime import datetime
 # Ajuste para importar config desde la carpeta superior
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from config.config import Config
+from data.fvg_registry import guardar_registro
 
 class FVGScanner:
-    def __init__(self):
+    def __init__(self, symbol=None):
         print("🛰️  INICIANDO RADAR INSTITUCIONAL (FVG SCANNER)...")
-        self.cfg = Config()
+        # Registro FVG por símbolo (el Brain de cada símbolo lee el de su LOG_PATH)
+        self.cfg = Config.para_simbolo(symbol or Config.SYMBOL)()
         self.data_path = 'logs/data_lab'
-        self.output_file = os.path.join('logs', 'bitacoras', 'fvg_registry.csv')
+        self.output_file = os.path.join(self.cfg.LOG_PATH, 'fvg_registry.csv')
 
     def cargar_datos(self, timeframe):
         """Carga el histórico generado por el Data Miner."""
@@ -44,74 +47,50 @@ class FVGScanner:
             print(" Insuficiente data.")
             return []
 
-        count_found = 0
-        
-        # Iterar buscando el patrón
-        # i = Vela 1, i+1 = Vela 2 (Explosión), i+2 = Vela 3
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+
+        # Tríos (i, i+1, i+2) = (Vela 1, Vela 2 de explosión, Vela 3) con arrays desplazados.
         # No analizamos las últimas 2 velas porque el FVG necesita la vela 3 cerrada
-        for i in range(len(df) - 3):
-            c1 = df.iloc[i]
-            c2 = df.iloc[i+1] # La vela del movimiento
-            c3 = df.iloc[i+2]
-            
-            fvg_type = None
-            top = 0.0
-            bottom = 0.0
-            
-            # --- 1. DETECCIÓN MATEMÁTICA ---
-            
-            # FVG ALCISTA (Soporte): Hueco entre High(1) y Low(3)
-            # El precio subió tan rápido que dejó un vacío sin negociar
-            if c3['low'] > c1['high']:
-                gap_size = c3['low'] - c1['high']
-                # Filtro de Calidad: El hueco debe ser > 0.1% del precio (evita ruido)
-                if gap_size > (c2['close'] * 0.001): 
-                    fvg_type = 'LONG' # Zona de Compra
-                    top = c3['low']      # Techo del hueco (Entrada agresiva)
-                    bottom = c1['high']  # Piso del hueco (Stop Loss estructural)
+        m = len(df) - 3
+        h1, l1 = high[:m], low[:m]
+        c2 = close[1:m + 1]
+        h3, l3 = high[2:m + 2], low[2:m + 2]
 
-            # FVG BAJISTA (Resistencia): Hueco entre Low(1) y High(3)
-            # El precio bajó tan rápido que dejó un vacío
-            elif c3['high'] < c1['low']:
-                gap_size = c1['low'] - c3['high']
-                if gap_size > (c2['close'] * 0.001):
-                    fvg_type = 'SHORT' # Zona de Venta
-                    top = c1['low']      # Techo del hueco (Stop Loss estructural)
-                    bottom = c3['high']  # Piso del hueco (Entrada agresiva)
-            
-            # --- 2. VERIFICACIÓN DE MITIGACIÓN (¿Sigue vivo?) ---
-            if fvg_type:
-                mitigado = False
-                # Revisamos el futuro: desde la vela i+3 hasta AHORA
-                future_candles = df.iloc[i+3:]
-                
-                for _, fc in future_candles.iterrows():
-                    # Si el precio toca la zona, se considera mitigado (usado)
-                    if fvg_type == 'LONG':
-                        # El precio baja y toca el techo del FVG
-                        if fc['low'] <= top: 
-                            mitigado = True
-                            break
-                    else: # SHORT
-                        # El precio sube y toca el piso del FVG
-                        if fc['high'] >= bottom:
-                            mitigado = True
-                            break
-                
-                # Si sobrevivió al paso del tiempo, es una joya.
-                if not mitigado:
-                    fvgs.append({
-                        'Symbol': self.cfg.SYMBOL,
-                        'Timeframe': timeframe,
-                        'Type': fvg_type,
-                        'Top': float(f"{top:.2f}"),
-                        'Bottom': float(f"{bottom:.2f}"),
-                        'Created_At': str(c2['datetime']),
-                        'Gap_Size_Pct': float(f"{(abs(top-bottom)/c2['close'])*100:.2f}")
-                    })
-                    count_found += 1
+        # --- 1. DETECCIÓN MATEMÁTICA ---
+        # FVG ALCISTA (Soporte): Hueco entre High(1) y Low(3), > 0.1% del precio (evita ruido)
+        #   Techo = Low(3) (Entrada agresiva) | Piso = High(1) (Stop Loss estructural)
+        es_long = (l3 > h1) & ((l3 - h1) > c2 * 0.001)
+        # FVG BAJISTA (Resistencia): Hueco entre Low(1) y High(3)
+        #   Techo = Low(1) (Stop Loss estructural) | Piso = High(3) (Entrada agresiva)
+        es_short = ~(l3 > h1) & (h3 < l1) & ((l1 - h3) > c2 * 0.001)
+
+        # --- 2. VERIFICACIÓN DE MITIGACIÓN (¿Sigue vivo?) ---
+        # Mínimo/máximo de TODO el futuro (desde la vela i+3 hasta AHORA) en O(1) por zona:
+        # acumulados inversos (fmin/fmax ignoran NaN, como la comparación original)
+        min_futuro = np.fmin.accumulate(low[::-1])[::-1][3:]
+        max_futuro = np.fmax.accumulate(high[::-1])[::-1][3:]
+        # LONG mitigado si el precio bajó a tocar el techo; SHORT si subió a tocar el piso
+        vivos_long = es_long & ~(min_futuro <= l3)
+        vivos_short = es_short & ~(max_futuro >= h3)
 
-        print(f" -> {count_found} Activos.")
+        # Si sobrevivió al paso del tiempo, es una joya.
+        fechas = df['datetime']
+        for i in np.flatnonzero(vivos_long | vivos_short):
+            if vivos_long[i]: fvg_type, top, bottom = 'LONG', l3[i], h1[i]
+            else: fvg_type, top, bottom = 'SHORT', l1[i], h3[i]
+            fvgs.append({
+                'Symbol': self.cfg.SYMBOL,
+                'Timeframe': timeframe,
+                'Type': fvg_type,
+                'Top': float(f"{top:.2f}"),
+                'Bottom': float(f"{bottom:.2f}"),
+                'Created_At': str(fechas.iloc[i + 1]),
+                'Gap_Size_Pct': float(f"{(abs(top-bottom)/c2[i])*100:.2f}")
+            })
+
+        print(f" -> {len(fvgs)} Activos.")
         return fvgs
 
     def ejecutar_barrido(self):
@@ -136,10 +115,8 @@ class FVGScanner:
             # Ordenar: Los más recientes arriba
             df_result = df_result.sort_values('Created_At', ascending=False)
             
-            # Asegurar directorio
-            os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
-            
-            df_result.to_csv(self.output_file, index=False)
+            # Escritura atómica: el Brain en vivo nunca lee un archivo a medias
+            guardar_registro(df_result, self.output_file)
             
             print("\n✅ REGISTRO FVG ACTUALIZADO.")
             print(f"📍 Archivo: {self.output_file}")
@@ -149,5 +126,6 @@ class FVGScanner:
             print("\n⚠️ No se encontraron FVGs activos. El mercado está eficiente (o muy comprimido).")
 
 if __name__ == "__main__":
-    scanner = FVGScanner()
-    scanner.ejecutar_barrido()
\ No newline at end of file
+    for symbol in Config.SYMBOLS:
+        scanner = FVGScanner(symbol)
+        scanner.ejecutar_barrido()
\ No newline at end of file
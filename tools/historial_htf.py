@@ -0,0 +1,106 @@
+import sys
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Ajuste de path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from config.config import Config
+from core import clock
+from connections.exchange_simulator import cargar_velas
+from data import kernels
+from data.candle_store import DTYPE_VELA
+from data.htf_history import HistorialSuperior, TFS_HISTORIA, BARRAS_MINIMAS
+from data.incremental_engine import MotorIncremental
+from data.resampler import AgregadorVelas, PERIODOS_MS
+from tools.offline_exchange import preparar_config, generar_dataset_sintetico
+
+DIAS = 300  # Bastante más historia de la que cubren las 60,000 velas de 1m del almacén
+
+
+class _RelojFijo:
+    def __init__(self, t): self.t = t
+    def time(self): return self.t
+    def sleep(self, segundos): pass
+
+
+def _barras_del_almacen(store):
+    return np.array(store.cola())
+
+
+def verificar():
+    """
+    Arranque del MetricsManager real contra el exchange simulado con ~300 días de
+    velas: 1h/4h/1d se siembran con klines nativas y el plegado de 1m las continúa.
+    """
+    from logs.system_logger import SystemLogger
+    from connections.api_manager import APIManager
+    from data.metrics_manager import MetricsManager
+
+    print(f"🧪 HISTORIA 1h/4h/1d: siembra nativa + plegado de 1m ({DIAS} días simulados)")
+    checks = {}
+    reloj_previo = clock.actual()
+    with tempfile.TemporaryDirectory() as carpeta:
+        dataset = generar_dataset_sintetico(os.path.join(carpeta, 'dataset_1m.bin'), n=DIAS * 1440,
+                                            inicio_ms=1700006400000)  # 00:00 UTC: días completos
+        velas = cargar_velas(dataset)
+        calentamiento = len(velas) - 90
+        cfg = preparar_config(carpeta, dataset)
+        Config.OFFLINE_WARMUP_CANDLES = calentamiento
+        # Reloj en el dataset: el simulador lo sirve sin desfase (buckets alineados)
+        clock.instalar(_RelojFijo(int(velas['ts'][calentamiento]) / 1000 + 30))
+        try:
+            conn = APIManager(cfg, SystemLogger())
+            metrics = MetricsManager(cfg, conn)
+            metrics.sync.sincronizar()
+            mtf, _ = metrics.calcular()
+            print(f"   Velas 1m en el almacén: {len(metrics.store)}")
+
+            for tf in TFS_HISTORIA:
+                periodo = PERIODOS_MS[tf]
+                barras = _barras_del_almacen(metrics.historial.stores[tf])
+                referencia = conn.client._serie(periodo)[0]
+                ref = referencia[np.isin(referencia['ts'], barras['ts'])]
+                print(f"   {tf}: {len(barras)} barras persistidas")
+                checks[f'{tf}: al menos {BARRAS_MINIMAS} barras'] = len(barras) >= BARRAS_MINIMAS
+                checks[f'{tf}: contiguas (nativas + plegadas sin solape)'] = bool(
+                    len(barras) and np.all(np.diff(barras['ts']) == periodo))
+                checks[f'{tf}: OHLCV = agregación del dataset'] = len(ref) == len(barras) and all(
+                    np.allclose(ref[c], barras[c], rtol=1e-12) for c in DTYPE_VELA.names)
+
+                # EMA200 del motor (última barra cerrada) vs la de toda la historia del dataset
+                vista = mtf.get(f'df_{tf}')
+                ts_cerrada = int(barras['ts'][-1])
+                cierres = referencia['close'][referencia['ts'] <= ts_cerrada]
+                esperado = kernels.ema(cierres, 200)[-1]
+                obtenido = float(vista['EMA_200'][np.flatnonzero(vista.ts == ts_cerrada)[0]]) if vista is not None else np.nan
+                checks[f'{tf}: EMA200 = historia completa'] = abs(obtenido - esperado) <= 1e-6 * abs(esperado)
+
+            # Sin conexión: los history_*.csv del Data Miner siembran igual
+            carpeta_csv = os.path.join(carpeta, 'data_lab')
+            os.makedirs(carpeta_csv)
+            for tf in TFS_HISTORIA:
+                pd.DataFrame(conn.client._serie(PERIODOS_MS[tf])[0]).to_csv(
+                    os.path.join(carpeta_csv, f"history_{cfg.SYMBOL}_{tf}.csv"), index=False)
+            agregador = AgregadorVelas(MetricsManager.VENTANA_1M, tfs=TFS_HISTORIA)
+            historial = HistorialSuperior(os.path.join(carpeta, 'sin_conexion'), agregador, MotorIncremental())
+            historial.sembrar(metrics.store, None, cfg.SYMBOL, carpeta_csv)
+            historial.ponerse_al_dia(metrics.store)
+            checks['sin conexión: history_*.csv siembran 1h/4h/1d'] = all(
+                len(historial.stores[tf]) >= BARRAS_MINIMAS for tf in TFS_HISTORIA)
+            conn.salud.detener()
+        finally:
+            clock.instalar(reloj_previo)
+
+    for nombre, ok in checks.items():
+        print(f"   {'✅' if ok else '❌'} {nombre}")
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verificar() else 1)
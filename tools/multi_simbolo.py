@@ -0,0 +1,101 @@
+import sys
+import os
+import time
+import tempfile
+import threading
+
+# Ajuste de path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from config.config import Config
+from core.financials import Financials
+from execution.comptroller import Comptroller
+from logic.shooter import Shooter
+
+SIMBOLOS = ['AAVEUSDT', 'BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'BNBUSDT', 'LINKUSDT']
+PRECIO = 100.0
+
+
+class _OrdenesInstantaneas:
+    """OrderManager sustituto: llena la entrada al precio pedido tras una demora (ventana de carrera)."""
+    def __init__(self, symbol, demora=0.05):
+        self.symbol = symbol
+        self.demora = demora
+
+    def ejecutar_estrategia(self, plan):
+        time.sleep(self.demora)
+        return True, dict(plan, entry_price=PRECIO, status='OPEN', symbol=self.symbol)
+
+
+class _LogMudo:
+    def log_operational(self, mod, msg): pass
+    def log_error(self, mod, msg): pass
+
+
+def _config_mesa(carpeta, symbol):
+    """Config de una mesa con su estado de posiciones aislado en 'carpeta' (escalera de TP del simulador)."""
+    shooter_cfg = type('ShooterConfig', (Config.ShooterConfig,), {
+        'TP_DISTANCES': list(Config.OFFLINE_TP_DISTANCES), 'TP_SPLIT': list(Config.OFFLINE_TP_SPLIT)})
+    return type(f"Config_{symbol}", (Config,), {
+        'SYMBOL': symbol,
+        'MODE': 'SIMULATION',
+        'ShooterConfig': shooter_cfg,
+        'FILE_STATE': os.path.join(carpeta, f'bot_state_{symbol}.json'),
+        'FILE_WALLET': os.path.join(carpeta, 'virtual_wallet.json'),
+    })()
+
+
+def verificar():
+    """N mesas con una billetera compartida: los topes de posiciones y de margen son globales."""
+    print(f"🧪 MULTI-SÍMBOLO: {len(SIMBOLOS)} mesas, una billetera "
+          f"(MAX_OPEN_POSITIONS={Config.MAX_OPEN_POSITIONS}, MAX_TOTAL_EXPOSURE_PCT={Config.MAX_TOTAL_EXPOSURE_PCT:g})")
+    checks = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        cfg = _config_mesa(carpeta, SIMBOLOS[0])
+        fin = Financials(cfg, None)
+        log = _LogMudo()
+        mesas = []
+        for symbol in SIMBOLOS:
+            cfg_mesa = _config_mesa(carpeta, symbol)
+            comp = Comptroller(cfg_mesa, None, fin, log)
+            mesas.append((symbol, comp, Shooter(cfg_mesa, fin, _OrdenesInstantaneas(symbol), comp, log)))
+
+        # 1. Todas las mesas disparan a la vez (cada una un modo distinto libre)
+        resultados = {}
+
+        def _disparar(symbol, shooter, modo):
+            resultados[(symbol, modo)] = shooter.ejecutar_senal({'mode': modo, 'side': 'LONG', 'price': PRECIO})
+
+        hilos = [threading.Thread(target=_disparar, args=(symbol, shooter, modo))
+                 for symbol, _, shooter in mesas for modo in ('TREND_FOLLOWING', 'SNIPER_FVG', 'SCALP_BB')]
+        for h in hilos: h.start()
+        for h in hilos: h.join()
+
+        abiertas, margen = fin.exposicion()
+        tope_margen = fin.obtener_capital_total() * Config.MAX_TOTAL_EXPOSURE_PCT
+        por_mesa = {symbol: len(comp.positions) for symbol, comp, _ in mesas}
+        print(f"   Disparos: {len(hilos)} | Abiertas: {abiertas} {por_mesa} | "
+              f"Margen: {margen:.2f} / {tope_margen:.2f} USDT")
+        rechazos = [r for r in resultados.values() if r.startswith('⛔')]
+        checks['posiciones <= tope global'] = 0 < abiertas <= Config.MAX_OPEN_POSITIONS
+        checks['margen <= tope global'] = margen <= tope_margen + 1e-6
+        checks['resto rechazado'] = len(rechazos) == len(hilos) - abiertas
+        checks['sin reservas colgadas'] = not fin._reservas
+
+        # 2. Al cerrar una posición se libera cupo para cualquier mesa
+        symbol, comp, _ = next(m for m in mesas if m[1].positions)
+        comp.positions.pop(next(iter(comp.positions)))
+        libre = next(m for m in mesas if not m[1].positions)
+        res = libre[2].ejecutar_senal({'mode': 'SCALP_BB', 'side': 'LONG', 'price': PRECIO})
+        checks['cupo liberado al cerrar'] = res.startswith('✅')
+
+    for nombre, ok in checks.items():
+        print(f"   {'✅' if ok else '❌'} {nombre}")
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verificar() else 1)
@@ -0,0 +1,160 @@
+import sys
+import os
+import time
+import tempfile
+import numpy as np
+
+# Ajuste de path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from config.config import Config
+from data.candle_store import AlmacenVelas, DTYPE_VELA
+from connections.exchange_simulator import ExchangeSimulado, cargar_velas
+
+
+def preparar_config(carpeta, dataset):
+    """
+    Pone Config en modo OFFLINE con bitácoras aisladas en 'carpeta' (el almacén
+    de velas en vivo no se mezcla con el replay). Se modifica la clase, así que
+    aplica también a los Config() que instancian main y SystemLogger.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    Config.MODE = 'OFFLINE'
+    Config.MARKET_DATA_MODE = 'REST'
+    Config.TELEGRAM_TOKEN = ''
+    Config.OFFLINE_DATASET = dataset
+    Config.preparar_offline()
+    Config.LOG_PATH = carpeta
+    for nombre, archivo in (('FILE_STATE', 'bot_state.json'), ('FILE_METRICS', 'metrics_history.csv'),
+                            ('FILE_CANDLES', 'candles_1m.bin'), ('FILE_WALLET', 'virtual_wallet.json'),
+                            ('FILE_ORDERS', 'orders_positions.csv'), ('FILE_ERRORS', 'system_errors.csv'),
+                            ('FILE_ACTIVITY', 'bot_activity.log')):
+        setattr(Config, nombre, os.path.join(carpeta, archivo))
+    return Config()
+
+
+def generar_dataset_sintetico(ruta, n=80000, precio=150.0, semilla=7, inicio_ms=1700000040000):
+    """Paseo aleatorio geométrico de velas 1m en un almacén binario."""
+    rng = np.random.default_rng(semilla)
+    cierres = precio * np.exp(np.cumsum(rng.normal(0, 0.0012, n)))
+    aperturas = np.r_[precio, cierres[:-1]]
+    mecha = np.abs(rng.normal(0, 0.0008, n)) * cierres
+    velas = np.zeros(n, dtype=DTYPE_VELA)
+    velas['ts'] = inicio_ms + np.arange(n, dtype=np.int64) * 60000
+    velas['open'], velas['close'] = aperturas, cierres
+    velas['high'] = np.maximum(aperturas, cierres) + mecha
+    velas['low'] = np.minimum(aperturas, cierres) - mecha
+    velas['volume'] = rng.uniform(100, 1000, n)
+    store = AlmacenVelas(ruta)
+    store.vaciar()
+    store.agregar(velas)
+    return ruta
+
+
+class _RelojManual:
+    def __init__(self, t): self.t = t
+    def __call__(self): return self.t
+
+
+def verificar():
+    """Flujo de ejecución real (APIManager + OrderManager + Comptroller) contra el simulador."""
+    from logs.system_logger import SystemLogger
+    from connections.api_manager import APIManager
+    from execution.order_manager import OrderManager
+    from execution.comptroller import Comptroller
+    from core.financials import Financials
+    from logic.shooter import Shooter
+
+    print("🧪 EXCHANGE SIMULADO: ejecución de extremo a extremo sin red")
+    checks = {}
+    # Dataset por defecto (antes de que preparar_config lo reemplace): existe en el repo
+    por_defecto = cargar_velas(Config.OFFLINE_DATASET)
+    checks['dataset por defecto presente (velas de 1m)'] = len(por_defecto) > 0 and set(np.diff(por_defecto['ts'])) == {60000}
+    with tempfile.TemporaryDirectory() as carpeta:
+        dataset = generar_dataset_sintetico(os.path.join(carpeta, 'dataset_1m.bin'), n=3000)
+        cfg = preparar_config(carpeta, dataset)
+        cfg.OFFLINE_WARMUP_CANDLES = 1000
+        log = SystemLogger()
+        conn = APIManager(cfg, log)
+
+        # Reloj manual para avanzar el replay a voluntad
+        reloj = _RelojManual(1800000000.0)
+        conn.client = ExchangeSimulado(cargar_velas(dataset), symbol=cfg.SYMBOL, saldo=1000.0,
+                                       calentamiento=1000, reloj=reloj)
+        ex = conn.client
+        om = OrderManager(cfg, conn, log)
+        comp = Comptroller(cfg, om, Financials(cfg, conn), log)
+        checks['hedge + calibración'] = ex.hedge and om.qty_precision == 1 and om.price_precision == 2
+
+        # 1. Entrada MARKET: precio de ejecución real (no 0)
+        precio = conn.get_real_price()
+        ok, resp = conn.place_market_order('BUY', 'LONG', 1.0)
+        entrada, qty = om._esperar_confirmacion_fill(resp)
+        checks['fill MARKET con precio'] = ok and abs(entrada - precio) < 1e-9 and qty == 1.0
+
+        # 2. SL STOP_MARKET (closePosition) y TP LIMIT por encima
+        ok_sl, resp_sl = conn.place_stop_loss('SELL', 'LONG', om.formatear_precio(entrada * 0.97))
+        tp = om.formatear_precio(entrada * 1.004)
+        tps = om._colocar_take_profits_duros('SELL', 'LONG', qty, [tp], [1.0])
+        checks['SL + TP en el libro'] = ok_sl and len(tps) == 1 and len(ex.futures_get_open_orders(symbol=cfg.SYMBOL)) == 2
+
+        # 3. El replay avanza hasta que algo se ejecute
+        while ex.posiciones['LONG'][0] > 0 and not ex.terminado():
+            reloj.t += 60
+            ex.futures_position_information(symbol=cfg.SYMBOL)
+        cierre = next(o for o in ex.ordenes.values() if o['status'] == 'FILLED' and o['side'] == 'SELL')
+        checks['posición cerrada por TP o SL'] = ex.posiciones['LONG'][0] == 0 and cierre['orderId'] in (tps[0], resp_sl['orderId'])
+        checks['PnL al saldo'] = abs(ex.saldo - 1000.0 - sum(float(t['realizedPnl']) - float(t['commission'])
+                                                             for t in ex.trades)) < 1e-6
+        print(f"   Entrada {entrada:.2f} → salida {float(cierre['avgPrice']):.2f} ({cierre['type']}) | "
+              f"Saldo {ex.saldo:.4f} | Trades {len(ex.trades)}")
+
+        # 4. Contralor: huérfana en el exchange -> adopción + protección restaurada
+        conn.cancel_all_orders()
+        conn.place_market_order('SELL', 'SHORT', 2.0)
+        comp.positions = {}
+        comp.sincronizar_estado_externo()
+        protegida = [o for o in ex.futures_get_open_orders(symbol=cfg.SYMBOL) if o['type'] == 'STOP_MARKET']
+        checks['huérfana adoptada y protegida'] = len(comp.positions) == 1 and len(protegida) == 1
+
+        # 5. Contralor: la posición desaparece -> fantasma limpiado y SL cancelado
+        conn.place_market_order('BUY', 'SHORT', 2.0)
+        comp.sincronizar_estado_externo()
+        checks['fantasma limpiado'] = len(comp.positions) == 0 and not ex.futures_get_open_orders(symbol=cfg.SYMBOL)
+
+        # 6. Errores con códigos de Binance
+        ok_err, msg = conn.place_market_order('SELL', 'LONG', 1.0)
+        checks['rechazo -2022'] = not ok_err and '-2022' in msg
+        checks['cancelación desconocida -2011'] = om.cancelar_orden_por_id(999999) is False
+
+        # 7. Ciclo completo del Shooter: entrada + SL + escalera de TPs (OFFLINE_TP_DISTANCES/SPLIT)
+        shooter = Shooter(cfg, comp.fin, om, comp, log)
+        res = shooter.ejecutar_senal({'mode': 'MANUAL', 'side': 'LONG', 'price': conn.get_real_price()})
+        libro = ex.futures_get_open_orders(symbol=cfg.SYMBOL)
+        checks['Shooter: entrada + SL + 3 TPs'] = (res.startswith('✅') and len(comp.positions) == 1 and
+                                                  sum(o['type'] == 'LIMIT' for o in libro) == 3 and
+                                                  sum(o['type'] == 'STOP_MARKET' for o in libro) == 1)
+        conn.cancel_all_orders()
+
+        # 8. Dataset de config: inexistente -> error claro; corto -> calentamiento acotado
+        cfg.OFFLINE_DATASET = os.path.join(carpeta, 'no_existe.csv')
+        try:
+            ExchangeSimulado.desde_config(cfg)
+            checks['dataset inexistente: error claro'] = False
+        except FileNotFoundError:
+            checks['dataset inexistente: error claro'] = True
+        cfg.OFFLINE_DATASET = dataset
+        cfg.OFFLINE_WARMUP_CANDLES = 60000
+        checks['calentamiento acotado al dataset'] = len(ExchangeSimulado.desde_config(cfg).velas) == 3000
+        conn.salud.detener()
+
+    for nombre, ok in checks.items():
+        print(f"   {'✅' if ok else '❌'} {nombre}")
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verificar() else 1)
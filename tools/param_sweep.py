@@ -0,0 +1,320 @@
+import sys
+import os
+import io
+import json
+import time
+import hashlib
+import argparse
+import itertools
+import contextlib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+# Ajuste de path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from config.config import Config
+from data import feature_cube
+from tools.backtester_v3_pro import BacktesterV3
+from tools.backtester_v4_dynamic import BacktesterV4
+from tools.backtester_v4_unified import BacktesterV4Unified
+
+# --- BACKTESTERS BARRIBLES ---
+# nombre -> (clase, carga del frame MTF, ejecución, PnL por trade, atributo de capital)
+BACKTESTERS = {
+    'v4_unified': (BacktesterV4Unified, 'cargar_datos', 'ejecutar',
+                   lambda bt: [t['PnL'] for t in bt.trades], 'capital'),
+    'v4_dynamic': (BacktesterV4, 'cargar_datos', 'ejecutar',
+                   lambda bt: [t['pnl'] for t in bt.trades], 'capital'),
+    'v3_pro': (BacktesterV3, 'load_data', 'ejecutar_simulacion',
+               lambda bt: [t['pnl_realized'] for t in bt.stats['trades']], 'current_capital'),
+}
+
+
+class FrameCompartido:
+    """
+    FRAME MTF EN MEMORIA COMPARTIDA
+    El proceso principal carga el frame una vez y lo copia a un único bloque con el
+    mismo layout columnar que el cubo MTF en disco (data/feature_cube.py).
+    Los workers lo abren por nombre y arman un DataFrame sobre el bloque sin copiar
+    las columnas numéricas (los backtesters solo leen el frame).
+    """
+    def __init__(self, df):
+        d = feature_cube.describir(df)
+        self.shm = shared_memory.SharedMemory(create=True, size=feature_cube.tamano(d))
+        self.descriptor = dict(d, nombre=self.shm.name)
+        feature_cube.volcar(df, self.shm.buf, d)
+
+    @staticmethod
+    def abrir(descriptor):
+        """(shm, DataFrame) en el worker; mantener shm vivo mientras se use el frame."""
+        shm = shared_memory.SharedMemory(name=descriptor['nombre'])
+        return shm, feature_cube.armar(shm.buf, descriptor)
+
+    def cerrar(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+# --- PARÁMETROS ---
+def _resolver(ruta):
+    """'BrainConfig.ADX_MIN_STRENGTH' / 'ShooterConfig.MODES.SNIPER_FVG.wallet_pct' -> (contenedor, clave)."""
+    partes = ruta.split('.')
+    actual = Config
+    for p in partes[:-1]:
+        actual = actual[p] if isinstance(actual, dict) else getattr(actual, p)
+    clave = partes[-1]
+    if (clave not in actual) if isinstance(actual, dict) else not hasattr(actual, clave):
+        raise KeyError(ruta)
+    return actual, clave
+
+
+def _aplicar_config(params):
+    """Aplica los parámetros de Config; devuelve lo necesario para restaurarlos."""
+    deshacer = []
+    for ruta, valor in params.items():
+        if ruta.startswith('bt.'): continue
+        contenedor, clave = _resolver(ruta)
+        if isinstance(contenedor, dict):
+            deshacer.append((contenedor, clave, contenedor[clave]))
+            contenedor[clave] = valor
+        else:
+            deshacer.append((contenedor, clave, getattr(contenedor, clave)))
+            setattr(contenedor, clave, valor)
+    return deshacer
+
+
+def _restaurar(deshacer):
+    for contenedor, clave, valor in reversed(deshacer):
+        if isinstance(contenedor, dict): contenedor[clave] = valor
+        else: setattr(contenedor, clave, valor)
+
+
+def _valor(texto):
+    try: return json.loads(texto)
+    except ValueError: return texto
+
+
+def parsear_parametro(texto):
+    """'ruta=v1,v2,v3' o 'ruta=inicio:fin:paso' (fin incluido) -> (ruta, [valores])."""
+    ruta, _, valores = texto.partition('=')
+    if not valores: raise ValueError(f"Parámetro sin valores: {texto}")
+    if ':' in valores:
+        inicio, fin, paso = (float(v) for v in valores.split(':'))
+        decimales = max(0, -int(np.floor(np.log10(abs(paso))))) + 2 if paso else 6
+        return ruta.strip(), [round(float(v), decimales) for v in np.arange(inicio, fin + paso / 2, paso)]
+    return ruta.strip(), [_valor(v.strip()) for v in valores.split(',')]
+
+
+def combinaciones(grid):
+    rutas = sorted(grid)
+    return [dict(zip(rutas, valores)) for valores in itertools.product(*(grid[r] for r in rutas))]
+
+
+def id_combinacion(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+
+# --- MÉTRICAS ---
+def metricas(pnls, capital_inicial, capital_final):
+    pnls = np.asarray(pnls, dtype=np.float64)
+    ganadas, perdidas = pnls[pnls > 0], pnls[pnls < 0]
+    curva = capital_inicial + np.concatenate([[0.0], np.cumsum(pnls)])
+    picos = np.maximum.accumulate(curva)
+    drawdown = float(np.max((picos - curva) / picos)) * 100 if len(pnls) else 0.0
+    return {
+        'trades': int(len(pnls)),
+        'win_rate': round(len(ganadas) / len(pnls) * 100, 2) if len(pnls) else 0.0,
+        'pnl_neto': round(capital_final - capital_inicial, 2),
+        'retorno_pct': round((capital_final - capital_inicial) / capital_inicial * 100, 2),
+        'profit_factor': round(float(ganadas.sum() / -perdidas.sum()), 3) if len(perdidas) else (float('inf') if len(ganadas) else 0.0),
+        'max_dd_pct': round(drawdown, 2),
+        'expectativa': round(float(pnls.mean()), 4) if len(pnls) else 0.0,
+    }
+
+
+# --- WORKER ---
+_SHM = None
+_DF = None
+
+
+def _iniciar_worker(descriptor):
+    global _SHM, _DF
+    _SHM, _DF = FrameCompartido.abrir(descriptor)
+
+
+def recortar(df, inicio, fin):
+    """Filas [inicio, fin) como vista del frame (sin recalcular indicadores); índice posicional desde 0."""
+    parte = df.iloc[inicio:fin]
+    return parte if isinstance(parte.index, pd.DatetimeIndex) else parte.reset_index(drop=True)
+
+
+def evaluar(nombre_bt, params, df=None, tramo=None):
+    """
+    Corre una combinación sobre el frame compartido (o 'df') y devuelve sus métricas.
+    'tramo' = (inicio, fin) limita la corrida a esas filas (ventanas walk-forward).
+    """
+    clase, _, metodo, pnls, attr_capital = BACKTESTERS[nombre_bt]
+    df = _DF if df is None else df
+    if tramo is not None: df = recortar(df, *tramo)
+    t0 = time.perf_counter()
+    deshacer = _aplicar_config(params)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            bt = clase()
+            for ruta, valor in params.items():
+                if ruta.startswith('bt.'): setattr(bt, ruta[3:], valor)
+            capital_inicial = getattr(bt, attr_capital)
+            getattr(bt, metodo)(df)
+        resultado = metricas(pnls(bt), capital_inicial, getattr(bt, attr_capital))
+    except Exception as e:
+        resultado = {'error': f"{type(e).__name__}: {e}"}
+    finally:
+        _restaurar(deshacer)
+    resultado['segundos'] = round(time.perf_counter() - t0, 3)
+    return resultado
+
+
+# --- CHECKPOINT ---
+def _leer_checkpoint(ruta):
+    """Resultados ya calculados (id -> fila). Ignora una última línea truncada por un corte."""
+    hechos = {}
+    if not os.path.exists(ruta): return hechos
+    with open(ruta, encoding='utf-8') as f:
+        contenido = f.read()
+    for linea in contenido.splitlines():
+        try: fila = json.loads(linea)
+        except ValueError: continue
+        if 'error' not in fila: hechos[fila['id']] = fila
+    if contenido and not contenido.endswith("\n"):
+        with open(ruta, 'a', encoding='utf-8') as f: f.write("\n")  # cerrar la línea cortada
+    return hechos
+
+
+def validar_grid(nombre_bt, grid):
+    """Comprueba las rutas del grid antes de lanzar nada; devuelve una instancia sonda del backtester."""
+    clase = BACKTESTERS[nombre_bt][0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        sonda = clase()
+    for ruta in grid:
+        if ruta.startswith('bt.'):
+            if not hasattr(sonda, ruta[3:]): raise KeyError(f"{nombre_bt} no tiene el atributo '{ruta[3:]}'")
+        else:
+            _resolver(ruta)
+    return sonda
+
+
+def cargar_frame(nombre_bt, sonda):
+    print("📂 Cargando frame MTF (una sola vez)...")
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = getattr(sonda, BACKTESTERS[nombre_bt][1])()
+    if df is None: print("❌ El backtester no pudo cargar datos.")
+    return df
+
+
+def ejecutar_tareas(nombre_bt, tareas, df, ruta_ckpt, procesos=None):
+    """
+    Corre {id: (params, tramo)} en un pool de procesos sobre 'df' en memoria compartida.
+    Cada resultado se anexa al checkpoint al llegar. Devuelve {id: fila} de las exitosas.
+    """
+    hechos = {}
+    if not tareas: return hechos
+    frame = FrameCompartido(df)
+    procesos = procesos or os.cpu_count() or 1
+    print(f"⚡ {len(tareas)} pendientes en {procesos} procesos | {len(df)} velas en memoria compartida")
+    t0 = time.perf_counter()
+    try:
+        with open(ruta_ckpt, 'a', encoding='utf-8') as ckpt, \
+             ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_worker,
+                                 initargs=(frame.descriptor,)) as pool:
+            futuros = {pool.submit(evaluar, nombre_bt, params, None, tramo): (id_tarea, params, tramo)
+                       for id_tarea, (params, tramo) in tareas.items()}
+            for k, futuro in enumerate(as_completed(futuros), 1):
+                id_tarea, params, tramo = futuros[futuro]
+                fila = {'id': id_tarea, 'params': params, **futuro.result()}
+                if tramo is not None: fila['tramo'] = list(tramo)
+                ckpt.write(json.dumps(fila) + "\n")
+                ckpt.flush()
+                if 'error' not in fila: hechos[id_tarea] = fila
+                else: print(f"\n⚠️ {params}: {fila['error']}")
+                transcurrido = time.perf_counter() - t0
+                eta = transcurrido / k * (len(tareas) - k)
+                print(f"\r   {k}/{len(tareas)} | {transcurrido:.0f}s | ETA {eta:.0f}s", end="", flush=True)
+        print()
+    finally:
+        frame.cerrar()
+    return hechos
+
+
+def barrer(nombre_bt, grid, procesos=None, nombre=None, orden='pnl_neto', reiniciar=False, df=None, carpeta=None):
+    """
+    BARRIDO DE PARÁMETROS
+    Evalúa el producto cartesiano de 'grid' ({ruta: [valores]}) con el backtester
+    'nombre_bt'. Rutas: 'bt.ATRIBUTO' (instancia del backtester) o rutas de Config
+    ('BrainConfig.ADX_MIN_STRENGTH', 'ShooterConfig.MODES.SNIPER_FVG.wallet_pct').
+    Cada resultado se anexa al checkpoint <nombre>.jsonl al terminar; relanzar el
+    mismo barrido retoma las combinaciones pendientes. Escribe <nombre>.csv ordenado.
+    """
+    combos = combinaciones(grid)
+    nombre = nombre or f"sweep_{nombre_bt}_{id_combinacion(grid)}"
+    carpeta = carpeta or os.path.join(Config.BASE_DIR, 'logs', 'sweeps')
+    os.makedirs(carpeta, exist_ok=True)
+    ruta_ckpt = os.path.join(carpeta, f"{nombre}.jsonl")
+    ruta_csv = os.path.join(carpeta, f"{nombre}.csv")
+    if reiniciar and os.path.exists(ruta_ckpt): os.remove(ruta_ckpt)
+
+    sonda = validar_grid(nombre_bt, grid)
+    hechos = _leer_checkpoint(ruta_ckpt)
+    pendientes = {id_combinacion(p): (p, None) for p in combos if id_combinacion(p) not in hechos}
+    print(f"🧮 Barrido {nombre}: {len(combos)} combinaciones | {len(combos) - len(pendientes)} en checkpoint")
+
+    if pendientes:
+        if df is None: df = cargar_frame(nombre_bt, sonda)
+        if df is None: return None
+        hechos.update(ejecutar_tareas(nombre_bt, pendientes, df, ruta_ckpt, procesos))
+
+    # Tabla ordenada (solo las combinaciones de este grid)
+    filas = []
+    for p in combos:
+        fila = hechos.get(id_combinacion(p))
+        if fila: filas.append({**p, **{k: v for k, v in fila.items() if k not in ('id', 'params')}})
+    if not filas:
+        print("⚠️ Sin resultados.")
+        return None
+    tabla = pd.DataFrame(filas).sort_values(orden, ascending=(orden == 'max_dd_pct'), kind='stable')
+    tabla.insert(0, 'rank', range(1, len(tabla) + 1))
+    tabla.to_csv(ruta_csv, index=False)
+    print(f"✅ Ranking ({orden}) guardado en {ruta_csv}")
+    print(tabla.head(10).to_string(index=False))
+    return tabla
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Barrido de parámetros de los backtesters en paralelo")
+    parser.add_argument('--bt', choices=sorted(BACKTESTERS), default='v4_unified')
+    parser.add_argument('-p', '--param', action='append', default=[],
+                        help="ruta=v1,v2,... o ruta=inicio:fin:paso (ej: bt.SNIPER_SL_PCT=0.015:0.04:0.005)")
+    parser.add_argument('--grid', help="JSON {ruta: [valores]} (se combina con --param)")
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--nombre', default=None, help="Nombre del barrido (checkpoint y CSV)")
+    parser.add_argument('--orden', default='pnl_neto',
+                        choices=['pnl_neto', 'retorno_pct', 'profit_factor', 'win_rate', 'expectativa', 'max_dd_pct'])
+    parser.add_argument('--reiniciar', action='store_true', help="Descarta el checkpoint existente")
+    args = parser.parse_args()
+
+    grid = {}
+    if args.grid:
+        with open(args.grid, encoding='utf-8') as f:
+            grid.update(json.load(f))
+    for texto in args.param:
+        ruta, valores = parsear_parametro(texto)
+        grid[ruta] = valores
+    if not grid:
+        print("❌ Grid vacío (usa --param o --grid)")
+        sys.exit(1)
+    sys.exit(0 if barrer(args.bt, grid, args.procesos, args.nombre, args.orden, args.reiniciar) is not None else 1)
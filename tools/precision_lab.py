@@ -1,28 +1,53 @@
 import pandas as pd
 import numpy as np
+from collections import deque
+from data import kernels
 
 class PrecisionLab:
     """
     LABORATORIO DE PRECISIÓN (TOOLKIT ATÓMICO V3.2)
     Funciones independientes para disecar indicadores específicos.
     Incluye: RSI, ADX, StochRSI, MACD, Bollinger, EMAs (con Cruce) y Divergencias.
+    Acepta DataFrames o VistaIndicadores (columnas como arrays, sin copias).
     """
 
     # --- UTILITARIOS ---
+    @staticmethod
+    def serie(df, col):
+        """Columna como array float64 (DataFrame o VistaIndicadores)."""
+        return np.asarray(df[col], dtype=np.float64)
+
+    @staticmethod
+    def ultimo(df, col, default=0.0):
+        """Último valor de una columna (default si no existe)."""
+        if col not in df.columns or len(df) == 0: return default
+        return float(PrecisionLab.serie(df, col)[-1])
+
     @staticmethod
     def _calcular_pendiente(serie, rango=3):
         """Calcula velocidad de cambio (Positivo=Sube, Negativo=Baja)."""
+        serie = np.asarray(serie, dtype=np.float64)
         if len(serie) < rango: return 0.0
-        inicial = serie.iloc[-rango]
-        final = serie.iloc[-1]
-        return (final - inicial) / rango
+        inicial = serie[-rango]
+        final = serie[-1]
+        return float((final - inicial) / rango)
+
+    @staticmethod
+    def _max_sin_nan(arr):
+        validos = arr[arr == arr]
+        return validos.max() if len(validos) else np.nan
+
+    @staticmethod
+    def _min_sin_nan(arr):
+        validos = arr[arr == arr]
+        return validos.min() if len(validos) else np.nan
 
     # --- 1. RSI (Fuerza Relativa) ---
     @staticmethod
     def analizar_rsi(df, rango=3):
         if 'RSI' not in df.columns: return {'valor': 50, 'estado': 'NEUTRAL', 'pendiente': 0, 'direccion': 'NEUTRAL'}
-        val = df.iloc[-1]['RSI']
-        pendiente = PrecisionLab._calcular_pendiente(df['RSI'], rango)
+        val = PrecisionLab.ultimo(df, 'RSI')
+        pendiente = PrecisionLab._calcular_pendiente(PrecisionLab.serie(df, 'RSI'), rango)
         
         estado = 'NEUTRAL'
         if val > 70: estado = 'SOBRECOMPRA'
@@ -40,8 +65,8 @@ class PrecisionLab:
     @staticmethod
     def analizar_adx(df, rango=3):
         if 'ADX' not in df.columns: return {'valor': 0, 'fuerza': 'NEUTRAL', 'evolucion': 'NEUTRAL'}
-        val = df.iloc[-1]['ADX']
-        pendiente = PrecisionLab._calcular_pendiente(df['ADX'], rango)
+        val = PrecisionLab.ultimo(df, 'ADX')
+        pendiente = PrecisionLab._calcular_pendiente(PrecisionLab.serie(df, 'ADX'), rango)
         
         return {
             'tipo': 'ADX',
@@ -57,8 +82,8 @@ class PrecisionLab:
         if 'STOCH_RSI' not in df.columns: 
             return {'valor': 50, 'zona': 'NEUTRAL', 'posible_giro': False}
             
-        val = df.iloc[-1]['STOCH_RSI']
-        pendiente = PrecisionLab._calcular_pendiente(df['STOCH_RSI'], rango)
+        val = PrecisionLab.ultimo(df, 'STOCH_RSI')
+        pendiente = PrecisionLab._calcular_pendiente(PrecisionLab.serie(df, 'STOCH_RSI'), rango)
         
         zona = 'NEUTRAL'
         if val > 80: zona = 'TECHO'
@@ -80,16 +105,12 @@ class PrecisionLab:
     @staticmethod
     def analizar_macd(df):
         if 'MACD_HIST' not in df.columns:
-            k = df['close'].ewm(span=12, adjust=False).mean()
-            d = df['close'].ewm(span=26, adjust=False).mean()
-            dif = k - d
-            dea = dif.ewm(span=9, adjust=False).mean()
-            hist = dif - dea
+            _, _, hist = kernels.macd(PrecisionLab.serie(df, 'close'))
         else:
-            hist = df['MACD_HIST']
+            hist = PrecisionLab.serie(df, 'MACD_HIST')
 
-        val_hist = hist.iloc[-1]
-        prev_hist = hist.iloc[-2] if len(hist) > 1 else 0
+        val_hist = float(hist[-1])
+        prev_hist = float(hist[-2]) if len(hist) > 1 else 0
         
         return {
             'tipo': 'MACD',
@@ -102,9 +123,9 @@ class PrecisionLab:
     @staticmethod
     def analizar_bb(df):
         if 'BB_UPPER' not in df.columns: return {'ubicacion': 'DENTRO', 'rango_precio': 0}
-        price = df.iloc[-1]['close']
-        up = df.iloc[-1]['BB_UPPER']
-        low = df.iloc[-1]['BB_LOWER']
+        price = PrecisionLab.ultimo(df, 'close')
+        up = PrecisionLab.ultimo(df, 'BB_UPPER')
+        low = PrecisionLab.ultimo(df, 'BB_LOWER')
         
         pos = 'DENTRO'
         if price >= up: pos = 'ROMPIENDO_ARRIBA'
@@ -123,26 +144,26 @@ class PrecisionLab:
         # Calcular si no existen
         if rapida not in df.columns:
             span = int(rapida.split('_')[1])
-            serie_rapida = df['close'].ewm(span=span, adjust=False).mean()
+            serie_rapida = kernels.ema(PrecisionLab.serie(df, 'close'), span)
         else:
-            serie_rapida = df[rapida]
+            serie_rapida = PrecisionLab.serie(df, rapida)
             
         if lenta not in df.columns:
             span = int(lenta.split('_')[1])
-            serie_lenta = df['close'].ewm(span=span, adjust=False).mean()
+            serie_lenta = kernels.ema(PrecisionLab.serie(df, 'close'), span)
         else:
-            serie_lenta = df[lenta]
+            serie_lenta = PrecisionLab.serie(df, lenta)
         
         if len(serie_rapida) < 2 or len(serie_lenta) < 2:
              return {'indicador': 'EMAS', 'estado': 'NEUTRO', 'spread': 0, 'cruce': False}
 
         # Valores actuales
-        val_r = serie_rapida.iloc[-1]
-        val_l = serie_lenta.iloc[-1]
+        val_r = float(serie_rapida[-1])
+        val_l = float(serie_lenta[-1])
         
         # Valores previos (para detectar cruce)
-        prev_r = serie_rapida.iloc[-2]
-        prev_l = serie_lenta.iloc[-2]
+        prev_r = serie_rapida[-2]
+        prev_l = serie_lenta[-2]
         
         estado_actual = 'ALCISTA' if val_r > val_l else 'BAJISTA'
         estado_previo = 'ALCISTA' if prev_r > prev_l else 'BAJISTA'
@@ -162,18 +183,17 @@ class PrecisionLab:
     def detectar_divergencia(df, ventana=10):
         if len(df) < ventana or 'RSI' not in df.columns: return None
         
-        subset = df.tail(ventana)
-        curr_high = subset.iloc[-1]['high']
-        curr_low = subset.iloc[-1]['low']
-        curr_rsi = subset.iloc[-1]['RSI']
+        highs = PrecisionLab.serie(df, 'high')[-ventana:]
+        lows = PrecisionLab.serie(df, 'low')[-ventana:]
+        rsis = PrecisionLab.serie(df, 'RSI')[-ventana:]
+        curr_high, curr_low, curr_rsi = highs[-1], lows[-1], rsis[-1]
         
-        prev_subset = subset.iloc[:-1]
-        if prev_subset.empty: return None
+        if ventana < 2: return None
         
-        max_price_prev = prev_subset['high'].max()
-        min_price_prev = prev_subset['low'].min()
-        max_rsi_prev = prev_subset['RSI'].max()
-        min_rsi_prev = prev_subset['RSI'].min()
+        max_price_prev = PrecisionLab._max_sin_nan(highs[:-1])
+        min_price_prev = PrecisionLab._min_sin_nan(lows[:-1])
+        max_rsi_prev = PrecisionLab._max_sin_nan(rsis[:-1])
+        min_rsi_prev = PrecisionLab._min_sin_nan(rsis[:-1])
         
         if curr_high >= max_price_prev and curr_rsi < max_rsi_prev * 0.98:
             return 'BEARISH_DIV'
@@ -181,4 +201,95 @@ class PrecisionLab:
         if curr_low <= min_price_prev and curr_rsi > min_rsi_prev * 1.02:
             return 'BULLISH_DIV'
             
-        return None
\ No newline at end of file
+        return None
+
+
+class _ExtremoMovil:
+    """Máximo (o mínimo) de una ventana deslizante con deque monotónica; ignora NaN."""
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self.dq = deque()  # (índice, valor), valores monótonos desde el frente
+
+    def agregar(self, i, valor):
+        if valor != valor: return
+        dq = self.dq
+        if self.maximo:
+            while dq and dq[-1][1] <= valor: dq.pop()
+        else:
+            while dq and dq[-1][1] >= valor: dq.pop()
+        dq.append((i, valor))
+
+    def valor(self, desde):
+        """Extremo de los índices >= desde (NaN si la ventana no tiene valores)."""
+        dq = self.dq
+        while dq and dq[0][0] < desde: dq.popleft()
+        return dq[0][1] if dq else np.nan
+
+
+class DetectorDivergencia:
+    """
+    DIVERGENCIAS EN STREAMING
+    Misma regla que PrecisionLab.detectar_divergencia (vela actual contra las
+    'ventana - 1' anteriores, factores 0.98/1.02 sobre el RSI), pero los extremos
+    de precio y RSI de las velas anteriores viven en deques monotónicas: cada
+    vela nueva se agrega una vez y cada consulta es O(1) amortizado.
+    La última fila de la serie es la vela actual (puede seguir en formación);
+    solo las anteriores entran a la ventana.
+    """
+    def __init__(self, ventana=10):
+        self.ventana = ventana
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.n = 0              # Velas agregadas a la ventana
+        self.ultimo_ts = None   # ts de la última vela agregada
+        self.max_high = _ExtremoMovil(True)
+        self.min_low = _ExtremoMovil(False)
+        self.max_rsi = _ExtremoMovil(True)
+        self.min_rsi = _ExtremoMovil(False)
+
+    def agregar(self, high, low, rsi):
+        """Empuja una vela ya cerrada a la ventana de velas anteriores."""
+        i = self.n
+        self.max_high.agregar(i, high)
+        self.min_low.agregar(i, low)
+        self.max_rsi.agregar(i, rsi)
+        self.min_rsi.agregar(i, rsi)
+        self.n += 1
+
+    def evaluar(self, curr_high, curr_low, curr_rsi):
+        """Divergencia de la vela actual contra las 'ventana - 1' velas agregadas más recientes."""
+        desde = self.n - (self.ventana - 1)
+        if curr_high >= self.max_high.valor(desde) and curr_rsi < self.max_rsi.valor(desde) * 0.98:
+            return 'BEARISH_DIV'
+        if curr_low <= self.min_low.valor(desde) and curr_rsi > self.min_rsi.valor(desde) * 1.02:
+            return 'BULLISH_DIV'
+        return None
+
+    def _sincronizar(self, ts, highs, lows, rsis):
+        """Agrega las filas nuevas anteriores a la última (ts ordenados)."""
+        actual = len(ts) - 1
+        inicio = max(0, actual - (self.ventana - 1))
+        if self.ultimo_ts is not None:
+            k = int(np.searchsorted(ts, self.ultimo_ts, side='right'))
+            if k == 0 or ts[k - 1] != self.ultimo_ts or k > actual:
+                self.reiniciar()  # La serie se regeneró o retrocedió
+            else:
+                inicio = max(inicio, k)
+        for j in range(inicio, actual):
+            self.agregar(float(highs[j]), float(lows[j]), float(rsis[j]))
+        if actual > 0 and inicio < actual: self.ultimo_ts = ts[actual - 1]
+
+    def detectar(self, df):
+        """Equivalente en streaming de PrecisionLab.detectar_divergencia(df, self.ventana)."""
+        if len(df) < self.ventana or 'RSI' not in df.columns: return None
+        if self.ventana < 2: return None
+        ts = getattr(df, 'ts', None)
+        if ts is None: return PrecisionLab.detectar_divergencia(df, self.ventana)
+
+        ts = np.asarray(ts)
+        highs = PrecisionLab.serie(df, 'high')
+        lows = PrecisionLab.serie(df, 'low')
+        rsis = PrecisionLab.serie(df, 'RSI')
+        self._sincronizar(ts, highs, lows, rsis)
+        return self.evaluar(highs[-1], lows[-1], rsis[-1])
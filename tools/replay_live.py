@@ -0,0 +1,97 @@
+import sys
+import os
+import time
+import threading
+import _thread
+import argparse
+
+# Ajuste de path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from config.config import Config
+from core import clock
+from core.clock import RelojAcelerado
+from connections.exchange_simulator import cargar_velas
+from tools.offline_exchange import preparar_config, generar_dataset_sintetico
+
+
+def replay(dataset, velocidad=100, calentamiento=60000, carpeta=None, minutos=None, silencioso=True, decisiones=True):
+    """
+    REPLAY ACELERADO DEL BOT COMPLETO
+    Corre core.main.main() tal cual (runtime, Brain, Shooter, OrderManager,
+    Comptroller) contra el exchange simulado, con el reloj global acelerado
+    'velocidad' veces. Termina al agotar el dataset (o tras 'minutos' simulados)
+    y resume velocidad lograda y coste de CPU por tick.
+    'decisiones' activa la ruta de decisión (ENABLE_LIVE_DECISIONS) contra el simulado.
+    """
+    carpeta = carpeta or os.path.join(Config.BASE_DIR, 'logs', 'replay')
+    preparar_config(carpeta, dataset)
+    velas = cargar_velas(dataset)
+    # Mismo acotado que ExchangeSimulado.desde_config (el reloj arranca donde él)
+    if len(velas) <= calentamiento: calentamiento = len(velas) // 2
+    Config.OFFLINE_WARMUP_CANDLES = calentamiento
+    Config.ENABLE_LIVE_DECISIONS = decisiones
+
+    inicio = int(velas['ts'][calentamiento]) / 1000
+    fin = (int(velas['ts'][-1]) + 60000) / 1000
+    if minutos: fin = min(fin, inicio + minutos * 60)
+
+    if silencioso:
+        # Sin limpiar la consola en cada render (a 1000x saturaría la terminal)
+        from interfaces.dashboard import Dashboard
+        Dashboard.render = lambda self, *a, **k: None
+
+    print(f"⏩ Replay {os.path.basename(dataset)} a {velocidad:g}x | {(fin - inicio) / 3600:.1f} h simuladas")
+    clock.instalar(RelojAcelerado(inicio, velocidad))
+
+    def _vigilar():
+        while clock.time() < fin: time.sleep(0.05)
+        _thread.interrupt_main()  # main() lo trata como Ctrl+C: apagado ordenado
+    threading.Thread(target=_vigilar, daemon=True).start()
+
+    from core.main import main
+    cpu0, real0 = time.process_time(), time.monotonic()
+    codigo = 0
+    try:
+        main()
+    except SystemExit as e:
+        codigo = e.code or 0
+        print(f"⚠️  main() terminó con SystemExit({codigo}) (protocolo de emergencia)")
+    cpu, real = time.process_time() - cpu0, time.monotonic() - real0
+    simulado = min(clock.time(), fin) - inicio
+
+    ticks = max(1, simulado / Config.SYNC_CYCLE_FAST)
+    print("\n📊 RESUMEN DEL REPLAY")
+    print(f"   Simulado: {simulado / 3600:.2f} h en {real:.1f} s reales -> {simulado / max(real, 1e-9):.0f}x logrado")
+    print(f"   CPU: {cpu:.1f} s | {cpu / ticks * 1000:.2f} ms por tick de {Config.SYNC_CYCLE_FAST}s")
+    actividad = Config.FILE_ACTIVITY
+    if os.path.exists(actividad):
+        with open(actividad, encoding='utf-8') as f:
+            runtime = [l.strip() for l in f if 'RUNTIME' in l]
+        if runtime: print(f"   Último reporte: {runtime[-1]}")
+    print(f"   Bitácoras: {carpeta}")
+    return codigo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay acelerado de core.main.main() sin red")
+    parser.add_argument('--dataset', default=Config.OFFLINE_DATASET, help="Velas 1m (.bin o CSV)")
+    parser.add_argument('--velocidad', type=float, default=100)
+    parser.add_argument('--calentamiento', type=int, default=60000)
+    parser.add_argument('--minutos', type=float, default=None, help="Minutos simulados a reproducir")
+    parser.add_argument('--sintetico', action='store_true', help="Genera un dataset sintético si falta")
+    parser.add_argument('--ver', action='store_true', help="Mostrar el dashboard")
+    parser.add_argument('--sin-decisiones', action='store_true', help="Sin Brain/Shooter (solo datos y render)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.dataset):
+        if not args.sintetico:
+            print(f"❌ No existe {args.dataset} (usa --sintetico o --dataset)")
+            sys.exit(1)
+        args.dataset = generar_dataset_sintetico(os.path.join(project_root, 'logs', 'replay', 'sintetico_1m.bin'),
+                                                 n=args.calentamiento + 20000)
+    sys.exit(replay(args.dataset, args.velocidad, args.calentamiento, minutos=args.minutos, silencioso=not args.ver,
+                    decisiones=not args.sin_decisiones))
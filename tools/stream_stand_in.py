@@ -0,0 +1,226 @@
+import sys
+import os
+import json
+import math
+import time
+import asyncio
+import tempfile
+import threading
+
+# Ajuste de path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from connections.market_stream import StreamMercado, WEBSOCKETS_DISPONIBLE
+from data.candle_store import AlmacenVelas
+from data.kline_sync import SincronizadorVelas
+
+if WEBSOCKETS_DISPONIBLE:
+    import websockets
+
+T0 = 1700000040000  # Alineado al minuto
+INTERVALO_MS = 60000
+
+
+def vela_final(m):
+    """Vela 1m determinista del minuto m (la misma para el stream y para el 'REST')."""
+    o = 100 + 5 * math.sin(m / 7)
+    c = 100 + 5 * math.sin((m + 1) / 7)
+    return [T0 + m * INTERVALO_MS, o, max(o, c) + 0.5, min(o, c) - 0.5, c, 10.0 + m % 5]
+
+
+class ServidorStreamLocal:
+    """
+    SERVIDOR WEBSOCKET LOCAL (SUSTITUTO DE BINANCE FUTURES)
+    Emite mensajes de stream combinado (kline_1m, markPriceUpdate, bookTicker)
+    con un reloj acelerado: cada vela de 1m dura 'seg_por_vela' segundos reales.
+    'cortar_cada' cierra la conexión tras N mensajes para ejercitar la reconexión;
+    el 'mercado' sigue avanzando mientras el cliente está desconectado.
+    'perder' (minutos) no emite sus klines con la conexión viva: un mensaje
+    perdido que deja un hueco sin reconexión.
+    """
+    def __init__(self, host='127.0.0.1', port=8765, symbol='AAVEUSDT',
+                 seg_por_vela=0.5, seg_por_mensaje=0.05, cortar_cada=None, perder=()):
+        self.host, self.port = host, port
+        self.symbol = symbol.lower()
+        self.seg_por_vela = seg_por_vela
+        self.seg_por_mensaje = seg_por_mensaje
+        self.cortar_cada = cortar_cada
+        self.perder = set(perder)
+        self.inicio = time.time()
+        self.conexiones = 0
+        self.ultimo_precio = None
+        self._loop = None
+        self._servidor = None
+
+    # --- RELOJ SIMULADO ---
+    def ahora_ms(self):
+        return T0 + (time.time() - self.inicio) / self.seg_por_vela * INTERVALO_MS
+
+    def minuto_actual(self):
+        return int((self.ahora_ms() - T0) // INTERVALO_MS)
+
+    def kline_parcial(self, m):
+        """Vela m en formación: el cierre avanza hacia el final según el tiempo transcurrido."""
+        ts, o, h, l, c, v = vela_final(m)
+        f = min(1.0, (self.ahora_ms() - ts) / INTERVALO_MS)
+        c_parcial = o + (c - o) * f
+        return ts, o, max(o, c_parcial) + 0.5 * f, min(o, c_parcial) - 0.5 * f, c_parcial, v * f
+
+    # --- 'REST' (para el relleno tras reconexión) ---
+    def get_historical_candles(self, symbol, interval, limit=100, start_time=None, end_time=None, strict=False):
+        actual = self.minuto_actual()
+        m0 = int((start_time - T0) // INTERVALO_MS)
+        m1 = min(actual, int((end_time - T0) // INTERVALO_MS), m0 + limit - 1)
+        velas = []
+        for m in range(max(0, m0), m1 + 1):
+            fila = vela_final(m) if m < actual else list(self.kline_parcial(m))
+            velas.append([fila[0]] + [str(x) for x in fila[1:]] + [fila[0] + INTERVALO_MS - 1])
+        return velas
+
+    # --- WEBSOCKET ---
+    async def _handler(self, ws, *args):
+        self.conexiones += 1
+        enviados = 0
+        previo = self.minuto_actual()
+        try:
+            while True:
+                m = self.minuto_actual()
+                if m != previo:
+                    # Cierre de la vela anterior (x=true) con sus valores finales
+                    if previo not in self.perder:
+                        await ws.send(self._msg_kline(vela_final(previo), True))
+                    previo = m
+                fila = self.kline_parcial(m)
+                self.ultimo_precio = fila[4]
+                if m not in self.perder:
+                    await ws.send(self._msg_kline(fila, False))
+                await ws.send(json.dumps({'stream': f"{self.symbol}@markPrice@1s", 'data': {
+                    'e': 'markPriceUpdate', 's': self.symbol.upper(), 'p': f"{fila[4] + 0.01:.8f}"}}))
+                await ws.send(json.dumps({'stream': f"{self.symbol}@bookTicker", 'data': {
+                    'e': 'bookTicker', 's': self.symbol.upper(),
+                    'b': f"{fila[4] - 0.01:.8f}", 'B': '5', 'a': f"{fila[4] + 0.01:.8f}", 'A': '5'}}))
+                enviados += 1
+                if self.cortar_cada and enviados >= self.cortar_cada:
+                    await ws.close()
+                    return
+                await asyncio.sleep(self.seg_por_mensaje)
+        except Exception:
+            return
+
+    def _msg_kline(self, fila, cerrada):
+        ts, o, h, l, c, v = fila
+        return json.dumps({'stream': f"{self.symbol}@kline_1m", 'data': {
+            'e': 'kline', 's': self.symbol.upper(), 'k': {
+                't': int(ts), 'T': int(ts) + INTERVALO_MS - 1, 'i': '1m',
+                'o': f"{o:.8f}", 'h': f"{h:.8f}", 'l': f"{l:.8f}", 'c': f"{c:.8f}",
+                'v': f"{v:.8f}", 'x': cerrada}}})
+
+    async def _servir(self, listo):
+        self._servidor = await websockets.serve(self._handler, self.host, self.port)
+        listo.set()
+        await self._servidor.wait_closed()
+
+    def iniciar(self):
+        """Levanta el servidor en un hilo propio y espera a que acepte conexiones."""
+        listo = threading.Event()
+
+        def _correr():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._servir(listo))
+
+        threading.Thread(target=_correr, daemon=True).start()
+        listo.wait(5)
+        return f"ws://{self.host}:{self.port}"
+
+    def detener(self):
+        if self._loop and self._servidor:
+            self._loop.call_soon_threadsafe(self._servidor.close)
+
+
+def _verificar_mensajes_perdidos(segundos=5):
+    """
+    Klines perdidas con la conexión viva: sin reconexión no hay relleno REST, solo
+    el escaneo periódico de huecos (SincronizadorVelas.revisar_huecos, lo que
+    MetricsManager corre en modo stream) las recupera.
+    """
+    servidor = ServidorStreamLocal(port=8766, perder={3, 4})
+    url = servidor.iniciar()
+    with tempfile.TemporaryDirectory() as carpeta:
+        store = AlmacenVelas(os.path.join(carpeta, 'candles_1m.bin'))
+        sync = SincronizadorVelas(servidor, store, 'AAVEUSDT', historia_inicial=2,
+                                  reloj=lambda: servidor.ahora_ms() / 1000)
+        sync.REVISION_HUECOS_SEG = 60  # Un escaneo por minuto simulado
+        stream = StreamMercado(url, 'AAVEUSDT', store, al_reconectar=sync.sincronizar)
+        stream.iniciar()
+        visto_hueco = False
+        fin = time.time() + segundos
+        while time.time() < fin:
+            visto_hueco |= len(sync.detectar_huecos()) > 0
+            sync.revisar_huecos()
+            time.sleep(0.1)
+        stream.detener()
+        servidor.detener()
+        ts = store.cola()['ts']
+        return {
+            'mensajes perdidos dejaron hueco': visto_hueco,
+            'hueco rellenado sin reconexión': stream.reconexiones == 0 and len(sync.detectar_huecos()) == 0 and len(ts) > 5,
+        }
+
+
+def verificar(segundos=8):
+    """Stream real contra el servidor local: precio en memoria, velas sin huecos ni duplicados."""
+    print("🧪 STREAM DE MERCADO contra servidor WebSocket local")
+    if not WEBSOCKETS_DISPONIBLE:
+        print("❌ Falta el paquete 'websockets'.")
+        return False
+
+    servidor = ServidorStreamLocal(cortar_cada=40)
+    url = servidor.iniciar()
+    with tempfile.TemporaryDirectory() as carpeta:
+        store = AlmacenVelas(os.path.join(carpeta, 'candles_1m.bin'))
+        sync = SincronizadorVelas(servidor, store, 'AAVEUSDT', historia_inicial=5,
+                                  reloj=lambda: servidor.ahora_ms() / 1000)
+        sync.REVISION_HUECOS_SEG = 0  # Revisar huecos en cada reconexión
+        stream = StreamMercado(url, 'AAVEUSDT', store, al_reconectar=sync.sincronizar)
+        stream.BACKOFF_INICIAL = 0.5  # Corte más largo que una vela: fuerza relleno REST
+        stream.iniciar()
+        time.sleep(segundos)
+        stream.detener()
+        servidor.detener()
+
+        registros = store.cola()
+        ts = registros['ts']
+        cerradas = registros[:-1]
+        esperadas = [vela_final(int((t - T0) // INTERVALO_MS)) for t in cerradas['ts']]
+        valores_ok = all(abs(r['close'] - e[4]) < 1e-6 and abs(r['high'] - e[2]) < 1e-6
+                         for r, e in zip(cerradas, esperadas))
+        checks = {
+            'precio en memoria': stream.precio is not None and abs(stream.precio - servidor.ultimo_precio) < 1.0,
+            'mark/bid/ask': None not in (stream.precio_marca, stream.bid, stream.ask),
+            'reconexiones': stream.reconexiones > 0,
+            'sin huecos': len(sync.detectar_huecos()) == 0 and len(ts) > 5,
+            'sin duplicados': len(set(ts.tolist())) == len(ts),
+            'velas cerradas correctas': valores_ok,
+        }
+        checks.update(_verificar_mensajes_perdidos())
+        print(f"   Conexiones: {servidor.conexiones} | Reconexiones: {stream.reconexiones} | "
+              f"Velas en almacén: {len(ts)} | Updates kline: {stream.velas_recibidas}")
+        for nombre, ok in checks.items():
+            print(f"   {'✅' if ok else '❌'} {nombre}")
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--servir':
+        # Servidor manual: MARKET_DATA_MODE='STREAM' y WS_URL='ws://127.0.0.1:8765'
+        s = ServidorStreamLocal(seg_por_vela=60, seg_por_mensaje=0.25)
+        print(f"📡 Sirviendo stream simulado en {s.iniciar()} (Ctrl+C para salir)")
+        try:
+            while True: time.sleep(1)
+        except KeyboardInterrupt:
+            s.detener()
+    else:
+        sys.exit(0 if verificar() else 1)
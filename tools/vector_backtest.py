@@ -0,0 +1,72 @@
+"""
+MOTOR VECTORIZADO DE BACKTEST
+Primitivas compartidas por los backtesters (v3 pro, v4 dynamic, v4 unified):
+- Las señales de entrada se calculan como arrays booleanos sobre el frame MTF.
+- Las salidas se resuelven con una búsqueda del primer toque sobre los arrays
+  hacia adelante (bloques crecientes: coste proporcional a la duración del trade).
+- Solo los eventos dispersos (entradas, salidas, cambios de estado de zonas)
+  pasan por Python; ya no se recorre el frame fila a fila como dicts.
+Las comparaciones se hacen con los mismos floats que el bucle por filas, así que
+la lista de operaciones resultante es idéntica.
+"""
+import numpy as np
+
+BLOQUE_INICIAL = 256
+BLOQUE_MAXIMO = 1 << 16
+
+
+def columna(df, nombre, defecto):
+    """Equivalente vectorial de row.get(nombre, defecto)."""
+    if nombre in df.columns: return df[nombre].to_numpy(dtype=np.float64)
+    return np.full(len(df), defecto, dtype=np.float64)
+
+
+def primer_indice(condicion, desde, n):
+    """
+    Primer j en [desde, n) donde condicion(a, b) (array booleano de b-a) es
+    verdadera, o None. Evalúa en bloques que se duplican hasta BLOQUE_MAXIMO.
+    """
+    a = max(int(desde), 0)
+    bloque = BLOQUE_INICIAL
+    while a < n:
+        b = min(n, a + bloque)
+        m = condicion(a, b)
+        if m.any(): return a + int(m.argmax())
+        a = b
+        bloque = min(bloque * 2, BLOQUE_MAXIMO)
+    return None
+
+
+def primera_salida(serie_sl, serie_tp, desde, sl, tp, lado):
+    """
+    Primera vela >= desde que toca SL o TP. LONG: serie_sl <= sl / serie_tp >= tp;
+    SHORT al revés. Si ambas tocan en la misma vela gana el SL (como los bucles).
+    Devuelve (indice, 'STOP_LOSS'|'TAKE_PROFIT') o (None, None).
+    """
+    n = len(serie_sl)
+    if lado == 'LONG':
+        j = primer_indice(lambda a, b: (serie_sl[a:b] <= sl) | (serie_tp[a:b] >= tp), desde, n)
+        if j is None: return None, None
+        return j, 'STOP_LOSS' if serie_sl[j] <= sl else 'TAKE_PROFIT'
+    j = primer_indice(lambda a, b: (serie_sl[a:b] >= sl) | (serie_tp[a:b] <= tp), desde, n)
+    if j is None: return None, None
+    return j, 'STOP_LOSS' if serie_sl[j] >= sl else 'TAKE_PROFIT'
+
+
+def siguiente(indices, desde):
+    """Primer valor de 'indices' (ordenado) >= desde, o None."""
+    k = int(np.searchsorted(indices, desde))
+    return int(indices[k]) if k < len(indices) else None
+
+
+def en_zona(precio, bottom, top):
+    return (bottom <= precio) & (precio <= top)
+
+
+def primera_zona(precio, bottoms, tops):
+    """Por vela, índice de la primera zona [bottom, top] (en orden de lista) que contiene el precio; -1 si ninguna."""
+    out = np.full(len(precio), -1, dtype=np.int64)
+    for k in range(len(bottoms)):
+        m = (out < 0) & en_zona(precio, bottoms[k], tops[k])
+        out[m] = k
+    return out
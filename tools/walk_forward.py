@@ -0,0 +1,186 @@
+import sys
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+# Ajuste de path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from config.config import Config
+from tools.param_sweep import (BACKTESTERS, combinaciones, id_combinacion, parsear_parametro, validar_grid,
+                               cargar_frame, ejecutar_tareas, _leer_checkpoint)
+
+DIA_NS = 86400 * 10**9
+
+
+def ventanas(tiempos, dias_is, dias_oos, paso=None, anclado=False):
+    """
+    Ventanas walk-forward sobre 'tiempos' (datetime64 ordenados): in-sample de
+    'dias_is' seguida de out-of-sample de 'dias_oos', avanzando 'paso' días
+    (por defecto dias_oos). 'anclado': la in-sample crece desde el inicio.
+    Devuelve filas [inicio, fin) de cada tramo; solo folds con la OOS completa.
+    """
+    ts = np.asarray(tiempos).astype('datetime64[ns]').astype(np.int64)
+    paso = paso or dias_oos
+    folds = []
+    k = 0
+    while True:
+        is_inicio = ts[0] if anclado else ts[0] + k * paso * DIA_NS
+        is_fin = ts[0] + (dias_is + k * paso) * DIA_NS
+        oos_fin = is_fin + dias_oos * DIA_NS
+        if oos_fin > ts[-1] + 60 * 10**9: break
+        a, b, c = np.searchsorted(ts, [is_inicio, is_fin, oos_fin], side='left')
+        folds.append({'fold': k + 1, 'is': (int(a), int(b)), 'oos': (int(b), int(c)),
+                      'is_desde': pd.Timestamp(int(is_inicio)), 'oos_desde': pd.Timestamp(int(is_fin)),
+                      'oos_hasta': pd.Timestamp(int(oos_fin))})
+        k += 1
+    return folds
+
+
+def _id(params, tramo):
+    return id_combinacion({**params, '_tramo': list(tramo)})
+
+
+def _mejor(filas, orden, min_trades):
+    """Fila in-sample ganadora (orden de combinación como desempate), o None si ninguna opera lo suficiente."""
+    validas = [f for f in filas if f['trades'] >= min_trades]
+    if not validas: return None
+    signo = 1 if orden == 'max_dd_pct' else -1
+    return min(validas, key=lambda f: signo * f[orden])
+
+
+def walk_forward(nombre_bt, grid, dias_is=30, dias_oos=7, paso=None, anclado=False, procesos=None,
+                 orden='retorno_pct', min_trades=5, nombre=None, reiniciar=False, df=None, carpeta=None):
+    """
+    OPTIMIZACIÓN WALK-FORWARD
+    Por cada fold optimiza 'grid' en la in-sample y puntúa la combinación ganadora
+    (y la Config actual como referencia) en la out-of-sample siguiente.
+    El frame MTF con sus indicadores se carga UNA vez en memoria compartida; cada
+    fold es una vista por filas (los indicadores no se recalculan por ventana).
+    Todas las in-sample de todos los folds se reparten juntas en el pool.
+    Checkpoint <nombre>.jsonl (reanudable) y tabla <nombre>_folds.csv.
+    """
+    nombre = nombre or f"wf_{nombre_bt}_{id_combinacion({'grid': grid, 'is': dias_is, 'oos': dias_oos, 'paso': paso, 'anclado': anclado})}"
+    carpeta = carpeta or os.path.join(Config.BASE_DIR, 'logs', 'walk_forward')
+    os.makedirs(carpeta, exist_ok=True)
+    ruta_ckpt = os.path.join(carpeta, f"{nombre}.jsonl")
+    if reiniciar and os.path.exists(ruta_ckpt): os.remove(ruta_ckpt)
+
+    sonda = validar_grid(nombre_bt, grid)
+    if df is None: df = cargar_frame(nombre_bt, sonda)
+    if df is None: return None
+    tiempos = df.index if isinstance(df.index, pd.DatetimeIndex) else df['datetime']
+    folds = ventanas(tiempos, dias_is, dias_oos, paso, anclado)
+    if not folds:
+        print(f"❌ Datos insuficientes para {dias_is}d IS + {dias_oos}d OOS.")
+        return None
+
+    combos = combinaciones(grid)
+    hechos = _leer_checkpoint(ruta_ckpt)
+    print(f"🧭 Walk-forward {nombre}: {len(folds)} folds x {len(combos)} combinaciones "
+          f"({dias_is}d IS / {dias_oos}d OOS{', anclado' if anclado else ''})")
+
+    # 1. IN-SAMPLE: todas las combinaciones de todos los folds en paralelo
+    tareas = {}
+    for f in folds:
+        for p in combos:
+            id_tarea = _id(p, f['is'])
+            if id_tarea not in hechos: tareas[id_tarea] = (p, f['is'])
+    hechos.update(ejecutar_tareas(nombre_bt, tareas, df, ruta_ckpt, procesos))
+
+    # 2. OUT-OF-SAMPLE: ganadora de cada fold + Config actual
+    for f in folds:
+        filas = [dict(hechos[_id(p, f['is'])], params=p) for p in combos if _id(p, f['is']) in hechos]
+        f['mejor'] = _mejor(filas, orden, min_trades)
+    tareas = {}
+    for f in folds:
+        for p in ([f['mejor']['params']] if f['mejor'] else []) + [{}]:
+            id_tarea = _id(p, f['oos'])
+            if id_tarea not in hechos: tareas[id_tarea] = (p, f['oos'])
+    hechos.update(ejecutar_tareas(nombre_bt, tareas, df, ruta_ckpt, procesos))
+
+    # 3. TABLA POR FOLD
+    filas = []
+    for f in folds:
+        base = hechos.get(_id({}, f['oos']), {})
+        fila = {'fold': f['fold'], 'is_desde': f['is_desde'], 'oos_desde': f['oos_desde'], 'oos_hasta': f['oos_hasta']}
+        if f['mejor']:
+            oos = hechos.get(_id(f['mejor']['params'], f['oos']), {})
+            fila.update(f['mejor']['params'])
+            fila.update({'is_trades': f['mejor']['trades'], f'is_{orden}': f['mejor'][orden],
+                         'is_retorno_pct': f['mejor']['retorno_pct'],
+                         'oos_trades': oos.get('trades'), 'oos_retorno_pct': oos.get('retorno_pct'),
+                         'oos_pnl_neto': oos.get('pnl_neto'), 'oos_max_dd_pct': oos.get('max_dd_pct')})
+        fila.update({'base_oos_retorno_pct': base.get('retorno_pct'), 'base_oos_pnl_neto': base.get('pnl_neto')})
+        filas.append(fila)
+    tabla = pd.DataFrame(filas)
+    ruta_csv = os.path.join(carpeta, f"{nombre}_folds.csv")
+    tabla.to_csv(ruta_csv, index=False)
+    _resumen(tabla, grid, dias_is, dias_oos)
+    print(f"✅ Folds guardados en {ruta_csv}")
+    return tabla
+
+
+def _resumen(tabla, grid, dias_is, dias_oos):
+    print("\n" + "=" * 60)
+    print("📊 WALK-FORWARD: IN-SAMPLE vs OUT-OF-SAMPLE")
+    print("=" * 60)
+    columnas = [c for c in ['fold', 'oos_desde'] + sorted(grid) + ['is_retorno_pct', 'oos_retorno_pct',
+                'base_oos_retorno_pct', 'oos_trades'] if c in tabla.columns]
+    print(tabla[columnas].to_string(index=False))
+    if 'oos_retorno_pct' not in tabla.columns or tabla['oos_retorno_pct'].isna().all():
+        print("\n⚠️ Ningún fold tuvo una combinación con suficientes trades in-sample.")
+        return
+
+    evaluados = tabla.dropna(subset=['oos_retorno_pct'])
+    is_diario = evaluados['is_retorno_pct'].mean() / dias_is
+    oos_diario = evaluados['oos_retorno_pct'].mean() / dias_oos
+    # Eficiencia walk-forward: rendimiento diario OOS / IS (< 0.5 sugiere sobreajuste)
+    wfe = oos_diario / is_diario if is_diario > 0 else float('nan')
+    print(f"\n   Folds evaluados:       {len(evaluados)}/{len(tabla)}")
+    print(f"   OOS positivos:         {(evaluados['oos_retorno_pct'] > 0).mean() * 100:.0f}%")
+    print(f"   Retorno OOS (suma):    {evaluados['oos_retorno_pct'].sum():.2f}% "
+          f"| Config actual: {evaluados['base_oos_retorno_pct'].sum():.2f}%")
+    print(f"   Eficiencia WF (OOS/IS): {wfe:.2f}{'  ⚠️ posible sobreajuste' if wfe < 0.5 else ''}")
+    print("   Estabilidad de parámetros (veces elegido):")
+    for ruta in sorted(grid):
+        conteo = evaluados[ruta].value_counts()
+        print(f"     {ruta}: " + ", ".join(f"{v}×{n}" for v, n in conteo.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimización walk-forward de los backtesters")
+    parser.add_argument('--bt', choices=sorted(BACKTESTERS), default='v4_unified')
+    parser.add_argument('-p', '--param', action='append', default=[],
+                        help="ruta=v1,v2,... o ruta=inicio:fin:paso (ver tools/param_sweep.py)")
+    parser.add_argument('--grid', help="JSON {ruta: [valores]} (se combina con --param)")
+    parser.add_argument('--dias-is', type=float, default=30)
+    parser.add_argument('--dias-oos', type=float, default=7)
+    parser.add_argument('--paso', type=float, default=None, help="Días entre folds (por defecto = OOS)")
+    parser.add_argument('--anclado', action='store_true', help="In-sample creciente desde el inicio")
+    parser.add_argument('--min-trades', type=int, default=5)
+    parser.add_argument('--orden', default='retorno_pct',
+                        choices=['pnl_neto', 'retorno_pct', 'profit_factor', 'win_rate', 'expectativa', 'max_dd_pct'])
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--nombre', default=None)
+    parser.add_argument('--reiniciar', action='store_true', help="Descarta el checkpoint existente")
+    args = parser.parse_args()
+
+    grid = {}
+    if args.grid:
+        with open(args.grid, encoding='utf-8') as f:
+            grid.update(json.load(f))
+    for texto in args.param:
+        ruta, valores = parsear_parametro(texto)
+        grid[ruta] = valores
+    if not grid:
+        print("❌ Grid vacío (usa --param o --grid)")
+        sys.exit(1)
+    tabla = walk_forward(args.bt, grid, args.dias_is, args.dias_oos, args.paso, args.anclado, args.procesos,
+                         args.orden, args.min_trades, args.nombre, args.reiniciar)
+    sys.exit(0 if tabla is not None else 1)